@@ -65,9 +65,12 @@ function install_tensorflow() {
 function build_dynamic_libraries() {
   # Explicitly build the dynamic library targets that are needed for the wheel.
   # These are required by the stamp_wheel function.
-  bazel build //struct2tensor/ops:_decode_proto_map_op.so || exit 1;
-  bazel build //struct2tensor/ops:_decode_proto_sparse_op.so || exit 1;
+  bazel build //struct2tensor/ops:_compose_parent_indices_op.so || exit 1;
+  bazel build //struct2tensor/ops:_decode_proto_op.so || exit 1;
+  bazel build //struct2tensor/ops:_prensor_encoding_op.so || exit 1;
   bazel build //struct2tensor/ops:_run_length_before_op.so || exit 1;
+  bazel build //struct2tensor/ops:_segment_count_op.so || exit 1;
+  bazel build //struct2tensor/ops:_slice_indices_op.so || exit 1;
   bazel build //struct2tensor/ops:_equi_join_any_indices_op.so || exit 1;
   bazel build //struct2tensor/ops:_equi_join_indices_op.so || exit 1;
   bazel build //struct2tensor/ops:_parquet_dataset_op.so || exit 1;
@@ -11,44 +11,82 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Import core names for struct2tensor."""
-
-# Import calculate API.
-from struct2tensor.calculate import calculate_prensors
-from struct2tensor.calculate import calculate_prensors_with_graph
-from struct2tensor.calculate_options import get_default_options
-from struct2tensor.calculate_options import get_options_with_minimal_checks
-from struct2tensor.calculate_with_source_paths import calculate_prensors_with_source_paths
-
-# Import expressions API.
-from struct2tensor.create_expression import create_expression_from_prensor
-from struct2tensor.expression import Expression
-
-# Import expression queries API
-from struct2tensor.expression_impl.proto import create_expression_from_file_descriptor_set
-from struct2tensor.expression_impl.proto import create_expression_from_proto
-
-# Import path API
-from struct2tensor.path import create_path
-from struct2tensor.path import Path
-from struct2tensor.path import Step
-
-# Import prensor API
-from struct2tensor.prensor import ChildNodeTensor
-from struct2tensor.prensor import create_prensor_from_descendant_nodes
-from struct2tensor.prensor import create_prensor_from_root_and_children
-from struct2tensor.prensor import LeafNodeTensor
-from struct2tensor.prensor import NodeTensor
-from struct2tensor.prensor import Prensor
-from struct2tensor.prensor import RootNodeTensor
-
-# TODO(b/163167832): Remove these after 0.32.0 is released.
-from struct2tensor.prensor_util import get_ragged_tensor
-from struct2tensor.prensor_util import get_ragged_tensors
-from struct2tensor.prensor_util import get_sparse_tensor
-from struct2tensor.prensor_util import get_sparse_tensors
-
-# Importing this will register the session handler for PrensorValue, and
-# tf.compat.v1.Session.run() will be able to take a Prensor and return a
-# PrensorValue.
-import struct2tensor.prensor_value
+"""Import core names for struct2tensor.
+
+The names are resolved on first access, so that `import struct2tensor` does
+not import tensorflow (or pyarrow), nor load the op libraries. For example,
+`struct2tensor.Path` only imports the path module.
+
+The session handler for PrensorValue, which lets tf.compat.v1.Session.run()
+take a Prensor and return a PrensorValue, is registered by the prensor module,
+so it is registered however prensor is imported.
+"""
+
+import importlib
+from typing import Any, List
+
+# A map from each core name to the module that defines it.
+_NAME_TO_MODULE = {
+    # Import calculate API.
+    "calculate_prensors": "struct2tensor.calculate",
+    "calculate_prensors_with_graph": "struct2tensor.calculate",
+    "CompiledQuery": "struct2tensor.calculate",
+    "get_default_options": "struct2tensor.calculate_options",
+    "get_options_with_minimal_checks": "struct2tensor.calculate_options",
+    "calculate_prensors_with_source_paths":
+        "struct2tensor.calculate_with_source_paths",
+
+    # Import expressions API.
+    "create_expression_from_prensor": "struct2tensor.create_expression",
+    "Expression": "struct2tensor.expression",
+
+    # Import expression queries API
+    "create_expression_from_file_descriptor_set":
+        "struct2tensor.expression_impl.proto",
+    "create_expression_from_proto": "struct2tensor.expression_impl.proto",
+
+    # Import path API
+    "create_path": "struct2tensor.path",
+    "Path": "struct2tensor.path",
+    "Step": "struct2tensor.path",
+
+    # Import prensor API
+    "ChildNodeTensor": "struct2tensor.prensor",
+    "create_prensor_from_descendant_nodes": "struct2tensor.prensor",
+    "create_prensor_from_root_and_children": "struct2tensor.prensor",
+    "LeafNodeTensor": "struct2tensor.prensor",
+    "NodeTensor": "struct2tensor.prensor",
+    "Prensor": "struct2tensor.prensor",
+    "RootNodeTensor": "struct2tensor.prensor",
+
+    # TODO(b/163167832): Remove these after 0.32.0 is released.
+    "get_ragged_tensor": "struct2tensor.prensor_util",
+    "get_ragged_tensors": "struct2tensor.prensor_util",
+    "get_sparse_tensor": "struct2tensor.prensor_util",
+    "get_sparse_tensors": "struct2tensor.prensor_util",
+}
+
+
+def __getattr__(name: str) -> Any:
+  """Resolves a core name or a submodule on first access."""
+  module_name = _NAME_TO_MODULE.get(name)
+  if module_name is None:
+    module_name = "{}.{}".format(__name__, name)
+    try:
+      # The submodule may still be being imported (e.g. prensor_value, while
+      # it imports prensor), so it is not always an attribute of this package
+      # yet.
+      return importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+      if e.name != module_name:
+        raise
+      raise AttributeError("module {} has no attribute {}".format(
+          __name__, name)) from None
+  value = getattr(importlib.import_module(module_name), name)
+  # Later accesses do not call __getattr__.
+  globals()[name] = value
+  return value
+
+
+def __dir__() -> List[str]:
+  return sorted(set(globals()) | set(_NAME_TO_MODULE))
@@ -0,0 +1,104 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+r"""Benchmarks for the cold import time of struct2tensor.
+
+Each iteration imports struct2tensor in a new python interpreter, and measures
+the time spent in the import statement (not the interpreter startup).
+
+Usage:
+blaze run -c opt --dynamic_mode=off \
+  //struct2tensor/benchmarks:import_benchmark \
+  -- --notest_mode
+
+Results:
+Num Iterations|Total (wall) Time (s)|Wall Time avg(ms)|Wall Time std
+"""
+
+import statistics
+import subprocess
+import sys
+
+from absl import flags
+from absl.testing import absltest
+from absl.testing import parameterized
+from struct2tensor.benchmarks import struct2tensor_benchmark_util  # pylint: disable=unused-import
+
+FLAGS = flags.FLAGS
+
+# Runs `statement` and prints the seconds it took.
+_TIMED_PROGRAM = """
+import timeit
+start_time = timeit.default_timer()
+{statement}
+print(timeit.default_timer() - start_time)
+"""
+
+
+class ImportBenchmarks(parameterized.TestCase):
+  """Benchmarks for the cold import time of struct2tensor."""
+
+  def _cold_import_seconds(self, statement):
+    output = subprocess.run(
+        [sys.executable, "-c", _TIMED_PROGRAM.format(statement=statement)],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True).stdout
+    return float(output.split()[-1])
+
+  @parameterized.named_parameters(*[
+      dict(
+          testcase_name="import_struct2tensor",
+          fn_name="import_struct2tensor",
+          statement="import struct2tensor",
+      ),
+      dict(
+          testcase_name="import_path",
+          fn_name="import_path",
+          statement="from struct2tensor import path",
+      ),
+      dict(
+          testcase_name="import_prensor_value",
+          fn_name="import_prensor_value",
+          statement="from struct2tensor import prensor_value",
+      ),
+      dict(
+          testcase_name="resolve_prensor",
+          fn_name="resolve_prensor",
+          statement="import struct2tensor as s2t; s2t.Prensor",
+      ),
+      dict(
+          testcase_name="load_op_libraries",
+          fn_name="load_op_libraries",
+          statement=("from struct2tensor.ops import struct2tensor_ops; "
+                     "struct2tensor_ops.load_op_libraries()"),
+      ),
+  ])
+  def test_cold_import(self, fn_name, statement):
+    iterations = 20
+    if FLAGS.test_mode:
+      print("WARNING: --test_mode is True. Setting iterations to 2.")
+      iterations = 2  # 2 iterations so we can calculate stdev.
+
+    print(f"BEGIN {fn_name}:\tNum Iterations\tTotal (wall) Time (s)\t"
+          "Wall Time avg(ms)\tWall Time std")
+    wall_times = [
+        self._cold_import_seconds(statement) * 1000 for _ in range(iterations)
+    ]
+    total_duration = sum(wall_times)
+    print(f"{fn_name}: \t{iterations}\t{total_duration / 1000}\t"
+          f"{total_duration / iterations}\t{statistics.stdev(wall_times)}")
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -53,6 +53,12 @@ class EquiJoinIndicesBenchmarks(struct2tensor_benchmark_util.OpsBenchmarks):
           fn_args=[],
           data_key="random",
       ),
+      dict(
+          testcase_name="equi_join_indices_parent_index",
+          fn_name="equi_join_indices_parent_index",
+          fn_args=[],
+          data_key="parent_index",
+      ),
   ])
   def test_equi_join_indices(self, fn_name, fn_args, data_key):
 
@@ -83,6 +89,12 @@ class EquiJoinAnyIndicesBenchmarks(struct2tensor_benchmark_util.OpsBenchmarks):
           fn_args=[],
           data_key="random",
       ),
+      dict(
+          testcase_name="equi_join_any_indices_parent_index",
+          fn_name="equi_join_any_indices_parent_index",
+          fn_args=[],
+          data_key="parent_index",
+      ),
   ])
   def test_equi_join_indices(self, fn_name, fn_args, data_key):
 
@@ -375,6 +375,36 @@ class ProjectBenchmarks(struct2tensor_benchmark_util.ProtoDataBenchmarks):
           ],
           proto_list_key="flat_protos",
       ),
+  ] + [
+      # Wide protos: half of the fields are requested, and the other half
+      # (interleaved with them on the wire) is skipped.
+      dict(
+          testcase_name="project_50_of_100_flat_int_fields_{}".format(key),
+          fn_name="project_50_of_100_flat_int_fields_{}".format(key),
+          fn_args=[
+              benchmark_pb2.FlatProto100.DESCRIPTOR,
+              [
+                  s2t.path.Path(["int_values_{}".format(i)])
+                  for i in range(1, 101, 2)
+              ]
+          ],
+          proto_list_key=key,
+      ) for key in ["flat_protos_100_features",
+                    "flat_protos_100_features_100_values"]
+  ] + [
+      dict(
+          testcase_name="project_100_of_100_flat_int_fields_{}".format(key),
+          fn_name="project_100_of_100_flat_int_fields_{}".format(key),
+          fn_args=[
+              benchmark_pb2.FlatProto100.DESCRIPTOR,
+              [
+                  s2t.path.Path(["int_values_{}".format(i)])
+                  for i in range(1, 101)
+              ]
+          ],
+          proto_list_key=key,
+      ) for key in ["flat_protos_100_features",
+                    "flat_protos_100_features_100_values"]
   ])
   # pylint: enable=g-complex-comprehension
   def test_project(self, fn_name, fn_args, proto_list_key):
@@ -708,6 +738,19 @@ class PrensorToTensorBenchmarks(
               ]
           ],
           proto_list_key="deep_protos"),
+      dict(
+          testcase_name="deep_to_ragged_5_all_leaves",
+          fn_name="deep_to_ragged_5_all_leaves",
+          fn_args=[
+              benchmark_pb2.DeepProto.DESCRIPTOR,
+              [
+                  s2t.path.Path([
+                      "child_1", "child_2", "child_3", "child_4", leaf
+                  ]) for leaf in
+                  ["int_values_5", "float_values_5", "bytes_values_5"]
+              ]
+          ],
+          proto_list_key="deep_protos"),
   ])
   # pylint: enable=g-complex-comprehension
   def test_to_ragged(self, fn_name, fn_args, proto_list_key):
@@ -809,6 +852,19 @@ class PrensorToTensorBenchmarks(
               ]
           ],
           proto_list_key="deep_protos"),
+      dict(
+          testcase_name="deep_to_sparse_5_all_leaves",
+          fn_name="deep_to_sparse_5_all_leaves",
+          fn_args=[
+              benchmark_pb2.DeepProto.DESCRIPTOR,
+              [
+                  s2t.path.Path([
+                      "child_1", "child_2", "child_3", "child_4", leaf
+                  ]) for leaf in
+                  ["int_values_5", "float_values_5", "bytes_values_5"]
+              ]
+          ],
+          proto_list_key="deep_protos"),
   ])
   # pylint: enable=g-complex-comprehension
   def test_to_sparse(self, fn_name, fn_args, proto_list_key):
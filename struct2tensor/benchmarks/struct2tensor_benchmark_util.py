@@ -21,6 +21,7 @@ import timeit
 from absl import flags
 from absl.testing import parameterized
 import cpuinfo
+import numpy as np
 import psutil
 import tensorflow as tf
 
@@ -274,4 +275,25 @@ class OpsBenchmarks(Struct2tensorBenchmarksBase):
     random.shuffle(rand_b)
 
     cls._data = {"monotonic_increasing": [[a, b]],
-                 "random": [[rand_a, rand_b]]}
+                 "random": [[rand_a, rand_b]],
+                 "parent_index": [
+                     _create_parent_index_data(size)
+                     for size in (1000, 1000000, 10000000)
+                 ]}
+
+
+def _create_parent_index_data(size):
+  """Creates the parent indices of a parent and a child with size elements.
+
+  The child parent index is sorted, as it is in a prensor.
+
+  Args:
+    size: the number of parents, and of children.
+
+  Returns:
+    [parent_parent_index, child_parent_index] as int64 numpy arrays.
+  """
+  rng = np.random.default_rng(seed=0)
+  parent_parent_index = np.arange(size, dtype=np.int64)
+  child_parent_index = np.sort(rng.integers(0, size, size, dtype=np.int64))
+  return [parent_parent_index, child_parent_index]
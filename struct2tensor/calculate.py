@@ -28,6 +28,11 @@ also return the ExpressionGraph used to calculate the result. This is useful if
 you want to know what other expressions were used to calculate a value (e.g.,
 if you want to know what fields in the original protobuf tensor were parsed).
 
+CompiledQuery plans the calculation of the prensors of a list of expressions
+once, and then calculates them for any number of feed_dicts. This avoids
+rebuilding the expression graphs on every call (e.g., in eager mode or when a
+tf.function is retraced).
+
 
 All of this code does a variety of optimizations:
 
@@ -43,13 +48,18 @@ All of this code does a variety of optimizations:
 
 """
 
+from __future__ import annotations
+
+import time
 from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 # type(id(...)), disambiguated for clarity
 IDExpression = int
@@ -157,6 +167,103 @@ def calculate_prensors(
       expressions, options=options, feed_dict=feed_dict)[0]
 
 
+class CompiledQuery(object):
+  """The calculation of the prensors of a list of expressions, planned once.
+
+  calculate_prensors(...) plans the calculation (i.e., builds the original and
+  the canonical expression graphs) every time it is called. A CompiledQuery
+  plans it once, and then each call to calculate_prensors(feed_dict) only
+  calls calculate(...) on the expressions of the canonical graph, in order.
+
+  The inputs that vary from one call to the next must be passed in the
+  feed_dict (e.g., placeholder expressions, see
+  expression_impl/placeholder.py). Any other tensor held by the expressions
+  (e.g., the tensor of a proto expression) is used as is by every call.
+
+  Sample usage:
+
+  ```
+  placeholder_exp = placeholder.create_expression_from_schema(schema)
+  new_exp = expression_queries(placeholder_exp, ..)
+  query = calculate.CompiledQuery([new_exp])
+  for pren in prensors:
+    [result] = query.calculate_prensors(feed_dict={placeholder_exp: pren})
+  ```
+  """
+
+  def __init__(self,
+               expressions: Sequence[expression.Expression],
+               options: Optional[calculate_options.Options] = None):
+    """Plans the calculation of the prensors of expressions.
+
+    Args:
+      expressions: expressions to calculate prensors for.
+      options: options for calculate(...) methods.
+    """
+    start_time = time.perf_counter()
+    self._options = (
+        calculate_options.get_default_options() if options is None else options)
+    subtrees = [x.get_known_descendants() for x in expressions]
+    all_expressions = []
+    for tree in subtrees:
+      all_expressions.extend(tree.values())
+    self._graph = CanonicalExpressionGraph(
+        OriginalExpressionGraph(all_expressions))
+    nodes = self._graph.ordered_node_list
+    node_index = {id(node): i for i, node in enumerate(nodes)}
+    # The indices (in nodes) of the sources of each node.
+    self._source_indices = [[
+        node_index[id(self._graph._get_node(x))] for x in node.sources  # pylint: disable=protected-access
+    ] for node in nodes]
+    # For each expression, a map from each path to the index of its node.
+    self._subtree_indices = [{
+        k: node_index[id(self._graph._get_node(v))]  # pylint: disable=protected-access
+        for k, v in subtree.items()
+    } for subtree in subtrees]
+    self._planning_seconds = time.perf_counter() - start_time
+
+  @property
+  def planning_seconds(self) -> float:
+    """The time it took to plan the calculation, in seconds."""
+    return self._planning_seconds
+
+  @property
+  def graph(self) -> "ExpressionGraph":
+    """The graph used to calculate the prensors.
+
+    The values of its nodes are not set by calculate_prensors(...).
+    """
+    return self._graph
+
+  def calculate_prensors(
+      self,
+      feed_dict: Optional[Dict[expression.Expression, prensor.Prensor]] = None
+  ) -> Sequence[prensor.Prensor]:
+    """Gets the prensor value of the expressions.
+
+    Args:
+      feed_dict: a dictionary, mapping expression to prensor that will be used
+        as the initial expression in the expression graph.
+
+    Returns:
+      a list of prensors, one per expression.
+    """
+    values = []  # type: List[prensor.NodeTensor]
+    for node, source_indices in zip(self._graph.ordered_node_list,
+                                    self._source_indices):
+      side_info = feed_dict[node.expression] if feed_dict and (
+          node.expression in feed_dict) else None
+      values.append(
+          node.calculate_value([values[i] for i in source_indices],
+                               self._options,
+                               side_info=side_info))
+    return [
+        prensor.create_prensor_from_descendant_nodes(
+            {k: values[i] for k, i in subtree_indices.items()})
+        for subtree_indices in self._subtree_indices
+    ]
+
+
 # TODO(martinz): Create an option to create the original expression graph.
 def _create_graph(
     expressions: List[expression.Expression],
@@ -209,7 +316,7 @@ def _fancy_type_str(is_repeated: bool, dtype: Optional[tf.DType]):
 
 def _node_type_str(node_tensor: prensor.NodeTensor):
   if isinstance(node_tensor, prensor.LeafNodeTensor):
-    return _fancy_type_str(node_tensor.is_repeated, node_tensor.values.dtype)
+    return _fancy_type_str(node_tensor.is_repeated, node_tensor.dtype)
   else:
     return _fancy_type_str(node_tensor.is_repeated, None)
 
@@ -231,6 +338,7 @@ class _ExpressionNode(object):
     ]
     self.destinations = []  # type: List[_ExpressionNode]
     self.value = None
+    self._fingerprint = expr.calculation_fingerprint()
 
   def __eq__(self, node: "_ExpressionNode") -> bool:
     """Test if this node is equal to the other.
@@ -243,6 +351,8 @@ class _ExpressionNode(object):
     Returns:
       True if the nodes are guaranteed to have equal value.
     """
+    if self._fingerprint != node._fingerprint:  # pylint: disable=protected-access
+      return False
     if not self.expression.calculation_equal(node.expression):
       return False
     # This assumes the sources are canonical, so we check for identity equality
@@ -257,43 +367,68 @@ class _ExpressionNode(object):
                 destinations=str(self.destinations),
                 value=str(self.value))
 
-  def _create_value_error(self) -> ValueError:
-    """Creates a ValueError, assuming there should be one for this node."""
-    assert self.value is not None
+  def _create_value_error(self, value: prensor.NodeTensor) -> ValueError:
+    """Creates a ValueError, assuming there should be one for this value."""
+    assert value is not None
     return ValueError("Expression {} returned the wrong type:"
                       " expected: {}"
                       " actual: {}.".format(
                           self.expression,
                           _fancy_type_str(self.expression.is_repeated,
                                           self.expression.type),
-                          _node_type_str(self.value)))
+                          _node_type_str(value)))
 
   def calculate(self,
                 source_values: Sequence[prensor.NodeTensor],
                 options: calculate_options.Options,
                 side_info: Optional[prensor.Prensor]) -> None:
     """Calculate the value of the node, and store it in self.value."""
-    self.value = self.expression.calculate(
-        source_values, [x.expression for x in self.destinations],
+    self.value = self.calculate_value(source_values, options, side_info)
+
+  def calculate_value(self, source_values: Sequence[prensor.NodeTensor],
+                      options: calculate_options.Options,
+                      side_info: Optional[prensor.Prensor]
+                     ) -> prensor.NodeTensor:
+    """Calculate the value of the node, without storing it."""
+    if self.expression.calculation_needs_transitive_destinations():
+      destinations = self._get_transitive_destinations()
+    else:
+      destinations = self.destinations
+    value = self.expression.calculate(
+        source_values, [x.expression for x in destinations],
         options,
         side_info=side_info)
-    if self.value.is_repeated != self.expression.is_repeated:
-      raise self._create_value_error()
+    if value.is_repeated != self.expression.is_repeated:
+      raise self._create_value_error(value)
     expected_type = self.expression.type
-    actual_value = self.value
     if expected_type is None:
-      if not (isinstance(actual_value, prensor.RootNodeTensor) or
-              isinstance(actual_value, prensor.ChildNodeTensor)):
-        raise self._create_value_error()
-    elif isinstance(actual_value, prensor.LeafNodeTensor):
-      if expected_type != actual_value.values.dtype:
-        raise self._create_value_error()
+      if not (isinstance(value, prensor.RootNodeTensor) or
+              isinstance(value, prensor.ChildNodeTensor)):
+        raise self._create_value_error(value)
+    elif isinstance(value, prensor.LeafNodeTensor):
+      if expected_type != value.dtype:
+        raise self._create_value_error(value)
     else:
-      raise self._create_value_error()
+      raise self._create_value_error(value)
+    return value
+
+  def _get_transitive_destinations(self) -> List["_ExpressionNode"]:
+    """Gets the nodes that depend upon this node, directly or indirectly."""
+    result = []  # type: List[_ExpressionNode]
+    visited = set()
+    to_visit = list(reversed(self.destinations))
+    while to_visit:
+      node = to_visit.pop()
+      if id(node) in visited:
+        continue
+      visited.add(id(node))
+      result.append(node)
+      to_visit.extend(reversed(node.destinations))
+    return result
 
   def __hash__(self) -> int:
     """This assumes all sources are canonical."""
-    return hash(tuple([id(x) for x in self.sources]))
+    return hash((self._fingerprint, tuple([id(x) for x in self.sources])))
 
 
 class ExpressionGraph(object):
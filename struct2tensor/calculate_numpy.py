@@ -0,0 +1,652 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Calculate the value of a list of expressions on PrensorValues with NumPy.
+
+calculate.calculate_prensors evaluates an expression graph with TensorFlow
+ops. calculate_prensor_values evaluates the same expression graph on
+PrensorValues (i.e., ndarrays) with vectorized NumPy operations, without
+building or running any TensorFlow ops:
+
+```
+placeholder_exp = placeholder.create_expression_from_schema(schema)
+new_exp = promote.promote(placeholder_exp, path.Path(["user", "friends"]),
+                          "new_friends")
+[result] = calculate_numpy.calculate_prensor_values(
+    [new_exp], feed_dict={placeholder_exp: my_prensor_value})
+# result is a PrensorValue.
+```
+
+The inputs of the expression graph must be placeholders, fed with
+PrensorValues. The graph is planned exactly as in calculate (identity
+operations are removed and common subexpressions are calculated once).
+
+The following operations are supported: placeholder, promote, broadcast (of
+fields and of subtrees), size, has, filter_expression, index,
+slice_expression, reroot, map_values, project, depth_limit and
+promote_and_broadcast. For map_values, the operation is called on the ndarrays
+of the sources, and its result is converted to an ndarray.
+
+This module does not import tensorflow. If the dtypes of the placeholder
+schema are NumPy dtypes, an expression graph of placeholder, promote,
+broadcast, project, depth_limit, promote_and_broadcast, reroot and map_values
+(with a NumPy dtype) is built and calculated without tensorflow. size, has,
+index, filter_expression and slice_expression create fields with a
+tensorflow dtype, so they import tensorflow when they are built.
+"""
+
+import collections
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from struct2tensor import calculate
+from struct2tensor import expression
+from struct2tensor import path
+from struct2tensor import prensor_value
+from struct2tensor.expression_impl import broadcast
+from struct2tensor.expression_impl import filter_expression
+from struct2tensor.expression_impl import index
+from struct2tensor.expression_impl import map_values
+from struct2tensor.expression_impl import placeholder
+from struct2tensor.expression_impl import promote
+from struct2tensor.expression_impl import reroot
+from struct2tensor.expression_impl import size
+from struct2tensor.expression_impl import slice_expression
+
+
+def run_length_before(a: np.ndarray) -> np.ndarray:
+  r"""Returns the run length of each set of elements in a vector.
+
+  This is the NumPy equivalent of struct2tensor_ops.run_length_before.
+
+  Args:
+    a: a 1D int64 ndarray. This assumes that for all a_i, a_j, if i <= j, then
+      a_i <= a_j.
+
+  Returns:
+    1D int64 ndarray [b_0,...,b_n] where b_n := \sum_{i=0}^{n-1} I(a_i=a_n)
+  """
+  a = np.asarray(a, dtype=np.int64)
+  positions = np.arange(a.size, dtype=np.int64)
+  if not a.size:
+    return positions
+  is_run_start = np.empty(a.size, dtype=bool)
+  is_run_start[0] = True
+  np.not_equal(a[1:], a[:-1], out=is_run_start[1:])
+  run_start = np.maximum.accumulate(np.where(is_run_start, positions, 0))
+  return positions - run_start
+
+
+def _join_ranges(lower: np.ndarray,
+                 upper: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  """Enumerates the ranges [lower[i], upper[i]) in order of i.
+
+  Args:
+    lower: a 1D int64 ndarray.
+    upper: a 1D int64 ndarray of the same size, where upper[i] >= lower[i].
+
+  Returns:
+    [index, position] where index[k] is the i of the kth element, and
+    position[k] is the kth element.
+  """
+  counts = upper - lower
+  index_a = np.repeat(np.arange(lower.size, dtype=np.int64), counts)
+  offsets = np.cumsum(counts) - counts
+  position = (np.arange(index_a.size, dtype=np.int64) -
+              np.repeat(offsets - lower, counts))
+  return index_a, position
+
+
+def equi_join_indices(a: np.ndarray,
+                      b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  """The NumPy equivalent of struct2tensor_ops.equi_join_indices.
+
+  Args:
+    a: an int64 vector, where for all i, a[i] <= a[i+1]
+    b: an int64 vector, where for all i, b[i] <= b[i+1]
+
+  Returns:
+    [index_a, index_b] where:
+    1. For every k, a[index_a[k]] = b[index_b[k]]
+    2. for every i,j, iff a[i]==b[j], then there exists a k where
+       index_a[k]=i and index_b[k]=j.
+    3. Moreover, for any k, k' where k < k',
+       index_a[k] <= index_a[k'], and if index_a[k] == index_a[k'], then
+       index_b[k] <= index_b[k'].
+  """
+  a = np.asarray(a, dtype=np.int64)
+  b = np.asarray(b, dtype=np.int64)
+  lower = np.searchsorted(b, a, side="left").astype(np.int64)
+  upper = np.searchsorted(b, a, side="right").astype(np.int64)
+  return _join_ranges(lower, upper)
+
+
+def equi_join_any_indices(a: np.ndarray,
+                          b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  """The NumPy equivalent of struct2tensor_ops.equi_join_any_indices.
+
+  Similar to `equi_join_indices`, except this does not assume `a` and `b` are
+  monotonically increasing. Prefer to use equi_join_indices if possible.
+
+  Args:
+    a: an int64 vector
+    b: an int64 vector
+
+  Returns:
+    [index_a, index_b] where:
+    1. For every k, a[index_a[k]] = b[index_b[k]]
+    2. for every i,j, iff a[i]==b[j], then there exists a k where
+       index_a[k]=i and index_b[k]=j.
+    3. Moreover, for any k, k' where k < k',
+       index_a[k] <= index_a[k'], and if index_a[k] == index_a[k'], then
+       index_b[k] <= index_b[k'].
+  """
+  a = np.asarray(a, dtype=np.int64)
+  b = np.asarray(b, dtype=np.int64)
+  # A stable sort keeps the indices of equal elements of b increasing.
+  b_order = np.argsort(b, kind="stable").astype(np.int64)
+  sorted_b = b[b_order]
+  lower = np.searchsorted(sorted_b, a, side="left").astype(np.int64)
+  upper = np.searchsorted(sorted_b, a, side="right").astype(np.int64)
+  index_a, position = _join_ranges(lower, upper)
+  return index_a, b_order[position]
+
+
+def calculate_values(
+    expressions: Sequence[expression.Expression],
+    feed_dict: Mapping[expression.Expression, prensor_value.PrensorValue]
+) -> List[prensor_value.NodeValue]:
+  """Calculates the NodeValues of the expressions.
+
+  Args:
+    expressions: A list of expressions to calculate.
+    feed_dict: a dictionary, mapping each placeholder root expression of the
+      expression graph to the PrensorValue it represents.
+
+  Returns:
+    A list of NodeValues.
+
+  Raises:
+    NotImplementedError: if an expression has no NumPy implementation.
+    ValueError: if an expression is calculated from values of the wrong type.
+  """
+  graph = calculate.CanonicalExpressionGraph(
+      calculate.OriginalExpressionGraph(expressions))
+  for node in graph.ordered_node_list:
+    source_values = [graph.get_value_or_die(x) for x in node.sources]
+    side_info = feed_dict.get(node.expression)
+    value = _calculate_node_value(node.expression, source_values, side_info)
+    _check_node_value(node.expression, value)
+    node.value = value
+  return [graph.get_value_or_die(x) for x in expressions]
+
+
+def calculate_prensor_values(
+    expressions: Sequence[expression.Expression],
+    feed_dict: Mapping[expression.Expression, prensor_value.PrensorValue]
+) -> List[prensor_value.PrensorValue]:
+  """Gets the PrensorValues of the expressions.
+
+  This is the NumPy equivalent of calculate.calculate_prensors.
+
+  Args:
+    expressions: expressions to calculate PrensorValues for.
+    feed_dict: a dictionary, mapping each placeholder root expression of the
+      expression graph to the PrensorValue it represents.
+
+  Returns:
+    a list of PrensorValues.
+
+  Raises:
+    NotImplementedError: if an expression has no NumPy implementation.
+    ValueError: if an expression is calculated from values of the wrong type.
+  """
+  subtrees = [x.get_known_descendants() for x in expressions]
+  all_expressions = []
+  for tree in subtrees:
+    all_expressions.extend(tree.values())
+  values = calculate_values(all_expressions, feed_dict)
+  value_map = {}
+  for expr, value in zip(all_expressions, values):
+    if id(expr) not in value_map:
+      value_map[id(expr)] = value
+  return [
+      _create_prensor_value_from_descendant_nodes(
+          {k: value_map[id(v)] for k, v in subtree.items()})
+      for subtree in subtrees
+  ]
+
+
+#################### Private methods and classes follow ########################
+
+
+def _create_prensor_value_from_descendant_nodes(
+    nodes: Mapping[path.Path, prensor_value.NodeValue]
+) -> prensor_value.PrensorValue:
+  """Creates a PrensorValue from a map from paths to NodeValues."""
+  subtree_nodes = collections.defaultdict(dict)
+  for p, node in nodes.items():
+    if p:
+      subtree_nodes[p.field_list[0]][path.Path(p.field_list[1:])] = node
+  children = collections.OrderedDict(
+      (step, _create_prensor_value_from_descendant_nodes(subtree))
+      for step, subtree in sorted(subtree_nodes.items()))
+  return prensor_value.PrensorValue(nodes[path.Path([])], children)
+
+
+class _PrensorAsRootNodeValue(prensor_value.RootNodeValue):
+  """The root of a PrensorValue fed to a placeholder."""
+
+  __slots__ = ["_prensor"]
+
+  def __init__(self, prensor_tree: prensor_value.PrensorValue):
+    super().__init__(prensor_tree.node.size)
+    self._prensor = prensor_tree
+
+  @property
+  def prensor(self) -> prensor_value.PrensorValue:
+    return self._prensor
+
+
+class _PrensorAsChildNodeValue(prensor_value.ChildNodeValue):
+  """A child of a PrensorValue fed to a placeholder."""
+
+  __slots__ = ["_prensor"]
+
+  def __init__(self, prensor_tree: prensor_value.PrensorValue):
+    super().__init__(prensor_tree.node.parent_index,
+                     prensor_tree.node.is_repeated)
+    self._prensor = prensor_tree
+
+  @property
+  def prensor(self) -> prensor_value.PrensorValue:
+    return self._prensor
+
+
+class _PrensorAsLeafNodeValue(prensor_value.LeafNodeValue):
+  """A leaf of a PrensorValue fed to a placeholder."""
+
+  __slots__ = ["_prensor"]
+
+  def __init__(self, prensor_tree: prensor_value.PrensorValue):
+    super().__init__(prensor_tree.node.parent_index, prensor_tree.node.values,
+                     prensor_tree.node.is_repeated)
+    self._prensor = prensor_tree
+
+  @property
+  def prensor(self) -> prensor_value.PrensorValue:
+    return self._prensor
+
+
+class _IndexedRootNodeValue(prensor_value.RootNodeValue):
+  """A root node where each element points to an element of another node.
+
+  A filtered root points to the element it keeps (indices_to_keep), and a
+  rerooted root points to the input proto it comes from (input_proto_index).
+  """
+
+  __slots__ = ["_index"]
+
+  def __init__(self, root_size: np.int64, node_index: np.ndarray):
+    super().__init__(root_size)
+    self._index = node_index
+
+  @property
+  def index(self) -> np.ndarray:
+    return self._index
+
+
+class _IndexedChildNodeValue(prensor_value.ChildNodeValue):
+  """A child node where each element points to an element of another node.
+
+  A filtered node points to the element it keeps (indices_to_keep), and a
+  broadcasted subtree points to the element it copies (index_to_value).
+  """
+
+  __slots__ = ["_index"]
+
+  def __init__(self, parent_index: np.ndarray, is_repeated: bool,
+               node_index: np.ndarray):
+    super().__init__(parent_index, is_repeated)
+    self._index = node_index
+
+  @property
+  def index(self) -> np.ndarray:
+    return self._index
+
+
+def _prensor_as_node_value(
+    prensor_tree: prensor_value.PrensorValue) -> prensor_value.NodeValue:
+  node = prensor_tree.node
+  if isinstance(node, prensor_value.RootNodeValue):
+    return _PrensorAsRootNodeValue(prensor_tree)
+  if isinstance(node, prensor_value.ChildNodeValue):
+    return _PrensorAsChildNodeValue(prensor_tree)
+  return _PrensorAsLeafNodeValue(prensor_tree)
+
+
+def _num_elements(node: prensor_value.NodeValue) -> np.int64:
+  """The number of elements of a node, as if it was the root."""
+  if isinstance(node, prensor_value.RootNodeValue):
+    return np.int64(node.size)
+  return np.int64(node.parent_index.size)
+
+
+def _leaf_or_error(node: prensor_value.NodeValue,
+                   name: str) -> prensor_value.LeafNodeValue:
+  if not isinstance(node, prensor_value.LeafNodeValue):
+    raise ValueError("{} must be a LeafNodeValue, but was a {}".format(
+        name, type(node)))
+  return node
+
+
+def _child_or_error(node: prensor_value.NodeValue,
+                    name: str) -> prensor_value.ChildNodeValue:
+  if not isinstance(node, prensor_value.ChildNodeValue):
+    raise ValueError("{} must be a ChildNodeValue, but was a {}".format(
+        name, type(node)))
+  return node
+
+
+def _not_root_or_error(node: prensor_value.NodeValue, name: str):
+  if isinstance(node, prensor_value.RootNodeValue):
+    raise ValueError("{} must not be a RootNodeValue".format(name))
+  return node
+
+
+def _placeholder_root(expr, sources, side_info):
+  del expr
+  if sources:
+    raise ValueError("_PlaceholderRootExpression has no sources")
+  if side_info is None:
+    raise ValueError("_PlaceholderRootExpression requires a PrensorValue")
+  return _prensor_as_node_value(side_info)
+
+
+def _placeholder_child(expr, sources, side_info):
+  if side_info is not None:
+    return _prensor_as_node_value(side_info)
+  [parent] = sources
+  if not isinstance(parent, (_PrensorAsRootNodeValue, _PrensorAsChildNodeValue)):
+    raise ValueError("The parent of a placeholder is not a PrensorValue")
+  step = expr.get_path().field_list[-1]
+  my_prensor = parent.prensor.get_child(step)
+  if my_prensor is None:
+    raise ValueError("step {} does not exist in prensor: {}".format(
+        step, parent.prensor))
+  return _prensor_as_node_value(my_prensor)
+
+
+def _promote(expr, sources, side_info):
+  del side_info
+  origin = sources[0]
+  new_parent_index = origin.parent_index
+  # Composes the parent indices of the ancestors the node is promoted past.
+  for ancestor in sources[1:]:
+    ancestor = _child_or_error(ancestor, "origin_parent_value")
+    new_parent_index = ancestor.parent_index[new_parent_index]
+  if isinstance(expr, promote.PromoteExpression):
+    origin = _leaf_or_error(origin, "origin_value")
+    return prensor_value.LeafNodeValue(new_parent_index, origin.values,
+                                       expr.is_repeated)
+  _child_or_error(origin, "origin_value")
+  return prensor_value.ChildNodeValue(new_parent_index, expr.is_repeated)
+
+
+def _broadcast(expr, sources, side_info):
+  del side_info
+  [origin, sibling] = sources
+  origin = _leaf_or_error(origin, "origin_value")
+  sibling = _child_or_error(sibling, "sibling_value")
+  new_parent_index, index_to_values = equi_join_indices(
+      sibling.parent_index, origin.parent_index)
+  return prensor_value.LeafNodeValue(new_parent_index,
+                                     origin.values[index_to_values],
+                                     expr.is_repeated)
+
+
+def _broadcast_child(expr, sources, side_info):
+  del side_info
+  [origin, sibling] = sources
+  origin = _child_or_error(origin, "origin_value")
+  sibling = _child_or_error(sibling, "sibling_value")
+  new_parent_index, index_to_values = equi_join_any_indices(
+      sibling.parent_index, origin.parent_index)
+  return _IndexedChildNodeValue(new_parent_index, expr.is_repeated,
+                                index_to_values)
+
+
+def _recalculate(expr, sources, side_info):
+  del side_info
+  [origin, parent] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  if not isinstance(parent, _IndexedChildNodeValue):
+    raise ValueError("The parent of a broadcasted subtree must be broadcasted")
+  new_parent_index, index_to_values = equi_join_any_indices(
+      parent.index, origin.parent_index)
+  if isinstance(origin, prensor_value.LeafNodeValue):
+    return prensor_value.LeafNodeValue(new_parent_index,
+                                       origin.values[index_to_values],
+                                       expr.is_repeated)
+  return _IndexedChildNodeValue(new_parent_index, expr.is_repeated,
+                                index_to_values)
+
+
+def _size(expr, sources, side_info):
+  del side_info
+  [origin, origin_parent] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  if isinstance(origin_parent, prensor_value.LeafNodeValue):
+    raise ValueError("origin_parent_value must be a ChildNodeValue "
+                     "or a RootNodeValue")
+  num_parents = _num_elements(origin_parent)
+  values = np.bincount(
+      np.asarray(origin.parent_index, dtype=np.int64),
+      minlength=num_parents).astype(np.int64)
+  return prensor_value.LeafNodeValue(
+      np.arange(num_parents, dtype=np.int64), values, expr.is_repeated)
+
+
+def _filter_by_self_indices_to_keep(
+    node: prensor_value.NodeValue,
+    self_indices_to_keep: np.ndarray) -> prensor_value.NodeValue:
+  """Filter the node by the indices you want to keep."""
+  if isinstance(node, prensor_value.RootNodeValue):
+    return _IndexedRootNodeValue(
+        np.int64(self_indices_to_keep.size), self_indices_to_keep)
+  if isinstance(node, prensor_value.ChildNodeValue):
+    return _IndexedChildNodeValue(node.parent_index[self_indices_to_keep],
+                                  node.is_repeated, self_indices_to_keep)
+  return prensor_value.LeafNodeValue(node.parent_index[self_indices_to_keep],
+                                     node.values[self_indices_to_keep],
+                                     node.is_repeated)
+
+
+def _filter_by_sibling(expr, sources, side_info):
+  del expr, side_info
+  [origin, sibling] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  sibling = _leaf_or_error(sibling, "sibling_value")
+  if not np.array_equal(sibling.parent_index, origin.parent_index):
+    raise ValueError("The sibling and the origin have different shapes")
+  self_indices_to_keep = np.flatnonzero(sibling.values).astype(np.int64)
+  return _filter_by_self_indices_to_keep(origin, self_indices_to_keep)
+
+
+def _filter_by_child(expr, sources, side_info):
+  del expr, side_info
+  [origin, child] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  child = _leaf_or_error(child, "child_value")
+  self_indices_to_keep = np.asarray(child.parent_index,
+                                    dtype=np.int64)[child.values.astype(bool)]
+  return _filter_by_self_indices_to_keep(origin, self_indices_to_keep)
+
+
+def _filter_by_indices(expr, sources, side_info):
+  del expr, side_info
+  [origin, indices] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  indices = _leaf_or_error(indices, "indices_value")
+  return _filter_by_self_indices_to_keep(
+      origin, np.asarray(indices.values, dtype=np.int64))
+
+
+def _filter_by_parent_indices_to_keep(expr, sources, side_info):
+  del expr, side_info
+  [origin, parent] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  if not isinstance(parent, (_IndexedRootNodeValue, _IndexedChildNodeValue)):
+    raise ValueError("Parent must be a filtered node")
+  new_parent_index, self_indices_to_keep = equi_join_indices(
+      parent.index, origin.parent_index)
+  if isinstance(origin, prensor_value.LeafNodeValue):
+    return prensor_value.LeafNodeValue(new_parent_index,
+                                       origin.values[self_indices_to_keep],
+                                       origin.is_repeated)
+  return _IndexedChildNodeValue(new_parent_index, origin.is_repeated,
+                                self_indices_to_keep)
+
+
+def _positional_index(expr, sources, side_info):
+  del side_info
+  [origin] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  return prensor_value.LeafNodeValue(origin.parent_index,
+                                     run_length_before(origin.parent_index),
+                                     expr.is_repeated)
+
+
+def _positional_index_from_end(expr, sources, side_info):
+  del side_info
+  [positional_index, size_value] = sources
+  positional_index = _leaf_or_error(positional_index, "positional_index")
+  size_value = _leaf_or_error(size_value, "size_value")
+  size_per_index = size_value.values[positional_index.parent_index]
+  return prensor_value.LeafNodeValue(positional_index.parent_index,
+                                     positional_index.values - size_per_index,
+                                     expr.is_repeated)
+
+
+def _get_slice_bound(bound, sizes: np.ndarray) -> np.ndarray:
+  """Gets the bound of a slice for each element, given the size of its list."""
+  bound = int(bound)
+  return np.full_like(sizes, bound) if bound >= 0 else sizes + bound
+
+
+def _slice_indices(expr, sources, side_info):
+  del side_info
+  [origin] = sources
+  origin = _not_root_or_error(origin, "origin_value")
+  parent_index = np.asarray(origin.parent_index, dtype=np.int64)
+  positional_index = run_length_before(parent_index)
+  sizes = np.bincount(parent_index)[parent_index].astype(np.int64)
+  keep = np.ones(parent_index.shape, dtype=bool)
+  if expr.begin is not None:
+    keep &= positional_index >= _get_slice_bound(expr.begin, sizes)
+  if expr.end is not None:
+    keep &= positional_index < _get_slice_bound(expr.end, sizes)
+  indices_to_keep = np.flatnonzero(keep).astype(np.int64)
+  return prensor_value.LeafNodeValue(parent_index[indices_to_keep],
+                                     indices_to_keep, expr.is_repeated)
+
+
+def _get_input_proto_index(root: prensor_value.RootNodeValue) -> np.ndarray:
+  if isinstance(root, _IndexedRootNodeValue):
+    return root.index
+  return np.arange(root.size, dtype=np.int64)
+
+
+def _reroot(expr, sources, side_info):
+  del expr, side_info
+  [old_root, new_root] = sources
+  if not isinstance(old_root, prensor_value.RootNodeValue):
+    raise ValueError("Source types incorrect")
+  new_root = _child_or_error(new_root, "new_root_value")
+  return _IndexedRootNodeValue(
+      _num_elements(new_root),
+      _get_input_proto_index(old_root)[new_root.parent_index])
+
+
+def _input_proto_index(expr, sources, side_info):
+  del expr, side_info
+  [root] = sources
+  if not isinstance(root, prensor_value.RootNodeValue):
+    raise ValueError(
+        "Illegal operation: expected a true root node: got {}".format(
+            str(root)))
+  return prensor_value.LeafNodeValue(
+      np.arange(root.size, dtype=np.int64), _get_input_proto_index(root),
+      False)
+
+
+def _map_values(expr, sources, side_info):
+  del side_info
+  source_leaves = [_leaf_or_error(s, "source") for s in sources]
+  # pylint: disable=protected-access
+  new_values = np.asarray(expr._operation(*[s.values for s in source_leaves]))
+  return prensor_value.LeafNodeValue(source_leaves[0].parent_index,
+                                     new_values, expr.is_repeated)
+
+
+_NumpyCalculator = Callable[
+    [expression.Expression, Sequence[prensor_value.NodeValue],
+     Optional[prensor_value.PrensorValue]], prensor_value.NodeValue]
+
+# pylint: disable=protected-access
+_CALCULATORS = {
+    placeholder._PlaceholderRootExpression: _placeholder_root,
+    placeholder._PlaceholderChildExpression: _placeholder_child,
+    promote.PromoteExpression: _promote,
+    promote.PromoteChildExpression: _promote,
+    broadcast._BroadcastExpression: _broadcast,
+    broadcast._BroadcastChildExpression: _broadcast_child,
+    broadcast._RecalculateExpression: _recalculate,
+    size.SizeExpression: _size,
+    filter_expression._FilterBySiblingExpression: _filter_by_sibling,
+    filter_expression._FilterByChildExpression: _filter_by_child,
+    filter_expression._FilterByIndicesExpression: _filter_by_indices,
+    filter_expression._FilterChildByParentIndicesToKeepExpression:
+        _filter_by_parent_indices_to_keep,
+    index._PositionalIndexExpression: _positional_index,
+    index._PositionalIndexFromEndExpression: _positional_index_from_end,
+    reroot._RerootExpression: _reroot,
+    reroot._InputProtoIndexExpression: _input_proto_index,
+    map_values._MapValuesExpression: _map_values,
+    slice_expression._SliceIndicesExpression: _slice_indices,
+}  # type: Dict[type, _NumpyCalculator]
+# pylint: enable=protected-access
+
+
+def _calculate_node_value(
+    expr: expression.Expression,
+    source_values: Sequence[prensor_value.NodeValue],
+    side_info: Optional[prensor_value.PrensorValue]
+) -> prensor_value.NodeValue:
+  calculator = _CALCULATORS.get(type(expr))
+  if calculator is None:
+    raise NotImplementedError(
+        "{} cannot be calculated with NumPy.".format(type(expr).__name__))
+  return calculator(expr, source_values, side_info)
+
+
+def _check_node_value(expr: expression.Expression,
+                      value: prensor_value.NodeValue) -> None:
+  """Checks that the value has the type of the expression."""
+  if expr.type is None:
+    is_valid = not isinstance(value, prensor_value.LeafNodeValue)
+  else:
+    is_valid = isinstance(value, prensor_value.LeafNodeValue)
+  if not is_valid or value.is_repeated != expr.is_repeated:
+    raise ValueError("Expression {} returned the wrong type: {}".format(
+        expr, value))
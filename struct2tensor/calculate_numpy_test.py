@@ -0,0 +1,217 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for struct2tensor.calculate_numpy."""
+
+import subprocess
+import sys
+
+from absl.testing import absltest
+import numpy as np
+from struct2tensor import calculate_numpy
+from struct2tensor import create_expression
+from struct2tensor import path
+from struct2tensor import prensor_value
+from struct2tensor.expression_impl import broadcast
+from struct2tensor.expression_impl import filter_expression
+from struct2tensor.expression_impl import map_prensor_to_prensor as mpp
+from struct2tensor.expression_impl import placeholder
+from struct2tensor.expression_impl import promote
+from struct2tensor.expression_impl import size
+from struct2tensor.expression_impl import slice_expression
+from struct2tensor.test import prensor_test_util
+import tensorflow as tf
+
+
+def _create_nested_prensor_value():
+  """Creates the PrensorValue of prensor_test_util.create_nested_prensor()."""
+  # pylint: disable=protected-access
+  return calculate_numpy._create_prensor_value_from_descendant_nodes({
+      path.Path([]):
+          prensor_value.RootNodeValue(np.int64(3)),
+      path.Path(["doc"]):
+          prensor_value.ChildNodeValue(np.array([0, 1, 1]), True),
+      path.Path(["doc", "bar"]):
+          prensor_value.LeafNodeValue(
+              np.array([0, 1, 1, 2]), np.array([b"a", b"b", b"c", b"d"]),
+              True),
+      path.Path(["doc", "keep_me"]):
+          prensor_value.LeafNodeValue(
+              np.array([0, 1]), np.array([False, True]), False),
+      path.Path(["user"]):
+          prensor_value.ChildNodeValue(np.array([0, 1, 1, 2]), True),
+      path.Path(["user", "friends"]):
+          prensor_value.LeafNodeValue(
+              np.array([0, 1, 1, 2, 3]),
+              np.array([b"a", b"b", b"c", b"d", b"e"]), True),
+  })
+
+
+def _create_nested_placeholder():
+  return placeholder.create_expression_from_schema(
+      mpp.create_schema(
+          is_repeated=True,
+          children={
+              "doc": {
+                  "is_repeated": True,
+                  "children": {
+                      "bar": {
+                          "is_repeated": True,
+                          "dtype": tf.string
+                      },
+                      "keep_me": {
+                          "is_repeated": False,
+                          "dtype": tf.bool
+                      }
+                  }
+              },
+              "user": {
+                  "is_repeated": True,
+                  "children": {
+                      "friends": {
+                          "is_repeated": True,
+                          "dtype": tf.string
+                      }
+                  }
+              }
+          }))
+
+
+class CalculateNumpyTest(absltest.TestCase):
+
+  def assertArrayEqual(self, actual, expected):
+    np.testing.assert_array_equal(actual, expected)
+
+  def test_run_length_before(self):
+    self.assertArrayEqual(
+        calculate_numpy.run_length_before(np.array([0, 0, 2, 3, 3, 3])),
+        [0, 1, 0, 0, 1, 2])
+    self.assertArrayEqual(
+        calculate_numpy.run_length_before(np.array([], dtype=np.int64)), [])
+
+  def test_equi_join_indices(self):
+    index_a, index_b = calculate_numpy.equi_join_indices(
+        np.array([0, 1, 1, 3]), np.array([0, 0, 1, 2, 3]))
+    self.assertArrayEqual(index_a, [0, 0, 1, 2, 3])
+    self.assertArrayEqual(index_b, [0, 1, 2, 2, 4])
+
+  def test_equi_join_any_indices(self):
+    index_a, index_b = calculate_numpy.equi_join_any_indices(
+        np.array([2, 0, 2]), np.array([0, 2, 1, 2, 0]))
+    self.assertArrayEqual(index_a, [0, 0, 1, 1, 2, 2])
+    self.assertArrayEqual(index_b, [1, 3, 0, 4, 1, 3])
+
+  def test_promote(self):
+    exp = _create_nested_placeholder()
+    new_root = promote.promote(exp, path.Path(["user", "friends"]),
+                               "new_friends")
+    [result] = calculate_numpy.calculate_values(
+        [new_root.get_child_or_error("new_friends")],
+        feed_dict={exp: _create_nested_prensor_value()})
+    self.assertTrue(result.is_repeated)
+    self.assertArrayEqual(result.parent_index, [0, 1, 1, 1, 2])
+    self.assertArrayEqual(result.values, [b"a", b"b", b"c", b"d", b"e"])
+
+  def test_size_and_has(self):
+    exp = _create_nested_placeholder()
+    new_root = size.size(exp, path.Path(["doc", "bar"]), "bar_size")
+    new_root = size.has(new_root, path.Path(["doc", "keep_me"]), "has_keep_me")
+    [bar_size, has_keep_me] = calculate_numpy.calculate_values(
+        [new_root.get_descendant_or_error(path.Path(["doc", "bar_size"])),
+         new_root.get_descendant_or_error(path.Path(["doc", "has_keep_me"]))],
+        feed_dict={exp: _create_nested_prensor_value()})
+    self.assertArrayEqual(bar_size.parent_index, [0, 1, 2])
+    self.assertArrayEqual(bar_size.values, [1, 2, 1])
+    self.assertArrayEqual(has_keep_me.values, [True, True, False])
+
+  def test_broadcast_substructure(self):
+    exp = _create_nested_placeholder()
+    new_root = broadcast.broadcast(exp, path.Path(["user"]), "doc",
+                                   "new_user")
+    [result] = calculate_numpy.calculate_prensor_values(
+        [new_root], feed_dict={exp: _create_nested_prensor_value()})
+    new_user = result.get_descendant_or_error(path.Path(["doc", "new_user"]))
+    self.assertArrayEqual(new_user.node.parent_index, [0, 1, 1, 2, 2])
+    friends = new_user.get_child_or_error("friends")
+    self.assertArrayEqual(friends.node.parent_index, [0, 1, 1, 2, 3, 3, 4])
+    self.assertArrayEqual(friends.node.values,
+                          [b"a", b"b", b"c", b"d", b"b", b"c", b"d"])
+
+  def test_filter_by_child(self):
+    exp = _create_nested_placeholder()
+    new_root = filter_expression.filter_by_child(exp, path.Path(["doc"]),
+                                                 "keep_me", "new_doc")
+    [result] = calculate_numpy.calculate_prensor_values(
+        [new_root], feed_dict={exp: _create_nested_prensor_value()})
+    new_doc = result.get_child_or_error("new_doc")
+    self.assertArrayEqual(new_doc.node.parent_index, [1])
+    bar = new_doc.get_child_or_error("bar")
+    self.assertArrayEqual(bar.node.parent_index, [0, 0])
+    self.assertArrayEqual(bar.node.values, [b"b", b"c"])
+
+  def test_slice(self):
+    exp = _create_nested_placeholder()
+    new_root = slice_expression.slice_expression(
+        exp, path.Path(["user", "friends"]), "new_friends", -1, None)
+    [result] = calculate_numpy.calculate_values(
+        [new_root.get_descendant_or_error(path.Path(["user", "new_friends"]))],
+        feed_dict={exp: _create_nested_prensor_value()})
+    self.assertArrayEqual(result.parent_index, [0, 1, 2, 3])
+    self.assertArrayEqual(result.values, [b"a", b"c", b"d", b"e"])
+
+  def test_unsupported_expression(self):
+    exp = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_nested_prensor())
+    with self.assertRaisesRegex(NotImplementedError, "_DirectExpression"):
+      calculate_numpy.calculate_values([exp], feed_dict={})
+
+  def test_calculate_without_tensorflow(self):
+    """Tests that calculate_prensor_values does not import tensorflow."""
+    program = "\n".join([
+        "import sys",
+        "import numpy as np",
+        "from struct2tensor import calculate_numpy",
+        "from struct2tensor import path",
+        "from struct2tensor import prensor_value",
+        "from struct2tensor.expression_impl import map_prensor_to_prensor",
+        "from struct2tensor.expression_impl import placeholder",
+        "from struct2tensor.expression_impl import promote",
+        "exp = placeholder.create_expression_from_schema(",
+        "    map_prensor_to_prensor.create_schema(",
+        "        is_repeated=True,",
+        "        children={'user': {'is_repeated': True, 'children': {",
+        "            'friends': {'is_repeated': True, 'dtype': np.int64}}}}))",
+        "new_root = promote.promote(exp, path.Path(['user', 'friends']),",
+        "                           'new_friends')",
+        "friends = prensor_value.LeafNodeValue(",
+        "    np.array([0, 1, 1]), np.array([7, 8, 9]), True)",
+        "user = prensor_value.ChildNodeValue(np.array([0, 1]), True)",
+        "value = prensor_value.PrensorValue(",
+        "    prensor_value.RootNodeValue(np.int64(2)), {",
+        "        'user': prensor_value.PrensorValue(user, {",
+        "            'friends': prensor_value.PrensorValue(friends, {})})})",
+        "[result] = calculate_numpy.calculate_prensor_values(",
+        "    [new_root], feed_dict={exp: value})",
+        "new_friends = result.get_child_or_error('new_friends').node",
+        "print(new_friends.parent_index.tolist())",
+        "print('tensorflow' in sys.modules)",
+    ])
+    output = subprocess.run([sys.executable, "-c", program],
+                            check=True,
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    self.assertEqual(output.strip().splitlines(), ["[0, 1, 1]", "False"])
+
+
+if __name__ == "__main__":
+  absltest.main()
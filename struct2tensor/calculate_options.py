@@ -18,6 +18,8 @@ as an argument to calculate, get_sparse_tensor, and get_ragged_tensor.
 
 """
 
+from typing import Optional
+
 
 class Options(object):
   """Options for calculate functions.
@@ -36,7 +38,9 @@ class Options(object):
     sparse_checks: if True, add assertion ops when converting a Prensor object
       to SparseTensors.
     use_string_view: if True, decode sub-messages into string views to avoid
-      copying.
+      copying. If None (the default), decode sub-messages into string views
+      unless they are passed to the transform_fn of a field created by
+      proto.create_transformed_field. If False, always copy sub-messages.
     experimental_honor_proto3_optional_semantics: if True, if a proto3 primitive
       optional field without the presence semantic (i.e. the field is without
       the "optional" or "repeated" label) is requested to be parsed, it will
@@ -48,7 +52,7 @@ class Options(object):
     """Create options."""
     self.ragged_checks = ragged_checks
     self.sparse_checks = sparse_checks
-    self.use_string_view = False
+    self.use_string_view = None  # type: Optional[bool]
     self.experimental_honor_proto3_optional_semantics = False
 
   def __str__(self):
@@ -14,12 +14,17 @@
 """Tests for struct2tensor.calculate."""
 
 import random
+from unittest import mock
 
 from struct2tensor import calculate
 from struct2tensor import calculate_options
 from struct2tensor import create_expression
 from struct2tensor import expression_add
 from struct2tensor import path
+from struct2tensor import prensor
+from struct2tensor.expression_impl import map_prensor_to_prensor
+from struct2tensor.expression_impl import map_values
+from struct2tensor.expression_impl import placeholder
 from struct2tensor.expression_impl import promote
 from struct2tensor.expression_impl import proto_test_util
 from struct2tensor.test import expression_test_util
@@ -193,6 +198,102 @@ class CalculateTest(tf.test.TestCase):
                                      options=options)
       self.assertAllEqual(event_value.parent_index, [0, 0, 0, 1, 1])
 
+  def test_calculate_wide_prensor(self):
+    num_leaves = 2000
+    nodes = {path.Path([]): prensor_test_util.create_root_node(2)}
+    for i in range(num_leaves):
+      nodes[path.Path(["leaf_{}".format(i)])] = (
+          prensor_test_util.create_optional_leaf_node([1], [i]))
+    expr = create_expression.create_expression_from_prensor(
+        prensor.create_prensor_from_descendant_nodes(nodes))
+    [result], graph = calculate.calculate_prensors_with_graph([expr])
+    # Leaves with distinct values are not merged.
+    self.assertLen(graph.ordered_node_list, num_leaves + 1)
+    leaf = result.get_descendant_or_error(path.Path(["leaf_1234"])).node
+    self.assertAllEqual(leaf.parent_index, [1])
+    self.assertAllEqual(leaf.values, [1234])
+
+  def test_plan_wide_query_with_shared_source(self):
+    # Siblings calculated from the same source are only compared with
+    # calculation_equal if their fingerprints are equal.
+    num_fields = 2000
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_simple_prensor())
+    foo = expr.get_child_or_error("foo")
+    new_expr = expression_add.add_paths(
+        expr, {
+            path.Path(["foo_plus_{}".format(i)]):
+            map_values._MapValuesExpression(  # pylint: disable=protected-access
+                [foo], lambda x, i=i: x + i, foo.type)
+            for i in range(num_fields)
+        })
+    original_eq = calculate._ExpressionNode.__eq__  # pylint: disable=protected-access
+    num_comparisons = [0]
+
+    def counting_eq(node, other):
+      num_comparisons[0] += 1
+      return original_eq(node, other)
+
+    with mock.patch.object(calculate._ExpressionNode, "__eq__", counting_eq):  # pylint: disable=protected-access
+      query = calculate.CompiledQuery([new_expr])
+    # The root, foo, foorepeated and the new fields.
+    self.assertLen(query.graph.ordered_node_list, num_fields + 3)
+    self.assertLess(num_comparisons[0], num_fields)
+
+  def test_compiled_query(self):
+    for options in options_to_test:
+      expr = proto_test_util._get_expression_from_session_empty_user_info()
+      expected = calculate.calculate_prensors([expr], options=options)
+      query = calculate.CompiledQuery([expr], options=options)
+      self.assertGreaterEqual(query.planning_seconds, 0)
+      # The calculation can be repeated.
+      for _ in range(2):
+        [result] = query.calculate_prensors()
+        expected_nodes = expected[0].get_descendants()
+        result_nodes = result.get_descendants()
+        self.assertCountEqual(expected_nodes.keys(), result_nodes.keys())
+        event_id = result_nodes[path.Path(["event", "event_id"])].node
+        self.assertAllEqual(event_id.parent_index, [0, 1, 2, 4])
+        self.assertAllEqual(event_id.values, [b"A", b"B", b"C", b"D"])
+
+  def test_compiled_query_with_feed_dict(self):
+    for options in options_to_test:
+      schema = map_prensor_to_prensor.create_schema(
+          is_repeated=True,
+          children={
+              "user": {
+                  "is_repeated": True,
+                  "children": {
+                      "friends": {
+                          "is_repeated": True,
+                          "dtype": tf.string
+                      }
+                  }
+              }
+          })
+      exp = placeholder.create_expression_from_schema(schema)
+      new_root = promote.promote(exp, path.Path(["user", "friends"]),
+                                 "new_friends")
+      query = calculate.CompiledQuery(
+          [new_root.get_child_or_error("new_friends")], options=options)
+      [result] = query.calculate_prensors(
+          feed_dict={exp: prensor_test_util.create_nested_prensor()})
+      self.assertAllEqual(result.node.parent_index, [0, 1, 1, 1, 2])
+      self.assertAllEqual(result.node.values, [b"a", b"b", b"c", b"d", b"e"])
+      # The same query, with another input.
+      other_prensor = prensor.create_prensor_from_descendant_nodes({
+          path.Path([]):
+              prensor_test_util.create_root_node(2),
+          path.Path(["user"]):
+              prensor_test_util.create_child_node([1, 1], True),
+          path.Path(["user", "friends"]):
+              prensor_test_util.create_repeated_leaf_node([0, 1, 1],
+                                                          ["x", "y", "z"])
+      })
+      [result] = query.calculate_prensors(feed_dict={exp: other_prensor})
+      self.assertAllEqual(result.node.parent_index, [1, 1, 1])
+      self.assertAllEqual(result.node.values, [b"x", b"y", b"z"])
+
 
 if __name__ == "__main__":
   absltest.main()
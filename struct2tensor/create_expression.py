@@ -17,7 +17,7 @@ create_expression_from_prensor(...) creates an Expression from a Prensor.
 
 """
 
-from typing import FrozenSet, Mapping, Optional, Sequence
+from typing import FrozenSet, Hashable, Mapping, Optional, Sequence
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
@@ -76,6 +76,9 @@ class _DirectExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _DirectExpression) and expr._value is self._value  # pylint: disable=protected-access
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self._value)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return self._children.get(field_name)
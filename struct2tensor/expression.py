@@ -29,15 +29,15 @@ get_known_children().
 
 """
 
+from __future__ import annotations
+
 import abc
-from typing import Callable, FrozenSet, List, Mapping, Optional, Sequence, Union
+from typing import Callable, FrozenSet, Hashable, List, Mapping, Optional, Sequence, Union
 
 from struct2tensor import calculate_options
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
 
-from tensorflow.python.util.lazy_loader import LazyLoader  # pylint: disable=g-direct-tensorflow-import
 from tensorflow_metadata.proto.v0 import schema_pb2
 
 # The purpose of this type is to make it easy to write down paths as literals.
@@ -48,38 +48,47 @@ CoercableToPath = path.CoercableToPath
 # upon this one.
 # Similar to:
 # from struct2tensor.expression_impl import promote
-promote = LazyLoader("promote", globals(),
-                     "struct2tensor.expression_impl.promote")
+promote = lazy_loader.LazyLoader("promote", globals(),
+                                 "struct2tensor.expression_impl.promote")
 
-broadcast = LazyLoader("broadcast", globals(),
-                       "struct2tensor.expression_impl.broadcast")
+broadcast = lazy_loader.LazyLoader("broadcast", globals(),
+                                   "struct2tensor.expression_impl.broadcast")
 
-promote_and_broadcast = LazyLoader(
+promote_and_broadcast = lazy_loader.LazyLoader(
     "promote_and_broadcast", globals(), "struct2tensor.expression_impl"
     ".promote_and_broadcast")
 
-map_values = LazyLoader("map_values", globals(),
-                        "struct2tensor.expression_impl.map_values")
+map_values = lazy_loader.LazyLoader("map_values", globals(),
+                                    "struct2tensor.expression_impl.map_values")
+
+project = lazy_loader.LazyLoader("project", globals(),
+                                 "struct2tensor.expression_impl.project")
 
-project = LazyLoader("project", globals(),
-                     "struct2tensor.expression_impl.project")
+size = lazy_loader.LazyLoader("size", globals(),
+                              "struct2tensor.expression_impl.size")
 
-size = LazyLoader("size", globals(), "struct2tensor.expression_impl.size")
+reroot = lazy_loader.LazyLoader("reroot", globals(),
+                                "struct2tensor.expression_impl.reroot")
 
-reroot = LazyLoader("reroot", globals(), "struct2tensor.expression_impl.reroot")
+map_prensor = lazy_loader.LazyLoader(
+    "map_prensor", globals(), "struct2tensor.expression_impl.map_prensor")
 
-map_prensor = LazyLoader("map_prensor", globals(),
-                         "struct2tensor.expression_impl.map_prensor")
+apply_schema = lazy_loader.LazyLoader(
+    "apply_schema", globals(), "struct2tensor.expression_impl.apply_schema")
 
-apply_schema = LazyLoader("apply_schema", globals(),
-                          "struct2tensor.expression_impl.apply_schema")
+slice_expression = lazy_loader.LazyLoader(
+    "slice_expression", globals(),
+    "struct2tensor.expression_impl.slice_expression")
 
-slice_expression = LazyLoader("slice_expression", globals(),
-                              "struct2tensor.expression_impl.slice_expression")
+# prensor and tensorflow are only imported when an expression is calculated, so
+# that expressions can be built and planned without tensorflow (see
+# calculate_numpy.py).
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 # Type for limit arguments to slice (begin, end).
 # Union[int, tf.Tensor, tf.Variable]
-IndexValue = Union[int, tf.Tensor, tf.Variable]  # pylint: disable=invalid-name
+IndexValue = Union[int, "tf.Tensor", "tf.Variable"]  # pylint: disable=invalid-name
 
 
 class Expression(object, metaclass=abc.ABCMeta):
@@ -194,6 +203,31 @@ class Expression(object, metaclass=abc.ABCMeta):
     """
     raise NotImplementedError()
 
+  def calculation_needs_transitive_destinations(self) -> bool:
+    """True iff self.calculate needs all the transitive destinations.
+
+    By default, the destinations passed to calculate(...) are the expressions
+    that directly use its output. If this is True, they are instead all the
+    expressions that (directly or indirectly) depend upon this expression.
+    This allows an expression to calculate, in one step, values that its
+    descendants will need (e.g., to parse a whole subtree of a proto at once).
+    """
+    return False
+
+  def calculation_fingerprint(self) -> Hashable:
+    """A hashable summary of the parameters of self.calculate.
+
+    If self.calculation_equal(expr), then self.calculation_fingerprint() must
+    equal expr.calculation_fingerprint(). When canonicalizing a graph, only
+    expressions with the same sources and the same fingerprint are compared
+    with calculation_equal, so a fingerprint that distinguishes the
+    expressions of a wide tree (e.g., the field name of a leaf) avoids
+    comparing each expression with all its siblings.
+
+    The default, None, does not distinguish any expressions.
+    """
+    return None
+
   @abc.abstractmethod
   def calculation_equal(self, expression: "Expression") -> bool:
     """self.calculate is equal to another expression.calculate.
@@ -282,6 +316,25 @@ class Expression(object, metaclass=abc.ABCMeta):
           str(p), self.schema_string(limit=20)))
     return result
 
+  def get_filtered_by_child(
+      self, child_field_name: path.Step) -> Optional["Expression"]:
+    """Returns this expression filtered by a child, if it can do so itself.
+
+    filter_expression.filter_by_child uses the result (if it is not None)
+    instead of filtering the calculated node tensor. For example, a proto
+    message field can filter its serialized submessages, so that only the
+    submessages kept are parsed.
+
+    Args:
+      child_field_name: an optional boolean child. The elements where it is
+        present and True are kept.
+
+    Returns:
+      A new expression (with the same parent), or None (the default) if the
+      node tensor must be filtered after it is calculated.
+    """
+    return None
+
   def get_known_children(self) -> Mapping[path.Step, "Expression"]:
     known_field_names = self.known_field_names()
     result = {}
@@ -451,9 +504,23 @@ class Expression(object, metaclass=abc.ABCMeta):
                                              path.create_path(source_path),
                                              new_field_name, begin, end)
 
-  def promote(self, source_path: CoercableToPath, new_field_name: path.Step):
-    """Promotes source_path to be a field new_field_name in its grandparent."""
-    return promote.promote(self, path.create_path(source_path), new_field_name)
+  def promote(self,
+              source_path: CoercableToPath,
+              new_field_name: path.Step,
+              levels: int = 1):
+    """Promotes source_path to be a field new_field_name in an ancestor.
+
+    Args:
+      source_path: the path to promote.
+      new_field_name: the name of the promoted field.
+      levels: the number of levels to promote source_path. With 1 (the
+        default), the new field is in the grandparent of source_path.
+
+    Returns:
+      the resulting root expression.
+    """
+    return promote.promote(self, path.create_path(source_path), new_field_name,
+                           levels)
 
   def broadcast(self, source_path: CoercableToPath, sibling_field: path.Step,
                 new_field_name: path.Step) -> "Expression":
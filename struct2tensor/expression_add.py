@@ -21,13 +21,17 @@ add_to: a way to copy fields back to an earlier tree.
 
 """
 
+from __future__ import annotations
+
 from typing import FrozenSet, Mapping, Optional, Sequence, Tuple
 
 from struct2tensor import expression
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
 from struct2tensor.calculate_options import Options
 
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+
 
 def create_subtrees(
     path_map: Mapping[path.Path, expression.Expression]
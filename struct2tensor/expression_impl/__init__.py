@@ -22,22 +22,42 @@ from struct2tensor import expression_impl
 
 s2t.expression_impl.apply_schema
 ```
+
+The modules are imported on first access, so that e.g. using proto does not
+import pyarrow (through parquet).
 """
 
-from struct2tensor.expression_impl import apply_schema
-from struct2tensor.expression_impl import broadcast
-from struct2tensor.expression_impl import depth_limit
-from struct2tensor.expression_impl import filter_expression
-from struct2tensor.expression_impl import index
-from struct2tensor.expression_impl import map_prensor
-from struct2tensor.expression_impl import map_prensor_to_prensor
-from struct2tensor.expression_impl import map_values
-from struct2tensor.expression_impl import parquet
-from struct2tensor.expression_impl import placeholder
-from struct2tensor.expression_impl import project
-from struct2tensor.expression_impl import promote
-from struct2tensor.expression_impl import promote_and_broadcast
-from struct2tensor.expression_impl import proto
-from struct2tensor.expression_impl import reroot
-from struct2tensor.expression_impl import size
-from struct2tensor.expression_impl import slice_expression
+import importlib
+from typing import Any, List
+
+_MODULES = frozenset([
+    "aggregate",
+    "apply_schema",
+    "broadcast",
+    "depth_limit",
+    "filter_expression",
+    "index",
+    "map_prensor",
+    "map_prensor_to_prensor",
+    "map_values",
+    "parquet",
+    "placeholder",
+    "project",
+    "promote",
+    "promote_and_broadcast",
+    "proto",
+    "proto_record",
+    "reroot",
+    "size",
+    "slice_expression",
+])
+
+
+def __getattr__(name: str) -> Any:
+  if name in _MODULES:
+    return importlib.import_module("{}.{}".format(__name__, name))
+  raise AttributeError("module {} has no attribute {}".format(__name__, name))
+
+
+def __dir__() -> List[str]:
+  return sorted(set(globals()) | _MODULES)
@@ -0,0 +1,257 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Functions for aggregating the values of a leaf per parent.
+
+Given a repeated field "foo.bar",
+
+```
+root = reduce_sum(expr, path.Path(["foo","bar"]), "bar_sum")
+```
+
+creates a new expression root that has an optional field "foo.bar_sum", which
+contains the sum of the bar in a particular foo. reduce_min, reduce_max,
+reduce_mean and count_distinct are similar.
+
+The new field is missing from a foo without any bar (e.g. the sum is missing,
+rather than 0). Use size.size(...) to get the number of values.
+
+The reductions are sorted segment reductions on the parent index of the leaf,
+so the leaf is never converted to a RaggedTensor or a SparseTensor.
+"""
+
+from typing import Callable, Hashable, Optional, Sequence, Tuple
+
+from struct2tensor import calculate_options
+from struct2tensor import expression
+from struct2tensor import expression_add
+from struct2tensor import path
+from struct2tensor import prensor
+from struct2tensor.ops import struct2tensor_ops
+import tensorflow as tf
+
+
+def reduce_sum(root: expression.Expression, source_path: path.Path,
+               new_field_name: path.Step) -> expression.Expression:
+  """Get the sum of the values of a leaf as a new sibling field.
+
+  Args:
+    root: the original expression.
+    source_path: the path of a numeric leaf. Cannot be root.
+    new_field_name: the name of the sibling field.
+
+  Returns:
+    The new expression.
+  """
+  return _aggregate_impl(root, source_path, new_field_name, _SUM)[0]
+
+
+def reduce_min(root: expression.Expression, source_path: path.Path,
+               new_field_name: path.Step) -> expression.Expression:
+  """Get the minimum of the values of a leaf as a new sibling field.
+
+  Args:
+    root: the original expression.
+    source_path: the path of a numeric leaf. Cannot be root.
+    new_field_name: the name of the sibling field.
+
+  Returns:
+    The new expression.
+  """
+  return _aggregate_impl(root, source_path, new_field_name, _MIN)[0]
+
+
+def reduce_max(root: expression.Expression, source_path: path.Path,
+               new_field_name: path.Step) -> expression.Expression:
+  """Get the maximum of the values of a leaf as a new sibling field.
+
+  Args:
+    root: the original expression.
+    source_path: the path of a numeric leaf. Cannot be root.
+    new_field_name: the name of the sibling field.
+
+  Returns:
+    The new expression.
+  """
+  return _aggregate_impl(root, source_path, new_field_name, _MAX)[0]
+
+
+def reduce_mean(root: expression.Expression, source_path: path.Path,
+                new_field_name: path.Step) -> expression.Expression:
+  """Get the mean of the values of a leaf as a new sibling field.
+
+  The mean of an integer leaf is a tf.float64.
+
+  Args:
+    root: the original expression.
+    source_path: the path of a numeric leaf. Cannot be root.
+    new_field_name: the name of the sibling field.
+
+  Returns:
+    The new expression.
+  """
+  return _aggregate_impl(root, source_path, new_field_name, _MEAN)[0]
+
+
+def count_distinct(root: expression.Expression, source_path: path.Path,
+                   new_field_name: path.Step) -> expression.Expression:
+  """Get the number of distinct values of a leaf as a new sibling field.
+
+  Args:
+    root: the original expression.
+    source_path: the path of a leaf. Cannot be root.
+    new_field_name: the name of the sibling field.
+
+  Returns:
+    The new expression.
+  """
+  return _aggregate_impl(root, source_path, new_field_name, _COUNT_DISTINCT)[0]
+
+
+class _Reduction(object):
+  """A reduction of the values of each segment of a leaf."""
+
+  __slots__ = ["_name", "_numeric_only", "_get_dtype", "_reduce"]
+
+  def __init__(self, name: str, numeric_only: bool,
+               get_dtype: Callable[[tf.DType], tf.DType],
+               reduce: Callable[[tf.Tensor, tf.Tensor, tf.Tensor], tf.Tensor]):
+    """Creates a reduction.
+
+    Args:
+      name: the name of the reduction.
+      numeric_only: True iff the values must be integers or floats.
+      get_dtype: gets the dtype of the result from the dtype of the values.
+      reduce: a function (values, segment_ids, num_segments) -> result, where
+        segment_ids is sorted, and covers [0, num_segments).
+    """
+    self._name = name
+    self._numeric_only = numeric_only
+    self._get_dtype = get_dtype
+    self._reduce = reduce
+
+  @property
+  def name(self) -> str:
+    return self._name
+
+  def get_dtype(self, dtype: tf.DType) -> tf.DType:
+    if self._numeric_only and not (dtype.is_integer or dtype.is_floating):
+      raise ValueError("Cannot {} a field of type {}".format(self._name, dtype))
+    return self._get_dtype(dtype)
+
+  def reduce(self, values: tf.Tensor, segment_ids: tf.Tensor,
+             num_segments: tf.Tensor) -> tf.Tensor:
+    return self._reduce(values, segment_ids, num_segments)
+
+
+def _get_mean_dtype(dtype: tf.DType) -> tf.DType:
+  return dtype if dtype.is_floating else tf.float64
+
+
+def _segment_mean(values: tf.Tensor, segment_ids: tf.Tensor,
+                  num_segments: tf.Tensor) -> tf.Tensor:
+  del num_segments
+  return tf.math.segment_mean(
+      tf.cast(values, _get_mean_dtype(values.dtype)), segment_ids)
+
+
+def _segment_count_distinct(values: tf.Tensor, segment_ids: tf.Tensor,
+                            num_segments: tf.Tensor) -> tf.Tensor:
+  # Each (segment, value) pair gets a unique key. The first occurrences of the
+  # keys are in the order of the segments, so the segment of each distinct key
+  # is sorted.
+  _, value_ids = tf.unique(values, out_idx=tf.int64)
+  num_values = tf.maximum(tf.size(values, out_type=tf.int64), 1)
+  distinct_keys, _ = tf.unique(
+      segment_ids * num_values + value_ids, out_idx=tf.int64)
+  return struct2tensor_ops.segment_count(distinct_keys // num_values,
+                                         num_segments)
+
+
+_SUM = _Reduction(
+    "sum", True, lambda dtype: dtype,
+    lambda values, segment_ids, _: tf.math.segment_sum(values, segment_ids))
+_MIN = _Reduction(
+    "min", True, lambda dtype: dtype,
+    lambda values, segment_ids, _: tf.math.segment_min(values, segment_ids))
+_MAX = _Reduction(
+    "max", True, lambda dtype: dtype,
+    lambda values, segment_ids, _: tf.math.segment_max(values, segment_ids))
+_MEAN = _Reduction("mean", True, _get_mean_dtype, _segment_mean)
+_COUNT_DISTINCT = _Reduction("count_distinct", False, lambda dtype: tf.int64,
+                             _segment_count_distinct)
+
+
+class AggregateExpression(expression.Leaf):
+  """The aggregate of the values of a leaf, per parent of the leaf.
+
+  AggregateExpression is intended to be a sibling of origin.
+  """
+
+  def __init__(self, origin: expression.Expression, reduction: _Reduction):
+    if not origin.is_leaf:
+      raise ValueError("Can only aggregate a leaf")
+    super().__init__(False, reduction.get_dtype(origin.type))
+    self._origin = origin
+    self._reduction = reduction
+
+  def get_source_expressions(self) -> Sequence[expression.Expression]:
+    return [self._origin]
+
+  def calculate(
+      self,
+      sources: Sequence[prensor.NodeTensor],
+      destinations: Sequence[expression.Expression],
+      options: calculate_options.Options,
+      side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
+    [origin_value] = sources
+    if not isinstance(origin_value, prensor.LeafNodeTensor):
+      raise ValueError("origin_value must be a LeafNodeTensor, but was a " +
+                       str(type(origin_value)))
+    parent_index = origin_value.parent_index
+    # The parent index is sorted, so the values of a parent are a segment that
+    # starts where the positional index is 0.
+    is_segment_start = tf.equal(origin_value.get_positional_index(), 0)
+    segment_ids = tf.cumsum(tf.cast(is_segment_start, tf.int64)) - 1
+    new_parent_index = tf.boolean_mask(parent_index, is_segment_start)
+    num_segments = tf.size(new_parent_index, out_type=tf.int64)
+    new_values = self._reduction.reduce(origin_value.values, segment_ids,
+                                        num_segments)
+    return prensor.LeafNodeTensor(new_parent_index, new_values, False)
+
+  def calculation_is_identity(self) -> bool:
+    return False
+
+  def calculation_equal(self, expr: expression.Expression) -> bool:
+    return (isinstance(expr, AggregateExpression) and
+            expr._reduction.name == self._reduction.name)  # pylint: disable=protected-access
+
+  def calculation_fingerprint(self) -> Hashable:
+    return (AggregateExpression, self._reduction.name)
+
+
+def _aggregate_impl(
+    root: expression.Expression, source_path: path.Path,
+    new_field_name: path.Step,
+    reduction: _Reduction) -> Tuple[expression.Expression, path.Path]:
+  if not source_path:
+    raise ValueError("Cannot aggregate the root.")
+  if root.get_descendant(source_path) is None:
+    raise ValueError("Path not found: {}".format(str(source_path)))
+  new_path = source_path.get_parent().get_child(new_field_name)
+  return expression_add.add_paths(
+      root, {
+          new_path:
+              AggregateExpression(
+                  root.get_descendant_or_error(source_path), reduction)
+      }), new_path
@@ -0,0 +1,110 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for struct2tensor.aggregate."""
+
+from absl.testing import absltest
+from struct2tensor import create_expression
+from struct2tensor import path
+from struct2tensor import prensor
+from struct2tensor.expression_impl import aggregate
+from struct2tensor.test import expression_test_util
+from struct2tensor.test import prensor_test_util
+import tensorflow as tf
+
+from tensorflow.python.framework import test_util  # pylint: disable=g-direct-tensorflow-import
+
+
+def _create_prensor_with_missing_values():
+  """Creates a prensor with foo: [1, 1, 2], [], [1]."""
+  return prensor.create_prensor_from_descendant_nodes({
+      path.Path([]):
+          prensor_test_util.create_root_node(3),
+      path.Path(["foo"]):
+          prensor_test_util.create_repeated_leaf_node([0, 0, 0, 2],
+                                                      [1, 1, 2, 1]),
+  })
+
+
+@test_util.run_all_in_graph_and_eager_modes
+class AggregateTest(tf.test.TestCase):
+
+  def _calculate(self, new_root, field_path):
+    return expression_test_util.calculate_value_slowly(
+        new_root.get_descendant_or_error(field_path))
+
+  def test_reduce_sum(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    new_root = aggregate.reduce_sum(expr, path.Path(["foorepeated"]), "result")
+    new_field = new_root.get_child_or_error("result")
+    self.assertFalse(new_field.is_repeated)
+    self.assertEqual(new_field.type, tf.int32)
+    leaf_node = self._calculate(new_root, path.Path(["result"]))
+    self.assertAllEqual(leaf_node.parent_index, [0, 1, 2])
+    self.assertAllEqual(leaf_node.values, [9, 15, 6])
+
+  def test_reduce_min_and_max(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    new_root = aggregate.reduce_min(expr, path.Path(["foorepeated"]), "min")
+    new_root = aggregate.reduce_max(new_root, path.Path(["foorepeated"]),
+                                    "max")
+    min_node = self._calculate(new_root, path.Path(["min"]))
+    self.assertAllEqual(min_node.parent_index, [0, 1, 2])
+    self.assertAllEqual(min_node.values, [9, 7, 6])
+    max_node = self._calculate(new_root, path.Path(["max"]))
+    self.assertAllEqual(max_node.parent_index, [0, 1, 2])
+    self.assertAllEqual(max_node.values, [9, 8, 6])
+
+  def test_reduce_mean(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    new_root = aggregate.reduce_mean(expr, path.Path(["foorepeated"]),
+                                     "result")
+    self.assertEqual(new_root.get_child_or_error("result").type, tf.float64)
+    leaf_node = self._calculate(new_root, path.Path(["result"]))
+    self.assertAllEqual(leaf_node.parent_index, [0, 1, 2])
+    self.assertAllClose(leaf_node.values, [9.0, 7.5, 6.0])
+
+  def test_count_distinct(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    new_root = aggregate.count_distinct(expr, path.Path(["doc", "bar"]),
+                                        "result")
+    leaf_node = self._calculate(new_root, path.Path(["doc", "result"]))
+    self.assertAllEqual(leaf_node.parent_index, [0, 1, 2])
+    self.assertAllEqual(leaf_node.values, [1, 2, 1])
+
+  def test_missing_values(self):
+    expr = create_expression.create_expression_from_prensor(
+        _create_prensor_with_missing_values())
+    new_root = aggregate.reduce_sum(expr, path.Path(["foo"]), "sum")
+    new_root = aggregate.count_distinct(new_root, path.Path(["foo"]),
+                                        "distinct")
+    sum_node = self._calculate(new_root, path.Path(["sum"]))
+    self.assertAllEqual(sum_node.parent_index, [0, 2])
+    self.assertAllEqual(sum_node.values, [4, 1])
+    distinct_node = self._calculate(new_root, path.Path(["distinct"]))
+    self.assertAllEqual(distinct_node.parent_index, [0, 2])
+    self.assertAllEqual(distinct_node.values, [2, 1])
+
+  def test_reduce_sum_of_string(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    with self.assertRaisesRegex(ValueError, "Cannot sum"):
+      aggregate.reduce_sum(expr, path.Path(["doc", "bar"]), "result")
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -80,15 +80,19 @@ session: {
 
 """
 
-from typing import FrozenSet, Optional, Sequence, Tuple
+from __future__ import annotations
+
+from typing import FrozenSet, Hashable, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-from struct2tensor.ops import struct2tensor_ops
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
 
 
 class _BroadcastExpression(expression.Leaf):
@@ -125,9 +129,10 @@ class _BroadcastExpression(expression.Leaf):
     [broadcasted_to_sibling_index, index_to_values
     ] = struct2tensor_ops.equi_join_indices(sibling_value.parent_index,
                                             origin_value.parent_index)
-    new_values = tf.gather(origin_value.values, index_to_values)
-    return prensor.LeafNodeTensor(broadcasted_to_sibling_index, new_values,
-                                  self.is_repeated)
+    # The values are not copied: the new leaf refers to the origin values.
+    return prensor.gather_leaf_node(origin_value, index_to_values,
+                                    broadcasted_to_sibling_index,
+                                    self.is_repeated)
 
   def calculation_is_identity(self) -> bool:
     return False
@@ -135,6 +140,9 @@ class _BroadcastExpression(expression.Leaf):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _BroadcastExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return _BroadcastExpression
+
 
 class _RecalculateExpression(expression.Expression):
   r"""Expression for recalculating a broadcasted subtree's parent indices.
@@ -209,9 +217,9 @@ class _RecalculateExpression(expression.Expression):
                                                 origin_value.parent_index)
 
     if isinstance(origin_value, prensor.LeafNodeTensor):
-      new_values = tf.gather(origin_value.values, index_to_values)
-      return prensor.LeafNodeTensor(broadcasted_to_sibling_index, new_values,
-                                    self.is_repeated)
+      return prensor.gather_leaf_node(origin_value, index_to_values,
+                                      broadcasted_to_sibling_index,
+                                      self.is_repeated)
     else:
       return prensor.ChildNodeTensor(broadcasted_to_sibling_index,
                                      self.is_repeated, index_to_values)
@@ -222,6 +230,9 @@ class _RecalculateExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _RecalculateExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return _RecalculateExpression
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     """Gets the child expression.
@@ -291,6 +302,9 @@ class _BroadcastChildExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _BroadcastChildExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return _BroadcastChildExpression
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return _RecalculateExpression(self._origin.get_child(field_name), self)
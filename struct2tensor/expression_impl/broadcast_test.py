@@ -17,7 +17,9 @@
 from absl.testing import absltest
 from struct2tensor import create_expression
 from struct2tensor import path
+from struct2tensor import prensor
 from struct2tensor.expression_impl import broadcast
+from struct2tensor.expression_impl import promote
 from struct2tensor.test import expression_test_util
 from struct2tensor.test import prensor_test_util
 import tensorflow as tf
@@ -250,6 +252,20 @@ class BroadcastValuesTest(tf.test.TestCase):
     self.assertAllEqual(leaf_node.parent_index, [0, 1, 2, 3])
     self.assertAllEqual(leaf_node.values, [9, 8, 8, 7])
 
+  def test_broadcast_and_promote_does_not_copy_values(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    new_root, new_path = broadcast.broadcast_anonymous(expr, path.Path(["foo"]),
+                                                       "user")
+    new_root, new_path = promote.promote_anonymous(new_root, new_path)
+    new_field = new_root.get_descendant_or_error(new_path)
+    leaf_node = expression_test_util.calculate_value_slowly(new_field)
+    self.assertIsInstance(leaf_node, prensor.IndexedLeafNodeTensor)
+    self.assertAllEqual(leaf_node.parent_index, [0, 1, 1, 2])
+    self.assertAllEqual(leaf_node.base_values, [9, 8, 7])
+    self.assertAllEqual(leaf_node.value_index, [0, 1, 1, 2])
+    self.assertAllEqual(leaf_node.values, [9, 8, 8, 7])
+
 
 if __name__ == "__main__":
   absltest.main()
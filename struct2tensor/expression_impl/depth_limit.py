@@ -39,12 +39,16 @@ You get:
 
 """
 
+from __future__ import annotations
+
 from typing import FrozenSet, Optional, Sequence
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
 
 
 def limit_depth(expr: expression.Expression,
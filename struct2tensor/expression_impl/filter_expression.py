@@ -58,17 +58,33 @@ root_2 = filter_expression.filter_by_child(
     root, path.create_path("doc"), "keep_me", "new_doc")
 ```
 
+filter_by_indices allows you to filter an expression by an int64 sibling field
+holding the indices of the elements to keep. For example, if the sibling
+"doc_to_keep" is [1] in root1 (and empty elsewhere), the following call will
+have the same effect as above:
+
+```
+root_2 = filter_expression.filter_by_indices(
+    root, path.create_path("doc"), "doc_to_keep", "new_doc")
+```
+
 """
 
-from typing import FrozenSet, Optional, Sequence, Union
+from __future__ import annotations
+
+from typing import FrozenSet, Hashable, Optional, Sequence, Union
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
+from struct2tensor import node_tensor
 from struct2tensor import path
-from struct2tensor import prensor
-from struct2tensor.ops import struct2tensor_ops
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 def filter_by_sibling(expr: expression.Expression, p: path.Path,
@@ -107,6 +123,10 @@ def filter_by_child(expr: expression.Expression, p: path.Path,
   If the child field is present and True, then keep that parent.
   Otherwise, drop the parent.
 
+  If the expression at p can filter itself by the child (see
+  Expression.get_filtered_by_child), e.g. a proto message field, the elements
+  dropped are not calculated.
+
   Args:
     expr: the original expression
     p: the path to filter.
@@ -117,17 +137,48 @@ def filter_by_child(expr: expression.Expression, p: path.Path,
     The new root expression.
   """
   origin = expr.get_descendant_or_error(p)
-  child = origin.get_child_or_error(child_field_name)
-  new_expr = _FilterByChildExpression(origin, child)
+  new_expr = origin.get_filtered_by_child(child_field_name)
+  if new_expr is None:
+    child = origin.get_child_or_error(child_field_name)
+    new_expr = _FilterByChildExpression(origin, child)
   new_path = p.get_parent().get_child(new_field_name)
 
   return expression_add.add_paths(expr, {new_path: new_expr})
 
 
+def filter_by_indices(expr: expression.Expression, p: path.Path,
+                      indices_field_name: path.Step,
+                      new_field_name: path.Step) -> expression.Expression:
+  """Filter an expression by a sibling holding the indices to keep.
+
+  Unlike filter_by_sibling, this does not require a mask with one element per
+  element of p: the sibling only has an element per element kept.
+
+  Args:
+    expr: the root expression.
+    p: a path to the source to be filtered.
+    indices_field_name: a sibling int64 leaf. Its values are the sorted
+      indices (in p) of the elements to keep, and its parent index is the
+      parent index of these elements (e.g., from
+      struct2tensor_ops.slice_indices).
+    new_field_name: a new sibling to create.
+
+  Returns:
+    a new root.
+  """
+  origin = expr.get_descendant_or_error(p)
+  parent_path = p.get_parent()
+  indices = expr.get_descendant_or_error(
+      parent_path.get_child(indices_field_name))
+  new_expr = _FilterByIndicesExpression(origin, indices)
+  new_path = parent_path.get_child(new_field_name)
+  return expression_add.add_paths(expr, {new_path: new_expr})
+
+
 #################### Private methods and classes follow ########################
 
 
-class _FilterRootNodeTensor(prensor.RootNodeTensor):
+class _FilterRootNodeTensor(node_tensor.RootNodeTensor):
   """The value of the root."""
 
   def __init__(self, size: tf.Tensor, indices_to_keep: tf.Tensor):
@@ -148,7 +199,7 @@ class _FilterRootNodeTensor(prensor.RootNodeTensor):
     return "_FilterRootNodeTensor"
 
 
-class _FilterChildNodeTensor(prensor.ChildNodeTensor):
+class _FilterChildNodeTensor(node_tensor.ChildNodeTensor):
   """The value of an intermediate node."""
 
   def __init__(self, parent_index: tf.Tensor, is_repeated: bool,
@@ -172,22 +223,32 @@ class _FilterChildNodeTensor(prensor.ChildNodeTensor):
     return self._indices_to_keep
 
 
-def _filter_by_self_indices_to_keep(node_value: prensor.NodeTensor,
-                                    self_indices_to_keep: tf.Tensor
-                                   ) -> prensor.NodeTensor:
-  """Filter the node by the indices you want to keep."""
+def _filter_by_self_indices_to_keep(
+    node_value: prensor.NodeTensor,
+    self_indices_to_keep: tf.Tensor,
+    new_parent_index: Optional[tf.Tensor] = None) -> prensor.NodeTensor:
+  """Filter the node by the indices you want to keep.
+
+  Args:
+    node_value: the node to filter.
+    self_indices_to_keep: the indices of the elements to keep.
+    new_parent_index: the parent index of the elements to keep, if known.
+      Otherwise, it is gathered from the parent index of node_value.
+
+  Returns:
+    The filtered node.
+  """
   if isinstance(node_value, prensor.RootNodeTensor):
     return _FilterRootNodeTensor(
         tf.size(self_indices_to_keep), self_indices_to_keep)
+  if new_parent_index is None:
+    new_parent_index = tf.gather(node_value.parent_index, self_indices_to_keep)
   if isinstance(node_value, prensor.ChildNodeTensor):
-    return _FilterChildNodeTensor(
-        tf.gather(node_value.parent_index, self_indices_to_keep),
-        node_value.is_repeated, self_indices_to_keep)
+    return _FilterChildNodeTensor(new_parent_index, node_value.is_repeated,
+                                  self_indices_to_keep)
   if isinstance(node_value, prensor.LeafNodeTensor):
-    return prensor.LeafNodeTensor(
-        tf.gather(node_value.parent_index, self_indices_to_keep),
-        tf.gather(node_value.values, self_indices_to_keep),
-        node_value.is_repeated)
+    return prensor.gather_leaf_node(node_value, self_indices_to_keep,
+                                    new_parent_index, node_value.is_repeated)
   raise ValueError("Unknown NodeValue type")
 
 
@@ -202,9 +263,8 @@ def _filter_by_parent_indices_to_keep(
     return _FilterChildNodeTensor(new_parent_index, node_value.is_repeated,
                                   self_indices_to_keep)
   if isinstance(node_value, prensor.LeafNodeTensor):
-    return prensor.LeafNodeTensor(
-        new_parent_index, tf.gather(node_value.values, self_indices_to_keep),
-        node_value.is_repeated)
+    return prensor.gather_leaf_node(node_value, self_indices_to_keep,
+                                    new_parent_index, node_value.is_repeated)
   raise ValueError("Unknown NodeValue type")
 
 
@@ -251,7 +311,10 @@ class _FilterChildByParentIndicesToKeepExpression(expression.Expression):
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
-    return isinstance(self, _FilterChildByParentIndicesToKeepExpression)
+    return isinstance(expr, _FilterChildByParentIndicesToKeepExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _FilterChildByParentIndicesToKeepExpression
 
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
@@ -313,7 +376,63 @@ class _FilterBySiblingExpression(expression.Expression):
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
-    return isinstance(self, _FilterBySiblingExpression)
+    return isinstance(expr, _FilterBySiblingExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _FilterBySiblingExpression
+
+  def _get_child_impl(self,
+                      field_name: path.Step) -> Optional[expression.Expression]:
+    original = self._origin.get_child(field_name)
+    if original is None:
+      return None
+    return _FilterChildByParentIndicesToKeepExpression(original, self)
+
+  def known_field_names(self) -> FrozenSet[path.Step]:
+    return self._origin.known_field_names()
+
+
+class _FilterByIndicesExpression(expression.Expression):
+  """Filter an expression by a sibling holding the indices to keep."""
+
+  def __init__(self, origin: expression.Expression,
+               indices: expression.Expression):
+    super().__init__(
+        origin.is_repeated,
+        origin.type,
+        validate_step_format=origin.validate_step_format,
+    )
+    self._origin = origin
+    self._indices = indices
+    if indices.type != tf.int64:
+      raise ValueError("Indices must be an int64 leaf.")
+
+  def get_source_expressions(self) -> Sequence[expression.Expression]:
+    return [self._origin, self._indices]
+
+  def calculate(
+      self,
+      sources: Sequence[prensor.NodeTensor],
+      destinations: Sequence[expression.Expression],
+      options: calculate_options.Options,
+      side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
+    [origin_value, indices_value] = sources
+    if not isinstance(origin_value,
+                      (prensor.ChildNodeTensor, prensor.LeafNodeTensor)):
+      raise ValueError("Origin should not be a root")
+    if not isinstance(indices_value, prensor.LeafNodeTensor):
+      raise ValueError("Indices should be a leaf")
+    return _filter_by_self_indices_to_keep(origin_value, indices_value.values,
+                                           indices_value.parent_index)
+
+  def calculation_is_identity(self) -> bool:
+    return False
+
+  def calculation_equal(self, expr: expression.Expression) -> bool:
+    return isinstance(expr, _FilterByIndicesExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _FilterByIndicesExpression
 
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
@@ -367,7 +486,10 @@ class _FilterByChildExpression(expression.Expression):
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
-    return isinstance(self, _FilterByChildExpression)
+    return isinstance(expr, _FilterByChildExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _FilterByChildExpression
 
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
@@ -304,6 +304,32 @@ class FilterExpressionTest(tf.test.TestCase):
                                                   "bar"])).node.values,
         [b"b", b"c"])
 
+  def test_filter_by_indices(self):
+    """Tests filter_by_indices, keeping doc1 as in test_filter_by_sibling."""
+    nested_prensor = _create_nested_prensor()
+    nodes = {
+        k: v.node for k, v in nested_prensor.get_descendants().items()
+    }
+    nodes[path.Path(["doc_to_keep"])] = prensor.LeafNodeTensor(
+        tf.constant([1], dtype=tf.int64), tf.constant([1], dtype=tf.int64),
+        True)
+    root = create_expression.create_expression_from_prensor(
+        prensor.create_prensor_from_descendant_nodes(nodes))
+    root_2 = filter_expression.filter_by_indices(root, path.create_path("doc"),
+                                                 "doc_to_keep", "new_doc")
+    [result] = calculate.calculate_prensors([root_2])
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["new_doc"
+                                                 ])).node.parent_index, [1])
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["new_doc",
+                                                  "bar"])).node.parent_index,
+        [0, 0])
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["new_doc",
+                                                  "bar"])).node.values,
+        [b"b", b"c"])
+
   def test_slice_and_project_mini(self):
     """Testing a part of query_test.test_slice_and_project.
 
@@ -321,6 +347,54 @@ class FilterExpressionTest(tf.test.TestCase):
     value_indices = calculate_value.parent_index
     self.assertAllEqual(value_indices, [0, 1, 2, 4, 4])
 
+  def test_filter_by_child_while_parsing(self):
+    """Tests that filter_by_child on a proto only parses the messages kept."""
+    # The decode ops are looked up in the graph.
+    with tf.Graph().as_default():
+      root = proto_test_util.text_to_expression([
+          """
+          action:{
+            doc_id:"a"
+            is_clicked: true
+          }
+          action:{
+            doc_id:"b"
+          }
+          action:{
+            doc_id:"c"
+            is_clicked: false
+          }""", """
+          action:{
+            doc_id:"d"
+            is_clicked: true
+          }"""
+      ], test_pb2.Event)
+      root_2 = filter_expression.filter_by_child(root, path.Path(["action"]),
+                                                 "is_clicked",
+                                                 "clicked_action")
+      [result] = calculate.calculate_prensors([root_2])
+      [decode_doc_id] = [
+          op for op in tf.compat.v1.get_default_graph().get_operations()
+          if op.type.startswith("DecodeProtoSparse") and
+          op.get_attr("field_names") == [b"doc_id"]
+      ]
+      with tf.compat.v1.Session() as sess:
+        num_decoded, result = sess.run(
+            [tf.size(decode_doc_id.inputs[0]), result])
+    # Only the 2 submessages kept are parsed for the children of
+    # clicked_action.
+    self.assertEqual(num_decoded, 2)
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["clicked_action"
+                                                 ])).node.parent_index, [0, 1])
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["clicked_action", "doc_id"
+                                                 ])).node.parent_index, [0, 1])
+    self.assertAllEqual(
+        result.get_descendant_or_error(path.Path(["clicked_action",
+                                                  "doc_id"])).node.values,
+        [b"a", b"d"])
+
   def test_indices_where_true(self):
     input_prensor_node = prensor_test_util.create_repeated_leaf_node(
         [0, 0, 1, 1, 2, 2, 3, 4, 4, 4],
@@ -117,15 +117,19 @@ are just references to the parent indices of other fields, and are therefore
 take little memory or CPU.
 """
 
-from typing import Optional, Sequence, Tuple
+from __future__ import annotations
+
+from typing import Hashable, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
 from struct2tensor.expression_impl import size
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 def get_positional_index(expr: expression.Expression, source_path: path.Path,
@@ -207,10 +211,12 @@ class _PositionalIndexExpression(expression.Leaf):
       side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
     [origin] = sources
     if isinstance(origin, (prensor.LeafNodeTensor, prensor.ChildNodeTensor)):
-      return prensor.LeafNodeTensor(
+      result = prensor.LeafNodeTensor(
           origin.parent_index,
           origin.get_positional_index(),
           self.is_repeated)
+      prensor.share_positional_index(origin, result)
+      return result
     raise ValueError("Cannot calculate the positional index of the root")
 
   def calculation_is_identity(self) -> bool:
@@ -219,6 +225,9 @@ class _PositionalIndexExpression(expression.Leaf):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _PositionalIndexExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return _PositionalIndexExpression
+
 
 class _PositionalIndexFromEndExpression(expression.Leaf):
   """The positional index from the end.
@@ -262,12 +271,17 @@ class _PositionalIndexFromEndExpression(expression.Leaf):
       raise ValueError("size_value must be a LeafNodeTensor")
 
     size_per_index = tf.gather(size_value.values, positional_index.parent_index)
-    return prensor.LeafNodeTensor(positional_index.parent_index,
-                                  positional_index.values - size_per_index,
-                                  self.is_repeated)
+    result = prensor.LeafNodeTensor(positional_index.parent_index,
+                                    positional_index.values - size_per_index,
+                                    self.is_repeated)
+    prensor.share_positional_index(positional_index, result)
+    return result
 
   def calculation_is_identity(self) -> bool:
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, _PositionalIndexFromEndExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _PositionalIndexFromEndExpression
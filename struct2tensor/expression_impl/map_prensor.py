@@ -99,7 +99,7 @@ session: {
 
 """
 
-from typing import Callable, FrozenSet, Optional, Sequence, Tuple
+from typing import Callable, FrozenSet, Hashable, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
@@ -213,6 +213,9 @@ class _MapPrensorExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return None
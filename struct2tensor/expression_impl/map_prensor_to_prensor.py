@@ -69,17 +69,22 @@ foo   bar foo2 bar2
 
 """
 
-from typing import Any, Callable, Dict, FrozenSet, Optional, Sequence, Union
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Optional, Sequence, Union
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
+from struct2tensor import node_tensor
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
 
 from tensorflow_metadata.proto.v0 import schema_pb2
 
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
+
 
 class Schema(object):
   """A finite schema for a prensor.
@@ -289,7 +294,7 @@ def _tree_as_node(prensor_tree: prensor.Prensor) -> "_TreeAsNode":
   return _PrensorAsLeafNodeTensor(prensor_tree, top_node)
 
 
-class _PrensorAsRootNodeTensor(prensor.RootNodeTensor):
+class _PrensorAsRootNodeTensor(node_tensor.RootNodeTensor):
   """A root node tensor that has a prensor property."""
 
   def __init__(self, prensor_tree: prensor.Prensor,
@@ -303,13 +308,14 @@ class _PrensorAsRootNodeTensor(prensor.RootNodeTensor):
     return self._prensor
 
 
-class _PrensorAsChildNodeTensor(prensor.ChildNodeTensor):
+class _PrensorAsChildNodeTensor(node_tensor.ChildNodeTensor):
   """A child node tensor that has a prensor property."""
 
   def __init__(self, prensor_tree: prensor.Prensor,
                child: prensor.ChildNodeTensor):
     """Call _tree_as_node instead."""
     super().__init__(child.parent_index, child.is_repeated)
+    prensor.share_positional_index(child, self)
     self._prensor = prensor_tree
 
   @property
@@ -317,7 +323,7 @@ class _PrensorAsChildNodeTensor(prensor.ChildNodeTensor):
     return self._prensor
 
 
-class _PrensorAsLeafNodeTensor(prensor.LeafNodeTensor):
+class _PrensorAsLeafNodeTensor(node_tensor.LeafNodeTensor):
   """A leaf node tensor that has a prensor property."""
 
   def __init__(self, prensor_tree: prensor.Prensor,
@@ -325,6 +331,7 @@ class _PrensorAsLeafNodeTensor(prensor.LeafNodeTensor):
     """Call _tree_as_node instead."""
     super(_PrensorAsLeafNodeTensor,
           self).__init__(leaf.parent_index, leaf.values, leaf.is_repeated)
+    prensor.share_positional_index(leaf, self)
     self._prensor = prensor_tree
 
   @property
@@ -387,6 +394,9 @@ class _PrensorOpChildExpression(expression.Expression):
       return self._step == expr._step  # pylint: disable=protected-access
     return False
 
+  def calculation_fingerprint(self) -> Hashable:
+    return self._step
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     """Implementation of getting a named child in a subclass.
@@ -475,6 +485,9 @@ class _PrensorOpExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     if field_name not in self._schema.known_field_names():
@@ -21,14 +21,18 @@ Note that the operations are on 1-D tensors (as opposed to scalars).
 
 """
 
-from typing import Callable, FrozenSet, Optional, Sequence, Tuple
+from __future__ import annotations
+
+from typing import Callable, FrozenSet, Hashable, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 def map_many_values(
@@ -145,9 +149,11 @@ class _MapValuesExpression(expression.Expression):
     # TODO(martinz): Check that:
     # source_values have equal parent_index.
     # output_value has the same size as the input.
-    return prensor.LeafNodeTensor(source_leaves[0].parent_index,
-                                  self._operation(*source_values),
-                                  self._is_repeated)
+    result = prensor.LeafNodeTensor(source_leaves[0].parent_index,
+                                    self._operation(*source_values),
+                                    self._is_repeated)
+    prensor.share_positional_index(source_leaves[0], result)
+    return result
 
   def calculation_is_identity(self) -> bool:
     return False
@@ -155,6 +161,9 @@ class _MapValuesExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return None
@@ -28,7 +28,10 @@ Example usage:
 """
 
 import collections
-from typing import Any, Dict, List, Optional, Tuple, Union
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -42,6 +45,143 @@ from struct2tensor.expression_impl import placeholder
 from struct2tensor.ops import gen_parquet_dataset
 import tensorflow as tf
 
+# A predicate on the values of a leaf column of a parquet file. The values must
+# be in [min_value, max_value], where a bound of None is unbounded.
+# Predicates are checked against the min/max statistics of each row group, and
+# the row groups that cannot have a matching value are not read. The rows of
+# the row groups that are read are NOT filtered.
+# column_path is the dotstring path of the column, e.g. "Name.Language.Code".
+ColumnPredicate = NamedTuple("ColumnPredicate", [("column_path", str),
+                                                 ("min_value", Any),
+                                                 ("max_value", Any)])
+
+
+def column_equals(column_path: str, value: Any) -> ColumnPredicate:
+  """Creates a predicate that the column has a value equal to value."""
+  return ColumnPredicate(column_path, value, value)
+
+
+def column_in_range(column_path: str,
+                    min_value: Any = None,
+                    max_value: Any = None) -> ColumnPredicate:
+  """Creates a predicate that the column has a value in [min_value, max_value].
+
+  Args:
+    column_path: the dotstring path of the column.
+    min_value: the smallest value allowed, or None if there is no lower bound.
+    max_value: the largest value allowed, or None if there is no upper bound.
+
+  Returns:
+    A ColumnPredicate.
+  """
+  return ColumnPredicate(column_path, min_value, max_value)
+
+
+# What is derived from the schema of a parquet file.
+# fingerprint is a hash of the parquet schema. Files with the same fingerprint
+#   have the same schema.
+# parquet_schema is the pq.ParquetSchema of the file.
+# path_to_column_index maps the dotstring path of each column to its index.
+# arrow_schema is the schema converted to a pa.Schema.
+_SchemaInfo = NamedTuple("_SchemaInfo",
+                         [("fingerprint", str),
+                          ("parquet_schema", pq.ParquetSchema),
+                          ("path_to_column_index", Dict[str, int]),
+                          ("arrow_schema", pa.Schema)])
+
+# What is read from the footer of a parquet file.
+# fingerprint is the fingerprint of the schema of the file.
+# metadata is the pq.FileMetaData of the file, e.g. with the statistics of its
+#   row groups.
+_FileInfo = NamedTuple("_FileInfo",
+                       [("fingerprint", str),
+                        ("metadata", pq.FileMetaData)])
+
+# The maximum number of entries of each of the caches below.
+_SCHEMA_CACHE_SIZE = 1024
+
+
+class _LruCache(object):
+  """A dict that drops its least recently used entries beyond maxsize.
+
+  It is not thread safe: the caches below are guarded by _schema_cache_lock.
+  """
+
+  def __init__(self, maxsize: int):
+    self._maxsize = maxsize
+    self._entries = collections.OrderedDict()
+
+  def get(self, key: Any) -> Any:
+    """Returns the value of key (marking it as used), or None."""
+    value = self._entries.get(key)
+    if value is not None:
+      self._entries.move_to_end(key)
+    return value
+
+  def put(self, key: Any, value: Any) -> None:
+    self._entries[key] = value
+    self._entries.move_to_end(key)
+    while len(self._entries) > self._maxsize:
+      self._entries.popitem(last=False)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+
+# The footer of each file read, keyed by (filename, size, mtime), so that a file
+# that is rewritten is read again.
+_file_info_cache = _LruCache(_SCHEMA_CACHE_SIZE)
+# The schema info and the root mpp.Schema of each fingerprint. Files sharing a
+# schema (e.g. the shards of a dataset) share these.
+_schema_info_cache = _LruCache(_SCHEMA_CACHE_SIZE)
+_root_schema_cache = _LruCache(_SCHEMA_CACHE_SIZE)
+_schema_cache_lock = threading.Lock()
+
+
+def _get_file_info(filename: str) -> _FileInfo:
+  """Returns the _FileInfo of a parquet file, reading its footer if needed."""
+  try:
+    stat = os.stat(filename)
+    file_key = (filename, stat.st_size, stat.st_mtime_ns)
+  except OSError:
+    # Let pyarrow report the error (or read a path that is not a local file)
+    # without caching.
+    file_key = None
+
+  with _schema_cache_lock:
+    result = _file_info_cache.get(file_key)
+    if result is not None:
+      return result
+
+  metadata = pq.ParquetFile(filename).metadata
+  result = _FileInfo(
+      fingerprint=hashlib.sha256(
+          str(metadata.schema).encode("utf-8")).hexdigest(),
+      metadata=metadata)
+  if file_key is not None:
+    with _schema_cache_lock:
+      _file_info_cache.put(file_key, result)
+  return result
+
+
+def _get_schema_info(filename: str) -> _SchemaInfo:
+  """Returns the _SchemaInfo of a parquet file, reading its footer if needed."""
+  file_info = _get_file_info(filename)
+  with _schema_cache_lock:
+    result = _schema_info_cache.get(file_info.fingerprint)
+    if result is None:
+      parquet_schema = file_info.metadata.schema
+      result = _SchemaInfo(
+          fingerprint=file_info.fingerprint,
+          parquet_schema=parquet_schema,
+          path_to_column_index={
+              parquet_schema.column(index).path: index
+              for index in range(len(parquet_schema))
+          },
+          arrow_schema=parquet_schema.to_arrow_schema())
+      _schema_info_cache.put(file_info.fingerprint, result)
+    return result
+
 
 def create_expression_from_parquet_file(
     filenames: List[str]) -> placeholder._PlaceholderRootExpression:  # pylint: disable=protected-access
@@ -54,15 +194,17 @@ def create_expression_from_parquet_file(
     A PlaceholderRootExpression that should be used as the root of an expression
     graph.
   """
-
-  metadata = pq.ParquetFile(filenames[0]).metadata
-  parquet_schema = metadata.schema
-  arrow_schema = parquet_schema.to_arrow_schema()
-
-  root_schema = mpp.create_schema(
-      is_repeated=True,
-      children=_create_children_from_arrow_fields(
-          [arrow_schema.field_by_name(name) for name in arrow_schema.names]))
+  schema_info = _get_schema_info(filenames[0])
+  with _schema_cache_lock:
+    root_schema = _root_schema_cache.get(schema_info.fingerprint)
+  if root_schema is None:
+    arrow_schema = schema_info.arrow_schema
+    root_schema = mpp.create_schema(
+        is_repeated=True,
+        children=_create_children_from_arrow_fields(
+            [arrow_schema.field_by_name(name) for name in arrow_schema.names]))
+    with _schema_cache_lock:
+      _root_schema_cache.put(schema_info.fingerprint, root_schema)
 
   # pylint: disable=protected-access
   return placeholder._PlaceholderRootExpression(root_schema)
@@ -73,7 +215,10 @@ def calculate_parquet_values(
     root_exp: placeholder._PlaceholderRootExpression,  # pylint: disable=protected-access
     filenames: List[str],
     batch_size: int,
-    options: Optional[calculate_options.Options] = None):
+    options: Optional[calculate_options.Options] = None,
+    num_parallel_reads: int = 1,
+    deterministic: bool = True,
+    predicates: Optional[Sequence[ColumnPredicate]] = None):
   """Calculates expressions and returns a parquet dataset.
 
   Args:
@@ -82,12 +227,17 @@ def calculate_parquet_values(
     filenames: A list of parquet files.
     batch_size: The number of messages to batch.
     options: calculate options.
+    num_parallel_reads: The number of files to read in parallel.
+    deterministic: If False, the batches of the files read in parallel may be
+      returned out of order.
+    predicates: The predicates used to skip row groups. See ParquetDataset.
 
   Returns:
     A parquet dataset.
   """
   pqds = _ParquetDatasetWithExpression(expressions, root_exp, filenames,
-                                       batch_size, options)
+                                       batch_size, options, num_parallel_reads,
+                                       deterministic, predicates)
   return pqds.map(pqds._calculate_prensor)  # pylint: disable=protected-access
 
 
@@ -107,7 +257,9 @@ class _RawParquetDataset(tf.compat.v1.data.Dataset):
 
   def __init__(self, filenames: List[str], value_paths: List[str],
                value_dtypes: List[tf.DType], parent_index_paths: List[str],
-               path_index: List[int], batch_size: int):
+               path_index: List[int], batch_size: int,
+               num_parallel_reads: int = 1, deterministic: bool = True,
+               row_groups: Optional[List[List[int]]] = None):
     """Creates a ParquetDataset.
 
     Args:
@@ -123,17 +275,38 @@ class _RawParquetDataset(tf.compat.v1.data.Dataset):
       batch_size: An int that determines how many messages are parsed into one
         prensor tree in an iteration. If there are fewer than batch_size
         remaining messages, then all remaining messages will be returned.
+      num_parallel_reads: An int that determines how many files are read in
+        parallel. The i-th reader reads the files filenames[i],
+        filenames[i + num_parallel_reads], ... one after the other.
+      deterministic: Only used if num_parallel_reads > 1. If True, the readers
+        take turns to return a batch. If False, the batches are returned in
+        the order they are read.
+      row_groups: If not None, row_groups[i] is the list of the indices of the
+        row groups to read in filenames[i]; the other row groups are skipped.
+        If num_parallel_reads > 1, the selected row groups (instead of the
+        files) are read in parallel.
 
     Raises:
       ValueError: if the column does not exist in the parquet schema.
       ValueError: if the column dtype does not match the value_dtype passed in.
+      ValueError: if num_parallel_reads is not positive.
+      ValueError: if row_groups does not have one element per file.
     """
+    if num_parallel_reads < 1:
+      raise ValueError(
+          "num_parallel_reads must be positive: {}".format(num_parallel_reads))
+    if row_groups is not None and len(row_groups) != len(filenames):
+      raise ValueError("row_groups must have one element per file: {} != {}"
+                       .format(len(row_groups), len(filenames)))
     self._filenames = filenames
     self._value_paths = value_paths
     self._value_dtypes = tuple(value_dtypes)
     self._parent_index_paths = parent_index_paths
     self._path_index = path_index
     self._batch_size = batch_size
+    self._num_parallel_reads = num_parallel_reads
+    self._deterministic = deterministic
+    self._row_groups = row_groups
 
     super().__init__()
 
@@ -145,16 +318,10 @@ class _RawParquetDataset(tf.compat.v1.data.Dataset):
         metadata_file, any file from file_names will suffice.
 
     Returns:
-      A dictionary mapping path name (str) to column index (int).
+      A dictionary mapping path name (str) to column index (int). It must not
+      be modified.
     """
-    metadata = pq.ParquetFile(metadata_file).metadata
-
-    path_to_column_index = {
-        metadata.schema.column(index).path: index
-        for index in range(metadata.num_columns)
-    }
-
-    return path_to_column_index
+    return _get_schema_info(metadata_file).path_to_column_index
 
   def _parquet_to_tf_type(self, parquet_type: str) -> Union[tf.DType, None]:
     """Maps tensorflow datatype to a parquet datatype.
@@ -175,13 +342,24 @@ class _RawParquetDataset(tf.compat.v1.data.Dataset):
     }.get(parquet_type)
 
   def _as_variant_tensor(self):
+    row_group_splits = []
+    flat_row_groups = []
+    if self._row_groups is not None:
+      row_group_splits.append(0)
+      for file_row_groups in self._row_groups:
+        flat_row_groups.extend(file_row_groups)
+        row_group_splits.append(len(flat_row_groups))
     return gen_parquet_dataset.parquet_dataset(
         self._filenames,
         value_paths=self._value_paths,
         value_dtypes=self._value_dtypes,
         parent_index_paths=self._parent_index_paths,
         path_index=self._path_index,
-        batch_size=self._batch_size)
+        batch_size=self._batch_size,
+        num_parallel_reads=self._num_parallel_reads,
+        deterministic=self._deterministic,
+        row_group_splits=row_group_splits,
+        row_groups=flat_row_groups)
 
   def _inputs(self):
     return []
@@ -230,8 +408,13 @@ class ParquetDataset(_RawParquetDataset):
     session.run(prensor)
   """
 
-  def __init__(self, filenames: List[str], value_paths: List[str],
-               batch_size: int):
+  def __init__(self,
+               filenames: List[str],
+               value_paths: List[str],
+               batch_size: int,
+               num_parallel_reads: int = 1,
+               deterministic: bool = True,
+               predicates: Optional[Sequence[ColumnPredicate]] = None):
     """Creates a ParquetDataset.
 
     Args:
@@ -241,19 +424,42 @@ class ParquetDataset(_RawParquetDataset):
       batch_size: An int that determines how many messages are parsed into one
         prensor tree in an iteration. If there are fewer than batch_size
         remaining messages, then all remaining messages will be returned.
+      num_parallel_reads: An int that determines how many files are read in
+        parallel. See _RawParquetDataset.
+      deterministic: If False, the batches of the files read in parallel may
+        be returned out of order. See _RawParquetDataset.
+      predicates: An optional list of ColumnPredicates. The row groups whose
+        statistics show that they have no value satisfying one of the
+        predicates are skipped. The rows of the other row groups are all
+        returned, including the ones that do not satisfy the predicates.
 
     Raises:
       ValueError: if the column does not exist in the parquet schema.
+      ValueError: if the column of a predicate does not exist in the parquet
+        schema.
     """
     self._filenames = filenames
     self._value_paths = value_paths
     self._batch_size = batch_size
 
+    # The shards of a dataset usually share a schema, which is only validated
+    # once.
+    validated_fingerprints = set()
     for filename in filenames:
-      self._validate_file(filename, value_paths)
+      fingerprint = _get_schema_info(filename).fingerprint
+      if fingerprint not in validated_fingerprints:
+        self._validate_file(filename, value_paths)
+        validated_fingerprints.add(fingerprint)
 
     self._value_dtypes = self._get_column_dtypes(filenames[0], value_paths)
 
+    row_groups = None
+    if predicates:
+      row_groups = [
+          self._get_row_groups_to_read(filename, predicates)
+          for filename in filenames
+      ]
+
     self._parent_index_paths = []
     self._path_index = []
 
@@ -263,7 +469,40 @@ class ParquetDataset(_RawParquetDataset):
 
     super(ParquetDataset,
           self).__init__(filenames, self._value_paths, self._value_dtypes,
-                         self._parent_index_paths, self._path_index, batch_size)
+                         self._parent_index_paths, self._path_index, batch_size,
+                         num_parallel_reads, deterministic, row_groups)
+
+  def _get_row_groups_to_read(
+      self, filename: str, predicates: Sequence[ColumnPredicate]) -> List[int]:
+    """Returns the indices of the row groups that may satisfy the predicates.
+
+    Args:
+      filename: The parquet filename.
+      predicates: A list of ColumnPredicates.
+
+    Returns:
+      The sorted indices of the row groups of filename to read.
+
+    Raises:
+      ValueError: if the column of a predicate does not exist in the parquet
+        file's schema.
+    """
+    path_to_column_index = self._get_column_path_to_index_mapping(filename)
+    for predicate in predicates:
+      if predicate.column_path not in path_to_column_index:
+        raise ValueError("path " + predicate.column_path +
+                         " does not exist in the file.")
+
+    metadata = _get_file_info(filename).metadata
+    result = []
+    for i in range(metadata.num_row_groups):
+      row_group = metadata.row_group(i)
+      if all(
+          _may_satisfy(
+              row_group.column(path_to_column_index[p.column_path]).statistics,
+              p) for p in predicates):
+        result.append(i)
+    return result
 
   def _get_column_dtypes(
       self, metadata_file: str,
@@ -279,12 +518,12 @@ class ParquetDataset(_RawParquetDataset):
       A list of tensorflow datatypes for each column. This list aligns with
       value_paths.
     """
-    path_to_column_index = self._get_column_path_to_index_mapping(metadata_file)
-    metadata = pq.ParquetFile(metadata_file).metadata
+    schema_info = _get_schema_info(metadata_file)
 
     value_dtypes = []
     for column in value_paths:
-      col = metadata.schema.column(path_to_column_index[column])
+      col = schema_info.parquet_schema.column(
+          schema_info.path_to_column_index[column])
       parquet_type = col.physical_type
       value_dtypes.append(self._parquet_to_tf_type(parquet_type))
     return value_dtypes
@@ -299,15 +538,9 @@ class ParquetDataset(_RawParquetDataset):
     Raises:
       ValueError: if a path does not exist in the parquet file's schema.
     """
-    metadata = pq.ParquetFile(filename).metadata
-
-    paths = {}
-    for i in range(metadata.num_columns):
-      col = metadata.schema.column(i)
-      p = (col.path)
-      paths[p] = col.physical_type
+    paths = self._get_column_path_to_index_mapping(filename)
 
-    for i, p in enumerate(value_paths):
+    for p in value_paths:
       if p not in paths:
         raise ValueError("path " + p + " does not exist in the file.")
 
@@ -371,9 +604,7 @@ class ParquetDataset(_RawParquetDataset):
       a root _PrensorTypeSpec.
     """
 
-    metadata = pq.ParquetFile(self._filenames[0]).metadata
-    parquet_schema = metadata.schema
-    arrow_schema = parquet_schema.to_arrow_schema()
+    arrow_schema = _get_schema_info(self._filenames[0]).arrow_schema
 
     # pylint: disable=protected-access
     # Sort the paths by number of fields.
@@ -433,6 +664,38 @@ class ParquetDataset(_RawParquetDataset):
     return self.element_structure
 
 
+def _may_satisfy(statistics: Optional[pq.Statistics],
+                 predicate: ColumnPredicate) -> bool:
+  """Returns False if no value of a column chunk can satisfy the predicate."""
+  if statistics is None or not statistics.has_min_max:
+    return True
+  try:
+    if (predicate.min_value is not None and
+        _less(statistics.max, predicate.min_value)):
+      return False
+    if (predicate.max_value is not None and
+        _less(predicate.max_value, statistics.min)):
+      return False
+  except TypeError:
+    # The statistics cannot be compared with the predicate, so the row group
+    # is read.
+    return True
+  return True
+
+
+def _less(a: Any, b: Any) -> bool:
+  """Returns a < b.
+
+  str (e.g. the statistics of a UTF8 column) and bytes are compared as UTF-8
+  encoded bytes, which is how parquet orders them.
+  """
+  if isinstance(a, str) and isinstance(b, bytes):
+    a = a.encode("utf-8")
+  elif isinstance(a, bytes) and isinstance(b, str):
+    b = b.encode("utf-8")
+  return a < b
+
+
 def _create_children_from_arrow_fields(
     fields: pa.lib.Field) -> Dict[str, Dict[Any, Any]]:
   """Creates a dictionary of children schema for a pyarrow field.
@@ -493,7 +756,10 @@ class _ParquetDatasetWithExpression(ParquetDataset):
   def __init__(self, exprs: List[expression.Expression],
                root_expr: placeholder._PlaceholderRootExpression,
                filenames: List[str], batch_size: int,
-               options: Optional[calculate_options.Options]):
+               options: Optional[calculate_options.Options],
+               num_parallel_reads: int = 1,
+               deterministic: bool = True,
+               predicates: Optional[Sequence[ColumnPredicate]] = None):
     self._exprs = exprs
     self._root_expr = root_expr
     self._filesnames = filenames
@@ -513,7 +779,8 @@ class _ParquetDatasetWithExpression(ParquetDataset):
     parquet_paths = [".".join(p.field_list) for p in paths]
 
     super(_ParquetDatasetWithExpression,
-          self).__init__(filenames, parquet_paths, batch_size)
+          self).__init__(filenames, parquet_paths, batch_size,
+                         num_parallel_reads, deterministic, predicates)
 
   def _calculate_prensor(self, pren) -> List[prensor.Prensor]:
     """Function for applying expression queries to a prensor.
@@ -136,6 +136,63 @@ class ParquetDatasetOutputsPrensorTest(ParquetDatasetTestBase):
       if i == 0:
         self._assertPrensorEqual(pren, expected_prensor)
 
+  def testSchemaInfoIsCached(self):
+    """Tests that the schema info of a file is only created once."""
+    # pylint: disable=protected-access
+    schema_info = parquet._get_schema_info(self._test_filenames[0])
+    self.assertIs(parquet._get_schema_info(self._test_filenames[0]),
+                  schema_info)
+    self.assertIn("DocId", schema_info.path_to_column_index)
+
+  def testPredicateSkipsRowGroups(self):
+    """Tests that the row groups not satisfying a predicate are skipped."""
+    pq_ds = parquet.ParquetDataset(
+        filenames=self._rowgroup_test_filenames,
+        value_paths=["DocId"],
+        batch_size=2,
+        predicates=[parquet.column_in_range("DocId", min_value=35)])
+    doc_ids = []
+    for pren in pq_ds:
+      doc_ids.extend(
+          pren.get_descendant_or_error(path.Path(["DocId"])).node.values)
+    # The whole row group is read, including the rows not satisfying the
+    # predicate.
+    self.assertAllEqual(doc_ids, [30, 40])
+
+  def testPredicateOnStringColumn(self):
+    """Tests predicates on a UTF8 column, given as bytes or as str."""
+    for min_value in [b"en-us2", "en-us2"]:
+      pq_ds = parquet.ParquetDataset(
+          filenames=self._rowgroup_test_filenames,
+          value_paths=["DocId"],
+          batch_size=2,
+          predicates=[
+              parquet.column_in_range("Name.Language.Code",
+                                      min_value=min_value)
+          ])
+      doc_ids = []
+      for pren in pq_ds:
+        doc_ids.extend(
+            pren.get_descendant_or_error(path.Path(["DocId"])).node.values)
+      # Only the second row group has a code not smaller than "en-us2".
+      self.assertAllEqual(doc_ids, [30, 40])
+
+  def testFileMetadataIsCached(self):
+    """Tests that the footer of a file is only read once."""
+    # pylint: disable=protected-access
+    file_info = parquet._get_file_info(self._rowgroup_test_filenames[0])
+    self.assertIs(parquet._get_file_info(self._rowgroup_test_filenames[0]),
+                  file_info)
+    self.assertEqual(file_info.metadata.num_row_groups, 2)
+
+  def testPredicateInvalidColumnName(self):
+    with self.assertRaisesRegex(ValueError, "path does not exist in the file."):
+      parquet.ParquetDataset(
+          filenames=self._rowgroup_test_filenames,
+          value_paths=["DocId"],
+          batch_size=1,
+          predicates=[parquet.column_equals("invalid_path", 1)])
+
 
 class ParquetDatasetWithExpressionTest(ParquetDatasetTestBase):
   """This tests the public facing API, using the placeholder expression."""
@@ -184,5 +241,20 @@ class ParquetDatasetWithExpressionTest(ParquetDatasetTestBase):
       self._assertPrensorEqual(docid_pren, docid_expected)
 
 
+class LruCacheTest(absltest.TestCase):
+
+  def testDropsLeastRecentlyUsed(self):
+    # pylint: disable=protected-access
+    cache = parquet._LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    self.assertEqual(cache.get("a"), 1)
+    cache.put("c", 3)
+    self.assertLen(cache, 2)
+    self.assertIsNone(cache.get("b"))
+    self.assertEqual(cache.get("a"), 1)
+    self.assertEqual(cache.get("c"), 3)
+
+
 if __name__ == "__main__":
   absltest.main()
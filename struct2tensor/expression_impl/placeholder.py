@@ -32,16 +32,20 @@ result = calculate.calculate_values([new_exp],
 
 """
 
+from __future__ import annotations
+
 import typing
-from typing import FrozenSet, List, Optional, Sequence, Union
+from typing import FrozenSet, Hashable, List, Optional, Sequence, Union
 
 from struct2tensor import calculate
 from struct2tensor import calculate_options
 from struct2tensor import expression
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
 from struct2tensor.expression_impl import map_prensor_to_prensor as mpp
 
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+
 
 def create_expression_from_schema(
     schema: mpp.Schema) -> "_PlaceholderRootExpression":
@@ -138,6 +142,9 @@ class _PlaceholderChildExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     if field_name not in self._schema.known_field_names():
@@ -193,6 +200,9 @@ class _PlaceholderRootExpression(expression.Expression):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     if field_name not in self._schema.known_field_names():
@@ -28,13 +28,17 @@ prensor_result now has two paths, "foo.bar" and "x.y".
 
 """
 
+from __future__ import annotations
+
 import collections
 from typing import FrozenSet, List, Mapping, Optional, Sequence
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
 
 
 def project(expr: expression.Expression,
@@ -96,38 +96,55 @@ session: {
 
 """
 
-from typing import FrozenSet, Optional, Sequence, Tuple
+from __future__ import annotations
+
+from typing import FrozenSet, Hashable, Optional, Sequence, Tuple, Union
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
 
 from tensorflow_metadata.proto.v0 import schema_pb2
 
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
+
 
 class PromoteExpression(expression.Leaf):
   """A promoted leaf."""
 
-  def __init__(self, origin: expression.Expression,
-               origin_parent: expression.Expression):
-
+  def __init__(self,
+               origin: expression.Expression,
+               origin_parent: expression.Expression,
+               origin_ancestors: Sequence[expression.Expression] = ()):
+    """Creates a promoted leaf.
+
+    Args:
+      origin: the leaf to promote.
+      origin_parent: the parent of origin.
+      origin_ancestors: if the leaf is promoted more than one level, the
+        ancestors of origin_parent that it is promoted past, starting with the
+        parent of origin_parent.
+    """
     super().__init__(
-        origin.is_repeated or origin_parent.is_repeated,
+        _is_promoted_repeated(origin, origin_parent, origin_ancestors),
         origin.type,
-        schema_feature=_get_promote_schema_feature(
-            origin.schema_feature, origin_parent.schema_feature))
+        schema_feature=_get_multi_level_promote_schema_feature(
+            origin, origin_parent, origin_ancestors))
     self._origin = origin
     self._origin_parent = origin_parent
+    self._origin_ancestors = tuple(origin_ancestors)
     if self.type is None:
       raise ValueError("Can only promote a field")
     if self._origin_parent.type is not None:
       raise ValueError("origin_parent cannot be a field")
 
   def get_source_expressions(self) -> Sequence[expression.Expression]:
-    return [self._origin, self._origin_parent]
+    return [self._origin, self._origin_parent] + list(self._origin_ancestors)
 
   def calculate(
       self,
@@ -135,44 +152,55 @@ class PromoteExpression(expression.Leaf):
       destinations: Sequence[expression.Expression],
       options: calculate_options.Options,
       side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
-    [origin_value, origin_parent_value] = sources
+    origin_value = sources[0]
     if not isinstance(origin_value, prensor.LeafNodeTensor):
       raise ValueError("origin_value must be a leaf")
-    if not isinstance(origin_parent_value, prensor.ChildNodeTensor):
-      raise ValueError("origin_parent_value must be a child node")
-    new_parent_index = tf.gather(origin_parent_value.parent_index,
-                                 origin_value.parent_index)
-    return prensor.LeafNodeTensor(new_parent_index, origin_value.values,
-                                  self.is_repeated)
+    new_parent_index = _get_promoted_parent_index(origin_value, sources[1:])
+    return prensor.reparent_leaf_node(origin_value, new_parent_index,
+                                      self.is_repeated)
 
   def calculation_is_identity(self) -> bool:
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
-    return isinstance(expr, PromoteExpression)
+    return (isinstance(expr, PromoteExpression) and
+            len(expr._origin_ancestors) == len(self._origin_ancestors))  # pylint: disable=protected-access
+
+  def calculation_fingerprint(self) -> Hashable:
+    return (PromoteExpression, len(self._origin_ancestors))
 
 
 class PromoteChildExpression(expression.Expression):
   """The root of the promoted sub tree."""
 
-  def __init__(self, origin: expression.Expression,
-               origin_parent: expression.Expression):
-
+  def __init__(self,
+               origin: expression.Expression,
+               origin_parent: expression.Expression,
+               origin_ancestors: Sequence[expression.Expression] = ()):
+    """Creates the root of a promoted sub tree.
+
+    Args:
+      origin: the root of the sub tree to promote.
+      origin_parent: the parent of origin.
+      origin_ancestors: if the sub tree is promoted more than one level, the
+        ancestors of origin_parent that it is promoted past, starting with the
+        parent of origin_parent.
+    """
     super().__init__(
-        origin.is_repeated or origin_parent.is_repeated,
+        _is_promoted_repeated(origin, origin_parent, origin_ancestors),
         origin.type,
-        schema_feature=_get_promote_schema_feature(
-            origin.schema_feature, origin_parent.schema_feature
-        ),
+        schema_feature=_get_multi_level_promote_schema_feature(
+            origin, origin_parent, origin_ancestors),
         validate_step_format=origin.validate_step_format,
     )
     self._origin = origin
     self._origin_parent = origin_parent
+    self._origin_ancestors = tuple(origin_ancestors)
     if self._origin_parent.type is not None:
       raise ValueError("origin_parent cannot be a field")
 
   def get_source_expressions(self) -> Sequence[expression.Expression]:
-    return [self._origin, self._origin_parent]
+    return [self._origin, self._origin_parent] + list(self._origin_ancestors)
 
   def calculate(
       self,
@@ -180,20 +208,21 @@ class PromoteChildExpression(expression.Expression):
       destinations: Sequence[expression.Expression],
       options: calculate_options.Options,
       side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
-    [origin_value, origin_parent_value] = sources
+    origin_value = sources[0]
     if not isinstance(origin_value, prensor.ChildNodeTensor):
       raise ValueError("origin_value must be a child")
-    if not isinstance(origin_parent_value, prensor.ChildNodeTensor):
-      raise ValueError("origin_parent_value must be a child node")
-    new_parent_index = tf.gather(origin_parent_value.parent_index,
-                                 origin_value.parent_index)
+    new_parent_index = _get_promoted_parent_index(origin_value, sources[1:])
     return prensor.ChildNodeTensor(new_parent_index, self.is_repeated)
 
   def calculation_is_identity(self) -> bool:
     return False
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
-    return isinstance(expr, PromoteChildExpression)
+    return (isinstance(expr, PromoteChildExpression) and
+            len(expr._origin_ancestors) == len(self._origin_ancestors))  # pylint: disable=protected-access
+
+  def calculation_fingerprint(self) -> Hashable:
+    return (PromoteChildExpression, len(self._origin_ancestors))
 
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
@@ -203,6 +232,37 @@ class PromoteChildExpression(expression.Expression):
     return self._origin.known_field_names()
 
 
+def _is_promoted_repeated(
+    origin: expression.Expression, origin_parent: expression.Expression,
+    origin_ancestors: Sequence[expression.Expression]) -> bool:
+  return (origin.is_repeated or origin_parent.is_repeated or
+          any(x.is_repeated for x in origin_ancestors))
+
+
+def _get_promoted_parent_index(
+    origin_value: Union[prensor.ChildNodeTensor, prensor.LeafNodeTensor],
+    ancestor_values: Sequence[prensor.NodeTensor]) -> tf.Tensor:
+  """Gets the parent index of a node promoted past its ancestors.
+
+  Args:
+    origin_value: the value of the promoted node.
+    ancestor_values: the values of the parent of the node, and of the
+      ancestors above it that the node is promoted past.
+
+  Returns:
+    The parent index of the promoted node.
+  """
+  for ancestor_value in ancestor_values:
+    if not isinstance(ancestor_value, prensor.ChildNodeTensor):
+      raise ValueError("origin_parent_value must be a child node")
+  if len(ancestor_values) == 1:
+    return tf.gather(ancestor_values[0].parent_index, origin_value.parent_index)
+  # Composes the parent indices in one pass, instead of one gather per level.
+  return struct2tensor_ops.compose_parent_indices(
+      [origin_value.parent_index] +
+      [x.parent_index for x in ancestor_values])
+
+
 def _lifecycle_stage_number(a) -> int:
   """Return a number indicating the quality of the lifecycle stage.
 
@@ -312,47 +372,93 @@ def _get_promote_schema_feature(original: Optional[schema_pb2.Feature],
   return result
 
 
-def _promote_impl(root: expression.Expression, p: path.Path,
-                  new_field_name: path.Step
-                 ) -> Tuple[expression.Expression, path.Path]:
-  """Promotes a path to be a child of its grandparent, and gives it a name.
+def _get_multi_level_promote_schema_feature(
+    origin: expression.Expression, origin_parent: expression.Expression,
+    origin_ancestors: Sequence[expression.Expression]
+) -> Optional[schema_pb2.Feature]:
+  """Generate the schema feature for a field promoted one or more levels."""
+  result = _get_promote_schema_feature(origin.schema_feature,
+                                       origin_parent.schema_feature)
+  for ancestor in origin_ancestors:
+    result = _get_promote_schema_feature(result, ancestor.schema_feature)
+  return result
+
+
+def _promote_impl(root: expression.Expression,
+                  p: path.Path,
+                  new_field_name: path.Step,
+                  levels: int = 1) -> Tuple[expression.Expression, path.Path]:
+  """Promotes a path to be a child of an ancestor, and gives it a name.
 
   Args:
     root: The root expression.
     p: The path to promote. This can be the path to a leaf or child node.
     new_field_name: The name of the promoted field.
+    levels: The number of levels to promote the path. With 1, the new field is
+      a child of the grandparent of p.
 
   Returns:
     An _AddPathsExpression that wraps a PromoteExpression.
   """
-  if len(p) < 2:
+  if levels < 1:
+    raise ValueError("levels must be positive: {}".format(levels))
+  if len(p) < levels + 1:
     raise ValueError("Cannot do a promotion beyond the root: {}".format(str(p)))
-  parent_path = p.get_parent()
-  grandparent_path = parent_path.get_parent()
+  # The parent of p, followed by the ancestors that p is promoted past.
+  ancestor_paths = [p.prefix(len(p) - i) for i in range(1, levels + 1)]
+  new_parent_path = p.prefix(len(p) - levels - 1)
 
   p_expression = root.get_descendant_or_error(p)
-  new_path = grandparent_path.get_child(new_field_name)
+  new_path = new_parent_path.get_child(new_field_name)
 
   if p_expression.is_leaf:
     promote_expression_factory = PromoteExpression
   else:
     promote_expression_factory = PromoteChildExpression
 
+  ancestors = [root.get_descendant_or_error(x) for x in ancestor_paths]
   return expression_add.add_paths(
       root, {
           new_path:
-              promote_expression_factory(
-                  p_expression, root.get_descendant_or_error(parent_path))
+              promote_expression_factory(p_expression, ancestors[0],
+                                         ancestors[1:])
       }), new_path
 
 
 def promote_anonymous(root: expression.Expression,
-                      p: path.Path) -> Tuple[expression.Expression, path.Path]:
-  """Promote a path to be a new anonymous child of its grandparent."""
-  return _promote_impl(root, p, path.get_anonymous_field())
+                      p: path.Path,
+                      levels: int = 1) -> Tuple[expression.Expression, path.Path]:
+  """Promote a path to be a new anonymous child of an ancestor.
+
+  Args:
+    root: The root expression.
+    p: The path to promote.
+    levels: The number of levels to promote the path. With 1 (the default),
+      the new field is a child of the grandparent of p.
+
+  Returns:
+    The new expression and the new path as a pair.
+  """
+  return _promote_impl(root, p, path.get_anonymous_field(), levels)
 
 
-def promote(root: expression.Expression, p: path.Path,
-            new_field_name: path.Step) -> expression.Expression:
-  """Promote a path to be a child of its grandparent, and give it a name."""
-  return _promote_impl(root, p, new_field_name)[0]
+def promote(root: expression.Expression,
+            p: path.Path,
+            new_field_name: path.Step,
+            levels: int = 1) -> expression.Expression:
+  """Promote a path to be a child of an ancestor, and give it a name.
+
+  Promoting a path k levels is equivalent to promoting it one level k times,
+  but calculates the new parent index in a single operation.
+
+  Args:
+    root: The root expression.
+    p: The path to promote.
+    new_field_name: The name of the promoted field.
+    levels: The number of levels to promote the path. With 1 (the default),
+      the new field is a child of the grandparent of p.
+
+  Returns:
+    The new expression.
+  """
+  return _promote_impl(root, p, new_field_name, levels)[0]
@@ -126,8 +126,9 @@ def promote_and_broadcast_anonymous(
   least_common_ancestor = origin.get_least_common_ancestor(new_parent)
 
   new_expr, new_path = root, origin
-  while new_path.get_parent() != least_common_ancestor:
-    new_expr, new_path = promote.promote_anonymous(new_expr, new_path)
+  levels = len(origin) - 1 - len(least_common_ancestor)
+  if levels > 0:
+    new_expr, new_path = promote.promote_anonymous(new_expr, new_path, levels)
 
   while new_path.get_parent() != new_parent:
     new_parent_step = new_parent.field_list[len(new_path) - 1]
@@ -256,6 +256,25 @@ class PromoteTest(absltest.TestCase):
     self.assertEqual(leaf_node.values.dtype, tf.string)
     self.assertEqual(new_field.known_field_names(), frozenset())
 
+  def test_promote_multiple_levels(self):
+    """Tests promote.promote(...) with levels > 1."""
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_four_layer_prensor())
+    new_root = promote.promote(
+        expr, path.Path(["event", "doc", "nested_child", "bar"]), "new_bar",
+        levels=3)
+    new_bar = new_root.get_child_or_error("new_bar")
+    self.assertTrue(new_bar.is_repeated)
+    self.assertEqual(new_bar.type, tf.string)
+    self.assertTrue(new_bar.is_leaf)
+
+  def test_promote_multiple_levels_beyond_root(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_four_layer_prensor())
+    with self.assertRaisesRegex(ValueError, "beyond the root"):
+      promote.promote(expr, path.Path(["event", "doc", "nested_child"]),
+                      "new_nested_child", levels=3)
+
   def test_promote_substructure(self):
     """Tests promote.promote(...) of substructure."""
     expr = create_expression.create_expression_from_prensor(
@@ -415,6 +434,27 @@ class PromoteValuesTest(tf.test.TestCase):
     self.assertAllEqual(keep_me_node.values, [False, True])
     self.assertFalse(keep_me_node.is_repeated)
 
+  def test_promote_multiple_levels_and_calculate(self):
+    """Tests promoting a leaf and substructure more than one level."""
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_four_layer_prensor())
+    new_root, new_bar_path = promote.promote_anonymous(
+        expr, path.Path(["event", "doc", "nested_child", "bar"]), levels=3)
+    new_root, new_nested_child_path = promote.promote_anonymous(
+        new_root, path.Path(["event", "doc", "nested_child"]), levels=2)
+    self.assertLen(new_bar_path, 1)
+    self.assertLen(new_nested_child_path, 1)
+
+    bar_node = expression_test_util.calculate_value_slowly(
+        new_root.get_descendant_or_error(new_bar_path))
+    self.assertAllEqual(bar_node.parent_index, [0, 1, 1, 1])
+    self.assertAllEqual(bar_node.values, [b"a", b"b", b"c", b"d"])
+
+    nested_child_node = expression_test_util.calculate_value_slowly(
+        new_root.get_descendant_or_error(new_nested_child_path))
+    self.assertAllEqual(nested_child_node.parent_index, [0, 1, 1, 1])
+    self.assertTrue(nested_child_node.is_repeated)
+
   def test_promote_and_calculate_substructure_then_leaf(self):
     """Tests promoting of substructure and then a leaf."""
     expr = create_expression.create_expression_from_prensor(
@@ -19,7 +19,7 @@ for its children.
 """
 
 import abc
-from typing import Callable, FrozenSet, Mapping, Optional, Sequence, Set, Tuple, Union, cast
+from typing import Callable, FrozenSet, Hashable, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union, cast
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
@@ -150,6 +150,9 @@ def create_transformed_field(
     To lift this restriction, a decoding op must be told to hold a reference
     of the input tensors of all its upstream decoding ops.
 
+    If CalculateOptions.use_string_view is None (the default), `values` passed
+    to `transform_fn` are copies, and this restriction does not apply.
+
 
   Args:
     expr: a source expression containing `source_path`.
@@ -158,7 +161,7 @@ def create_transformed_field(
       sibling of the field identified by `source_path`.
     transform_fn: a callable that accepts parent_indices and serialized proto
       values and returns a posibly modified parent_indices and values. Note that
-      when CalcuateOptions.use_string_view is set, transform_fn should not have
+      when CalcuateOptions.use_string_view is True, transform_fn should not have
       any stateful side effecting uses of serialized proto inputs. Doing so
       could cause segfaults as the backing string tensor lifetime is not
       guaranteed when the side effecting operations are run.
@@ -176,6 +179,15 @@ def create_transformed_field(
         "Expected _ProtoChildExpression for field {}, but found {}.".format(
             str(source_path), source_expr))
 
+  transformed_expr = _create_transformed_expression(source_expr, transform_fn)
+  dest_path = source_path.get_parent().get_child(dest_field)
+  return expression_add.add_paths(expr, {dest_path: transformed_expr})
+
+
+def _create_transformed_expression(
+    source_expr: "_ProtoChildExpression",
+    transform_fn: TransformFn) -> "_TransformProtoChildExpression":
+  """Creates a sibling of source_expr, transformed by transform_fn."""
   if isinstance(source_expr, _TransformProtoChildExpression):
     # In order to be able to propagate fields needed for parsing, the source
     # expression of _TransformProtoChildExpression must always be the original
@@ -195,15 +207,13 @@ def create_transformed_field(
   else:
     final_transform = transform_fn
 
-  transformed_expr = _TransformProtoChildExpression(
+  return _TransformProtoChildExpression(
       parent=source_expr._parent,  # pylint: disable=protected-access
       desc=source_expr._desc,  # pylint: disable=protected-access
       is_repeated=source_expr.is_repeated,
       name_as_field=source_expr.name_as_field,
       transform_fn=final_transform,
       backing_str_tensor=source_expr._backing_str_tensor)  # pylint: disable=protected-access
-  dest_path = source_path.get_parent().get_child(dest_field)
-  return expression_add.add_paths(expr, {dest_path: transformed_expr})
 
 
 class _ProtoRootNodeTensor(prensor.RootNodeTensor):
@@ -220,10 +230,21 @@ class _ProtoRootNodeTensor(prensor.RootNodeTensor):
 
   """
 
-  def __init__(self, size: tf.Tensor,
-               fields: Mapping[StrStep, struct2tensor_ops._ParsedField]):
+  def __init__(
+      self,
+      size: tf.Tensor,
+      fields: Mapping[StrStep, struct2tensor_ops._ParsedField],
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,
+      backing_str_tensor: Optional[tf.Tensor] = None):
     super().__init__(size)
     self.fields = fields
+    # If the whole subtree was parsed at once, the parsed fields of all the
+    # descendants, by path from the root of the proto.
+    self.subtree_fields = subtree_fields
+    # If the serialized submessages in fields are string views, the tensor
+    # that owns the bytes they point to.
+    self.backing_str_tensor = backing_str_tensor
 
 
 class _ProtoChildNodeTensor(prensor.ChildNodeTensor):
@@ -239,10 +260,19 @@ class _ProtoChildNodeTensor(prensor.ChildNodeTensor):
   4. if this is an Any proto, any needed casted fields are included.
   """
 
-  def __init__(self, parent_index: tf.Tensor, is_repeated: bool,
-               fields: Mapping[StrStep, struct2tensor_ops._ParsedField]):
+  def __init__(
+      self,
+      parent_index: tf.Tensor,
+      is_repeated: bool,
+      fields: Mapping[StrStep, struct2tensor_ops._ParsedField],
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,
+      backing_str_tensor: Optional[tf.Tensor] = None):
     super().__init__(parent_index, is_repeated)
     self.fields = fields
+    # See _ProtoRootNodeTensor.
+    self.subtree_fields = subtree_fields
+    self.backing_str_tensor = backing_str_tensor
 
 
 _ParentProtoNodeTensor = Union[_ProtoRootNodeTensor, _ProtoChildNodeTensor]
@@ -292,21 +322,34 @@ class _AbstractProtoChildExpression(expression.Expression):
       if parsed_field is None:
         raise ValueError("Cannot find {} in {}".format(
             str(self), str(parent_value)))
-      return self.calculate_from_parsed_field(parsed_field, destinations,
-                                              options)
+      return self.calculate_from_parsed_field(
+          parsed_field,
+          destinations,
+          options,
+          subtree_fields=parent_value.subtree_fields,
+          parent_backing_str_tensor=parent_value.backing_str_tensor)
     raise ValueError("Not a _ParentProtoNodeTensor: " + str(type(parent_value)))
 
   @abc.abstractmethod
   def calculate_from_parsed_field(
-      self, parsed_field: struct2tensor_ops._ParsedField,  # pylint: disable=protected-access
+      self,
+      parsed_field: struct2tensor_ops._ParsedField,  # pylint: disable=protected-access
       destinations: Sequence[expression.Expression],
-      options: calculate_options.Options) -> prensor.NodeTensor:
+      options: calculate_options.Options,
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,  # pylint: disable=protected-access
+      parent_backing_str_tensor: Optional[tf.Tensor] = None
+  ) -> prensor.NodeTensor:
     """Calculate the NodeTensor given the parsed fields requested from a parent.
 
     Args:
       parsed_field: the parsed field from name_as_field.
       destinations: the destination of the expression.
       options: calculate options.
+      subtree_fields: if the subtree of the proto was parsed at once, the
+        parsed fields of all the descendants of the root of the proto.
+      parent_backing_str_tensor: if the serialized submessages parsed from the
+        parent are string views, the tensor that owns the bytes they point to.
 
     Returns:
       A node tensor for this node.
@@ -316,6 +359,10 @@ class _AbstractProtoChildExpression(expression.Expression):
   def calculation_is_identity(self) -> bool:
     return False
 
+  def calculation_fingerprint(self) -> Hashable:
+    # Equal calculations parse the same field.
+    return self.name_as_field
+
 
 class _ProtoLeafExpression(_AbstractProtoChildExpression):
   """Represents parsing a leaf field."""
@@ -337,9 +384,14 @@ class _ProtoLeafExpression(_AbstractProtoChildExpression):
     self._field_descriptor = desc
 
   def calculate_from_parsed_field(
-      self, parsed_field: struct2tensor_ops._ParsedField,  # pylint: disable=protected-access
+      self,
+      parsed_field: struct2tensor_ops._ParsedField,  # pylint: disable=protected-access
       destinations: Sequence[expression.Expression],
-      options: calculate_options.Options) -> prensor.NodeTensor:
+      options: calculate_options.Options,
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,  # pylint: disable=protected-access
+      parent_backing_str_tensor: Optional[tf.Tensor] = None
+  ) -> prensor.NodeTensor:
     return prensor.LeafNodeTensor(parsed_field.index, parsed_field.value,
                                   self.is_repeated)
 
@@ -394,21 +446,48 @@ class _ProtoChildExpression(_AbstractProtoChildExpression):
     self._desc = desc
 
   def calculate_from_parsed_field(
-      self, parsed_field: struct2tensor_ops._ParsedField,  # pylint:disable=protected-access
+      self,
+      parsed_field: struct2tensor_ops._ParsedField,  # pylint:disable=protected-access
       destinations: Sequence[expression.Expression],
-      options: calculate_options.Options) -> prensor.NodeTensor:
-    needed_fields = _get_needed_fields(destinations)
-    backing_str_tensor = None
-    if options.use_string_view:
-      backing_str_tensor = self._backing_str_tensor
-    fields = parse_message_level_ex.parse_message_level_ex(
-        parsed_field.value,
-        self._desc,
-        needed_fields,
-        backing_str_tensor=backing_str_tensor,
-        honor_proto3_optional_semantics=options
-        .experimental_honor_proto3_optional_semantics)
-    return _ProtoChildNodeTensor(parsed_field.index, self.is_repeated, fields)
+      options: calculate_options.Options,
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,  # pylint: disable=protected-access
+      parent_backing_str_tensor: Optional[tf.Tensor] = None
+  ) -> prensor.NodeTensor:
+    my_path = self.get_path()
+    if subtree_fields is not None and parsed_field.value is None:
+      # The fields were parsed along with an ancestor.
+      fields = {
+          field_name: subtree_fields[my_path.get_child(field_name)]
+          for field_name in _get_needed_fields(destinations, my_path)
+      }
+      return _ProtoChildNodeTensor(
+          parsed_field.index,
+          self.is_repeated,
+          fields,
+          subtree_fields=subtree_fields)
+    if subtree_fields is not None:
+      # The submessages were parsed serialized along with an ancestor: they
+      # are copies, that own their bytes (see _get_subtree_paths).
+      root_backing_str_tensor = parsed_field.value
+      owner_of_values = parsed_field.value
+    else:
+      root_backing_str_tensor = self._backing_str_tensor
+      owner_of_values = _get_owner_of_values(parsed_field,
+                                             parent_backing_str_tensor)
+    fields, subtree_fields, backing_str_tensor = _parse_fields(
+        parsed_field.value, self._desc, my_path, destinations, options,
+        root_backing_str_tensor, owner_of_values)
+    return _ProtoChildNodeTensor(
+        parsed_field.index,
+        self.is_repeated,
+        fields,
+        subtree_fields=subtree_fields,
+        backing_str_tensor=backing_str_tensor)
+
+  def calculation_needs_transitive_destinations(self) -> bool:
+    # Used to parse the whole requested subtree at once.
+    return True
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
     # Ensure that we're dealing with the _ProtoChildExpression and not any
@@ -423,6 +502,30 @@ class _ProtoChildExpression(_AbstractProtoChildExpression):
                       field_name: path.Step) -> Optional[expression.Expression]:
     return _get_child(self, self._desc, field_name, self._backing_str_tensor)
 
+  def get_filtered_by_child(
+      self, child_field_name: path.Step) -> Optional[expression.Expression]:
+    # The filter is applied to the serialized submessages: the child is parsed
+    # first, and the other fields (and all the descendants) are only parsed
+    # from the submessages kept.
+    child = self.get_child(child_field_name)
+    if (not isinstance(child, _ProtoLeafExpression) or
+        child._parent is not self or  # pylint: disable=protected-access
+        child.type != tf.bool or child.is_repeated):
+      return None
+    desc = self._desc
+    name_as_field = child.name_as_field
+
+    def filter_fn(parent_indices: tf.Tensor,
+                  values: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+      parsed_field = parse_message_level_ex.parse_message_level_ex(
+          values, desc, {name_as_field})[name_as_field]
+      # The child is optional, so there is at most one value per submessage.
+      indices_to_keep = tf.boolean_mask(parsed_field.index, parsed_field.value)
+      return (tf.gather(parent_indices, indices_to_keep),
+              tf.gather(values, indices_to_keep))
+
+    return _create_transformed_expression(self, filter_fn)
+
   def known_field_names(self) -> FrozenSet[path.Step]:
     return _known_field_names_from_descriptor(self._desc)
 
@@ -451,22 +554,28 @@ class _TransformProtoChildExpression(_ProtoChildExpression):
       self,
       parsed_field: struct2tensor_ops._ParsedField,  # pylint:disable=protected-access
       destinations: Sequence[expression.Expression],
-      options: calculate_options.Options) -> prensor.NodeTensor:
-    needed_fields = _get_needed_fields(destinations)
+      options: calculate_options.Options,
+      subtree_fields: Optional[Mapping[
+          path.Path, struct2tensor_ops._ParsedField]] = None,  # pylint: disable=protected-access
+      parent_backing_str_tensor: Optional[tf.Tensor] = None
+  ) -> prensor.NodeTensor:
+    # The parent always parses the serialized submessages of a transformed
+    # field (see _get_subtree_paths).
+    del subtree_fields, parent_backing_str_tensor
     transformed_parent_indices, transformed_values = self._transform_fn(
         parsed_field.index, parsed_field.value)
-    backing_str_tensor = None
-    if options.use_string_view:
-      backing_str_tensor = self._backing_str_tensor
-    fields = parse_message_level_ex.parse_message_level_ex(
-        transformed_values,
-        self._desc,
-        needed_fields,
-        backing_str_tensor=backing_str_tensor,
-        honor_proto3_optional_semantics=options
-        .experimental_honor_proto3_optional_semantics)
-    return _ProtoChildNodeTensor(transformed_parent_indices, self.is_repeated,
-                                 fields)
+    # The parent did not decode the values passed to transform_fn into string
+    # views (see _get_backing_str_tensor), so whatever transform_fn returns
+    # owns its bytes.
+    fields, subtree_fields, backing_str_tensor = _parse_fields(
+        transformed_values, self._desc, self.get_path(), destinations, options,
+        self._backing_str_tensor, transformed_values)
+    return _ProtoChildNodeTensor(
+        transformed_parent_indices,
+        self.is_repeated,
+        fields,
+        subtree_fields=subtree_fields,
+        backing_str_tensor=backing_str_tensor)
 
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return (isinstance(expr, _TransformProtoChildExpression) and
@@ -525,32 +634,42 @@ class _ProtoRootExpression(expression.Expression):
     if sources:
       raise ValueError("_ProtoRootExpression has no sources")
     size = tf.size(self._tensor_of_protos, out_type=tf.int64)
-    needed_fields = _get_needed_fields(destinations)
-    backing_str_tensor = None
     if options.use_string_view:
       assert self._message_format == "binary", (
           "`options.use_string_view` is only compatible with 'binary' message "
           "format. Please create the root expression with "
           "message_format='binary'.")
-      backing_str_tensor = self._tensor_of_protos
-    fields = parse_message_level_ex.parse_message_level_ex(
+    # The destinations are transitive: they include all the descendants.
+    fields, subtree_fields, backing_str_tensor = _parse_fields(
         self._tensor_of_protos,
         self._descriptor,
-        needed_fields,
-        message_format=self._message_format,
-        backing_str_tensor=backing_str_tensor,
-        honor_proto3_optional_semantics=options
-        .experimental_honor_proto3_optional_semantics)
-    return _ProtoRootNodeTensor(size, fields)
+        self.get_path(),
+        destinations,
+        options,
+        self._tensor_of_protos,
+        self._tensor_of_protos if self._message_format == "binary" else None,
+        message_format=self._message_format)
+    return _ProtoRootNodeTensor(
+        size,
+        fields,
+        subtree_fields=subtree_fields,
+        backing_str_tensor=backing_str_tensor)
 
   def calculation_is_identity(self) -> bool:
     return False
 
+  def calculation_needs_transitive_destinations(self) -> bool:
+    # Used to parse the whole requested subtree at once.
+    return True
+
   def calculation_equal(self, expr: expression.Expression) -> bool:
     # TODO(martinz): In theory, we could check for the equality of the
     # tensor_of_protos and the descriptors.
     return self is expr
 
+  def calculation_fingerprint(self) -> Hashable:
+    return id(self)
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return _get_child(self, self._descriptor, field_name,
@@ -707,10 +826,231 @@ def _get_child(
                            field_name, backing_str_tensor)
 
 
-def _get_needed_fields(
-    destinations: Sequence[expression.Expression]) -> Set[StrStep]:
+def _get_needed_fields(destinations: Sequence[expression.Expression],
+                       parent_path: path.Path) -> Set[StrStep]:
   field_names = set()  # type: Set[StrStep]
   for destination in destinations:
-    if isinstance(destination, _AbstractProtoChildExpression):
+    if _is_child_of(destination, parent_path):
       field_names.add(destination.name_as_field)
   return field_names
+
+
+def _get_owner_of_values(
+    parsed_field: struct2tensor_ops._ParsedField,  # pylint: disable=protected-access
+    parent_backing_str_tensor: Optional[tf.Tensor]) -> tf.Tensor:
+  """Returns the tensor that owns the bytes of the serialized submessages.
+
+  Args:
+    parsed_field: the parsed field holding the serialized submessages.
+    parent_backing_str_tensor: if the submessages were decoded into string
+      views, the tensor that owns the bytes they point to.
+
+  Returns:
+    parent_backing_str_tensor if the values of parsed_field are string views,
+    or the values themselves.
+  """
+  if parent_backing_str_tensor is None:
+    return parsed_field.value
+  if (parsed_field.field_descriptor is None and
+      path.is_extension(parsed_field.field_name)):
+    # A protobuf.Any cast, decoded from a bytes field, which is always copied.
+    return parsed_field.value
+  return parent_backing_str_tensor
+
+
+def _get_backing_str_tensor(
+    options: calculate_options.Options,
+    destinations: Sequence[expression.Expression],
+    root_backing_str_tensor: Optional[tf.Tensor],
+    owner_of_values: Optional[tf.Tensor]) -> Optional[tf.Tensor]:
+  """Returns the backing_str_tensor to decode submessages into string views.
+
+  If options.use_string_view is None, the submessages are decoded into string
+  views unless they escape to a transform_fn (see create_transformed_field): any
+  other consumer of the submessages is another decoding op, that holds a
+  reference to the owner of the bytes through its backing_str_tensor.
+
+  Args:
+    options: calculate options.
+    destinations: the destinations of the expression decoding the submessages.
+    root_backing_str_tensor: the tensor of root protos, used if
+      options.use_string_view is True.
+    owner_of_values: the tensor that owns the bytes of the serialized messages
+      being decoded, or None if they cannot be decoded into string views.
+
+  Returns:
+    The backing_str_tensor, or None if the submessages must be copied.
+  """
+  if options.use_string_view is not None:
+    return root_backing_str_tensor if options.use_string_view else None
+  if any(
+      isinstance(x, _TransformProtoChildExpression) for x in destinations):
+    return None
+  return owner_of_values
+
+
+def _is_child_of(expr: expression.Expression, parent_path: path.Path) -> bool:
+  # Proto expressions only depend upon their parent, so the proto expressions
+  # that (transitively) depend upon an expression are its descendants.
+  return (isinstance(expr, _AbstractProtoChildExpression) and
+          len(expr.get_path()) == len(parent_path) + 1)
+
+
+def _get_subtree_prefix_len(desc: descriptor.Descriptor, p: path.Path) -> int:
+  """Returns the length of the longest prefix of p in parse_message_subtree.
+
+  Args:
+    desc: the descriptor of the message p is relative to.
+    p: a path to a field.
+
+  Returns:
+    The number of steps of p, before the first step that is not a regular
+    field or extension (e.g., an Any cast, a map indexing step or a MessageSet
+    extension).
+  """
+  for i, step in enumerate(p.field_list):
+    if desc is None or parse_message_level_ex.is_any_descriptor(desc):
+      return i
+    if path.is_map_indexing_step(step):
+      return i
+    field_desc = _get_field_descriptor(desc, step)
+    if field_desc is None:
+      return i
+    if field_desc.is_extension and desc.GetOptions().message_set_wire_format:
+      return i
+    desc = field_desc.message_type
+  return len(p)
+
+
+# The paths to parse with parse_message_subtree. See its arguments.
+_SubtreePaths = NamedTuple("_SubtreePaths",
+                           [("paths", Sequence[path.Path]),
+                            ("serialized_paths", Sequence[path.Path])])
+
+
+def _get_subtree_paths(
+    desc: descriptor.Descriptor, messages_path: path.Path,
+    destinations: Sequence[expression.Expression],
+    options: calculate_options.Options) -> Optional[_SubtreePaths]:
+  """Gets the paths to parse at once from serialized messages, if any.
+
+  Parsing the subtree at once is only worth it if there is a field below the
+  first level. The serialized submessages of the fields in between are never
+  materialized, and the unrequested fields are skipped at every depth.
+
+  Some descendants need the serialized submessages of a field: a transformed
+  field, or a field whose children are not regular fields or extensions (an
+  Any, a map). That field is parsed serialized along with the others, and its
+  own descendants are parsed from it.
+
+  parse_message_subtree copies the values it parses, so nothing is parsed at
+  once if options.use_string_view is True.
+
+  Args:
+    desc: the descriptor of the messages.
+    messages_path: the path of the messages, from the root of the proto.
+    destinations: all the expressions that depend upon the messages.
+    options: calculate options.
+
+  Returns:
+    The paths of the proto descendants of the messages, relative to the
+    messages, or None if only the children should be parsed.
+  """
+  if options.use_string_view:
+    return None
+  paths = []
+  serialized_paths = set()
+  for expr in destinations:
+    if not isinstance(expr, _AbstractProtoChildExpression):
+      continue
+    p = expr.get_path().suffix(len(messages_path))
+    prefix_len = _get_subtree_prefix_len(desc, p)
+    # Subclasses (e.g. _TransformProtoChildExpression) need the serialized
+    # submessages of their field.
+    if (prefix_len == len(p) and
+        type(expr) in (_ProtoChildExpression, _ProtoLeafExpression)):  # pylint: disable=unidiomatic-typecheck
+      paths.append(p)
+    elif prefix_len == 0:
+      return None
+    else:
+      serialized_paths.add(p.prefix(prefix_len))
+  # A serialized field is parsed no further.
+  serialized_paths = [
+      p for p in serialized_paths
+      if not any(q.is_ancestor(p) and q != p for q in serialized_paths)
+  ]
+  paths = [
+      p for p in paths if not any(q.is_ancestor(p) for q in serialized_paths)
+  ]
+  if all(len(p) <= 1 for p in paths + serialized_paths):
+    return None
+  return _SubtreePaths(paths=paths, serialized_paths=serialized_paths)
+
+
+def _parse_fields(
+    messages: tf.Tensor,
+    desc: descriptor.Descriptor,
+    messages_path: path.Path,
+    destinations: Sequence[expression.Expression],
+    options: calculate_options.Options,
+    root_backing_str_tensor: Optional[tf.Tensor],
+    owner_of_messages: Optional[tf.Tensor],
+    message_format: str = "binary"
+) -> Tuple[Mapping[StrStep, struct2tensor_ops._ParsedField],  # pylint: disable=protected-access
+           Optional[Mapping[path.Path, struct2tensor_ops._ParsedField]],  # pylint: disable=protected-access
+           Optional[tf.Tensor]]:
+  """Parses the fields of serialized messages needed by their descendants.
+
+  Args:
+    messages: the serialized messages.
+    desc: the descriptor of the messages.
+    messages_path: the path of the messages, from the root of the proto.
+    destinations: all the expressions that depend upon the messages.
+    options: calculate options.
+    root_backing_str_tensor: see _get_backing_str_tensor.
+    owner_of_messages: the tensor that owns the bytes of messages, or None if
+      they cannot be decoded into string views.
+    message_format: the format of messages, 'text' or 'binary'.
+
+  Returns:
+    A tuple (fields, subtree_fields, backing_str_tensor), where fields are the
+    parsed fields of the children, subtree_fields are the parsed fields of all
+    the descendants by path from the root of the proto if they were parsed at
+    once (see _get_subtree_paths), and backing_str_tensor is the tensor that
+    owns the bytes of the serialized submessages in fields if they are string
+    views.
+  """
+  subtree_paths = None
+  if message_format == "binary":
+    subtree_paths = _get_subtree_paths(desc, messages_path, destinations,
+                                       options)
+  if subtree_paths is not None:
+    subtree_fields = struct2tensor_ops.parse_message_subtree(
+        messages,
+        desc,
+        subtree_paths.paths,
+        honor_proto3_optional_semantics=options
+        .experimental_honor_proto3_optional_semantics,
+        serialized_paths=subtree_paths.serialized_paths)
+    fields = {
+        p.field_list[0]: parsed_field
+        for p, parsed_field in subtree_fields.items()
+        if len(p) == 1
+    }
+    return (fields, {
+        messages_path.concat(p): parsed_field
+        for p, parsed_field in subtree_fields.items()
+    }, None)
+  children = [x for x in destinations if _is_child_of(x, messages_path)]
+  backing_str_tensor = _get_backing_str_tensor(options, children,
+                                               root_backing_str_tensor,
+                                               owner_of_messages)
+  fields = parse_message_level_ex.parse_message_level_ex(
+      messages,
+      desc,
+      _get_needed_fields(children, messages_path),
+      message_format=message_format,
+      backing_str_tensor=backing_str_tensor,
+      honor_proto3_optional_semantics=options
+      .experimental_honor_proto3_optional_semantics)
+  return fields, None, backing_str_tensor
@@ -0,0 +1,156 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A dataset of prensors read from TFRecord files of protos.
+
+The usual way to read protos from TFRecord files is:
+
+```
+  ds = tf.data.TFRecordDataset(filenames).batch(batch_size)
+  ds = ds.map(lambda protos: calculate.calculate_prensors(
+      [proto.create_expression_from_proto(protos, descriptor)...]))
+```
+
+which batches the records into a string tensor before decoding them.
+ProtoRecordDataset decodes the records as they are read, directly into the
+components of a prensor:
+
+```
+  ds = proto_record.ProtoRecordDataset(
+      filenames, descriptor, [path.Path(["foo", "bar"])], batch_size)
+
+  for pren in ds:
+    bar = pren.get_descendant_or_error(path.Path(["foo", "bar"]))
+```
+
+The paths to read can be the paths of the ProtoRequirements returned by
+calculate_with_source_paths.calculate_prensors_with_source_paths.
+"""
+
+from typing import List, Sequence
+
+from struct2tensor import path
+from struct2tensor import prensor
+from struct2tensor.ops import file_descriptor_set
+from struct2tensor.ops import gen_decode_proto_sparse
+from struct2tensor.ops import struct2tensor_ops
+import tensorflow as tf
+
+from google.protobuf import descriptor
+
+
+class ProtoRecordDataset(tf.compat.v1.data.Dataset):
+  """A dataset of batches of protos read from TFRecord files, as prensors.
+
+  The prensors have the fields on the requested paths (and their prefixes).
+  Only regular fields and extensions are supported (no Any casts, no map
+  indexing steps, no MessageSet extensions), and the protos must be binary.
+
+  Note: In tensorflow v1 this dataset will not return a prensor, but its
+  components. See ParquetDataset for a workaround.
+  """
+
+  def __init__(self,
+               filenames: List[str],
+               descriptor_type: descriptor.Descriptor,
+               paths: Sequence[path.Path],
+               batch_size: int,
+               compression_type: str = "",
+               honor_proto3_optional_semantics: bool = False):
+    """Creates a ProtoRecordDataset.
+
+    Args:
+      filenames: The TFRecord files to read, one after the other.
+      descriptor_type: The descriptor of the protos in the files.
+      paths: The paths of the fields to read, relative to descriptor_type.
+      batch_size: The number of protos in each prensor. If there are fewer
+        than batch_size remaining protos, then all remaining protos will be
+        returned.
+      compression_type: The compression of the files: "", "ZLIB" or "GZIP".
+      honor_proto3_optional_semantics: See
+        struct2tensor_ops.parse_message_level.
+
+    Raises:
+      ValueError: if a path is not a path to a field in descriptor_type.
+      ValueError: if batch_size is not positive.
+    """
+    if batch_size < 1:
+      raise ValueError("batch_size must be positive: {}".format(batch_size))
+    self._filenames = filenames
+    self._descriptor_type = descriptor_type
+    self._batch_size = batch_size
+    self._compression_type = compression_type
+    self._honor_proto3_optional_semantics = honor_proto3_optional_semantics
+    # pylint: disable=protected-access
+    self._nodes = struct2tensor_ops._get_subtree_nodes(descriptor_type, paths)
+    self.element_structure = self._create_prensor_spec()
+
+    super().__init__()
+
+  def _create_node_spec(self, node_id: int) -> prensor._PrensorTypeSpec:  # pylint: disable=protected-access
+    """Creates the _PrensorTypeSpec of a node and its descendants."""
+    # pylint: disable=protected-access
+    field_descriptor = self._nodes.field_descriptors[node_id]
+    is_repeated = (
+        field_descriptor.label == descriptor.FieldDescriptor.LABEL_REPEATED)
+    if field_descriptor.message_type is not None:
+      return prensor._PrensorTypeSpec(
+          is_repeated, prensor._PrensorTypeSpec._NodeType.CHILD, tf.int64,
+          self._create_children_specs(node_id))
+    leaf_ordinal = self._nodes.leaf_ids.index(node_id)
+    return prensor._PrensorTypeSpec(
+        is_repeated, prensor._PrensorTypeSpec._NodeType.LEAF,
+        self._nodes.output_types[leaf_ordinal], [])
+
+  def _create_children_specs(self, parent_id: int):
+    """Creates the (step, _PrensorTypeSpec) pairs of the children of a node.
+
+    Args:
+      parent_id: the index of the parent node, or -1 for the root.
+
+    Returns:
+      The children specs, in the order of the nodes, which is the order of
+      the components produced by the ProtoRecordDataset op.
+    """
+    return [(self._nodes.paths[i].field_list[-1], self._create_node_spec(i))
+            for i, parent in enumerate(self._nodes.parents)
+            if parent == parent_id]
+
+  def _create_prensor_spec(self) -> prensor._PrensorTypeSpec:  # pylint: disable=protected-access
+    """Creates the prensor type spec of the requested paths."""
+    # pylint: disable=protected-access
+    return prensor._PrensorTypeSpec(None,
+                                    prensor._PrensorTypeSpec._NodeType.ROOT,
+                                    tf.int64, self._create_children_specs(-1))
+
+  def _as_variant_tensor(self):
+    node_field_names = [p.field_list[-1] for p in self._nodes.paths]
+    return gen_decode_proto_sparse.proto_record_dataset(
+        tf.convert_to_tensor(self._filenames, dtype=tf.string),
+        tf.convert_to_tensor(self._compression_type, dtype=tf.string),
+        batch_size=self._batch_size,
+        message_type=self._descriptor_type.full_name,
+        node_field_names=node_field_names,
+        node_parents=self._nodes.parents,
+        num_nodes=len(self._nodes.paths),
+        output_types=self._nodes.output_types,
+        descriptor_literal=file_descriptor_set.get_file_descriptor_set_literal(
+            self._descriptor_type, node_field_names),
+        honor_proto3_optional_semantics=self._honor_proto3_optional_semantics)
+
+  def _inputs(self):
+    return []
+
+  @property
+  def element_spec(self):
+    return self.element_structure
@@ -0,0 +1,112 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for struct2tensor.expression_impl.proto_record."""
+
+import os
+
+from absl.testing import absltest
+from struct2tensor import path
+from struct2tensor.expression_impl import proto_record
+from struct2tensor.test import test_pb2
+import tensorflow.compat.v2 as tf
+
+from google.protobuf import text_format
+
+tf.enable_v2_behavior()
+
+_SESSIONS = [
+    """
+    session_id: 1
+    event {
+      query: "a"
+      action { doc_id: "x" }
+      action { doc_id: "y" }
+    }
+    event { query: "b" }
+    """,
+    """
+    session_id: 2
+    """,
+    """
+    session_id: 3
+    event { action { doc_id: "z" } }
+    """,
+]
+
+
+class ProtoRecordDatasetTest(tf.test.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._filename = os.path.join(self.get_temp_dir(), "sessions.tfrecord")
+    with tf.io.TFRecordWriter(self._filename) as writer:
+      for session in _SESSIONS:
+        writer.write(
+            text_format.Parse(session, test_pb2.Session()).SerializeToString())
+
+  def test_prensor(self):
+    ds = proto_record.ProtoRecordDataset(
+        [self._filename],
+        test_pb2.Session.DESCRIPTOR,
+        [path.Path(["session_id"]),
+         path.Path(["event", "action", "doc_id"])],
+        batch_size=2)
+    batches = list(ds)
+    self.assertLen(batches, 2)
+
+    first = batches[0]
+    self.assertAllEqual(first.node.size, 2)
+    session_id = first.get_descendant_or_error(path.Path(["session_id"])).node
+    self.assertAllEqual(session_id.parent_index, [0, 1])
+    self.assertAllEqual(session_id.values, [1, 2])
+    event = first.get_descendant_or_error(path.Path(["event"])).node
+    self.assertAllEqual(event.parent_index, [0, 0])
+    action = first.get_descendant_or_error(path.Path(["event", "action"])).node
+    self.assertAllEqual(action.parent_index, [0, 0])
+    doc_id = first.get_descendant_or_error(
+        path.Path(["event", "action", "doc_id"])).node
+    self.assertAllEqual(doc_id.parent_index, [0, 1])
+    self.assertAllEqual(doc_id.values, [b"x", b"y"])
+
+    second = batches[1]
+    self.assertAllEqual(second.node.size, 1)
+    doc_id = second.get_descendant_or_error(
+        path.Path(["event", "action", "doc_id"])).node
+    self.assertAllEqual(doc_id.parent_index, [0])
+    self.assertAllEqual(doc_id.values, [b"z"])
+
+  def test_multiple_files(self):
+    ds = proto_record.ProtoRecordDataset(
+        [self._filename, self._filename],
+        test_pb2.Session.DESCRIPTOR, [path.Path(["session_id"])],
+        batch_size=4)
+    batches = list(ds)
+    self.assertLen(batches, 2)
+    self.assertAllEqual(
+        batches[0].get_descendant_or_error(path.Path(["session_id"])).node
+        .values, [1, 2, 3, 1])
+    self.assertAllEqual(
+        batches[1].get_descendant_or_error(path.Path(["session_id"])).node
+        .values, [2, 3])
+
+  def test_unknown_field(self):
+    with self.assertRaisesRegex(ValueError, "Unknown field"):
+      proto_record.ProtoRecordDataset([self._filename],
+                                      test_pb2.Session.DESCRIPTOR,
+                                      [path.Path(["unknown"])],
+                                      batch_size=1)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -253,6 +253,8 @@ class ProtoValuesTest(tf.test.TestCase, parameterized.TestCase):
         self.assertLen(op.inputs, 2)
       if op.type.startswith("DecodeProtoMap"):
         self.assertLen(op.inputs, 3)
+      # DecodeProtoSubtree always copies the values it decodes.
+      self.assertNotEqual(op.type, "DecodeProtoSubtree")
 
   @parameterized.named_parameters(("string_view", True),
                                   ("no_string_view", False))
@@ -414,6 +416,64 @@ class ProtoValuesTest(tf.test.TestCase, parameterized.TestCase):
     if use_string_view:
       self._check_string_view()
 
+  def test_automatic_string_view(self):
+    # Map fields are not parsed along with the root, so each level of the map
+    # is decoded by its own op.
+    expr = proto_test_util.text_to_expression([
+        """
+        features {
+          feature {
+            key: "feature1"
+            value { bytes_list { value: ["hello", "world"] } }
+          }
+        }
+        """
+    ], tf.train.Example)
+    options = calculate_options.get_default_options()
+    self.assertIsNone(options.use_string_view)
+    result = expression_test_util.calculate_list_map(
+        expr.project(["features.feature[feature1].bytes_list.value"]),
+        self,
+        options=options)
+    self.assertAllEqual(result["features.feature[feature1].bytes_list.value"],
+                        [[[[[b"hello", b"world"]]]]])
+    self._check_string_view()
+
+  def test_automatic_string_view_copies_transformed_values(self):
+    expr = proto_test_util._get_expression_from_session_empty_user_info()
+    reversed_events_expr = proto.create_transformed_field(
+        expr, path.Path(["event"]), "reversed_event", _reverse_values)
+    # One level below the events, so that each level is decoded by its own op.
+    result = expression_test_util.calculate_list_map(
+        reversed_events_expr.project(
+            ["reversed_event.event_id", "event.event_id"]),
+        self,
+        options=calculate_options.get_default_options())
+    self.assertAllEqual(result["reversed_event.event_id"],
+                        [[[b"D"], [], [b"C"]], [[b"B"], [b"A"]]])
+    self.assertAllEqual(result["event.event_id"],
+                        [[[b"A"], [b"B"], [b"C"]], [[], [b"D"]]])
+    if tf.executing_eagerly():
+      return
+    event_ops = []
+    event_id_ops = []
+    for op in tf.compat.v1.get_default_graph().get_operations():
+      self.assertNotEqual(op.type, "DecodeProtoSubtree")
+      if op.type.startswith("DecodeProtoSparse"):
+        field_names = op.get_attr("field_names")
+        if b"event" in field_names:
+          event_ops.append(op)
+        if b"event_id" in field_names:
+          event_id_ops.append(op)
+    # The events passed to the transform_fn are copies.
+    [event_op] = event_ops
+    self.assertLen(event_op.inputs, 1)
+    # The event ids of both the events and the reversed events are string
+    # views, into the events they are decoded from.
+    self.assertLen(event_id_ops, 2)
+    for op in event_id_ops:
+      self.assertLen(op.inputs, 2)
+
   @parameterized.named_parameters(("string_view", True),
                                   ("no_string_view", False))
   def test_transformed_field_values_with_transformed_parent(
@@ -456,6 +516,67 @@ class ProtoValuesTest(tf.test.TestCase, parameterized.TestCase):
     if use_string_view:
       self._check_string_view()
 
+  @parameterized.named_parameters(("default", None),
+                                  ("no_string_view", False))
+  def test_deep_fields_parsed_in_one_pass(self, use_string_view):
+    expr = proto_test_util._get_expression_from_session_empty_user_info()
+    result = expression_test_util.calculate_list_map(
+        expr.project(["event.action.doc_id", "event.event_id"]),
+        self,
+        options=self._get_calculate_options(use_string_view))
+    self.assertAllEqual(result["event.action.doc_id"],
+                        [[[[b"a"], [b"b"]], [[b"c"], []], [[b"e"], [b"f"]]],
+                         [[[b"g"]], [[b"h"], [b"i"], [b"j"]]]])
+    self.assertAllEqual(result["event.event_id"],
+                        [[[b"A"], [b"B"], [b"C"]], [[], [b"D"]]])
+    if not tf.executing_eagerly():
+      op_types = [
+          op.type for op in tf.compat.v1.get_default_graph().get_operations()
+      ]
+      self.assertIn("DecodeProtoSubtree", op_types)
+      self.assertNotIn("DecodeProtoSparseV4", op_types)
+
+  def test_deep_fields_parsed_level_by_level_with_string_view(self):
+    expr = proto_test_util._get_expression_from_session_empty_user_info()
+    result = expression_test_util.calculate_list_map(
+        expr.project(["event.action.doc_id", "event.event_id"]),
+        self,
+        options=self._get_calculate_options(True))
+    self.assertAllEqual(result["event.action.doc_id"],
+                        [[[[b"a"], [b"b"]], [[b"c"], []], [[b"e"], [b"f"]]],
+                         [[[b"g"]], [[b"h"], [b"i"], [b"j"]]]])
+    self.assertAllEqual(result["event.event_id"],
+                        [[[b"A"], [b"B"], [b"C"]], [[], [b"D"]]])
+    if not tf.executing_eagerly():
+      op_types = [
+          op.type for op in tf.compat.v1.get_default_graph().get_operations()
+      ]
+      self.assertIn("DecodeProtoSparseV4", op_types)
+      self._check_string_view()
+
+  def test_deep_fields_parsed_in_one_pass_with_transformed_field(self):
+    expr = proto_test_util._get_expression_from_session_empty_user_info()
+    reversed_actions_expr = proto.create_transformed_field(
+        expr, path.Path(["event", "action"]), "reversed_action",
+        _reverse_values)
+    result = expression_test_util.calculate_list_map(
+        reversed_actions_expr.project(
+            ["event.reversed_action.doc_id", "event.event_id"]),
+        self,
+        options=calculate_options.get_default_options())
+    self.assertAllEqual(result["event.reversed_action.doc_id"],
+                        [[[[b"j"], [b"i"]], [[b"h"], [b"g"]], [[b"f"], [b"e"]]],
+                         [[[]], [[b"c"], [b"b"], [b"a"]]]])
+    self.assertAllEqual(result["event.event_id"],
+                        [[[b"A"], [b"B"], [b"C"]], [[], [b"D"]]])
+    if not tf.executing_eagerly():
+      ops = tf.compat.v1.get_default_graph().get_operations()
+      for op in ops:
+        if op.type.startswith("DecodeProtoSparse"):
+          # Only the serialized actions are materialized, not the events.
+          self.assertNotIn(b"event", op.get_attr("field_names"))
+      [subtree_op] = [op for op in ops if op.type == "DecodeProtoSubtree"]
+      self.assertLen(subtree_op.get_attr("serialized_nodes"), 1)
 
 
 def _reverse_values(parent_indices, values):
@@ -395,6 +395,40 @@ class ParquetDatasetForTestingOpTest(ParquetDatasetTestBase):
         expected_output=[(2, [0, 1], [10, 20]),
                          (4, [0, 1, 2, 3], [10, 20, 30, 40])])
 
+  def testMultipleFilesParallelReads(self):
+    """Tests that the files read in parallel take turns."""
+    pq_ds = parquet._RawParquetDataset(
+        filenames=[self._test_filenames[0], self._rowgroup_test_filenames[0]],
+        value_paths=["DocId"],
+        value_dtypes=(tf.int64,),
+        parent_index_paths=["DocId"],
+        path_index=[0],
+        batch_size=1,
+        num_parallel_reads=2)
+    self.assertDatasetProduces(
+        pq_ds,
+        expected_output=[(1, [0], [10]), (1, [0], [10]), (1, [0], [20]),
+                         (1, [0], [20]), (1, [0], [30]), (1, [0], [40])])
+
+  def testMultipleFilesParallelReadsNotDeterministic(self):
+    """Tests that the dataset reads all the files in non deterministic mode."""
+    pq_ds = parquet._RawParquetDataset(
+        filenames=[self._test_filenames[0], self._rowgroup_test_filenames[0]],
+        value_paths=["DocId"],
+        value_dtypes=(tf.int64,),
+        parent_index_paths=["DocId"],
+        path_index=[0],
+        batch_size=1,
+        num_parallel_reads=2,
+        deterministic=False)
+    get_next = self._getNext(pq_ds)
+    doc_ids = []
+    for _ in range(6):
+      doc_ids.extend(self.evaluate(get_next())[2])
+    self.assertCountEqual(doc_ids, [10, 20, 10, 20, 30, 40])
+    with self.assertRaises(tf.errors.OutOfRangeError):
+      self.evaluate(get_next())
+
 
 @test_util.run_all_in_graph_and_eager_modes
 class ParquetDatasetForTestingOpDataTypesTest(ParquetDatasetTestBase):
@@ -667,6 +701,32 @@ class ParquetDatasetForTestingOpRowGroupTest(ParquetDatasetTestBase):
     self.assertDatasetProduces(
         pq_ds, expected_output=[(2, [0, 1], [10, 20]), (2, [0, 1], [30, 40])])
 
+  def testTwoRowGroupsSelectRowGroups(self):
+    """Tests that only the selected row groups are read."""
+    pq_ds = parquet._RawParquetDataset(
+        filenames=self._rowgroup_test_filenames,
+        value_paths=["DocId"],
+        value_dtypes=(tf.int64,),
+        parent_index_paths=["DocId"],
+        path_index=[0],
+        batch_size=2,
+        row_groups=[[1]])
+    self.assertDatasetProduces(pq_ds, expected_output=[(2, [0, 1], [30, 40])])
+
+  def testTwoRowGroupsParallelReads(self):
+    """Tests that the row groups of a file are read in parallel."""
+    pq_ds = parquet._RawParquetDataset(
+        filenames=self._rowgroup_test_filenames,
+        value_paths=["DocId"],
+        value_dtypes=(tf.int64,),
+        parent_index_paths=["DocId"],
+        path_index=[0],
+        batch_size=4,
+        num_parallel_reads=2,
+        row_groups=[[0, 1]])
+    self.assertDatasetProduces(
+        pq_ds, expected_output=[(2, [0, 1], [10, 20]), (2, [0, 1], [30, 40])])
+
   def testTwoRowGroupsAndEqualBatchSizeContainsNones(self):
     """Tests batch size == row group size, with two row groups with None values.
 
@@ -18,14 +18,19 @@ you to call create_proto_index(...) later on, that gives you a reference to the
 original proto.
 
 """
-from typing import FrozenSet, Optional, Sequence
+from __future__ import annotations
+
+from typing import FrozenSet, Hashable, Optional, Sequence
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
+from struct2tensor import node_tensor
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 def reroot(root: expression.Expression,
@@ -56,7 +61,7 @@ def create_proto_index_field(root: expression.Expression,
       root, {path.Path([new_field_name]): _InputProtoIndexExpression(root)})
 
 
-class _RerootRootNodeTensor(prensor.RootNodeTensor):
+class _RerootRootNodeTensor(node_tensor.RootNodeTensor):
   """The reroot root node.
 
   This contains a map from a current index to the original index of a proto.
@@ -129,6 +134,9 @@ class _RerootExpression(expression.Expression):
     # Although path can vary, it is not used in the calculation, just to
     return isinstance(expr, _RerootExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return _RerootExpression
+
   def _get_child_impl(self,
                       field_name: path.Step) -> Optional[expression.Expression]:
     return self._new_root.get_child(field_name)
@@ -176,3 +184,6 @@ class _InputProtoIndexExpression(expression.Leaf):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     # Although path can vary, it is not used in the calculation, just to
     return isinstance(expr, _InputProtoIndexExpression)
+
+  def calculation_fingerprint(self) -> Hashable:
+    return _InputProtoIndexExpression
@@ -29,15 +29,21 @@ root_2 = has(expr, path.Path(["foo","bar"]), "bar_has")
 creates a new expression root that has an optional field "foo.bar_has", which
 is always present, and is true if there are one or more bar in foo.
 """
-from typing import Optional, Sequence, Tuple
+from __future__ import annotations
+
+from typing import Hashable, Optional, Sequence, Tuple
 
 from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
 from struct2tensor.expression_impl import map_values
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 def size_anonymous(root: expression.Expression, source_path: path.Path
@@ -84,9 +90,9 @@ def has(root: expression.Expression, source_path: path.Path,
   new_root, size_p = size_anonymous(root, source_path)
   # TODO(martinz): consider using copy_over to "remove" the size field
   # from the result.
-  return map_values.map_values(
-      new_root, size_p, lambda x: tf.greater(x, tf.constant(0, dtype=tf.int64)),
-      tf.bool, new_field_name)
+  # A python comparison also works on ndarrays (see calculate_numpy).
+  return map_values.map_values(new_root, size_p, lambda x: x > 0, tf.bool,
+                               new_field_name)
 
 
 class SizeExpression(expression.Leaf):
@@ -126,14 +132,10 @@ class SizeExpression(expression.Leaf):
                        "or a RootNodeTensor, but was a " +
                        str(type(origin_parent_value)))
 
-    parent_index = origin_value.parent_index
     num_parent_protos = origin_parent_value.size
-    # A vector of 1s of the same size as the parent_index.
-    updates = tf.ones(tf.shape(parent_index), dtype=tf.int64)
-    indices = tf.expand_dims(parent_index, 1)
-    # This is incrementing the size by 1 for each element.
-    # Obviously, not the fastest way to do this.
-    values = tf.scatter_nd(indices, updates, tf.reshape(num_parent_protos, [1]))
+    # The parent index is sorted, so this counts the runs in one pass.
+    values = struct2tensor_ops.segment_count(origin_value.parent_index,
+                                             num_parent_protos)
 
     # Need to create a new_parent_index = 0,1,2,3,4...n.
     new_parent_index = tf.range(num_parent_protos, dtype=tf.int64)
@@ -145,6 +147,9 @@ class SizeExpression(expression.Leaf):
   def calculation_equal(self, expr: expression.Expression) -> bool:
     return isinstance(expr, SizeExpression)
 
+  def calculation_fingerprint(self) -> Hashable:
+    return SizeExpression
+
 
 def _size_impl(
     root: expression.Expression, source_path: path.Path,
@@ -113,15 +113,21 @@ result_2 = [{
 
 """
 
-from typing import Callable, Optional, Tuple
+from __future__ import annotations
 
+from typing import Hashable, Optional, Sequence, Tuple
+
+from struct2tensor import calculate_options
 from struct2tensor import expression
 from struct2tensor import expression_add
+from struct2tensor import lazy_loader
 from struct2tensor import path
 from struct2tensor.expression_impl import filter_expression
-from struct2tensor.expression_impl import index
-from struct2tensor.expression_impl import map_values
-import tensorflow as tf
+
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 IndexValue = expression.IndexValue
 
@@ -144,107 +150,36 @@ def slice_expression(expr: expression.Expression, p: path.Path,
   Returns:
     A new root expression.
   """
-  work_expr, mask_anonymous_path = _get_slice_mask(expr, p, begin, end)
-  work_expr = filter_expression.filter_by_sibling(
-      work_expr, p, mask_anonymous_path.field_list[-1], new_field_name)
+  work_expr, indices_anonymous_path = _get_slice_indices(expr, p, begin, end)
+  work_expr = filter_expression.filter_by_indices(
+      work_expr, p, indices_anonymous_path.field_list[-1], new_field_name)
   new_path = p.get_parent().get_child(new_field_name)
-  # We created a lot of anonymous fields and intermediate expressions. Just grab
-  # the final result (and its children).
+  # We created an anonymous field and intermediate expressions. Just grab the
+  # final result (and its children).
   return expression_add.add_to(expr, {new_path: work_expr})
 
 
-def _get_mask(t: expression.Expression, p: path.Path, threshold: IndexValue,
-              relation: Callable[[tf.Tensor, IndexValue], tf.Tensor]
-             ) -> Tuple[expression.Expression, path.Path]:
-  """Gets a mask based on a relation of the index to a threshold.
-
-  If the threshold is non-negative, then we create a mask that is true if
-  the relation(index, threshold) is true.
-
-  If the threshold is negative, then we create a mask that is true if
-  the relation(size - index, threshold) is true.
-
-  Args:
-    t: expression to add the field to.
-    p: path to create the mask for.
-    threshold: the cutoff threshold.
-    relation: tf.less or tf.greater_equal.
-
-  Returns:
-    A boolean mask on the fields to keep on the model.
-
-  Raises:
-    ValueError: if p is not in t.
-  """
-  if t.get_descendant(p) is None:
-    raise ValueError("Path not found: {}".format(str(p)))
-  work_expr, index_from_end = index.get_index_from_end(
-      t, p, path.get_anonymous_field())
-  work_expr, mask_for_negative_threshold = map_values.map_values_anonymous(
-      work_expr,
-      index_from_end, lambda x: relation(x, tf.cast(threshold, tf.int64)),
-      tf.bool)
-
-  work_expr, positional_index = index.get_positional_index(
-      work_expr, p, path.get_anonymous_field())
-  work_expr, mask_for_non_negative_threshold = map_values.map_values_anonymous(
-      work_expr,
-      positional_index, lambda x: relation(x, tf.cast(threshold, tf.int64)),
-      tf.bool)
-
-  if isinstance(threshold, int):
-    if threshold >= 0:
-      return work_expr, mask_for_non_negative_threshold
-    return work_expr, mask_for_negative_threshold
-  else:
-
-    def tf_cond_on_threshold(a, b):
-      return tf.cond(tf.greater_equal(threshold, 0), a, b)
-
-    return map_values.map_many_values(work_expr, p.get_parent(), [
-        x.field_list[-1]
-        for x in [mask_for_non_negative_threshold, mask_for_negative_threshold]
-    ], tf_cond_on_threshold, tf.bool, path.get_anonymous_field())
-
-
-def _get_begin_mask(expr: expression.Expression, p: path.Path, begin: IndexValue
-                   ) -> Tuple[expression.Expression, path.Path]:
-  """Get a boolean mask of what indices to retain for slice given begin."""
-  return _get_mask(expr, p, begin, tf.greater_equal)
-
-
-def _get_end_mask(t: expression.Expression, p: path.Path,
-                  end: IndexValue) -> Tuple[expression.Expression, path.Path]:
-  """Get a boolean mask of what indices to retain for slice given end."""
-  return _get_mask(t, p, end, tf.less)
-
-
-def _get_slice_mask(
+def _get_slice_indices(
     expr: expression.Expression, p: path.Path, begin: Optional[IndexValue],
     end: Optional[IndexValue]) -> Tuple[expression.Expression, path.Path]:
-  """Gets a mask for slicing a path.
+  """Gets the indices of the elements of a path kept by a slice.
 
   One way to consider the elements of a path "foo.bar" is as a list of list of
   list of elements. Slicing a path slices this doubly nested list of elements,
   based upon positions in its parent list. Each parent list has a size, and
   there is a beginning and end relative to the elements in that list.
 
-  At each path p, there is conceptually a list of...list of elements.
-
-  For example, given:
-  an index with respect to its parent
   The range is specified with beginning and an end.
   1. If begin is not present, begin_index is implied to be zero.
   2. If begin is negative, begin_index is the size of a particular
       list + begin
-  3. If end is not present, end_index is the length of the list + 1.
+  3. If end is not present, end_index is the length of the list.
   4. If end is negative, end_index is the length of the list + end
   5. If end is non-negative, end_index is end.
-  The mask is positive for all elements in range(begin_index, end_index), and
-  negative elsewhere.
+  The elements in range(begin_index, end_index) of each list are kept.
 
-  The mask returned is a sibling of path p, where for every element in p, there
-  is a corresponding element in the mask.
+  The indices returned are a sibling of path p, with an element for every
+  element of p that is kept: its value is the index of that element in p.
 
   Args:
     expr: the root expression
@@ -254,19 +189,87 @@ def _get_slice_mask(
 
   Returns:
     An expression,path pair, where the expression contains all the children in
-    `expr` and an anonymous field of the mask and the path points to
-    the mask field.
+    `expr` and an anonymous field of the indices and the path points to
+    the indices field.
+
+  Raises:
+    ValueError: if neither begin nor end are specified, or if p is not in expr.
   """
-  if begin is None:
-    if end is None:
-      raise ValueError("Must specify begin or end.")
-    return _get_end_mask(expr, p, end)
-  else:
-    if end is None:
-      return _get_begin_mask(expr, p, begin)
-    work_expr, begin_mask = _get_begin_mask(expr, p, begin)
-    work_expr, end_mask = _get_end_mask(work_expr, p, end)
-    return map_values.map_many_values(
-        work_expr, p.get_parent(),
-        [x.field_list[-1] for x in [begin_mask, end_mask]], tf.logical_and,
-        tf.bool, path.get_anonymous_field())
+  if begin is None and end is None:
+    raise ValueError("Must specify begin or end.")
+  origin = expr.get_descendant(p)
+  if origin is None:
+    raise ValueError("Path not found: {}".format(str(p)))
+  indices_path = p.get_parent().get_child(path.get_anonymous_field())
+  return expression_add.add_paths(
+      expr, {indices_path: _SliceIndicesExpression(origin, begin, end)
+            }), indices_path
+
+
+def _index_value_equal(a: Optional[IndexValue],
+                       b: Optional[IndexValue]) -> bool:
+  """True if a and b are equal ints (or None), or the same tensor."""
+  if isinstance(a, int) and isinstance(b, int):
+    return a == b
+  return a is b
+
+
+def _index_value_fingerprint(a: Optional[IndexValue]) -> Hashable:
+  """Equal if _index_value_equal."""
+  return a if isinstance(a, int) else id(a)
+
+
+class _SliceIndicesExpression(expression.Leaf):
+  """The indices of the elements of origin kept by a slice.
+
+  _SliceIndicesExpression is intended to be a sibling of origin. It has an
+  element per element of origin kept, with the same parent.
+  """
+
+  def __init__(self, origin: expression.Expression,
+               begin: Optional[IndexValue], end: Optional[IndexValue]):
+    super().__init__(origin.is_repeated, tf.int64)
+    self._origin = origin
+    self._begin = begin
+    self._end = end
+
+  @property
+  def begin(self) -> Optional[IndexValue]:
+    return self._begin
+
+  @property
+  def end(self) -> Optional[IndexValue]:
+    return self._end
+
+  def get_source_expressions(self) -> Sequence[expression.Expression]:
+    return [self._origin]
+
+  def calculate(
+      self,
+      sources: Sequence[prensor.NodeTensor],
+      destinations: Sequence[expression.Expression],
+      options: calculate_options.Options,
+      side_info: Optional[prensor.Prensor] = None) -> prensor.NodeTensor:
+    [origin_value] = sources
+    if not isinstance(origin_value,
+                      (prensor.ChildNodeTensor, prensor.LeafNodeTensor)):
+      raise ValueError("Cannot slice the root")
+    begin = 0 if self._begin is None else self._begin
+    end = tf.int64.max if self._end is None else self._end
+    new_parent_index, indices_to_keep = struct2tensor_ops.slice_indices(
+        origin_value.parent_index, tf.cast(begin, tf.int64),
+        tf.cast(end, tf.int64))
+    return prensor.LeafNodeTensor(new_parent_index, indices_to_keep,
+                                  self.is_repeated)
+
+  def calculation_is_identity(self) -> bool:
+    return False
+
+  def calculation_equal(self, expr: expression.Expression) -> bool:
+    return (isinstance(expr, _SliceIndicesExpression) and
+            _index_value_equal(self._begin, expr.begin) and
+            _index_value_equal(self._end, expr.end))
+
+  def calculation_fingerprint(self) -> Hashable:
+    return (_SliceIndicesExpression, _index_value_fingerprint(self._begin),
+            _index_value_fingerprint(self._end))
@@ -142,57 +142,60 @@ class SliceExpressionTest(tf.test.TestCase):
         result.get_descendant_or_error(path.Path(["new_doc",
                                                   "bar"])).node.values, [b"d"])
 
-  def test_slice_mask(self):
+  def test_slice_indices(self):
     root = create_expression.create_expression_from_prensor(
         prensor_test_util.create_big_prensor())
-    root_2, new_path = slice_expression._get_slice_mask(root,
-                                                        path.Path(["doc"]),
-                                                        None, 1)
+    root_2, new_path = slice_expression._get_slice_indices(
+        root, path.Path(["doc"]), None, 1)
     result = calculate.calculate_prensors([root_2])[0]
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.parent_index, [0, 1, 1])
+        result.get_descendant_or_error(new_path).node.parent_index, [0, 1])
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.values,
-        [True, True, False])
+        result.get_descendant_or_error(new_path).node.values, [0, 1])
 
-  def test_slice_mask_end_negative(self):
+  def test_slice_indices_end_negative(self):
     root = create_expression.create_expression_from_prensor(
         prensor_test_util.create_big_prensor())
-    root_2, new_path = slice_expression._get_slice_mask(root,
-                                                        path.Path(["doc"]),
-                                                        None, -1)
+    root_2, new_path = slice_expression._get_slice_indices(
+        root, path.Path(["doc"]), None, -1)
     result = calculate.calculate_prensors([root_2])[0]
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.parent_index, [0, 1, 1])
+        result.get_descendant_or_error(new_path).node.parent_index, [1])
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.values,
-        [False, True, False])
+        result.get_descendant_or_error(new_path).node.values, [1])
 
-  def test_slice_mask_begin_positive(self):
+  def test_slice_indices_begin_positive(self):
     root = create_expression.create_expression_from_prensor(
         prensor_test_util.create_big_prensor())
-    root_2, new_path = slice_expression._get_slice_mask(root,
-                                                        path.Path(["doc"]), 1,
-                                                        None)
+    root_2, new_path = slice_expression._get_slice_indices(
+        root, path.Path(["doc"]), 1, None)
     [result] = calculate.calculate_prensors([root_2])
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.parent_index, [0, 1, 1])
+        result.get_descendant_or_error(new_path).node.parent_index, [1])
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.values,
-        [False, False, True])
+        result.get_descendant_or_error(new_path).node.values, [2])
 
-  def test_slice_mask_begin_negative(self):
+  def test_slice_indices_begin_negative(self):
     root = create_expression.create_expression_from_prensor(
         prensor_test_util.create_big_prensor())
-    root_2, new_path = slice_expression._get_slice_mask(root,
-                                                        path.Path(["doc"]), -1,
-                                                        None)
+    root_2, new_path = slice_expression._get_slice_indices(
+        root, path.Path(["doc"]), -1, None)
     result = calculate.calculate_prensors([root_2])[0]
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.parent_index, [0, 1, 1])
+        result.get_descendant_or_error(new_path).node.parent_index, [0, 1])
     self.assertAllEqual(
-        result.get_descendant_or_error(new_path).node.values,
-        [True, False, True])
+        result.get_descendant_or_error(new_path).node.values, [0, 2])
+
+  def test_slice_indices_tensor_begin_and_end(self):
+    root = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_big_prensor())
+    root_2, new_path = slice_expression._get_slice_indices(
+        root, path.Path(["doc"]), tf.constant(-2), tf.constant(1))
+    result = calculate.calculate_prensors([root_2])[0]
+    self.assertAllEqual(
+        result.get_descendant_or_error(new_path).node.parent_index, [0, 1])
+    self.assertAllEqual(
+        result.get_descendant_or_error(new_path).node.values, [0, 1])
 
   def test_slice_end_lenient_formatting(self):
     root = create_expression.create_expression_from_prensor(
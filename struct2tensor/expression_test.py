@@ -52,6 +52,17 @@ class ExpressionTest(absltest.TestCase):
     self.assertEqual(leaf_node.values.dtype, tf.string)
     self.assertEqual(new_field.known_field_names(), frozenset())
 
+  def test_promote_multiple_levels(self):
+    expr = create_expression.create_expression_from_prensor(
+        prensor_test_util.create_four_layer_prensor())
+    new_root = expr.promote("event.doc.nested_child.bar", "new_bar", levels=3)
+    new_bar = new_root.get_child_or_error("new_bar")
+    self.assertTrue(new_bar.is_repeated)
+    self.assertEqual(new_bar.type, tf.string)
+    self.assertTrue(new_bar.is_leaf)
+    leaf_node = expression_test_util.calculate_value_slowly(new_bar)
+    self.assertEqual(leaf_node.values.dtype, tf.string)
+
   def test_broadcast(self):
     """Tests broadcast.broadcast(...), and indirectly tests set_path."""
     expr = create_expression.create_expression_from_prensor(
@@ -0,0 +1,79 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+// An op that, given the parent indices [p_0,...,p_{N-1}] of a node and of N-1
+// of its ancestors, returns p_{N-1}[...p_1[p_0[i]]...] for each i.
+
+#include <vector>
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/op_kernel.h"
+#include "tensorflow/core/framework/tensor_types.h"
+#include "tensorflow/core/platform/types.h"
+
+namespace struct2tensor {
+
+namespace {
+
+using ::tensorflow::DEVICE_CPU;
+using ::tensorflow::OpInputList;
+using ::tensorflow::OpKernel;
+using ::tensorflow::OpKernelConstruction;
+using ::tensorflow::OpKernelContext;
+using ::tensorflow::Tensor;
+
+class ComposeParentIndicesOp : public OpKernel {
+ public:
+  explicit ComposeParentIndicesOp(OpKernelConstruction* context)
+      : OpKernel(context) {}
+
+  void Compute(OpKernelContext* context) override {
+    OpInputList parent_indices;
+    OP_REQUIRES_OK(context,
+                   context->input_list("parent_indices", &parent_indices));
+    std::vector<tensorflow::TTypes<tensorflow::int64>::ConstFlat> levels;
+    levels.reserve(parent_indices.size());
+    for (int level = 0; level < parent_indices.size(); ++level) {
+      levels.push_back(parent_indices[level].flat<tensorflow::int64>());
+    }
+
+    Tensor* output_tensor = nullptr;
+    OP_REQUIRES_OK(context,
+                   context->allocate_output(0, parent_indices[0].shape(),
+                                            &output_tensor));
+    auto output = output_tensor->flat<tensorflow::int64>();
+    const int64_t output_length = levels[0].size();
+    // Each element follows its chain of ancestors, so no intermediate parent
+    // index is materialized.
+    for (int64_t i = 0; i < output_length; ++i) {
+      int64_t index = levels[0](i);
+      for (int level = 1; level < levels.size(); ++level) {
+        OP_REQUIRES(
+            context, index >= 0 && index < levels[level].size(),
+            tensorflow::errors::InvalidArgument(
+                "parent_indices[", level - 1, "] has an index out of range: ",
+                index, " (parent_indices[", level, "] has size ",
+                levels[level].size(), ")"));
+        index = levels[level](index);
+      }
+      output(i) = index;
+    }
+  }
+};
+
+REGISTER_KERNEL_BUILDER(Name("ComposeParentIndices").Device(DEVICE_CPU),
+                        ComposeParentIndicesOp);
+
+}  // namespace
+}  // namespace struct2tensor
@@ -45,6 +45,7 @@ limitations under the License.
 #include "absl/types/span.h"
 #include "google/protobuf/compiler/parser.h"
 #include "google/protobuf/descriptor.h"
+#include "struct2tensor/kernels/descriptor_pool_registry.h"
 #include "struct2tensor/kernels/streaming_proto_reader.h"
 #include "struct2tensor/kernels/vector_to_tensor.h"
 #include "tensorflow/core/framework/op_kernel.h"
@@ -56,9 +57,7 @@ limitations under the License.
 namespace struct2tensor {
 namespace {
 using ::google::protobuf::Descriptor;
-using ::google::protobuf::DescriptorPool;
 using ::google::protobuf::FieldDescriptor;
-using ::google::protobuf::FileDescriptorSet;
 using ::tensorflow::DataType;
 using ::tensorflow::DEVICE_CPU;
 using ::tensorflow::OpKernel;
@@ -585,27 +584,14 @@ class DecodeProtoMapOp : public OpKernel {
     std::string descriptor_literal;
     OP_REQUIRES_OK(context,
                    context->GetAttr("descriptor_literal", &descriptor_literal));
-    FileDescriptorSet file_descriptor_set;
-    OP_REQUIRES(context,
-                file_descriptor_set.ParseFromString(descriptor_literal),
-                tensorflow::errors::InvalidArgument(
-                    "descriptor_literal is neither empty nor a "
-                    "serialized file_descriptor_set."));
-    auto descriptor_pool = absl::make_unique<DescriptorPool>();
-    for (const auto& file : file_descriptor_set.file()) {
-      OP_REQUIRES(
-          context, descriptor_pool->BuildFile(file),
-          tensorflow::errors::InvalidArgument("could not create DescriptorPool "
-                                              "from descriptor_literal."));
-      // Note, the order of the files matters: early files cannot depend on
-      // later files.
-    }
+    OP_REQUIRES_OK(context, GetOrCreateSharedDescriptorPool(descriptor_literal,
+                                                            &shared_pool_));
 
     std::string message_type;
     OP_REQUIRES_OK(context, context->GetAttr("message_type", &message_type));
 
     const Descriptor* message_desc =
-        descriptor_pool->FindMessageTypeByName(message_type);
+        shared_pool_->pool()->FindMessageTypeByName(message_type);
     OP_REQUIRES(context, message_desc != nullptr,
                 errors::InvalidArgument("No descriptor found for message type ",
                                         message_type));
@@ -687,6 +673,8 @@ class DecodeProtoMapOp : public OpKernel {
             produce_string_view, context));
   }
 
+  // Shared with the other kernels built from the same descriptor_literal.
+  std::shared_ptr<SharedDescriptorPool> shared_pool_;
   std::unique_ptr<const MapEntryCollector> map_entry_collector_;
 };
 
@@ -28,12 +28,14 @@ limitations under the License.
 // runtime but should be competitive in speed with approaches that
 // compile in the proto definitions.
 
+#include <algorithm>
 #include <atomic>
 #include <memory>
 #include <string>
 #include <utility>
 #include <vector>
 
+#include "absl/container/flat_hash_map.h"
 #include "absl/memory/memory.h"
 #include "google/protobuf/compiler/parser.h"
 #include "google/protobuf/descriptor.h"
@@ -43,23 +45,27 @@ limitations under the License.
 #include "google/protobuf/message.h"
 #include "google/protobuf/text_format.h"
 #include "google/protobuf/wire_format.h"
+#include "struct2tensor/kernels/descriptor_pool_registry.h"
 #include "struct2tensor/kernels/vector_to_tensor.h"
+#include "tensorflow/core/framework/dataset.h"
 #include "tensorflow/core/framework/op_kernel.h"
 #include "tensorflow/core/framework/tensor_types.h"
 #include "tensorflow/core/framework/tensor_util.h"
 #include "tensorflow/core/lib/core/errors.h"
+#include "tensorflow/core/lib/io/record_reader.h"
+#include "tensorflow/core/platform/env.h"
 #include "tensorflow/core/platform/logging.h"
+#include "tensorflow/core/platform/mutex.h"
 #include "tensorflow/core/platform/tstring.h"
 #include "tensorflow/core/platform/types.h"
+#include "tensorflow/core/util/work_sharder.h"
 
 namespace struct2tensor {
 namespace {
 using ::absl::string_view;
 using ::google::protobuf::Descriptor;
 using ::google::protobuf::DescriptorPool;
-using ::google::protobuf::DynamicMessageFactory;
 using ::google::protobuf::FieldDescriptor;
-using ::google::protobuf::FileDescriptorSet;
 using ::google::protobuf::Message;
 using ::google::protobuf::TextFormat;
 using ::google::protobuf::internal::WireFormatLite;
@@ -78,13 +84,45 @@ using ::tensorflow::tstring;
 using ::tensorflow::errors::DataLoss;
 using ::tensorflow::errors::InvalidArgument;
 constexpr bool kFailOnDecodeError = true;
+// The minimum number of messages decoded by a shard when the messages of a
+// run of DecodeProtoSparseOp are decoded in parallel. Below that, the cost of
+// scheduling the shards and merging their results is not worth it.
+constexpr int kMinMessagesPerShard = 256;
+// Requested fields with a number below this are looked up in a dense table
+// indexed by field number, others (e.g. extensions) in a hash map.
+constexpr int kMaxDenseFieldNumber = 4096;
+
+// Allocates the output tensors of the field builders by output index, so that
+// the same builders can produce the outputs of an op kernel or the components
+// of a dataset element.
+class OutputAllocator {
+ public:
+  virtual ~OutputAllocator() = default;
+  virtual Status Allocate(int output_index, const TensorShape& shape,
+                          Tensor** result) = 0;
+};
+
+// Allocates the outputs of an op kernel.
+class KernelOutputAllocator : public OutputAllocator {
+ public:
+  explicit KernelOutputAllocator(OpKernelContext* context)
+      : context_(context) {}
+
+  Status Allocate(int output_index, const TensorShape& shape,
+                  Tensor** result) override {
+    return context_->allocate_output(output_index, shape, result);
+  }
+
+ private:
+  OpKernelContext* const context_;
+};
 
 // Creates the output tensor of index `output_index` and populates it with
 // contents in `vec`.
 // If T is int64_t, it will create a tensor of type tensorflow::int64.
 // If T is uint64_t, it will create a tensor of type tensorflow::uint64.
 template <typename T>
-::tensorflow::Status ToOutputTensor(OpKernelContext* context,
+::tensorflow::Status ToOutputTensor(OutputAllocator* outputs,
                                     const int output_index,
                                     const vector<T>& vec,
                                     bool produce_string_view) {
@@ -94,8 +132,7 @@ template <typename T>
       TensorShapeUtils::MakeShape(&tensor_size, 1, &output_shape));
 
   Tensor* result = nullptr;
-  TF_RETURN_IF_ERROR(
-      context->allocate_output(output_index, output_shape, &result));
+  TF_RETURN_IF_ERROR(outputs->Allocate(output_index, output_shape, &result));
 
   if (tensor_size > 0) {
     VectorToTensor(vec, result, produce_string_view);
@@ -250,17 +287,48 @@ class FieldBuilder {
                                      int64_t message_index) = 0;
   // Produces the tensor at the end.
   // Clears the internal state.
-  // context is the context of the kernel where we are creating the output.
-  virtual tensorflow::Status Produce(OpKernelContext* context,
+  // outputs allocates the output tensors (e.g. those of the kernel).
+  virtual tensorflow::Status Produce(OutputAllocator* outputs,
                                      bool produce_string_view,
                                      int64_t num_messages) = 0;
 
+  // Discards all the values collected for messages whose index is
+  // >= `message_index`. Those values must be the last ones collected.
+  virtual void DiscardValuesFrom(int64_t message_index) = 0;
+
+  // Collects the values collected by `shards`, in order. Each shard is a
+  // builder of the same field that consumed its own range of messages
+  // (indexed from 0). The messages of shard i are `shard_num_messages[i]`
+  // messages that follow the messages of the previous shards.
+  // This builder must not have collected any value yet.
+  virtual void MergeShards(const vector<FieldBuilder*>& shards,
+                           const vector<int64_t>& shard_num_messages) = 0;
+
   int wire_number() const { return wire_number_; }
 
   // Returns the number of values collected so far.
   size_t num_values() const { return parent_indices_.size(); }
 
  protected:
+  // Collects the parent indices of `shards` (see MergeShards()), shifted by
+  // the number of messages of the previous shards.
+  void MergeParentIndices(const vector<FieldBuilder*>& shards,
+                          const vector<int64_t>& shard_num_messages) {
+    DCHECK(parent_indices_.empty());
+    size_t total_num_values = 0;
+    for (const FieldBuilder* shard : shards) {
+      total_num_values += shard->parent_indices_.size();
+    }
+    parent_indices_.reserve(total_num_values);
+    int64_t message_offset = 0;
+    for (int i = 0; i < shards.size(); ++i) {
+      for (const int64_t parent_index : shards[i]->parent_indices_) {
+        parent_indices_.push_back(parent_index + message_offset);
+      }
+      message_offset += shard_num_messages[i];
+    }
+  }
+
   // The output index of the parent index tensor (in terms of allocate_output).
   const int output_index_parent_index_;
   // The output index of the value tensor (in terms of allocate_output).
@@ -327,19 +395,47 @@ class FieldBuilderImpl : public FieldBuilder {
                                : CollectValue(input, message_index);
   }
 
-  tensorflow::Status Produce(OpKernelContext* context, bool produce_string_view,
+  tensorflow::Status Produce(OutputAllocator* outputs, bool produce_string_view,
                              int64_t num_messages) override {
     MaybePadDefaultValue(num_messages);
     produce_string_view &=
         (DataType == WireFormatLite::FieldType::TYPE_MESSAGE ||
          DataType == WireFormatLite::FieldType::TYPE_GROUP);
-    TF_RETURN_IF_ERROR(ToOutputTensor(context, output_index_value_, values_,
+    TF_RETURN_IF_ERROR(ToOutputTensor(outputs, output_index_value_, values_,
                                       produce_string_view));
-    TF_RETURN_IF_ERROR(ToOutputTensor(context, output_index_parent_index_,
+    TF_RETURN_IF_ERROR(ToOutputTensor(outputs, output_index_parent_index_,
                                       parent_indices_, produce_string_view));
     return absl::OkStatus();
   }
 
+  void DiscardValuesFrom(int64_t message_index) override {
+    while (!parent_indices_.empty() &&
+           parent_indices_.back() >= message_index) {
+      parent_indices_.pop_back();
+      values_.pop_back();
+    }
+  }
+
+  void MergeShards(const vector<FieldBuilder*>& shards,
+                   const vector<int64_t>& shard_num_messages) override {
+    DCHECK(values_.empty());
+    size_t total_num_values = 0;
+    for (int i = 0; i < shards.size(); ++i) {
+      auto* shard = static_cast<FieldBuilderImpl<T, DataType>*>(shards[i]);
+      // Default values of the messages at the end of the shard are not
+      // padded yet.
+      shard->MaybePadDefaultValue(shard_num_messages[i]);
+      total_num_values += shard->values_.size();
+    }
+    MergeParentIndices(shards, shard_num_messages);
+    values_.reserve(total_num_values);
+    for (FieldBuilder* shard : shards) {
+      const vector<T>& shard_values =
+          static_cast<FieldBuilderImpl<T, DataType>*>(shard)->values_;
+      values_.insert(values_.end(), shard_values.begin(), shard_values.end());
+    }
+  }
+
   void MaybePadDefaultValue(int64_t current_message_index) {
     if (!default_value_) return;
     // Default padding is only supported for optional leaf fields.
@@ -396,6 +492,175 @@ class FieldBuilderImpl : public FieldBuilder {
   absl::optional<T> default_value_;
 };
 
+// Traverses a serialized (sub)message, dispatching values to the
+// field_builders, until the end of the input (or of its current limit) or an
+// END_GROUP tag is reached. `index` is the index of the message among all the
+// messages decoded for its node. field_builders must be sorted by increasing
+// wire_number. The last tag read (0 or an END_GROUP tag) is stored in
+// `last_tag`.
+Status ConsumeSubtreeMessage(
+    CodedInputStream* input, int64_t index,
+    const vector<std::unique_ptr<FieldBuilder>>& field_builders,
+    uint32_t* last_tag) {
+  uint32_t tag;
+  for (tag = input->ReadTag();
+       tag != 0 && WireFormatLite::GetTagWireType(tag) !=
+                       WireFormatLite::WIRETYPE_END_GROUP;
+       tag = input->ReadTag()) {
+    const int field_number = WireFormatLite::GetTagFieldNumber(tag);
+    auto iter = std::lower_bound(
+        field_builders.begin(), field_builders.end(), field_number,
+        [](const std::unique_ptr<FieldBuilder>& field_builder, int number) {
+          return field_builder->wire_number() < number;
+        });
+    if (iter == field_builders.end() ||
+        (*iter)->wire_number() != field_number) {
+      // Unknown and unrequested fields are skipped.
+      if (!WireFormatLite::SkipField(input, tag)) {
+        return DataLoss("Failed skipping unrequested field");
+      }
+      continue;
+    }
+    TF_RETURN_IF_ERROR(
+        (*iter)->Consume(input, WireFormatLite::GetTagWireType(tag), index));
+  }
+  *last_tag = tag;
+  return absl::OkStatus();
+}
+
+// Implementation of FieldBuilder for a submessage (or group) field whose
+// requested descendants are decoded in the same pass as the field itself.
+// Only the parent indices of the submessages are collected: the serialized
+// submessages are never materialized. The values of the descendants are
+// collected by `children_`, whose parent indices refer to the position of the
+// submessage in this builder.
+class SubmessageFieldBuilder : public FieldBuilder {
+ public:
+  SubmessageFieldBuilder(const int wire_number,
+                         const int output_index_parent_index,
+                         const bool is_repeated, const bool is_group,
+                         vector<std::unique_ptr<FieldBuilder>> children,
+                         const size_t hint_max_num_values)
+      : FieldBuilder(wire_number, output_index_parent_index,
+                     /*output_index_value=*/-1, is_repeated,
+                     hint_max_num_values),
+        is_group_(is_group),
+        children_(std::move(children)) {}
+
+  ~SubmessageFieldBuilder() override = default;
+
+  tensorflow::Status Consume(CodedInputStream* input,
+                             WireFormatLite::WireType wire_type,
+                             int64_t message_index) override {
+    const WireFormatLite::WireType schema_wire_type =
+        is_group_ ? WireFormatLite::WIRETYPE_START_GROUP
+                  : WireFormatLite::WIRETYPE_LENGTH_DELIMITED;
+    if (wire_type != schema_wire_type) {
+      if (WireFormatLite::SkipField(
+              input, WireFormatLite::MakeTag(wire_number_, wire_type))) {
+        return absl::OkStatus();
+      }
+      return DataLoss("Failed skipping malformed field");
+    }
+
+    int64_t submessage_index;
+    if (is_repeated_ || parent_indices_.empty() ||
+        parent_indices_.back() != message_index) {
+      submessage_index = parent_indices_.size();
+      parent_indices_.push_back(message_index);
+    } else {
+      // A non-repeated submessage that appears multiple times on the wire:
+      // like FieldBuilderImpl, only the last one is kept.
+      submessage_index = parent_indices_.size() - 1;
+      for (const auto& child : children_) {
+        child->DiscardValuesFrom(submessage_index);
+      }
+    }
+
+    if (children_.empty()) {
+      // Only the presence of the submessage is needed.
+      if (!WireFormatLite::SkipField(
+              input, WireFormatLite::MakeTag(wire_number_, wire_type))) {
+        return DataLoss("Failed skipping submessage");
+      }
+      return absl::OkStatus();
+    }
+
+    uint32_t last_tag = 0;
+    if (is_group_) {
+      TF_RETURN_IF_ERROR(
+          ConsumeSubtreeMessage(input, submessage_index, children_, &last_tag));
+      if (last_tag != WireFormatLite::MakeTag(
+                          wire_number_, WireFormatLite::WIRETYPE_END_GROUP)) {
+        return DataLoss("Failed to parse group: missing END_GROUP tag");
+      }
+      return absl::OkStatus();
+    }
+
+    int length;
+    if (!input->ReadVarintSizeAsInt(&length)) {
+      return DataLoss("Failed reading length for submessage.");
+    }
+    const CodedInputStream::Limit limit = input->PushLimit(length);
+    TF_RETURN_IF_ERROR(
+        ConsumeSubtreeMessage(input, submessage_index, children_, &last_tag));
+    if (last_tag != 0 || input->BytesUntilLimit() != 0) {
+      return DataLoss("Failed to consume entire submessage");
+    }
+    input->PopLimit(limit);
+    return absl::OkStatus();
+  }
+
+  tensorflow::Status Produce(OutputAllocator* outputs, bool produce_string_view,
+                             int64_t num_messages) override {
+    TF_RETURN_IF_ERROR(ToOutputTensor(outputs, output_index_parent_index_,
+                                      parent_indices_, produce_string_view));
+    for (const auto& child : children_) {
+      TF_RETURN_IF_ERROR(
+          child->Produce(outputs, produce_string_view, parent_indices_.size()));
+    }
+    return absl::OkStatus();
+  }
+
+  void DiscardValuesFrom(int64_t message_index) override {
+    size_t new_size = parent_indices_.size();
+    while (new_size > 0 && parent_indices_[new_size - 1] >= message_index) {
+      --new_size;
+    }
+    for (const auto& child : children_) {
+      child->DiscardValuesFrom(new_size);
+    }
+    parent_indices_.resize(new_size);
+  }
+
+  void MergeShards(const vector<FieldBuilder*>& shards,
+                   const vector<int64_t>& shard_num_messages) override {
+    // The messages of the children are the submessages of the shards.
+    vector<int64_t> shard_num_submessages;
+    shard_num_submessages.reserve(shards.size());
+    for (const FieldBuilder* shard : shards) {
+      shard_num_submessages.push_back(shard->num_values());
+    }
+    MergeParentIndices(shards, shard_num_messages);
+    for (int c = 0; c < children_.size(); ++c) {
+      vector<FieldBuilder*> child_shards;
+      child_shards.reserve(shards.size());
+      for (FieldBuilder* shard : shards) {
+        child_shards.push_back(
+            static_cast<SubmessageFieldBuilder*>(shard)->children_[c].get());
+      }
+      children_[c]->MergeShards(child_shards, shard_num_submessages);
+    }
+  }
+
+ private:
+  // True if the field is a group (as opposed to a length-delimited message).
+  const bool is_group_;
+  // Builders of the requested fields of the submessage, ordered by wire
+  // number.
+  const vector<std::unique_ptr<FieldBuilder>> children_;
+};
+
 // Abstract class for creating FieldBuilder objects.
 class FieldBuilderFactory {
  public:
@@ -403,7 +668,10 @@ class FieldBuilderFactory {
       : max_num_values_(0), wire_number_(wire_number) {}
   virtual ~FieldBuilderFactory() = default;
   // Creates a builder, local to a single run of the op.
-  virtual std::unique_ptr<FieldBuilder> Create() = 0;
+  std::unique_ptr<FieldBuilder> Create() { return Create(max_num_values()); }
+  // Creates a builder that expects to collect about `hint_max_num_values`
+  // values (e.g. for a shard of the messages of a run of the op).
+  virtual std::unique_ptr<FieldBuilder> Create(size_t hint_max_num_values) = 0;
 
   int wire_number() const { return wire_number_; }
 
@@ -469,10 +737,10 @@ class FieldBuilderFactoryImpl : public FieldBuilderFactory {
         }()) {}
   ~FieldBuilderFactoryImpl() override {}
 
-  std::unique_ptr<FieldBuilder> Create() override {
+  std::unique_ptr<FieldBuilder> Create(size_t hint_max_num_values) override {
     return absl::make_unique<FieldBuilderImpl<T, kDataType>>(
         wire_number(), output_index_parent_index_, output_index_value_,
-        is_repeated_, default_value_, max_num_values());
+        is_repeated_, default_value_, hint_max_num_values);
   }
 
  protected:
@@ -676,6 +944,48 @@ std::unique_ptr<FieldBuilderFactory> CreateFieldBuilderFactory(
   }
 }
 
+// Creates SubmessageFieldBuilders. Owns the factories of the requested fields
+// of the submessage.
+class SubmessageFieldBuilderFactory : public FieldBuilderFactory {
+ public:
+  SubmessageFieldBuilderFactory(
+      const FieldDescriptor* field_desc, int output_index_parent_index,
+      vector<std::unique_ptr<FieldBuilderFactory>> children)
+      : FieldBuilderFactory(field_desc->number()),
+        output_index_parent_index_(output_index_parent_index),
+        is_repeated_(field_desc->is_repeated()),
+        is_group_(field_desc->type() == FieldDescriptor::TYPE_GROUP),
+        children_(std::move(children)) {
+    std::sort(children_.begin(), children_.end(),
+              [](const std::unique_ptr<FieldBuilderFactory>& a,
+                 const std::unique_ptr<FieldBuilderFactory>& b) {
+                return a->wire_number() < b->wire_number();
+              });
+  }
+  ~SubmessageFieldBuilderFactory() override {}
+
+  std::unique_ptr<FieldBuilder> Create(size_t hint_max_num_values) override {
+    vector<std::unique_ptr<FieldBuilder>> children;
+    children.reserve(children_.size());
+    for (const auto& child : children_) {
+      children.push_back(child->Create());
+    }
+    return absl::make_unique<SubmessageFieldBuilder>(
+        wire_number(), output_index_parent_index_, is_repeated_, is_group_,
+        std::move(children), hint_max_num_values);
+  }
+
+ private:
+  // The output index of the parent index tensor (in terms of allocate_output).
+  const int output_index_parent_index_;
+  // Whether or not the field is repeated.
+  const bool is_repeated_;
+  // Whether or not the field is a group.
+  const bool is_group_;
+  // Ordered by wire number.
+  vector<std::unique_ptr<FieldBuilderFactory>> children_;
+};
+
 // Returns a FieldDescriptor for a step, whether it is a normal field
 // or an extension. If the field is not well-formed, returns nullptr.
 const FieldDescriptor* FindFieldByName(const DescriptorPool* pool,
@@ -714,32 +1024,14 @@ class DecodeProtoSparseOp : public OpKernel {
     int num_fields_attr;
     OP_REQUIRES_OK(context, context->GetAttr("num_fields", &num_fields_attr));
 
-    OP_REQUIRES(
-        context, !descriptor_literal.empty(),
-        InvalidArgument(
-            "descriptor_literal must be a serialized file_descriptor_set."));
-    FileDescriptorSet file_descriptor_set;
-    OP_REQUIRES(context,
-                file_descriptor_set.ParseFromString(descriptor_literal),
-                tensorflow::errors::InvalidArgument(
-                    "descriptor_literal is neither empty nor a "
-                    "serialized file_descriptor_set."));
-    file_descriptor_set.ParseFromString(descriptor_literal);
-    desc_pool_ = absl::make_unique<DescriptorPool>();
-    for (const auto& file : file_descriptor_set.file()) {
-      // Note, the order of the files matters: early files cannot depend on
-      // later files.
-      OP_REQUIRES(
-          context, desc_pool_->BuildFile(file),
-          tensorflow::errors::InvalidArgument("could not create DescriptorPool "
-                                              "from descriptor_literal."));
-    }
+    OP_REQUIRES_OK(context, GetOrCreateSharedDescriptorPool(descriptor_literal,
+                                                            &shared_pool_));
 
     std::string message_type;
     OP_REQUIRES_OK(context, context->GetAttr("message_type", &message_type));
 
     const Descriptor* message_desc =
-        desc_pool_->FindMessageTypeByName(message_type);
+        shared_pool_->pool()->FindMessageTypeByName(message_type);
     OP_REQUIRES(
         context, message_desc != nullptr,
         InvalidArgument("No descriptor found for message type ", message_type));
@@ -769,7 +1061,7 @@ class DecodeProtoSparseOp : public OpKernel {
     const int field_count = field_names.size();
     int field_index = 0;
     for (const std::string& name : field_names) {
-      const auto* fd = FindFieldByName(desc_pool_.get(), message_desc, name);
+      const auto* fd = FindFieldByName(shared_pool_->pool(), message_desc, name);
       if (IsMessageSetWireFormatExtension(*fd)) {
         has_message_set_wire_format_extension_ = true;
       }
@@ -798,8 +1090,9 @@ class DecodeProtoSparseOp : public OpKernel {
                  const std::unique_ptr<FieldBuilderFactory>& b) {
                 return a->wire_number() < b->wire_number();
               });
+    BuildFieldIndexTables();
 
-    message_prototype_ = message_factory_.GetPrototype(message_desc);
+    message_prototype_ = shared_pool_->GetPrototype(message_desc);
     OP_REQUIRES(context, message_prototype_ != nullptr,
                 InvalidArgument("Couldn't get prototype message: ",
                                 message_desc->full_name()));
@@ -877,12 +1170,19 @@ class DecodeProtoSparseOp : public OpKernel {
     }
 
     // Let builders collect the field values.
-    ConsumeProtos(ctx, bufs, builders);
+    const int num_shards = GetNumShards(ctx, bufs.size());
+    if (num_shards > 1) {
+      OP_REQUIRES_OK(ctx, ConsumeProtosInParallel(ctx, bufs, num_shards,
+                                                  builders));
+    } else {
+      OP_REQUIRES_OK(ctx, ConsumeProtos(bufs, 0, bufs.size(), builders));
+    }
     // This is the wire number order. I am counting on the fact that it does
     // not matter the order in which you optimize fields.
+    KernelOutputAllocator outputs(ctx);
     for (const auto& builder : builders) {
-      OP_REQUIRES_OK(ctx,
-                     builder->Produce(ctx, produce_string_view, bufs.size()));
+      OP_REQUIRES_OK(
+          ctx, builder->Produce(&outputs, produce_string_view, bufs.size()));
     }
 
     // Collect maximum number of collected values from each field builder.
@@ -915,11 +1215,21 @@ class DecodeProtoSparseOp : public OpKernel {
                 DataLoss("Unable to reserialize text proto as binary"));
   }
 
-  // Parse fields from a serialized message into vectors.
-  void ConsumeProtos(
-      OpKernelContext* ctx, const vector<const tstring*>& bufs,
+  // Returns the number of shards to decode `num_messages` messages with.
+  int GetNumShards(OpKernelContext* ctx, int num_messages) {
+    const int max_num_shards = num_messages / kMinMessagesPerShard;
+    if (max_num_shards <= 1) return 1;
+    const int num_threads =
+        ctx->device()->tensorflow_cpu_worker_threads()->num_threads;
+    return std::min(max_num_shards, num_threads);
+  }
+
+  // Parse fields from the serialized messages in [begin, end) of bufs into
+  // vectors. The index of bufs[begin] in the field_builders is 0.
+  Status ConsumeProtos(
+      const vector<const tstring*>& bufs, int begin, int end,
       const vector<std::unique_ptr<FieldBuilder>>& field_builders) {
-    for (int message_index = 0; message_index < bufs.size(); ++message_index) {
+    for (int message_index = begin; message_index < end; ++message_index) {
       const tstring& buf = *bufs[message_index];
       // When collecting field values, we don't want to copy values of string
       // types (string fields, sub messages, etc). Instead we want to collect
@@ -929,10 +1239,12 @@ class DecodeProtoSparseOp : public OpKernel {
       CodedInputStream input(reinterpret_cast<const uint8_t*>(buf.c_str()),
                              buf.size());
 
-      OP_REQUIRES(ctx, input.IsFlat(),
-                  DataLoss("Failed to construct a flat CodedInputStream"));
+      if (!input.IsFlat()) {
+        return DataLoss("Failed to construct a flat CodedInputStream");
+      }
 
-      Status st = ConsumeOneProto(&input, message_index, field_builders);
+      Status st =
+          ConsumeOneProto(&input, message_index - begin, field_builders);
 
       if (st.ok() && !input.ConsumedEntireMessage()) {
         st = DataLoss("Failed to consume entire buffer");
@@ -942,7 +1254,7 @@ class DecodeProtoSparseOp : public OpKernel {
           LOG(ERROR) << "Error consuming " << message_type_
                      << ". Error: " << st;
         }
-        OP_REQUIRES_OK(ctx, st);  // NOLINT
+        TF_RETURN_IF_ERROR(st);
       }
       if (!st.ok()) {
         // This code suppresses the corrupt proto, treating it as empty
@@ -951,23 +1263,99 @@ class DecodeProtoSparseOp : public OpKernel {
                      << message_type_ << ": " << st;
       }
     }
+    return absl::OkStatus();
   }
 
-  // Look up the FieldBuilder for a particular field number.
-  bool LookupFieldBuilder(
-      int field_number, int* field_index,
+  // Same as ConsumeProtos(bufs, 0, bufs.size(), field_builders), but splits
+  // the messages into `num_shards` contiguous ranges decoded in parallel on
+  // the intra-op thread pool. Each shard collects values in its own builders,
+  // which are then merged in order into field_builders, so the result does
+  // not depend on the number of shards.
+  Status ConsumeProtosInParallel(
+      OpKernelContext* ctx, const vector<const tstring*>& bufs,
+      const int num_shards,
       const vector<std::unique_ptr<FieldBuilder>>& field_builders) {
-    // Look up the FieldDescriptor using linear search.
-    // TODO(nix): this could be sped up with binary search, but we are
-    // already way off the fastpath at this point. If you see a hotspot
-    // here, somebody is sending you very inefficient protos.
-    for (int fi = field_builders.size() - 1; fi >= 0; fi--) {
-      if (field_number == field_builders[fi]->wire_number()) {
-        *field_index = fi;
-        return true;
+    const int num_messages = bufs.size();
+    // shard_begins[i] is the index of the first message of shard i.
+    vector<int> shard_begins(num_shards + 1);
+    vector<int64_t> shard_num_messages(num_shards);
+    for (int i = 0; i <= num_shards; ++i) {
+      shard_begins[i] = static_cast<int64_t>(num_messages) * i / num_shards;
+    }
+    for (int i = 0; i < num_shards; ++i) {
+      shard_num_messages[i] = shard_begins[i + 1] - shard_begins[i];
+    }
+
+    vector<vector<std::unique_ptr<FieldBuilder>>> shard_builders(num_shards);
+    for (auto& builders : shard_builders) {
+      builders.reserve(field_builder_factories_.size());
+      for (const auto& factory : field_builder_factories_) {
+        builders.push_back(
+            factory->Create(factory->max_num_values() / num_shards));
+      }
+    }
+
+    vector<Status> shard_statuses(num_shards);
+    auto work = [&](int64_t start, int64_t limit) {
+      for (int64_t i = start; i < limit; ++i) {
+        shard_statuses[i] = ConsumeProtos(bufs, shard_begins[i],
+                                          shard_begins[i + 1],
+                                          shard_builders[i]);
       }
+    };
+    const auto* worker_threads = ctx->device()->tensorflow_cpu_worker_threads();
+    // Each shard is already large enough to be worth its own task.
+    ::tensorflow::Shard(num_shards, worker_threads->workers, num_shards,
+                        /*cost_per_unit=*/1 << 30, work);
+    // Report the error of the first failing message, as the serial path does.
+    for (const Status& status : shard_statuses) {
+      TF_RETURN_IF_ERROR(status);
     }
-    return false;
+
+    for (int f = 0; f < field_builders.size(); ++f) {
+      vector<FieldBuilder*> shards;
+      shards.reserve(num_shards);
+      for (const auto& builders : shard_builders) {
+        shards.push_back(builders[f].get());
+      }
+      field_builders[f]->MergeShards(shards, shard_num_messages);
+    }
+    return absl::OkStatus();
+  }
+
+  // Populates dense_field_indices_ and sparse_field_indices_ from
+  // field_builder_factories_.
+  void BuildFieldIndexTables() {
+    int max_dense_field_number = -1;
+    for (const auto& factory : field_builder_factories_) {
+      if (factory->wire_number() < kMaxDenseFieldNumber) {
+        max_dense_field_number =
+            std::max(max_dense_field_number, factory->wire_number());
+      }
+    }
+    dense_field_indices_.assign(max_dense_field_number + 1, -1);
+    for (int fi = 0; fi < field_builder_factories_.size(); ++fi) {
+      const int field_number = field_builder_factories_[fi]->wire_number();
+      if (field_number <= max_dense_field_number) {
+        dense_field_indices_[field_number] = fi;
+      } else {
+        sparse_field_indices_[field_number] = fi;
+      }
+    }
+  }
+
+  // Look up the FieldBuilder for a particular field number. The builders
+  // are in the same order as field_builder_factories_.
+  bool LookupFieldBuilder(int field_number, int* field_index) const {
+    if (field_number >= 0 &&
+        field_number < static_cast<int>(dense_field_indices_.size())) {
+      *field_index = dense_field_indices_[field_number];
+      return *field_index >= 0;
+    }
+    const auto iter = sparse_field_indices_.find(field_number);
+    if (iter == sparse_field_indices_.end()) return false;
+    *field_index = iter->second;
+    return true;
   }
 
   // Handles proto1 MessageSet wire format. `input` is expected to be at a
@@ -1024,15 +1412,10 @@ class DecodeProtoSparseOp : public OpKernel {
           // the sub-message is empty because it contains the length.
           if (message_data.empty() || type_id == 0) return false;
 
-          if (LookupFieldBuilder(type_id, &field_index, field_builders)) {
+          if (LookupFieldBuilder(type_id, &field_index)) {
             CodedInputStream sub_input(
                 reinterpret_cast<const uint8_t*>(message_data.data()),
                 message_data.size());
-            // We could do the optimization similar to that in
-            // ConsumeOneProto() to look up the FieldBuilder. But it's
-            // probably not worth it as there are usually not many
-            // FieldBuilders (each would be for a requested message
-            // extension).
             if (!field_builders[field_index]
                      ->Consume(&sub_input,
                                WireFormatLite::GetTagWireType(
@@ -1053,35 +1436,17 @@ class DecodeProtoSparseOp : public OpKernel {
 
   // Traverses a serialized protobuf, dispatching values to the
   // field_builders. input contains the protobuf. index is the index of the
-  // message. field_builders contains the builders.
-  // field_builders must be sorted by increasing wire_number.
+  // message. field_builders contains the builders, in the order of
+  // field_builder_factories_ (by increasing wire_number).
   Status ConsumeOneProto(
       CodedInputStream* input, int index,
       const vector<std::unique_ptr<FieldBuilder>>& field_builders) {
-    // At the beginning of each loop, the last field number that was seen,
-    // regardless of whether it was parsed or not, or -1 if no field has
-    // been seen before.
-    int last_seen_field_number = -1;
-    // The field builder that is expected to be used next.
-    // It was either used to parse the last seen field number, or if the
-    // last seen field number was not in field_builders, it is the next
-    // field builder after the last seen field number.
-    // At the beginning it is the first field_builder.
-    auto expected_field_builder_iter = field_builders.begin();
-
     // The 'tag' variable should always be treated as tainted.
     uint32_t tag;
     for (tag = input->ReadTag();
          tag != 0 && WireFormatLite::GetTagWireType(tag) !=
                          WireFormatLite::WIRETYPE_END_GROUP;
          tag = input->ReadTag()) {
-      DCHECK(expected_field_builder_iter == field_builders.begin() ||
-             last_seen_field_number >
-                 (*(expected_field_builder_iter - 1))->wire_number());
-      DCHECK(expected_field_builder_iter == field_builders.end() ||
-             last_seen_field_number <=
-                 (*expected_field_builder_iter)->wire_number());
-
       // Special handling for proto1 MessageSet wire format.
       // (proto2 MessageSet bridge is also serialized into this wire format
       // by default).
@@ -1095,55 +1460,10 @@ class DecodeProtoSparseOp : public OpKernel {
 
       // The field wire number.
       const int field_number = WireFormatLite::GetTagFieldNumber(tag);
-      // The field associated with the field wire number.
-      FieldBuilder* field_builder = nullptr;
-
-      // field_builders are ordered by their field numbers. If the field numbers
-      // on wire are also ordered (which is a convention), then we can
-      // monotonically increment `expected_field_builder_iter` as the field
-      // numbers on wire get larger. If we detect any out-of-order
-      // field number, we reset `expected_field_builder_iter`, and expect that
-      // future wire numbers are ordered. This algorithm is quadratic in the
-      // worst case where field numbers on wire are in descending order, however
-      // it works well in the case where two serialized protobufs are
-      // concatenated together.
-      if (field_number < last_seen_field_number) {
-        expected_field_builder_iter = field_builders.begin();
-      }
-
-      // Advance expected_field_builder_iter until
-      // field_number <= expected_field_number.
-      for (; expected_field_builder_iter != field_builders.end();
-           ++expected_field_builder_iter) {
-        DCHECK(expected_field_builder_iter == field_builders.begin() ||
-               field_number >
-                   (*(expected_field_builder_iter - 1))->wire_number());
-        FieldBuilder* expected_field_builder =
-            expected_field_builder_iter->get();
-        if (field_number <= expected_field_builder->wire_number()) {
-          if (field_number == expected_field_builder->wire_number()) {
-            field_builder = expected_field_builder;
-          }
-          break;
-        }
-      }
-
-      last_seen_field_number = field_number;
-
-      if (!field_builder) {
-        // This DCHECK verifies that if we skip a field, we didn't want it.
-        // In particular, field_builders is empty or the field_number is either:
-        // before field_builders.begin().wire_number() or
-        // after (field_builders.end() - 1).wire_number() or
-        // in-between expected_field_builder_iter and
-        // expected_field_builder_iter - 1.
-        DCHECK(field_builders.empty() ||
-               (field_number < (*field_builders.begin())->wire_number()) ||
-               (field_number > (*(field_builders.end() - 1))->wire_number()) ||
-               (((*(expected_field_builder_iter - 1))->wire_number() <
-                 field_number) &&
-                (field_number <
-                 (*(expected_field_builder_iter))->wire_number())));
+      // The index of the field builder associated with the field wire number.
+      // Whatever the order of the fields on the wire, this is a table lookup.
+      int field_index;
+      if (!LookupFieldBuilder(field_number, &field_index)) {
         // Unknown and unrequested field_builders are skipped.
         if (!WireFormatLite::SkipField(input, tag)) {
           return DataLoss("Failed skipping unrequested field");
@@ -1151,6 +1471,7 @@ class DecodeProtoSparseOp : public OpKernel {
         continue;
       }
 
+      FieldBuilder* field_builder = field_builders[field_index].get();
       DCHECK(field_number == field_builder->wire_number());
       TF_RETURN_IF_ERROR(field_builder->Consume(
           input, WireFormatLite::GetTagWireType(tag), index));
@@ -1172,9 +1493,15 @@ class DecodeProtoSparseOp : public OpKernel {
   // Fields are ordered by wire number.
   vector<std::unique_ptr<FieldBuilderFactory>> field_builder_factories_;
 
-  // Owned_desc_pool_ is null when using descriptor_source=local.
-  std::unique_ptr<DescriptorPool> desc_pool_;
-  DynamicMessageFactory message_factory_;
+  // The index in field_builder_factories_ of the requested field with a given
+  // field number, for field numbers < dense_field_indices_.size() (-1 if the
+  // field is not requested).
+  vector<int> dense_field_indices_;
+  // Same as dense_field_indices_, for the other requested field numbers.
+  absl::flat_hash_map<int, int> sparse_field_indices_;
+
+  // Shared with the other kernels built from the same descriptor_literal.
+  std::shared_ptr<SharedDescriptorPool> shared_pool_;
   const Message* message_prototype_;
 
   // True if decoding binary format, false if decoding text format.
@@ -1197,12 +1524,552 @@ class DecodeProtoSparseOp : public OpKernel {
   TF_DISALLOW_COPY_AND_ASSIGN(DecodeProtoSparseOp);
 };
 
+// Decodes a subtree of requested fields (possibly at different depths) of
+// serialized protos in a single pass. The requested fields are the nodes of a
+// tree, see DecodeProtoSubtree in ../ops/decode_proto_sparse_op.cc.
+// The value tensor of the i-th leaf node has the output index i, and the
+// parent index tensor of node j has the output index num_leaves() + j.
+class SubtreeDecoder {
+ public:
+  // Creates a decoder of the nodes of `message_desc`. Node i is the field
+  // node_field_names[i] of the message of node node_parents[i] (or of
+  // `message_desc` if it is -1). The submessage nodes in serialized_nodes are
+  // decoded like leaves, into their serialized submessages.
+  static Status Create(const DescriptorPool* pool,
+                       const Descriptor* message_desc,
+                       const vector<std::string>& node_field_names,
+                       const vector<int>& node_parents,
+                       const vector<int>& serialized_nodes,
+                       const vector<DataType>& output_types,
+                       bool honor_proto3_optional_semantics,
+                       std::unique_ptr<SubtreeDecoder>* result) {
+    if (node_field_names.size() != node_parents.size()) {
+      return InvalidArgument(
+          "node_field_names and node_parents must have the same size, but ",
+          node_field_names.size(), " != ", node_parents.size());
+    }
+    const int num_nodes = node_field_names.size();
+    vector<bool> is_serialized(num_nodes, false);
+    for (const int node : serialized_nodes) {
+      if (node < 0 || node >= num_nodes) {
+        return InvalidArgument("serialized_nodes has an invalid node: ", node);
+      }
+      is_serialized[node] = true;
+    }
+    // Resolve the field descriptors. Parents must precede their children.
+    vector<const FieldDescriptor*> node_fds(num_nodes, nullptr);
+    vector<int> leaf_ordinals(num_nodes, -1);
+    int num_leaves = 0;
+    for (int i = 0; i < num_nodes; ++i) {
+      const int parent = node_parents[i];
+      if (parent >= i) {
+        return InvalidArgument("node_parents[", i, "] = ", parent,
+                               " must be less than ", i);
+      }
+      const Descriptor* parent_desc =
+          parent < 0 ? message_desc : node_fds[parent]->message_type();
+      if (parent_desc == nullptr) {
+        return InvalidArgument("Field ", node_fds[parent]->full_name(),
+                               " is not a message but has children");
+      }
+      if (parent >= 0 && is_serialized[parent]) {
+        return InvalidArgument("Field ", node_fds[parent]->full_name(),
+                               " is decoded serialized but has children");
+      }
+      const FieldDescriptor* fd =
+          FindFieldByName(pool, parent_desc, node_field_names[i]);
+      if (fd == nullptr) {
+        return InvalidArgument("Unknown field: ", node_field_names[i],
+                               " in message type ", parent_desc->full_name());
+      }
+      if (IsMessageSetWireFormatExtension(*fd)) {
+        return InvalidArgument("MessageSet extensions are not supported: ",
+                               fd->full_name());
+      }
+      if (is_serialized[i] && fd->message_type() == nullptr) {
+        return InvalidArgument("Field ", fd->full_name(),
+                               " is decoded serialized but is not a message");
+      }
+      node_fds[i] = fd;
+      if (fd->message_type() == nullptr || is_serialized[i]) {
+        leaf_ordinals[i] = num_leaves++;
+      }
+    }
+    if (output_types.size() != num_leaves) {
+      return InvalidArgument(
+          "output_types must have one element per leaf node, but ",
+          output_types.size(), " != ", num_leaves);
+    }
+
+    // Create the factories bottom-up, so that the factories of the children
+    // exist when the factory of their parent is created.
+    vector<std::unique_ptr<FieldBuilderFactory>> factories;
+    vector<vector<std::unique_ptr<FieldBuilderFactory>>> children(num_nodes);
+    for (int i = num_nodes - 1; i >= 0; --i) {
+      const FieldDescriptor* fd = node_fds[i];
+      std::unique_ptr<FieldBuilderFactory> factory;
+      if (leaf_ordinals[i] < 0) {
+        factory = absl::make_unique<SubmessageFieldBuilderFactory>(
+            fd, num_leaves + i, std::move(children[i]));
+      } else {
+        const DataType dtype = output_types[leaf_ordinals[i]];
+        factory = CreateFieldBuilderFactory(fd, num_leaves + i,
+                                            leaf_ordinals[i], dtype,
+                                            honor_proto3_optional_semantics);
+        if (!factory) {
+          return InvalidArgument("Unexpected output type for ",
+                                 fd->full_name(), ": ", fd->cpp_type(), " to ",
+                                 dtype);
+        }
+      }
+      if (node_parents[i] < 0) {
+        factories.push_back(std::move(factory));
+      } else {
+        children[node_parents[i]].push_back(std::move(factory));
+      }
+    }
+    std::sort(factories.begin(), factories.end(),
+              [](const std::unique_ptr<FieldBuilderFactory>& a,
+                 const std::unique_ptr<FieldBuilderFactory>& b) {
+                return a->wire_number() < b->wire_number();
+              });
+    result->reset(new SubtreeDecoder(std::move(factories),
+                                     std::move(leaf_ordinals), num_leaves));
+    return absl::OkStatus();
+  }
+
+  // Creates the builders collecting the values of a batch of messages.
+  vector<std::unique_ptr<FieldBuilder>> CreateBuilders() const {
+    vector<std::unique_ptr<FieldBuilder>> builders;
+    builders.reserve(field_builder_factories_.size());
+    for (const auto& factory : field_builder_factories_) {
+      builders.push_back(factory->Create());
+    }
+    return builders;
+  }
+
+  // Collects the requested fields of the message `buf`, the
+  // `message_index`-th message of the batch, into `builders`. The builders
+  // may keep string views of `buf` until they produce their outputs.
+  static Status ConsumeMessage(
+      string_view buf, int64_t message_index,
+      const vector<std::unique_ptr<FieldBuilder>>& builders) {
+    CodedInputStream input(reinterpret_cast<const uint8_t*>(buf.data()),
+                           buf.size());
+    uint32_t last_tag = 0;
+    TF_RETURN_IF_ERROR(
+        ConsumeSubtreeMessage(&input, message_index, builders, &last_tag));
+    // If the last read tag is END_GROUP it should be the very last thing
+    // left in the buffer.
+    if (last_tag != 0 && input.ReadTag() != 0) {
+      return DataLoss(
+          "Encountered WIRETYPE_END_GROUP but the message did not end with "
+          "it.");
+    }
+    if (!input.ConsumedEntireMessage()) {
+      return DataLoss("Failed to consume entire buffer");
+    }
+    return absl::OkStatus();
+  }
+
+  // Produces the outputs of `builders`, which consumed `num_messages`
+  // messages. Submessage builders produce the tensors of their descendants.
+  Status Produce(const vector<std::unique_ptr<FieldBuilder>>& builders,
+                 int64_t num_messages, OutputAllocator* outputs) const {
+    for (const auto& builder : builders) {
+      TF_RETURN_IF_ERROR(
+          builder->Produce(outputs, /*produce_string_view=*/false,
+                           num_messages));
+    }
+    for (int i = 0; i < builders.size(); ++i) {
+      field_builder_factories_[i]->compare_and_set_max_num_values(
+          builders[i]->num_values());
+    }
+    return absl::OkStatus();
+  }
+
+  int num_nodes() const { return leaf_ordinals_.size(); }
+  int num_leaves() const { return num_leaves_; }
+  // Returns the index of node i among the leaf nodes, or -1 if it is not a
+  // leaf.
+  int leaf_ordinal(int i) const { return leaf_ordinals_[i]; }
+
+ private:
+  SubtreeDecoder(
+      vector<std::unique_ptr<FieldBuilderFactory>> field_builder_factories,
+      vector<int> leaf_ordinals, int num_leaves)
+      : field_builder_factories_(std::move(field_builder_factories)),
+        leaf_ordinals_(std::move(leaf_ordinals)),
+        num_leaves_(num_leaves) {}
+
+  // Factories of the top-level requested fields, ordered by wire number.
+  const vector<std::unique_ptr<FieldBuilderFactory>> field_builder_factories_;
+  const vector<int> leaf_ordinals_;
+  const int num_leaves_;
+
+  TF_DISALLOW_COPY_AND_ASSIGN(SubtreeDecoder);
+};
+
+// Reads the attrs shared by DecodeProtoSubtree and ProtoRecordDataset, and
+// creates the SubtreeDecoder they describe.
+Status CreateSubtreeDecoderFromAttrs(
+    OpKernelConstruction* context, std::string* message_type,
+    std::shared_ptr<SharedDescriptorPool>* shared_pool,
+    std::unique_ptr<SubtreeDecoder>* decoder) {
+  std::string descriptor_literal;
+  TF_RETURN_IF_ERROR(
+      context->GetAttr("descriptor_literal", &descriptor_literal));
+  TF_RETURN_IF_ERROR(
+      GetOrCreateSharedDescriptorPool(descriptor_literal, shared_pool));
+
+  TF_RETURN_IF_ERROR(context->GetAttr("message_type", message_type));
+  const Descriptor* message_desc =
+      (*shared_pool)->pool()->FindMessageTypeByName(*message_type);
+  if (message_desc == nullptr) {
+    return InvalidArgument("No descriptor found for message type ",
+                           *message_type);
+  }
+
+  int num_nodes;
+  TF_RETURN_IF_ERROR(context->GetAttr("num_nodes", &num_nodes));
+  vector<std::string> node_field_names;
+  TF_RETURN_IF_ERROR(context->GetAttr("node_field_names", &node_field_names));
+  vector<int> node_parents;
+  TF_RETURN_IF_ERROR(context->GetAttr("node_parents", &node_parents));
+  if (node_field_names.size() != num_nodes ||
+      node_parents.size() != num_nodes) {
+    return InvalidArgument(
+        "node_field_names and node_parents must have num_nodes elements, but ",
+        node_field_names.size(), " and ", node_parents.size(), " != ",
+        num_nodes);
+  }
+  // ProtoRecordDataset never decodes submessages serialized.
+  vector<int> serialized_nodes;
+  if (context->HasAttr("serialized_nodes")) {
+    TF_RETURN_IF_ERROR(context->GetAttr("serialized_nodes", &serialized_nodes));
+  }
+  vector<DataType> output_types;
+  TF_RETURN_IF_ERROR(context->GetAttr("output_types", &output_types));
+  bool honor_proto3_optional_semantics;
+  TF_RETURN_IF_ERROR(context->GetAttr("honor_proto3_optional_semantics",
+                                      &honor_proto3_optional_semantics));
+  return SubtreeDecoder::Create((*shared_pool)->pool(), message_desc,
+                                node_field_names, node_parents,
+                                serialized_nodes, output_types,
+                                honor_proto3_optional_semantics, decoder);
+}
+
+// Decodes a subtree of requested fields (possibly at different depths) in a
+// single pass over the serialized protos. See DecodeProtoSubtree in
+// ../ops/decode_proto_sparse_op.cc.
+class DecodeProtoSubtreeOp : public OpKernel {
+ public:
+  explicit DecodeProtoSubtreeOp(OpKernelConstruction* context)
+      : OpKernel(context) {
+    OP_REQUIRES_OK(context,
+                   CreateSubtreeDecoderFromAttrs(context, &message_type_,
+                                                 &shared_pool_, &decoder_));
+  }
+
+  void Compute(OpKernelContext* ctx) override {
+    const Tensor* buf_tensor;
+    OP_REQUIRES_OK(ctx, ctx->input("bytes", &buf_tensor));
+    const int message_count = buf_tensor->NumElements();
+
+    OP_REQUIRES(
+        ctx,
+        ctx->num_outputs() == decoder_->num_leaves() + decoder_->num_nodes(),
+        InvalidArgument("Number of outputs is not the number of leaf "
+                        "nodes plus the number of nodes."));
+
+    const vector<std::unique_ptr<FieldBuilder>> builders =
+        decoder_->CreateBuilders();
+    for (int message_index = 0; message_index < message_count;
+         ++message_index) {
+      const tstring& buf = buf_tensor->flat<tstring>()(message_index);
+      const Status st = SubtreeDecoder::ConsumeMessage(
+          string_view(buf.data(), buf.size()), message_index, builders);
+      if (!st.ok()) {
+        LOG(ERROR) << "Error consuming " << message_type_ << ". Error: " << st;
+      }
+      OP_REQUIRES_OK(ctx, st);
+    }
+
+    KernelOutputAllocator outputs(ctx);
+    OP_REQUIRES_OK(ctx, decoder_->Produce(builders, message_count, &outputs));
+  }
+
+ private:
+  std::string message_type_;
+  // Shared with the other kernels built from the same descriptor_literal.
+  std::shared_ptr<SharedDescriptorPool> shared_pool_;
+  std::unique_ptr<SubtreeDecoder> decoder_;
+
+  TF_DISALLOW_COPY_AND_ASSIGN(DecodeProtoSubtreeOp);
+};
+
+// Allocates the outputs of a SubtreeDecoder as the components of a
+// ProtoRecordDataset element.
+class ComponentOutputAllocator : public OutputAllocator {
+ public:
+  // The output of index i is the component component_indices[i] of
+  // `components`, of type output_dtypes[component_indices[i]].
+  ComponentOutputAllocator(tensorflow::Allocator* allocator,
+                           const tensorflow::DataTypeVector& output_dtypes,
+                           const vector<int>& component_indices,
+                           vector<Tensor>* components)
+      : allocator_(allocator),
+        output_dtypes_(output_dtypes),
+        component_indices_(component_indices),
+        components_(components) {}
+
+  Status Allocate(int output_index, const TensorShape& shape,
+                  Tensor** result) override {
+    const int component_index = component_indices_[output_index];
+    (*components_)[component_index] =
+        Tensor(allocator_, output_dtypes_[component_index], shape);
+    *result = &(*components_)[component_index];
+    return absl::OkStatus();
+  }
+
+ private:
+  tensorflow::Allocator* const allocator_;
+  const tensorflow::DataTypeVector& output_dtypes_;
+  const vector<int>& component_indices_;
+  vector<Tensor>* const components_;
+};
+
+// A dataset of batches of protos read from TFRecord files, decoded directly
+// into the components of a prensor. See ProtoRecordDataset in
+// ../ops/decode_proto_sparse_op.cc.
+class ProtoRecordDataset : public tensorflow::data::DatasetBase {
+ public:
+  ProtoRecordDataset(OpKernelContext* ctx, vector<std::string> filenames,
+                     const std::string& compression_type, int64_t batch_size,
+                     const std::string& message_type,
+                     std::shared_ptr<SharedDescriptorPool> shared_pool,
+                     std::shared_ptr<const SubtreeDecoder> decoder,
+                     const vector<DataType>& leaf_dtypes)
+      : DatasetBase(tensorflow::data::DatasetContext(ctx)),
+        filenames_(std::move(filenames)),
+        compression_type_(compression_type),
+        batch_size_(batch_size),
+        message_type_(message_type),
+        shared_pool_(std::move(shared_pool)),
+        decoder_(std::move(decoder)) {
+    // The components are the size of the root, then, for each node in order,
+    // its parent indices and, for a leaf, its values.
+    output_dtypes_.push_back(tensorflow::DT_INT64);
+    output_shapes_.push_back(tensorflow::PartialTensorShape({}));
+    component_indices_.resize(decoder_->num_leaves() + decoder_->num_nodes());
+    for (int i = 0; i < decoder_->num_nodes(); ++i) {
+      component_indices_[decoder_->num_leaves() + i] = output_dtypes_.size();
+      output_dtypes_.push_back(tensorflow::DT_INT64);
+      output_shapes_.push_back(tensorflow::PartialTensorShape({-1}));
+      const int leaf_ordinal = decoder_->leaf_ordinal(i);
+      if (leaf_ordinal >= 0) {
+        component_indices_[leaf_ordinal] = output_dtypes_.size();
+        output_dtypes_.push_back(leaf_dtypes[leaf_ordinal]);
+        output_shapes_.push_back(tensorflow::PartialTensorShape({-1}));
+      }
+    }
+  }
+
+  std::unique_ptr<tensorflow::data::IteratorBase> MakeIteratorInternal(
+      const std::string& prefix) const override {
+    return absl::make_unique<Iterator>(Iterator::Params{
+        this, tensorflow::strings::StrCat(prefix, "::ProtoRecord")});
+  }
+
+  const tensorflow::DataTypeVector& output_dtypes() const override {
+    return output_dtypes_;
+  }
+  const std::vector<tensorflow::PartialTensorShape>& output_shapes()
+      const override {
+    return output_shapes_;
+  }
+
+  std::string DebugString() const override {
+    return "ProtoRecordDatasetOp::Dataset";
+  }
+
+  Status CheckExternalState() const { return absl::OkStatus(); }
+
+ protected:
+  Status AsGraphDefInternal(tensorflow::data::SerializationContext* ctx,
+                            DatasetGraphDefBuilder* b,
+                            tensorflow::Node** output) const override {
+    return tensorflow::errors::Unimplemented(
+        DebugString(), " does not support serialization.");
+  }
+
+ private:
+  class Iterator
+      : public tensorflow::data::DatasetIterator<ProtoRecordDataset> {
+   public:
+    explicit Iterator(const Params& params)
+        : DatasetIterator<ProtoRecordDataset>(params) {}
+
+    Status GetNextInternal(tensorflow::data::IteratorContext* ctx,
+                           std::vector<Tensor>* out_tensors,
+                           bool* end_of_sequence) override {
+      tensorflow::mutex_lock l(mu_);
+      const vector<std::unique_ptr<FieldBuilder>> builders =
+          dataset()->decoder_->CreateBuilders();
+      // The builders keep string views of the records until they produce
+      // their outputs, so the records of the batch are kept alive until then.
+      // They are never copied into a batched string tensor.
+      vector<tstring> records;
+      records.reserve(dataset()->batch_size_);
+      while (records.size() < dataset()->batch_size_) {
+        if (reader_ == nullptr) {
+          if (current_file_index_ == dataset()->filenames_.size()) {
+            break;
+          }
+          TF_RETURN_IF_ERROR(OpenCurrentFile(ctx->env()));
+        }
+        tstring record;
+        const Status status = reader_->ReadRecord(&record);
+        if (tensorflow::errors::IsOutOfRange(status)) {
+          // The end of the current file.
+          reader_.reset();
+          file_.reset();
+          ++current_file_index_;
+          continue;
+        }
+        TF_RETURN_IF_ERROR(status);
+        records.push_back(std::move(record));
+        const tstring& buf = records.back();
+        const Status st = SubtreeDecoder::ConsumeMessage(
+            string_view(buf.data(), buf.size()), records.size() - 1, builders);
+        if (!st.ok()) {
+          LOG(ERROR) << "Error consuming " << dataset()->message_type_
+                     << ". Error: " << st;
+          return st;
+        }
+      }
+      if (records.empty()) {
+        *end_of_sequence = true;
+        return absl::OkStatus();
+      }
+
+      out_tensors->resize(dataset()->output_dtypes_.size());
+      Tensor size_tensor(ctx->allocator({}), tensorflow::DT_INT64,
+                         TensorShape({}));
+      size_tensor.scalar<tensorflow::int64>()() = records.size();
+      (*out_tensors)[0] = std::move(size_tensor);
+      ComponentOutputAllocator outputs(ctx->allocator({}),
+                                       dataset()->output_dtypes_,
+                                       dataset()->component_indices_,
+                                       out_tensors);
+      TF_RETURN_IF_ERROR(
+          dataset()->decoder_->Produce(builders, records.size(), &outputs));
+      *end_of_sequence = false;
+      return absl::OkStatus();
+    }
+
+   protected:
+    Status SaveInternal(tensorflow::data::SerializationContext* ctx,
+                        tensorflow::data::IteratorStateWriter* writer) {
+      return tensorflow::errors::Unimplemented(
+          "ProtoRecordDataset iterator does not support checkpointing.");
+    }
+
+    Status RestoreInternal(tensorflow::data::IteratorContext* ctx,
+                           tensorflow::data::IteratorStateReader* reader) {
+      return tensorflow::errors::Unimplemented(
+          "ProtoRecordDataset iterator does not support checkpointing.");
+    }
+
+   private:
+    // Opens filenames_[current_file_index_].
+    Status OpenCurrentFile(tensorflow::Env* env)
+        TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+      TF_RETURN_IF_ERROR(env->NewRandomAccessFile(
+          dataset()->filenames_[current_file_index_], &file_));
+      reader_ = absl::make_unique<tensorflow::io::SequentialRecordReader>(
+          file_.get(), tensorflow::io::RecordReaderOptions::
+                           CreateRecordReaderOptions(
+                               dataset()->compression_type_));
+      return absl::OkStatus();
+    }
+
+    tensorflow::mutex mu_;
+    size_t current_file_index_ TF_GUARDED_BY(mu_) = 0;
+    std::unique_ptr<tensorflow::RandomAccessFile> file_ TF_GUARDED_BY(mu_);
+    std::unique_ptr<tensorflow::io::SequentialRecordReader> reader_
+        TF_GUARDED_BY(mu_);
+  };
+
+  const vector<std::string> filenames_;
+  const std::string compression_type_;
+  const int64_t batch_size_;
+  const std::string message_type_;
+  // Keeps the descriptors used by decoder_ alive.
+  const std::shared_ptr<SharedDescriptorPool> shared_pool_;
+  const std::shared_ptr<const SubtreeDecoder> decoder_;
+  tensorflow::DataTypeVector output_dtypes_;
+  std::vector<tensorflow::PartialTensorShape> output_shapes_;
+  // The component index of each output of decoder_.
+  vector<int> component_indices_;
+};
+
+class ProtoRecordDatasetOp : public tensorflow::data::DatasetOpKernel {
+ public:
+  explicit ProtoRecordDatasetOp(OpKernelConstruction* context)
+      : DatasetOpKernel(context) {
+    std::unique_ptr<SubtreeDecoder> decoder;
+    OP_REQUIRES_OK(context,
+                   CreateSubtreeDecoderFromAttrs(context, &message_type_,
+                                                 &shared_pool_, &decoder));
+    decoder_ = std::move(decoder);
+    OP_REQUIRES_OK(context, context->GetAttr("output_types", &leaf_dtypes_));
+    OP_REQUIRES_OK(context, context->GetAttr("batch_size", &batch_size_));
+  }
+
+  void MakeDataset(OpKernelContext* ctx,
+                   tensorflow::data::DatasetBase** output) override {
+    const Tensor* filenames_tensor;
+    OP_REQUIRES_OK(ctx, ctx->input("filenames", &filenames_tensor));
+    OP_REQUIRES(ctx, filenames_tensor->dims() <= 1,
+                InvalidArgument("`filenames` must be a scalar or a vector."));
+    vector<std::string> filenames;
+    filenames.reserve(filenames_tensor->NumElements());
+    for (int i = 0; i < filenames_tensor->NumElements(); ++i) {
+      filenames.push_back(filenames_tensor->flat<tstring>()(i));
+    }
+
+    tstring compression_type;
+    OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tstring>(
+                            ctx, "compression_type", &compression_type));
+
+    *output = new ProtoRecordDataset(ctx, std::move(filenames),
+                                     compression_type, batch_size_,
+                                     message_type_, shared_pool_, decoder_,
+                                     leaf_dtypes_);
+  }
+
+ private:
+  std::string message_type_;
+  std::shared_ptr<SharedDescriptorPool> shared_pool_;
+  // Shared with the datasets created by this kernel.
+  std::shared_ptr<const SubtreeDecoder> decoder_;
+  vector<DataType> leaf_dtypes_;
+  int batch_size_;
+
+  TF_DISALLOW_COPY_AND_ASSIGN(ProtoRecordDatasetOp);
+};
+
 REGISTER_KERNEL_BUILDER(Name("DecodeProtoSparseV2").Device(DEVICE_CPU),
                         DecodeProtoSparseOp<2>);
 REGISTER_KERNEL_BUILDER(Name("DecodeProtoSparseV3").Device(DEVICE_CPU),
                         DecodeProtoSparseOp<3>);
 REGISTER_KERNEL_BUILDER(Name("DecodeProtoSparseV4").Device(DEVICE_CPU),
                         DecodeProtoSparseOp<4>);
+REGISTER_KERNEL_BUILDER(Name("DecodeProtoSubtree").Device(DEVICE_CPU),
+                        DecodeProtoSubtreeOp);
+REGISTER_KERNEL_BUILDER(Name("ProtoRecordDataset").Device(DEVICE_CPU),
+                        ProtoRecordDatasetOp);
 
 }  // namespace
 }  // namespace struct2tensor
@@ -0,0 +1,127 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+#include "struct2tensor/kernels/descriptor_pool_registry.h"
+
+#include <unordered_map>
+#include <utility>
+
+#include "google/protobuf/descriptor.pb.h"
+#include "tensorflow/core/lib/core/errors.h"
+#include "tensorflow/core/platform/fingerprint.h"
+
+namespace struct2tensor {
+namespace {
+
+using ::google::protobuf::FileDescriptorSet;
+using ::tensorflow::Status;
+using ::tensorflow::errors::InvalidArgument;
+
+struct RegistryEntry {
+  // Kept to tell apart literals with the same fingerprint.
+  std::string descriptor_literal;
+  std::weak_ptr<SharedDescriptorPool> shared_pool;
+};
+
+class DescriptorPoolRegistry {
+ public:
+  static DescriptorPoolRegistry* Global() {
+    static DescriptorPoolRegistry* const registry = new DescriptorPoolRegistry;
+    return registry;
+  }
+
+  Status GetOrCreate(const std::string& descriptor_literal,
+                     std::shared_ptr<SharedDescriptorPool>* result) {
+    const tensorflow::uint64 key = tensorflow::Fingerprint64(descriptor_literal);
+    tensorflow::mutex_lock lock(mu_);
+    auto iter = entries_.find(key);
+    if (iter != entries_.end()) {
+      if (iter->second.descriptor_literal != descriptor_literal) {
+        // A fingerprint collision: do not share the pool.
+        return CreateSharedDescriptorPool(descriptor_literal, result);
+      }
+      *result = iter->second.shared_pool.lock();
+      if (*result != nullptr) {
+        return absl::OkStatus();
+      }
+    }
+    // The pool is built while holding the lock so that concurrent kernels with
+    // the same descriptor_literal build it only once.
+    TF_RETURN_IF_ERROR(CreateSharedDescriptorPool(descriptor_literal, result));
+    PruneExpiredEntries();
+    entries_[key] = RegistryEntry{descriptor_literal, *result};
+    return absl::OkStatus();
+  }
+
+ private:
+  DescriptorPoolRegistry() = default;
+
+  void PruneExpiredEntries() TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+    for (auto iter = entries_.begin(); iter != entries_.end();) {
+      if (iter->second.shared_pool.expired()) {
+        iter = entries_.erase(iter);
+      } else {
+        ++iter;
+      }
+    }
+  }
+
+  tensorflow::mutex mu_;
+  std::unordered_map<tensorflow::uint64, RegistryEntry> entries_
+      TF_GUARDED_BY(mu_);
+};
+
+}  // namespace
+
+const google::protobuf::Message* SharedDescriptorPool::GetPrototype(
+    const google::protobuf::Descriptor* descriptor) {
+  tensorflow::mutex_lock lock(mu_);
+  return message_factory_.GetPrototype(descriptor);
+}
+
+Status CreateSharedDescriptorPool(
+    const std::string& descriptor_literal,
+    std::shared_ptr<SharedDescriptorPool>* result) {
+  if (descriptor_literal.empty()) {
+    return InvalidArgument(
+        "descriptor_literal must be a serialized file_descriptor_set.");
+  }
+  FileDescriptorSet file_descriptor_set;
+  if (!file_descriptor_set.ParseFromString(descriptor_literal)) {
+    return InvalidArgument(
+        "descriptor_literal is neither empty nor a "
+        "serialized file_descriptor_set.");
+  }
+  auto shared_pool = std::shared_ptr<SharedDescriptorPool>(
+      new SharedDescriptorPool());
+  for (const auto& file : file_descriptor_set.file()) {
+    // Note, the order of the files matters: early files cannot depend on
+    // later files.
+    if (shared_pool->pool_.BuildFile(file) == nullptr) {
+      return InvalidArgument(
+          "could not create DescriptorPool from descriptor_literal.");
+    }
+  }
+  *result = std::move(shared_pool);
+  return absl::OkStatus();
+}
+
+Status GetOrCreateSharedDescriptorPool(
+    const std::string& descriptor_literal,
+    std::shared_ptr<SharedDescriptorPool>* result) {
+  return DescriptorPoolRegistry::Global()->GetOrCreate(descriptor_literal,
+                                                       result);
+}
+
+}  // namespace struct2tensor
@@ -0,0 +1,85 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+#ifndef STRUCT2TENSOR_PY_KERNELS_DESCRIPTOR_POOL_REGISTRY_H_
+#define STRUCT2TENSOR_PY_KERNELS_DESCRIPTOR_POOL_REGISTRY_H_
+
+// A process-wide registry of the DescriptorPools built from the
+// descriptor_literal attrs of the decode kernels.
+//
+// A graph typically contains many decode ops built from the same
+// descriptor_literal (e.g. one per level of a nested proto), and a model
+// server may load many versions of the same graph. Building one DescriptorPool
+// (and one DynamicMessageFactory) per kernel is slow and keeps a copy of the
+// descriptors alive per kernel, so kernels share them through this registry
+// instead. An entry lives as long as some kernel holds a reference to it.
+//
+// All the kernels using it (the sparse and the map decoding kernels) are in
+// one op library (_decode_proto_op.so), so that there is only one registry:
+// e.g. a map kernel shares the pool of a sparse kernel decoding the parent
+// message of the map, as their descriptor_literals are the same.
+
+#include <memory>
+#include <string>
+
+#include "google/protobuf/descriptor.h"
+#include "google/protobuf/dynamic_message.h"
+#include "google/protobuf/message.h"
+#include "tensorflow/core/lib/core/status.h"
+#include "tensorflow/core/platform/mutex.h"
+#include "tensorflow/core/platform/thread_annotations.h"
+
+namespace struct2tensor {
+
+// An immutable DescriptorPool, together with the factory of the prototypes of
+// its message types. Thread-safe.
+class SharedDescriptorPool {
+ public:
+  SharedDescriptorPool() = default;
+
+  const google::protobuf::DescriptorPool* pool() const { return &pool_; }
+
+  // Returns the prototype of a message type of pool(), or nullptr.
+  const google::protobuf::Message* GetPrototype(
+      const google::protobuf::Descriptor* descriptor);
+
+ private:
+  friend tensorflow::Status CreateSharedDescriptorPool(
+      const std::string& descriptor_literal,
+      std::shared_ptr<SharedDescriptorPool>* result);
+
+  google::protobuf::DescriptorPool pool_;
+  tensorflow::mutex mu_;
+  google::protobuf::DynamicMessageFactory message_factory_ TF_GUARDED_BY(mu_);
+
+  SharedDescriptorPool(const SharedDescriptorPool&) = delete;
+  SharedDescriptorPool& operator=(const SharedDescriptorPool&) = delete;
+};
+
+// Builds a new, unshared SharedDescriptorPool from a serialized
+// FileDescriptorSet.
+tensorflow::Status CreateSharedDescriptorPool(
+    const std::string& descriptor_literal,
+    std::shared_ptr<SharedDescriptorPool>* result);
+
+// Returns the SharedDescriptorPool built from a serialized FileDescriptorSet,
+// building it only if no live kernel already holds one for the same
+// descriptor_literal.
+tensorflow::Status GetOrCreateSharedDescriptorPool(
+    const std::string& descriptor_literal,
+    std::shared_ptr<SharedDescriptorPool>* result);
+
+}  // namespace struct2tensor
+
+#endif  // STRUCT2TENSOR_PY_KERNELS_DESCRIPTOR_POOL_REGISTRY_H_
@@ -0,0 +1,83 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+// Helpers shared by the EquiJoinIndices and EquiJoinAnyIndices kernels.
+#ifndef THIRD_PARTY_PY_STRUCT2TENSOR_KERNELS_EQUI_JOIN_H_
+#define THIRD_PARTY_PY_STRUCT2TENSOR_KERNELS_EQUI_JOIN_H_
+
+#include "tensorflow/core/framework/op_kernel.h"
+#include "tensorflow/core/framework/tensor.h"
+#include "tensorflow/core/framework/types.h"
+
+namespace struct2tensor {
+
+using ConstInt64Flat = tensorflow::TTypes<tensorflow::int64>::ConstFlat;
+
+// Merge-joins the non-decreasing vectors a and b: calls fn(i, j) for every
+// pair where a[i] == b[j], in lexicographic order.
+template <typename Fn>
+inline void MergeJoin(const ConstInt64Flat& a, const ConstInt64Flat& b,
+                      Fn fn) {
+  const tensorflow::int64 a_rows = a.size();
+  const tensorflow::int64 b_rows = b.size();
+  tensorflow::int64 index_a = 0;
+  tensorflow::int64 index_b = 0;
+  while (index_a < a_rows && index_b < b_rows) {
+    const tensorflow::int64 value = a(index_a);
+    if (value < b(index_b)) {
+      ++index_a;
+    } else if (value > b(index_b)) {
+      ++index_b;
+    } else {
+      tensorflow::int64 end_b = index_b + 1;
+      while (end_b < b_rows && b(end_b) == value) {
+        ++end_b;
+      }
+      for (; index_a < a_rows && a(index_a) == value; ++index_a) {
+        for (tensorflow::int64 i = index_b; i < end_b; ++i) {
+          fn(index_a, i);
+        }
+      }
+      index_b = end_b;
+    }
+  }
+}
+
+// Calls join(fn) to enumerate the pairs of the join, and writes them to the
+// outputs 0 (index_a) and 1 (index_b). The pairs are counted first, so that
+// the outputs can be allocated once and written in place.
+template <typename JoinFn>
+inline void JoinToOutputs(tensorflow::OpKernelContext* context, JoinFn join) {
+  tensorflow::int64 output_size = 0;
+  join([&output_size](tensorflow::int64, tensorflow::int64) { ++output_size; });
+  tensorflow::Tensor* index_a_tensor = nullptr;
+  OP_REQUIRES_OK(context,
+                 context->allocate_output(0, {output_size}, &index_a_tensor));
+  tensorflow::Tensor* index_b_tensor = nullptr;
+  OP_REQUIRES_OK(context,
+                 context->allocate_output(1, {output_size}, &index_b_tensor));
+  tensorflow::int64* index_a_out =
+      index_a_tensor->flat<tensorflow::int64>().data();
+  tensorflow::int64* index_b_out =
+      index_b_tensor->flat<tensorflow::int64>().data();
+  join([&index_a_out, &index_b_out](tensorflow::int64 index_a,
+                                    tensorflow::int64 index_b) {
+    *index_a_out++ = index_a;
+    *index_b_out++ = index_b;
+  });
+}
+
+}  // namespace struct2tensor
+
+#endif  // THIRD_PARTY_PY_STRUCT2TENSOR_KERNELS_EQUI_JOIN_H_
@@ -16,11 +16,16 @@ limitations under the License.
 // possible.
 //
 // This differs from equi_join_indices in that vectors a,b do not need to be
-// monotonically increasing.
+// monotonically increasing. If they are (as parent indices are), a linear
+// merge-join is used; otherwise b is indexed in a hash map.
+
+#include <unordered_map>
+#include <vector>
 
 #include "tensorflow/core/framework/op.h"
 #include "tensorflow/core/framework/op_kernel.h"
 #include "tensorflow/core/framework/shape_inference.h"
+#include "struct2tensor/kernels/equi_join.h"
 
 namespace struct2tensor {
 
@@ -35,20 +40,44 @@ using tensorflow::Tensor;
 using tensorflow::TensorShape;
 using tensorflow::TensorShapeUtils;
 
-// Creates an output vector tensor of dtype int64 from a vector<int64>.
-::tensorflow::Status ToOutputVector(OpKernelContext* context, int index,
-                                    const std::vector<tensorflow::int64>& vec) {
-  tensorflow::int64 tensor_size = vec.size();
-  Tensor* result = nullptr;
-  TF_RETURN_IF_ERROR(context->allocate_output(index, {tensor_size}, &result));
-  if (tensor_size > 0) {
-    auto result_flat = result->flat<tensorflow::int64>();
-    memcpy(result_flat.data(), vec.data(),
-           tensor_size * sizeof(tensorflow::int64));
+// Returns true iff for all i, vec[i] <= vec[i+1].
+bool IsNonDecreasing(const ConstInt64Flat& vec) {
+  for (tensorflow::int64 i = 1; i < vec.size(); ++i) {
+    if (vec(i - 1) > vec(i)) {
+      return false;
+    }
   }
-  return absl::OkStatus();
+  return true;
 }
 
+// Joins a and b with a hash map of the values of b: calls fn(i, j) for every
+// pair where a[i] == b[j], in lexicographic order.
+class HashJoin {
+ public:
+  explicit HashJoin(const ConstInt64Flat& b) {
+    for (tensorflow::int64 i = 0; i < b.size(); ++i) {
+      value_to_b_indices_[b(i)].push_back(i);
+    }
+  }
+
+  template <typename Fn>
+  void Join(const ConstInt64Flat& a, Fn fn) const {
+    for (tensorflow::int64 index_a = 0; index_a < a.size(); ++index_a) {
+      auto iter = value_to_b_indices_.find(a(index_a));
+      if (iter != value_to_b_indices_.end()) {
+        for (tensorflow::int64 index_b : iter->second) {
+          fn(index_a, index_b);
+        }
+      }
+    }
+  }
+
+ private:
+  // The indices of b with each value, in increasing order.
+  std::unordered_map<tensorflow::int64, std::vector<tensorflow::int64>>
+      value_to_b_indices_;
+};
+
 }  // namespace
 
 class EquiJoinAnyIndicesOp : public OpKernel {
@@ -75,29 +104,19 @@ class EquiJoinAnyIndicesOp : public OpKernel {
     const Tensor& b = context->input(1);
     OP_REQUIRES(context, IsEquivToVector(b.shape()),
                 InvalidArgument("Second argument not a vector"));
-    std::vector<tensorflow::int64> index_a_vec;
-    std::vector<tensorflow::int64> index_b_vec;
     auto a_flat = a.flat<tensorflow::int64>();
     auto b_flat = b.flat<tensorflow::int64>();
-    const tensorflow::int64 a_rows = a_flat.size();
-    const tensorflow::int64 b_rows = b_flat.size();
-
-    tensorflow::int64 index_a = 0;
-    tensorflow::int64 index_b = 0;
-    // Lots of checks that don't need to be done. Optimize this later.
-    while (index_a < a_rows) {
-      while (index_b < b_rows) {
-        if (a_flat(index_a) == b_flat(index_b)) {
-            index_a_vec.push_back(index_a);
-            index_b_vec.push_back(index_b);
-          }
-        ++index_b;
-      }
-      index_b = 0;
-      ++index_a;
+
+    if (IsNonDecreasing(a_flat) && IsNonDecreasing(b_flat)) {
+      JoinToOutputs(context, [&a_flat, &b_flat](auto fn) {
+        MergeJoin(a_flat, b_flat, fn);
+      });
+      return;
     }
-    OP_REQUIRES_OK(context, ToOutputVector(context, 0, index_a_vec));
-    OP_REQUIRES_OK(context, ToOutputVector(context, 1, index_b_vec));
+    const HashJoin hash_join(b_flat);
+    JoinToOutputs(context, [&a_flat, &hash_join](auto fn) {
+      hash_join.Join(a_flat, fn);
+    });
   }
 };
 
@@ -25,6 +25,7 @@ limitations under the License.
 #include "tensorflow/core/framework/op.h"
 #include "tensorflow/core/framework/op_kernel.h"
 #include "tensorflow/core/framework/shape_inference.h"
+#include "struct2tensor/kernels/equi_join.h"
 
 namespace struct2tensor {
 
@@ -39,20 +40,6 @@ using tensorflow::Tensor;
 using tensorflow::TensorShape;
 using tensorflow::TensorShapeUtils;
 
-// Creates an output vector tensor of dtype int64 from a vector<int64>.
-::tensorflow::Status ToOutputVector(OpKernelContext* context, int index,
-                                    const std::vector<tensorflow::int64>& vec) {
-  tensorflow::int64 tensor_size = vec.size();
-  Tensor* result = nullptr;
-  TF_RETURN_IF_ERROR(context->allocate_output(index, {tensor_size}, &result));
-  if (tensor_size > 0) {
-    auto result_flat = result->flat<tensorflow::int64>();
-    memcpy(result_flat.data(), vec.data(),
-           tensor_size * sizeof(tensorflow::int64));
-  }
-  return absl::OkStatus();
-}
-
 }  // namespace
 
 class EquiJoinIndicesOp : public OpKernel {
@@ -79,33 +66,11 @@ class EquiJoinIndicesOp : public OpKernel {
     const Tensor& b = context->input(1);
     OP_REQUIRES(context, IsEquivToVector(b.shape()),
                 InvalidArgument("Second argument not a vector"));
-    std::vector<tensorflow::int64> index_a_vec;
-    std::vector<tensorflow::int64> index_b_vec;
     auto a_flat = a.flat<tensorflow::int64>();
     auto b_flat = b.flat<tensorflow::int64>();
-    const tensorflow::int64 a_rows = a_flat.size();
-    const tensorflow::int64 b_rows = b_flat.size();
-
-    tensorflow::int64 index_a = 0;
-    tensorflow::int64 index_b = 0;
-    // Lots of checks that don't need to be done. Optimize this later.
-    while (index_a < a_rows && index_b < b_rows) {
-      if (a_flat(index_a) == b_flat(index_b)) {
-        tensorflow::int64 run_index_b = index_b;
-        while (run_index_b < b_rows && b_flat(run_index_b) == a_flat(index_a)) {
-          index_a_vec.push_back(index_a);
-          index_b_vec.push_back(run_index_b);
-          ++run_index_b;
-        }
-        ++index_a;
-      } else if (a_flat(index_a) < b_flat(index_b)) {
-        ++index_a;
-      } else if (a_flat(index_a) > b_flat(index_b)) {
-        ++index_b;
-      }
-    }
-    OP_REQUIRES_OK(context, ToOutputVector(context, 0, index_a_vec));
-    OP_REQUIRES_OK(context, ToOutputVector(context, 1, index_b_vec));
+    JoinToOutputs(context, [&a_flat, &b_flat](auto fn) {
+      MergeJoin(a_flat, b_flat, fn);
+    });
   }
 };
 
@@ -12,31 +12,48 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 ==============================================================================*/
+#include <deque>
+#include <memory>
+
 #include "absl/container/flat_hash_map.h"
 #include "struct2tensor/kernels/parquet/parquet_reader.h"
 #include "struct2tensor/kernels/parquet/parquet_reader_util.h"
 #include "struct2tensor/kernels/vector_to_tensor.h"
 #include "tensorflow/core/framework/op_kernel.h"
 #include "tensorflow/core/framework/types.h"
+#include "tensorflow/core/platform/env.h"
+#include "tensorflow/core/platform/mutex.h"
 
 namespace struct2tensor {
 namespace parquet_dataset {
 
+// A part of the files read by one ParquetReader: some row groups of a file.
+struct ReadUnit {
+  int file_index;
+  // The row groups to read. All of them if empty.
+  std::vector<int> row_groups;
+};
+
 class Dataset : public tensorflow::data::DatasetBase {
  public:
   explicit Dataset(tensorflow::OpKernelContext* ctx,
                    const std::vector<std::string>& filenames,
+                   const std::vector<ReadUnit>& read_units,
                    const std::vector<std::string>& value_paths,
                    const tensorflow::DataTypeVector& value_dtypes,
                    const std::vector<std::vector<int>>& segregated_path_indices,
                    const tensorflow::int64 batch_size,
-                   const tensorflow::DataTypeVector& output_dtypes)
+                   const tensorflow::DataTypeVector& output_dtypes,
+                   const int num_parallel_reads, const bool deterministic)
       : DatasetBase(tensorflow::data::DatasetContext(ctx)),
         filenames_(filenames),
+        read_units_(read_units),
         value_paths_(value_paths),
         value_dtypes_(value_dtypes),
         segregated_path_indices_(segregated_path_indices),
         batch_size_(batch_size),
+        num_parallel_reads_(num_parallel_reads),
+        deterministic_(deterministic),
         output_dtypes_(output_dtypes),
         output_shapes_([this]() {
           // The first output tensor is always the root size (number of messages
@@ -53,7 +70,8 @@ class Dataset : public tensorflow::data::DatasetBase {
       const std::string& prefix) const override {
     return absl::WrapUnique(new Iterator(
         {this, tensorflow::strings::StrCat(prefix, "::Parquet")}, filenames_,
-        value_paths_, value_dtypes_, segregated_path_indices_, batch_size_));
+        read_units_, value_paths_, value_dtypes_, segregated_path_indices_, batch_size_,
+        num_parallel_reads_, deterministic_));
   }
 
   const tensorflow::DataTypeVector& output_dtypes() const override {
@@ -87,17 +105,33 @@ class Dataset : public tensorflow::data::DatasetBase {
    public:
     explicit Iterator(
         const Params& params, const std::vector<std::string>& filenames,
+        const std::vector<ReadUnit>& read_units,
         const std::vector<std::string>& value_paths,
         const tensorflow::DataTypeVector& value_dtypes,
         const std::vector<std::vector<int>>& segregated_path_indices,
-        const tensorflow::int64 batch_size)
+        const tensorflow::int64 batch_size, const int num_parallel_reads,
+        const bool deterministic)
         : DatasetIterator<Dataset>(params),
           filenames_(filenames),
+          read_units_(read_units),
           value_paths_(value_paths),
           value_dtypes_(value_dtypes),
           segregated_path_indices_(segregated_path_indices),
           batch_size_(batch_size),
-          current_file_index_(0) {}
+          num_parallel_reads_(num_parallel_reads),
+          deterministic_(deterministic),
+          current_unit_index_(0),
+          readers_(num_parallel_reads > 1 ? num_parallel_reads : 0) {}
+
+    ~Iterator() override {
+      {
+        tensorflow::mutex_lock l(mu_);
+        cancelled_ = true;
+        cond_var_.notify_all();
+      }
+      // Joins the reader threads.
+      reader_threads_.clear();
+    }
 
     // For a deeper understanding of what tensors are returned in out_tensors,
     // see parquet_dataset_op.cc.
@@ -106,19 +140,20 @@ class Dataset : public tensorflow::data::DatasetBase {
         std::vector<tensorflow::Tensor>* out_tensors,
         bool* end_of_sequence) override {
       tensorflow::mutex_lock l(mu_);
-      if (current_file_index_ >= filenames_.size()) {
+      if (num_parallel_reads_ > 1) {
+        return GetNextFromParallelReaders(ctx, &l, out_tensors,
+                                          end_of_sequence);
+      }
+      if (current_unit_index_ >= read_units_.size()) {
         *end_of_sequence = true;
         return absl::OkStatus();
       }
 
       if (!parquet_reader_) {
         // Once a file is finished reading, this will create a ParquetReader
-        // for the next file in file_names_.
-        TF_RETURN_IF_ERROR(
-            ValidateFileAndSchema(filenames_[current_file_index_]));
-        TF_RETURN_IF_ERROR(ParquetReader::Create(
-            filenames_[current_file_index_], value_paths_, value_dtypes_,
-            batch_size_, &parquet_reader_));
+        // for the next file in read_units_.
+        TF_RETURN_IF_ERROR(CreateParquetReader(
+            read_units_[current_unit_index_], &parquet_reader_));
       }
 
       bool end_of_file = false;
@@ -127,10 +162,162 @@ class Dataset : public tensorflow::data::DatasetBase {
       TF_RETURN_IF_ERROR(parquet_reader_->ReadMessages(
           ctx, &parent_indices_and_values, &end_of_file));
       if (end_of_file) {
-        ++current_file_index_;
+        ++current_unit_index_;
         parquet_reader_.reset();
       }
+      return ToOutputTensors(ctx, &parent_indices_and_values, out_tensors);
+    }
+
+   protected:
+    // TODO(b/139440495): Implement saving and restoring iterator state.
+    tensorflow::Status SaveInternal(
+        tensorflow::data::SerializationContext* ctx,
+        tensorflow::data::IteratorStateWriter* writer)
+    {
+      return tensorflow::errors::Unimplemented(
+          "Parquet Dataset Iterator does not support checkpointing.");
+    }
+
+    tensorflow::Status RestoreInternal(
+        tensorflow::data::IteratorContext* ctx,
+        tensorflow::data::IteratorStateReader* reader)
+    {
+      return tensorflow::errors::Unimplemented(
+          "Parquet Dataset Iterator does not support checkpointing.");
+    }
+
+   private:
+    // A batch read by a reader thread, or the error it ran into.
+    struct ReadResult {
+      tensorflow::Status status;
+      std::vector<tensorflow::Tensor> out_tensors;
+    };
+
+    // The state of one of the num_parallel_reads_ readers. The i-th reader
+    // reads the read units i, i + num_parallel_reads_,
+    // i + 2 * num_parallel_reads_, ... one after the other.
+    struct ReaderState {
+      // Batches read but not yet returned by GetNextInternal, in order.
+      std::deque<ReadResult> results;
+      // True once the reader read all its files, or ran into an error.
+      bool done = false;
+    };
+
+    // The number of batches each reader reads ahead of GetNextInternal.
+    static constexpr int kMaxBufferedBatchesPerReader = 2;
+
+    // Returns the next batch read by the reader threads, starting them on the
+    // first call. If deterministic_, the readers take turns (skipping the
+    // readers that are done); otherwise, the next reader with a batch ready
+    // goes first.
+    tensorflow::Status GetNextFromParallelReaders(
+        tensorflow::data::IteratorContext* ctx, tensorflow::mutex_lock* l,
+        std::vector<tensorflow::Tensor>* out_tensors, bool* end_of_sequence)
+        ABSL_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+      if (reader_threads_.empty()) {
+        auto reader_ctx =
+            std::make_shared<tensorflow::data::IteratorContext>(*ctx);
+        for (int i = 0; i < num_parallel_reads_; ++i) {
+          reader_threads_.push_back(ctx->StartThread(
+              absl::StrCat("parquet_reader_thread_", i),
+              [this, reader_ctx, i]() { ReaderThread(reader_ctx, i); }));
+        }
+      }
+      while (true) {
+        bool all_done = true;
+        for (int i = 0; i < num_parallel_reads_; ++i) {
+          const int reader_index =
+              (next_reader_index_ + i) % num_parallel_reads_;
+          ReaderState& reader = readers_[reader_index];
+          if (!reader.results.empty()) {
+            ReadResult result = std::move(reader.results.front());
+            reader.results.pop_front();
+            next_reader_index_ = (reader_index + 1) % num_parallel_reads_;
+            cond_var_.notify_all();
+            TF_RETURN_IF_ERROR(result.status);
+            *out_tensors = std::move(result.out_tensors);
+            return absl::OkStatus();
+          }
+          if (!reader.done) {
+            all_done = false;
+            if (deterministic_) {
+              // Wait for the batch of this reader.
+              break;
+            }
+          }
+        }
+        if (all_done) {
+          *end_of_sequence = true;
+          return absl::OkStatus();
+        }
+        cond_var_.wait(*l);
+      }
+    }
+
+    // Reads the read units of the reader_index-th reader (see ReaderState) into
+    // readers_[reader_index], until they are all read, an error occurs or the
+    // iterator is destroyed.
+    void ReaderThread(
+        const std::shared_ptr<tensorflow::data::IteratorContext>& ctx,
+        const int reader_index) {
+      std::unique_ptr<ParquetReader> parquet_reader;
+      int unit_index = reader_index;
+      while (true) {
+        {
+          tensorflow::mutex_lock l(mu_);
+          while (!cancelled_ && readers_[reader_index].results.size() >=
+                                    kMaxBufferedBatchesPerReader) {
+            cond_var_.wait(l);
+          }
+          if (cancelled_) return;
+          if (unit_index >= read_units_.size()) {
+            readers_[reader_index].done = true;
+            cond_var_.notify_all();
+            return;
+          }
+        }
+        // Reads the next batch without holding the lock, so that the readers
+        // do their I/O and decoding in parallel.
+        ReadResult result;
+        if (!parquet_reader) {
+          result.status =
+              CreateParquetReader(read_units_[unit_index], &parquet_reader);
+        }
+        if (result.status.ok()) {
+          bool end_of_file = false;
+          std::vector<ParquetReader::ParentIndicesAndValues>
+              parent_indices_and_values;
+          result.status = parquet_reader->ReadMessages(
+              ctx.get(), &parent_indices_and_values, &end_of_file);
+          if (result.status.ok()) {
+            result.status = ToOutputTensors(
+                ctx.get(), &parent_indices_and_values, &result.out_tensors);
+          }
+          if (end_of_file) {
+            unit_index += num_parallel_reads_;
+            parquet_reader.reset();
+          }
+        }
+        tensorflow::mutex_lock l(mu_);
+        const bool ok = result.status.ok();
+        readers_[reader_index].results.push_back(std::move(result));
+        if (!ok) {
+          readers_[reader_index].done = true;
+        }
+        cond_var_.notify_all();
+        if (!ok) return;
+      }
+    }
 
+    // Converts the parent indices and values read from one batch of messages
+    // to the output tensors of GetNextInternal.
+    tensorflow::Status ToOutputTensors(
+        tensorflow::data::IteratorContext* ctx,
+        std::vector<ParquetReader::ParentIndicesAndValues>*
+            parent_indices_and_values_ptr,
+        std::vector<tensorflow::Tensor>* out_tensors) const {
+      std::vector<ParquetReader::ParentIndicesAndValues>&
+          parent_indices_and_values = *parent_indices_and_values_ptr;
       // pushes the number of messages read as the first output tensor.
       tensorflow::Tensor root_tensor(ctx->allocator({}), tensorflow::DT_INT64,
                                      {});
@@ -170,28 +357,20 @@ class Dataset : public tensorflow::data::DatasetBase {
       return absl::OkStatus();
     }
 
-   protected:
-    // TODO(b/139440495): Implement saving and restoring iterator state.
-    tensorflow::Status SaveInternal(
-        tensorflow::data::SerializationContext* ctx,
-        tensorflow::data::IteratorStateWriter* writer)
-    {
-      return tensorflow::errors::Unimplemented(
-          "Parquet Dataset Iterator does not support checkpointing.");
+    // Validates the file of a read unit, and creates a ParquetReader for it.
+    tensorflow::Status CreateParquetReader(
+        const ReadUnit& read_unit,
+        std::unique_ptr<ParquetReader>* parquet_reader) const {
+      const std::string& filename = filenames_[read_unit.file_index];
+      TF_RETURN_IF_ERROR(ValidateFileAndSchema(filename));
+      return ParquetReader::Create(filename, value_paths_, value_dtypes_,
+                                   batch_size_, read_unit.row_groups,
+                                   parquet_reader);
     }
 
-    tensorflow::Status RestoreInternal(
-        tensorflow::data::IteratorContext* ctx,
-        tensorflow::data::IteratorStateReader* reader)
-    {
-      return tensorflow::errors::Unimplemented(
-          "Parquet Dataset Iterator does not support checkpointing.");
-    }
-
-   private:
     // validates that the file exists and can be opened as a parquet file.
     // validates that the schema is the expected schema.
-    tensorflow::Status ValidateFileAndSchema(const std::string& filename) {
+    tensorflow::Status ValidateFileAndSchema(const std::string& filename) const {
       std::unique_ptr<parquet::ParquetFileReader> file_reader;
       tensorflow::Status s = OpenFileWithStatus(filename, &file_reader);
 
@@ -241,16 +420,29 @@ class Dataset : public tensorflow::data::DatasetBase {
     }
 
     const std::vector<std::string>& filenames_;
+    const std::vector<ReadUnit>& read_units_;
     const std::vector<std::string>& value_paths_;
     const tensorflow::DataTypeVector& value_dtypes_;
     const std::vector<std::vector<int>>& segregated_path_indices_;
     const tensorflow::int64 batch_size_;
-    int current_file_index_ ABSL_GUARDED_BY(mu_);
-    std::unique_ptr<ParquetReader> parquet_reader_ ABSL_GUARDED_BY(mu_);
+    const int num_parallel_reads_;
+    const bool deterministic_;
     tensorflow::mutex mu_;
+    // Used when num_parallel_reads_ == 1.
+    int current_unit_index_ ABSL_GUARDED_BY(mu_);
+    std::unique_ptr<ParquetReader> parquet_reader_ ABSL_GUARDED_BY(mu_);
+    // Used when num_parallel_reads_ > 1.
+    tensorflow::condition_variable cond_var_;
+    std::vector<ReaderState> readers_ ABSL_GUARDED_BY(mu_);
+    // The reader GetNextInternal tries first.
+    int next_reader_index_ ABSL_GUARDED_BY(mu_) = 0;
+    bool cancelled_ ABSL_GUARDED_BY(mu_) = false;
+    std::vector<std::unique_ptr<tensorflow::Thread>> reader_threads_;
   };
 
   const std::vector<std::string> filenames_;
+  // The parts of the files read one after the other by a ParquetReader.
+  const std::vector<ReadUnit> read_units_;
   const std::vector<std::string> value_paths_;
   const tensorflow::DataTypeVector value_dtypes_;
 
@@ -259,6 +451,11 @@ class Dataset : public tensorflow::data::DatasetBase {
   // the 0th field of the 1st path.
   const std::vector<std::vector<int>> segregated_path_indices_;
   const tensorflow::int64 batch_size_;
+  // The number of read units read in parallel.
+  const int num_parallel_reads_;
+  // If false, the batches of the files read in parallel may be returned out of
+  // order.
+  const bool deterministic_;
   const tensorflow::DataTypeVector output_dtypes_;
   const std::vector<tensorflow::PartialTensorShape> output_shapes_;
 };
@@ -273,6 +470,11 @@ class ParquetDatasetOp : public tensorflow::data::DatasetOpKernel {
                    ctx->GetAttr("parent_index_paths", &parent_index_paths_));
     OP_REQUIRES_OK(ctx, ctx->GetAttr("path_index", &path_index_));
     OP_REQUIRES_OK(ctx, ctx->GetAttr("batch_size", &batch_size_));
+    OP_REQUIRES_OK(ctx,
+                   ctx->GetAttr("num_parallel_reads", &num_parallel_reads_));
+    OP_REQUIRES_OK(ctx, ctx->GetAttr("deterministic", &deterministic_));
+    OP_REQUIRES_OK(ctx, ctx->GetAttr("row_group_splits", &row_group_splits_));
+    OP_REQUIRES_OK(ctx, ctx->GetAttr("row_groups", &row_groups_));
   }
 
   void MakeDataset(tensorflow::OpKernelContext* ctx,
@@ -286,6 +488,9 @@ class ParquetDatasetOp : public tensorflow::data::DatasetOpKernel {
       filenames.push_back(filenames_tensor->flat<tensorflow::tstring>()(i));
     }
 
+    std::vector<ReadUnit> read_units;
+    OP_REQUIRES_OK(ctx, CreateReadUnits(filenames.size(), &read_units));
+
     tensorflow::DataTypeVector output_dtypes = tensorflow::DataTypeVector();
 
     int column_counter = 0;
@@ -331,11 +536,56 @@ class ParquetDatasetOp : public tensorflow::data::DatasetOpKernel {
       }
     }
 
-    *output = new Dataset(ctx, filenames, value_paths_, value_dtypes_,
-                          segregated_path_indices, batch_size_, output_dtypes);
+    *output = new Dataset(ctx, filenames, read_units, value_paths_,
+                          value_dtypes_,
+                          segregated_path_indices, batch_size_, output_dtypes,
+                          num_parallel_reads_, deterministic_);
   }
 
  private:
+  // Splits the files into the read units of the dataset.
+  // Without row_group_splits_, each file is a read unit. Otherwise, the files
+  // are restricted to their selected row groups, and files without any are
+  // skipped. If num_parallel_reads_ > 1, each selected row group is then a
+  // read unit of its own, so that the row groups are read in parallel.
+  tensorflow::Status CreateReadUnits(
+      const int num_files, std::vector<ReadUnit>* read_units) const {
+    if (row_group_splits_.empty()) {
+      for (int i = 0; i < num_files; ++i) {
+        read_units->push_back(ReadUnit{i, {}});
+      }
+      return absl::OkStatus();
+    }
+    if (row_group_splits_.size() != num_files + 1 ||
+        row_group_splits_.front() != 0 ||
+        row_group_splits_.back() != row_groups_.size()) {
+      return tensorflow::errors::InvalidArgument(absl::StrCat(
+          "row_group_splits must have one more element than filenames (",
+          num_files, "), start at 0 and end at the number of row_groups (",
+          row_groups_.size(), ")"));
+    }
+    for (int i = 0; i < num_files; ++i) {
+      if (row_group_splits_[i] > row_group_splits_[i + 1]) {
+        return tensorflow::errors::InvalidArgument(
+            "row_group_splits must be non-decreasing");
+      }
+      const std::vector<int> row_groups(
+          row_groups_.begin() + row_group_splits_[i],
+          row_groups_.begin() + row_group_splits_[i + 1]);
+      if (row_groups.empty()) {
+        continue;
+      }
+      if (num_parallel_reads_ > 1) {
+        for (const int row_group : row_groups) {
+          read_units->push_back(ReadUnit{i, {row_group}});
+        }
+      } else {
+        read_units->push_back(ReadUnit{i, row_groups});
+      }
+    }
+    return absl::OkStatus();
+  }
+
   std::vector<std::string> value_paths_;
   tensorflow::DataTypeVector value_dtypes_;
 
@@ -344,6 +594,12 @@ class ParquetDatasetOp : public tensorflow::data::DatasetOpKernel {
   std::vector<std::string> parent_index_paths_;
   std::vector<int> path_index_;
   int batch_size_;
+  int num_parallel_reads_;
+  bool deterministic_;
+  // The row groups of filenames[i] to read are
+  // row_groups_[row_group_splits_[i]:row_group_splits_[i + 1]].
+  std::vector<int> row_group_splits_;
+  std::vector<int> row_groups_;
 };
 
 // Register the kernel implementation for ParquetDataset.
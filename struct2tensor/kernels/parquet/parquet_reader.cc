@@ -27,13 +27,13 @@ namespace internal {
 // A template class that wraps parquet's column reader.
 // This adds a peek functionality to parquet's ReadBatch.
 // This class also handles reading across row groups. That means that Peek will
-// always return the next level in the parquet file, until we have reached the
-// end of the file.
+// always return the next level in the requested row groups of the parquet
+// file, until we have reached the end of the last one.
 // This class is thread-compatible.
 // Sample usage to read all levels in a column:
 // auto pcr =
 // absl::make_unique<internal::PeekableColumnReader<parquet::Int32Type>>(
-//                                                   column_index, file_reader);
+//                                       column_index, row_groups, file_reader);
 // int16_t def_level;
 // int16_t rep_level;
 // while (pcr->PeekLevels(def_level, rep_level)) {
@@ -48,10 +48,11 @@ class PeekableColumnReader : public PeekableColumnReaderBase {
   // Returns an Internal error if the wrong number of levels is read.
   // Returns an OutOfRange error if the file is empty.
   static tensorflow::Status Create(
-      const int column_index, parquet::ParquetFileReader* file_reader,
+      const int column_index, const std::vector<int>& row_groups,
+      parquet::ParquetFileReader* file_reader,
       std::unique_ptr<PeekableColumnReader<ParquetDataType>>* pcr) {
-    *pcr = absl::WrapUnique(
-        new PeekableColumnReader<ParquetDataType>(column_index, file_reader));
+    *pcr = absl::WrapUnique(new PeekableColumnReader<ParquetDataType>(
+        column_index, row_groups, file_reader));
     TF_RETURN_IF_ERROR(pcr->get()->Advance());
     return absl::OkStatus();
   }
@@ -94,8 +95,9 @@ class PeekableColumnReader : public PeekableColumnReaderBase {
             column_reader_.get());
     while (!typed_column_reader || !typed_column_reader->HasNext()) {
       ++row_group_counter_;
-      if (row_group_counter_ < file_reader_->metadata()->num_row_groups()) {
-        row_group_reader_ = file_reader_->RowGroup(row_group_counter_);
+      if (row_group_counter_ < row_groups_.size()) {
+        row_group_reader_ =
+            file_reader_->RowGroup(row_groups_[row_group_counter_]);
         column_reader_ = row_group_reader_->Column(column_index_);
         typed_column_reader =
             static_cast<parquet::TypedColumnReader<ParquetDataType>*>(
@@ -123,8 +125,10 @@ class PeekableColumnReader : public PeekableColumnReaderBase {
   // the appropriate flags, if something went wrong. If the column was empty,
   // then end_of_column_ is set to true, and Peek() will always return false.
   PeekableColumnReader(const int column_index,
+                       const std::vector<int>& row_groups,
                        parquet::ParquetFileReader* file_reader)
       : column_index_(column_index),
+        row_groups_(row_groups),
         row_group_counter_(-1),
         end_of_column_(false),
         value_exists_(false),
@@ -133,6 +137,9 @@ class PeekableColumnReader : public PeekableColumnReaderBase {
         file_reader_(file_reader) {}
 
   const int column_index_;
+  // The indices of the row groups to read, in order.
+  const std::vector<int> row_groups_;
+  // The position in row_groups_ of the row group being read.
   int row_group_counter_;
   bool end_of_column_;
   bool value_exists_;
@@ -211,12 +218,13 @@ std::vector<ParentIndicesBuilder::RepetitionType> CreateRepetitionPattern(
 // Creates a peekable column reader, and appends it to peekable_column_readers.
 template <typename ParquetDataType>
 tensorflow::Status PopulatePeekableColumnReadersVector(
-    int column_index, parquet::ParquetFileReader* file_reader,
+    int column_index, const std::vector<int>& row_groups,
+    parquet::ParquetFileReader* file_reader,
     std::vector<std::unique_ptr<internal::PeekableColumnReaderBase>>*
         peekable_column_readers) {
   std::unique_ptr<internal::PeekableColumnReader<ParquetDataType>> pcr;
   TF_RETURN_IF_ERROR(internal::PeekableColumnReader<ParquetDataType>::Create(
-      column_index, file_reader, &pcr));
+      column_index, row_groups, file_reader, &pcr));
   peekable_column_readers->push_back(std::move(pcr));
   return absl::OkStatus();
 }
@@ -226,10 +234,37 @@ tensorflow::Status ParquetReader::Create(
     const tensorflow::DataTypeVector& value_dtypes,
     const tensorflow::int64 batch_size,
     std::unique_ptr<ParquetReader>* parquet_reader) {
+  return Create(filename, value_paths, value_dtypes, batch_size,
+                /*row_groups=*/{}, parquet_reader);
+}
+
+tensorflow::Status ParquetReader::Create(
+    const std::string& filename, const std::vector<std::string>& value_paths,
+    const tensorflow::DataTypeVector& value_dtypes,
+    const tensorflow::int64 batch_size, const std::vector<int>& row_groups,
+    std::unique_ptr<ParquetReader>* parquet_reader) {
   std::unique_ptr<parquet::ParquetFileReader> file_reader;
   TF_RETURN_IF_ERROR(OpenFileWithStatus(filename, &file_reader));
   // TODO(andylou) add handling of a metadata file, if it is provided.
 
+  const int num_row_groups = file_reader->metadata()->num_row_groups();
+  std::vector<int> row_groups_to_read = row_groups;
+  if (row_groups_to_read.empty()) {
+    for (int i = 0; i < num_row_groups; ++i) {
+      row_groups_to_read.push_back(i);
+    }
+  }
+  tensorflow::int64 num_rows = 0;
+  for (const int row_group : row_groups_to_read) {
+    if (row_group < 0 || row_group >= num_row_groups) {
+      return tensorflow::errors::InvalidArgument(
+          absl::StrCat("Row group ", row_group, " does not exist in ",
+                       filename, ", which has ", num_row_groups,
+                       " row groups"));
+    }
+    num_rows += file_reader->metadata()->RowGroup(row_group)->num_rows();
+  }
+
   std::vector<tensorflow::int64> column_indices;
   std::vector<std::unique_ptr<ParentIndicesBuilder>> parent_indices_builders;
   std::vector<int16_t> max_repetition_level;
@@ -258,37 +293,37 @@ tensorflow::Status ParquetReader::Create(
       case tensorflow::DT_INT32:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::Int32Type>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       case tensorflow::DT_INT64:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::Int64Type>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       case tensorflow::DT_FLOAT:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::FloatType>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       case tensorflow::DT_DOUBLE:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::DoubleType>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       case tensorflow::DT_BOOL:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::BooleanType>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       case tensorflow::DT_STRING:
         TF_RETURN_IF_ERROR(
             PopulatePeekableColumnReadersVector<parquet::ByteArrayType>(
-                column_indices[i], file_reader.get(),
+                column_indices[i], row_groups_to_read, file_reader.get(),
                 &peekable_column_readers));
         break;
       default:
@@ -299,7 +334,7 @@ tensorflow::Status ParquetReader::Create(
   }
 
   *parquet_reader = absl::WrapUnique(new ParquetReader(
-      value_paths, value_dtypes, batch_size, column_indices,
+      value_paths, value_dtypes, batch_size, column_indices, num_rows,
       std::move(file_reader), std::move(peekable_column_readers),
       std::move(parent_indices_builders)));
   return absl::OkStatus();
@@ -310,6 +345,7 @@ ParquetReader::ParquetReader(
     const tensorflow::DataTypeVector& value_dtypes,
     const tensorflow::int64 batch_size,
     const std::vector<tensorflow::int64>& column_indices,
+    const tensorflow::int64 num_rows,
     std::unique_ptr<parquet::ParquetFileReader> file_reader,
     std::vector<std::unique_ptr<internal::PeekableColumnReaderBase>>
         peekable_column_readers,
@@ -318,6 +354,7 @@ ParquetReader::ParquetReader(
       value_dtypes_(value_dtypes),
       batch_size_(batch_size),
       column_indices_(column_indices),
+      num_rows_(num_rows),
       file_reader_(std::move(file_reader)),
       peekable_column_readers_(std::move(peekable_column_readers)),
       parent_indices_builders_(std::move(parent_indices_builders)),
@@ -353,7 +390,7 @@ tensorflow::Status ParquetReader::ReadMessages(
     }
   }
   total_rows_read_ += prev_column_messages_read;
-  if (total_rows_read_ >= file_reader_->metadata()->num_rows()) {
+  if (total_rows_read_ >= num_rows_) {
     *end_of_file = true;
     return absl::OkStatus();
   }
@@ -60,6 +60,16 @@ class ParquetReader {
       const tensorflow::int64 batch_size,
       std::unique_ptr<ParquetReader>* parquet_reader);
 
+  // Same as above, but only reads the row groups of the file with the given
+  // indices, in the given order. Reads all the row groups if row_groups is
+  // empty.
+  // Returns an InvalidArgument error if a row group does not exist.
+  static tensorflow::Status Create(
+      const std::string& filename, const std::vector<std::string>& value_paths,
+      const tensorflow::DataTypeVector& value_dtypes,
+      const tensorflow::int64 batch_size, const std::vector<int>& row_groups,
+      std::unique_ptr<ParquetReader>* parquet_reader);
+
   ParquetReader& operator=(const ParquetReader&) = delete;
 
   ParquetReader(const ParquetReader&) = delete;
@@ -98,6 +108,7 @@ class ParquetReader {
                 const tensorflow::DataTypeVector& value_dtypes,
                 const tensorflow::int64 batch_size,
                 const std::vector<tensorflow::int64>& column_indices,
+                const tensorflow::int64 num_rows,
                 std::unique_ptr<parquet::ParquetFileReader> file_reader,
                 std::vector<std::unique_ptr<internal::PeekableColumnReaderBase>>
                     peekable_column_readers,
@@ -148,6 +159,9 @@ class ParquetReader {
   // 0th and 4th column in the parquet file.
   const std::vector<tensorflow::int64> column_indices_;
 
+  // The number of rows in the row groups to read.
+  const tensorflow::int64 num_rows_;
+
   std::unique_ptr<parquet::ParquetFileReader> file_reader_;
 
   // Vector of PeekableColumnReaderBase. We will static cast each
@@ -0,0 +1,264 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+// Ops that convert the parent indices of the nodes of a prensor into the row
+// splits of RaggedTensors, or the indices of SparseTensors. All the nodes are
+// converted in one call, so a node shared by many leaves is converted once.
+
+#include <algorithm>
+#include <vector>
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/op_kernel.h"
+#include "tensorflow/core/framework/tensor_shape.h"
+#include "tensorflow/core/framework/tensor_types.h"
+#include "tensorflow/core/platform/types.h"
+
+namespace struct2tensor {
+
+namespace {
+
+using ::tensorflow::DEVICE_CPU;
+using ::tensorflow::OpInputList;
+using ::tensorflow::OpKernel;
+using ::tensorflow::OpKernelConstruction;
+using ::tensorflow::OpKernelContext;
+using ::tensorflow::OpOutputList;
+using ::tensorflow::Status;
+using ::tensorflow::Tensor;
+using ::tensorflow::TensorShapeUtils;
+
+using ConstInt64Flat = tensorflow::TTypes<tensorflow::int64>::ConstFlat;
+
+// Checks that the parent of each node comes before it.
+Status ValidateParentIds(const std::vector<int>& parent_ids, int num_nodes) {
+  if (parent_ids.size() != num_nodes) {
+    return tensorflow::errors::InvalidArgument(
+        "parent_ids must have one element per node: ", parent_ids.size(),
+        " vs ", num_nodes);
+  }
+  for (int k = 0; k < num_nodes; ++k) {
+    if (parent_ids[k] < -1 || parent_ids[k] >= k) {
+      return tensorflow::errors::InvalidArgument(
+          "The parent of node ", k, " must come before it: ", parent_ids[k]);
+    }
+  }
+  return absl::OkStatus();
+}
+
+// The parent indices of the nodes of a prensor, with the size of the parent
+// of each node.
+class PrensorNodes {
+ public:
+  // Reads the inputs, and checks that each parent index is in range (and
+  // sorted, if check_sorted).
+  Status Init(OpKernelContext* context, const std::vector<int>& parent_ids,
+              bool check_sorted) {
+    const Tensor& root_size_tensor = context->input(0);
+    if (!TensorShapeUtils::IsScalar(root_size_tensor.shape())) {
+      return tensorflow::errors::InvalidArgument("root_size must be a scalar");
+    }
+    const int64_t root_size = root_size_tensor.scalar<tensorflow::int64>()();
+    OpInputList parent_indices;
+    TF_RETURN_IF_ERROR(context->input_list("parent_indices", &parent_indices));
+    TF_RETURN_IF_ERROR(ValidateParentIds(parent_ids, parent_indices.size()));
+    for (int k = 0; k < parent_indices.size(); ++k) {
+      if (!TensorShapeUtils::IsVector(parent_indices[k].shape())) {
+        return tensorflow::errors::InvalidArgument(
+            "parent_indices[", k, "] must be a vector");
+      }
+      parent_indices_.push_back(parent_indices[k].flat<tensorflow::int64>());
+      parent_sizes_.push_back(parent_ids[k] < 0
+                                  ? root_size
+                                  : parent_indices_[parent_ids[k]].size());
+    }
+    for (int k = 0; k < parent_indices_.size(); ++k) {
+      TF_RETURN_IF_ERROR(ValidateParentIndex(k, check_sorted));
+    }
+    return absl::OkStatus();
+  }
+
+  int num_nodes() const { return parent_indices_.size(); }
+
+  const ConstInt64Flat& parent_index(int k) const {
+    return parent_indices_[k];
+  }
+
+  int64_t parent_size(int k) const { return parent_sizes_[k]; }
+
+ private:
+  // Checks that the parent index of node k is in range, and sorted if
+  // check_sorted.
+  Status ValidateParentIndex(int k, bool check_sorted) const {
+    const ConstInt64Flat& parent_index = parent_indices_[k];
+    for (int64_t i = 0; i < parent_index.size(); ++i) {
+      const int64_t current = parent_index(i);
+      if (current < 0 || current >= parent_sizes_[k]) {
+        return tensorflow::errors::InvalidArgument(
+            "parent_indices[", k, "] has an index out of range: ", current,
+            " (the parent has size ", parent_sizes_[k], ")");
+      }
+      if (check_sorted && i > 0 && current < parent_index(i - 1)) {
+        return tensorflow::errors::InvalidArgument(
+            "parent_indices[", k, "] is not sorted at ", i);
+      }
+    }
+    return absl::OkStatus();
+  }
+
+  std::vector<ConstInt64Flat> parent_indices_;
+  std::vector<int64_t> parent_sizes_;
+};
+
+class PrensorRowSplitsOp : public OpKernel {
+ public:
+  explicit PrensorRowSplitsOp(OpKernelConstruction* context)
+      : OpKernel(context) {
+    OP_REQUIRES_OK(context, context->GetAttr("parent_ids", &parent_ids_));
+    OP_REQUIRES_OK(context, context->GetAttr("validate", &validate_));
+  }
+
+  void Compute(OpKernelContext* context) override {
+    PrensorNodes nodes;
+    OP_REQUIRES_OK(context, nodes.Init(context, parent_ids_, validate_));
+    OpOutputList row_splits;
+    OP_REQUIRES_OK(context, context->output_list("row_splits", &row_splits));
+    for (int k = 0; k < nodes.num_nodes(); ++k) {
+      const int64_t parent_size = nodes.parent_size(k);
+      Tensor* output_tensor = nullptr;
+      OP_REQUIRES_OK(context,
+                     row_splits.allocate(k, {parent_size + 1}, &output_tensor));
+      auto output = output_tensor->flat<tensorflow::int64>();
+      // The parent index is sorted, so the row splits are written in order.
+      // (If it is not, the row splits are still in range.)
+      const ConstInt64Flat& parent_index = nodes.parent_index(k);
+      const int64_t size = parent_index.size();
+      int64_t i = 0;
+      for (int64_t row = 0; row <= parent_size; ++row) {
+        while (i < size && parent_index(i) < row) {
+          ++i;
+        }
+        output(row) = i;
+      }
+    }
+  }
+
+ private:
+  std::vector<int> parent_ids_;
+  bool validate_;
+};
+
+REGISTER_KERNEL_BUILDER(Name("PrensorRowSplits").Device(DEVICE_CPU),
+                        PrensorRowSplitsOp);
+
+class PrensorSparseIndicesOp : public OpKernel {
+ public:
+  explicit PrensorSparseIndicesOp(OpKernelConstruction* context)
+      : OpKernel(context) {
+    OP_REQUIRES_OK(context, context->GetAttr("parent_ids", &parent_ids_));
+    OP_REQUIRES_OK(context, context->GetAttr("is_repeated", &is_repeated_));
+    OP_REQUIRES_OK(context, context->GetAttr("leaf_ids", &leaf_ids_));
+    OP_REQUIRES(context, is_repeated_.size() == parent_ids_.size(),
+                tensorflow::errors::InvalidArgument(
+                    "parent_ids and is_repeated must have the same length"));
+    for (int leaf_id : leaf_ids_) {
+      OP_REQUIRES(context, leaf_id >= 0 && leaf_id < parent_ids_.size(),
+                  tensorflow::errors::InvalidArgument("Invalid leaf id: ",
+                                                      leaf_id));
+    }
+  }
+
+  void Compute(OpKernelContext* context) override {
+    PrensorNodes nodes;
+    OP_REQUIRES_OK(context,
+                   nodes.Init(context, parent_ids_, /*check_sorted=*/false));
+
+    // The positional index of each repeated node, and the maximum size of
+    // each repeated node. These are computed once, and shared by the leaves.
+    std::vector<std::vector<int64_t>> positional_indices(nodes.num_nodes());
+    std::vector<int64_t> max_sizes(nodes.num_nodes(), 0);
+    for (int k = 0; k < nodes.num_nodes(); ++k) {
+      if (!is_repeated_[k]) {
+        continue;
+      }
+      const ConstInt64Flat& parent_index = nodes.parent_index(k);
+      std::vector<int64_t>& positional_index = positional_indices[k];
+      positional_index.resize(parent_index.size());
+      for (int64_t i = 0; i < parent_index.size(); ++i) {
+        positional_index[i] = (i > 0 && parent_index(i) == parent_index(i - 1))
+                                  ? positional_index[i - 1] + 1
+                                  : 0;
+        max_sizes[k] = std::max(max_sizes[k], positional_index[i] + 1);
+      }
+    }
+
+    OpOutputList indices;
+    OP_REQUIRES_OK(context, context->output_list("indices", &indices));
+    OpOutputList dense_shapes;
+    OP_REQUIRES_OK(context,
+                   context->output_list("dense_shapes", &dense_shapes));
+    for (int m = 0; m < leaf_ids_.size(); ++m) {
+      // The nodes from the leaf to the root (excluded).
+      std::vector<int> chain;
+      for (int k = leaf_ids_[m]; k >= 0; k = parent_ids_[k]) {
+        chain.push_back(k);
+      }
+      const int64_t rank =
+          1 + std::count_if(chain.begin(), chain.end(),
+                            [this](int k) { return is_repeated_[k]; });
+
+      Tensor* dense_shape_tensor = nullptr;
+      OP_REQUIRES_OK(context,
+                     dense_shapes.allocate(m, {rank}, &dense_shape_tensor));
+      auto dense_shape = dense_shape_tensor->flat<tensorflow::int64>();
+      dense_shape(0) = nodes.parent_size(chain.back());
+      int64_t column = rank - 1;
+      for (int k : chain) {
+        if (is_repeated_[k]) {
+          dense_shape(column--) = max_sizes[k];
+        }
+      }
+
+      const int64_t num_values = nodes.parent_index(leaf_ids_[m]).size();
+      Tensor* indices_tensor = nullptr;
+      OP_REQUIRES_OK(context, indices.allocate(m, {num_values, rank},
+                                               &indices_tensor));
+      auto output = indices_tensor->matrix<tensorflow::int64>();
+      // Each value walks up to the root, writing its indices from the last
+      // column to the first.
+      for (int64_t i = 0; i < num_values; ++i) {
+        int64_t index = i;
+        column = rank - 1;
+        for (int k : chain) {
+          if (is_repeated_[k]) {
+            output(i, column--) = positional_indices[k][index];
+          }
+          index = nodes.parent_index(k)(index);
+        }
+        output(i, 0) = index;
+      }
+    }
+  }
+
+ private:
+  std::vector<int> parent_ids_;
+  std::vector<bool> is_repeated_;
+  std::vector<int> leaf_ids_;
+};
+
+REGISTER_KERNEL_BUILDER(Name("PrensorSparseIndices").Device(DEVICE_CPU),
+                        PrensorSparseIndicesOp);
+
+}  // namespace
+}  // namespace struct2tensor
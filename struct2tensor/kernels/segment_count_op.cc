@@ -0,0 +1,88 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+// An op that, given a parent index and the number of parents, returns the
+// number of children of each parent.
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/op_kernel.h"
+#include "tensorflow/core/framework/tensor_shape.h"
+#include "tensorflow/core/framework/tensor_types.h"
+#include "tensorflow/core/platform/types.h"
+
+namespace struct2tensor {
+
+namespace {
+
+using ::tensorflow::DEVICE_CPU;
+using ::tensorflow::OpKernel;
+using ::tensorflow::OpKernelConstruction;
+using ::tensorflow::OpKernelContext;
+using ::tensorflow::Tensor;
+using ::tensorflow::TensorShapeUtils;
+
+class SegmentCountOp : public OpKernel {
+ public:
+  explicit SegmentCountOp(OpKernelConstruction* context) : OpKernel(context) {}
+
+  void Compute(OpKernelContext* context) override {
+    const Tensor& parent_index_tensor = context->input(0);
+    OP_REQUIRES(context, TensorShapeUtils::IsVector(parent_index_tensor.shape()),
+                tensorflow::errors::InvalidArgument(
+                    "parent_index must be a vector"));
+    const Tensor& num_parents_tensor = context->input(1);
+    OP_REQUIRES(context,
+                TensorShapeUtils::IsScalar(num_parents_tensor.shape()),
+                tensorflow::errors::InvalidArgument(
+                    "num_parents must be a scalar"));
+    const int64_t num_parents = num_parents_tensor.scalar<tensorflow::int64>()();
+    OP_REQUIRES(context, num_parents >= 0,
+                tensorflow::errors::InvalidArgument(
+                    "num_parents must not be negative: ", num_parents));
+
+    Tensor* output_tensor = nullptr;
+    OP_REQUIRES_OK(context,
+                   context->allocate_output(0, {num_parents}, &output_tensor));
+    auto output = output_tensor->flat<tensorflow::int64>();
+    output.setZero();
+
+    auto parent_index = parent_index_tensor.flat<tensorflow::int64>();
+    const int64_t parent_index_length = parent_index.size();
+    // Parent indices are sorted, so the children of a parent are a run. Each
+    // run is counted, and its size written once.
+    int64_t run_begin = 0;
+    while (run_begin < parent_index_length) {
+      const int64_t parent = parent_index(run_begin);
+      OP_REQUIRES(context, parent >= 0 && parent < num_parents,
+                  tensorflow::errors::InvalidArgument(
+                      "parent_index out of range: ", parent,
+                      " (num_parents: ", num_parents, ")"));
+      int64_t run_end = run_begin + 1;
+      while (run_end < parent_index_length &&
+             parent_index(run_end) == parent) {
+        ++run_end;
+      }
+      // Adds rather than assigns, so that unsorted input is also counted
+      // correctly.
+      output(parent) += run_end - run_begin;
+      run_begin = run_end;
+    }
+  }
+};
+
+REGISTER_KERNEL_BUILDER(Name("SegmentCount").Device(DEVICE_CPU),
+                        SegmentCountOp);
+
+}  // namespace
+}  // namespace struct2tensor
@@ -0,0 +1,109 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+// An op that, given a sorted parent index, slices the children of each parent,
+// returning the indices of the children kept (and their parent index).
+
+#include <algorithm>
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/op_kernel.h"
+#include "tensorflow/core/framework/tensor_shape.h"
+#include "tensorflow/core/framework/tensor_types.h"
+#include "tensorflow/core/platform/types.h"
+
+namespace struct2tensor {
+
+namespace {
+
+using ::tensorflow::DEVICE_CPU;
+using ::tensorflow::OpKernel;
+using ::tensorflow::OpKernelConstruction;
+using ::tensorflow::OpKernelContext;
+using ::tensorflow::Tensor;
+using ::tensorflow::TensorShapeUtils;
+
+// Converts a python slice bound into a position in [0, size].
+int64_t GetBound(int64_t bound, int64_t size) {
+  return std::clamp<int64_t>(bound >= 0 ? bound : size + bound, 0, size);
+}
+
+class SliceIndicesOp : public OpKernel {
+ public:
+  explicit SliceIndicesOp(OpKernelConstruction* context) : OpKernel(context) {}
+
+  void Compute(OpKernelContext* context) override {
+    const Tensor& parent_index_tensor = context->input(0);
+    OP_REQUIRES(context, TensorShapeUtils::IsVector(parent_index_tensor.shape()),
+                tensorflow::errors::InvalidArgument(
+                    "parent_index must be a vector"));
+    const Tensor& begin_tensor = context->input(1);
+    OP_REQUIRES(context, TensorShapeUtils::IsScalar(begin_tensor.shape()),
+                tensorflow::errors::InvalidArgument("begin must be a scalar"));
+    const Tensor& end_tensor = context->input(2);
+    OP_REQUIRES(context, TensorShapeUtils::IsScalar(end_tensor.shape()),
+                tensorflow::errors::InvalidArgument("end must be a scalar"));
+    const int64_t begin = begin_tensor.scalar<tensorflow::int64>()();
+    const int64_t end = end_tensor.scalar<tensorflow::int64>()();
+    auto parent_index = parent_index_tensor.flat<tensorflow::int64>();
+    const int64_t parent_index_length = parent_index.size();
+
+    // Parent indices are sorted, so the children of a parent are a run
+    // [run_begin, run_end), and the children kept are a subrange of the run.
+    // The first pass counts the children kept, and the second writes them.
+    auto for_each_kept_range = [&](auto fn) {
+      int64_t run_begin = 0;
+      while (run_begin < parent_index_length) {
+        int64_t run_end = run_begin + 1;
+        while (run_end < parent_index_length &&
+               parent_index(run_end) == parent_index(run_begin)) {
+          ++run_end;
+        }
+        const int64_t run_size = run_end - run_begin;
+        const int64_t keep_begin = GetBound(begin, run_size);
+        const int64_t keep_end = GetBound(end, run_size);
+        if (keep_begin < keep_end) {
+          fn(run_begin + keep_begin, run_begin + keep_end);
+        }
+        run_begin = run_end;
+      }
+    };
+
+    int64_t num_kept = 0;
+    for_each_kept_range(
+        [&num_kept](int64_t first, int64_t last) { num_kept += last - first; });
+
+    Tensor* new_parent_index_tensor = nullptr;
+    OP_REQUIRES_OK(context, context->allocate_output(
+                                0, {num_kept}, &new_parent_index_tensor));
+    Tensor* indices_to_keep_tensor = nullptr;
+    OP_REQUIRES_OK(context, context->allocate_output(
+                                1, {num_kept}, &indices_to_keep_tensor));
+    auto new_parent_index = new_parent_index_tensor->flat<tensorflow::int64>();
+    auto indices_to_keep = indices_to_keep_tensor->flat<tensorflow::int64>();
+    int64_t k = 0;
+    for_each_kept_range([&](int64_t first, int64_t last) {
+      for (int64_t i = first; i < last; ++i, ++k) {
+        new_parent_index(k) = parent_index(i);
+        indices_to_keep(k) = i;
+      }
+    });
+  }
+};
+
+REGISTER_KERNEL_BUILDER(Name("SliceIndices").Device(DEVICE_CPU),
+                        SliceIndicesOp);
+
+}  // namespace
+}  // namespace struct2tensor
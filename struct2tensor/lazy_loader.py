@@ -0,0 +1,63 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A module that is imported on first use.
+
+This is like tensorflow.python.util.lazy_loader.LazyLoader, without depending
+upon tensorflow. It is used to avoid import loops, and so that the modules
+needed to build and plan an expression graph (e.g. for calculate_numpy) do
+not import tensorflow until a tensor is created:
+
+```
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
+```
+"""
+
+import importlib
+import types
+from typing import Any, Dict, List
+
+
+class LazyLoader(types.ModuleType):
+  """Imports a module on first attribute access.
+
+  The module then replaces the LazyLoader in the globals of its user, so later
+  accesses go directly to the module.
+  """
+
+  def __init__(self, local_name: str, parent_module_globals: Dict[str, Any],
+               name: str):
+    """Creates a LazyLoader.
+
+    Args:
+      local_name: the name of the LazyLoader in parent_module_globals.
+      parent_module_globals: the globals() of the module using it.
+      name: the name of the module to import.
+    """
+    self._local_name = local_name
+    self._parent_module_globals = parent_module_globals
+    super().__init__(name)
+
+  def _load(self) -> types.ModuleType:
+    module = importlib.import_module(self.__name__)
+    self._parent_module_globals[self._local_name] = module
+    # Accesses through references to this LazyLoader (e.g. from another
+    # module) do not call __getattr__ again.
+    self.__dict__.update(module.__dict__)
+    return module
+
+  def __getattr__(self, item: str) -> Any:
+    return getattr(self._load(), item)
+
+  def __dir__(self) -> List[str]:
+    return dir(self._load())
@@ -0,0 +1,384 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The values of the nodes of a Prensor.
+
+A NodeTensor (RootNodeTensor, ChildNodeTensor or LeafNodeTensor) holds the
+tensors of one node of a Prensor. This module does not import tensorflow until
+a tensor is created, so that expressions can be built and planned without it
+(see calculate_numpy.py).
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Union
+
+from struct2tensor import lazy_loader
+
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
+struct2tensor_ops = lazy_loader.LazyLoader(
+    "struct2tensor_ops", globals(), "struct2tensor.ops.struct2tensor_ops")
+
+
+class RootNodeTensor(object):
+  """The value of the root."""
+
+  __slots__ = ["_size"]
+
+  def __init__(self, size: tf.Tensor):
+    """Creates a root node.
+
+    Args:
+      size: A scalar int64 tensor saying how many root objects there are.
+    """
+    self._size = size
+
+  @property
+  def size(self):
+    return self._size
+
+  @property
+  def is_repeated(self):
+    return True
+
+  def get_positional_index(self) -> tf.Tensor:
+    """Gets the positional index for this RootNodeTensor.
+
+    The positional index relative to the node's parent, and thus is always
+    monotonically increasing at step size 1 for a RootNodeTensor.
+
+    Returns:
+      A tensor of positional indices.
+    """
+    return tf.range(self.size)
+
+  def __str__(self):
+    return "RootNodeTensor"
+
+
+def _can_cache_op_on(t: tf.Tensor) -> bool:
+  """Returns True if an op created now on t can be used wherever t can.
+
+  An op created in a tf.function, a tf.cond branch or a while loop body cannot
+  be used outside of it, so it must not be cached on a node built outside.
+
+  Args:
+    t: the input of the op.
+  """
+  if tf.executing_eagerly():
+    return True
+  graph = tf.compat.v1.get_default_graph()
+  # An EagerTensor has no graph.
+  if getattr(t, "graph", None) is not graph:
+    return False
+  # pylint: disable=protected-access
+  return graph._get_control_flow_context() is t.op._get_control_flow_context()
+
+
+class _PositionalIndex(object):
+  """The positional index of a parent index, calculated on first use.
+
+  Nodes with the same parent index can share a _PositionalIndex, so that it is
+  only calculated once. It is not cached if it is calculated in another graph
+  or control flow context (e.g. in a tf.function) than the parent index.
+  """
+
+  __slots__ = ["_parent_index", "_value"]
+
+  def __init__(self, parent_index: tf.Tensor):
+    self._parent_index = parent_index
+    self._value = None
+
+  @property
+  def parent_index(self) -> tf.Tensor:
+    return self._parent_index
+
+  def get(self) -> tf.Tensor:
+    if self._value is not None:
+      return self._value
+    value = struct2tensor_ops.run_length_before(self._parent_index)
+    if _can_cache_op_on(self._parent_index):
+      self._value = value
+    return value
+
+
+class ChildNodeTensor(object):
+  """The value of an intermediate node."""
+
+  __slots__ = [
+      "_parent_index", "_is_repeated", "_index_to_value", "_positional_index"
+  ]
+
+  def __init__(self,
+               parent_index: tf.Tensor,
+               is_repeated: bool,
+               index_to_value: Optional[tf.Tensor] = None):
+    """Creates a child node.
+
+    Args:
+      parent_index: a 1-D int64 tensor where parent_index[i] represents the
+        parent index of the ith child.
+      is_repeated: a bool indicating if there can be more than one child per
+        parent.
+      index_to_value: a 1-D int64 tensor where index_to_value[i] represents the
+        `value` of the ith child. Where `value` is a subtree.
+    """
+    self._parent_index = parent_index
+    self._is_repeated = is_repeated
+    self._index_to_value = index_to_value
+    self._positional_index = _PositionalIndex(parent_index)
+
+  @property
+  def size(self):
+    """Returns the size, as if this was the root prensor.
+
+    Returns:
+      A scalar int64 tensor.
+    """
+    return tf.size(self._parent_index, out_type=tf.int64)
+
+  @property
+  def parent_index(self):
+    return self._parent_index
+
+  @property
+  def is_repeated(self):
+    return self._is_repeated
+
+  @property
+  def index_to_value(self):
+    return self._index_to_value
+
+  # LINT.IfChange(child_node_tensor)
+  def get_positional_index(self) -> tf.Tensor:
+    """Gets the positional index for this ChildNodeTensor.
+
+    The positional index tells us which index of the parent an element is.
+
+    For example, with the following parent indices: [0, 0, 2]
+    we would have positional index:
+    [
+      0, # The 0th element of the 0th parent.
+      1, # The 1st element of the 0th parent.
+      0  # The 0th element of the 2nd parent.
+    ].
+
+    For more information, view ops/run_length_before_op.cc
+
+    This is the same for Leaf NodeTensors.
+
+    The positional index is only calculated once (see share_positional_index).
+
+    Returns:
+      A tensor of positional indices.
+    """
+    return self._positional_index.get()
+  # LINT.ThenChange(:leaf_node_tensor)
+
+  def __str__(self):
+    cardinality = "repeated" if self.is_repeated else "optional"
+    return "{} ChildNodeTensor".format(cardinality)
+
+
+class LeafNodeTensor(object):
+  """The value of a leaf node."""
+
+  __slots__ = ["_parent_index", "_values", "_is_repeated", "_positional_index"]
+
+  def __init__(self, parent_index: tf.Tensor, values: tf.Tensor,
+               is_repeated: bool):
+    """Creates a LeafNodeTensor.
+
+    Args:
+      parent_index: a 1-D int64 tensor where parent_index[i] represents the
+        parent index of values[i]
+      values: a 1-D tensor of equal length to parent_index.
+      is_repeated: a bool indicating if there can be more than one child per
+        parent.
+    """
+    self._parent_index = parent_index
+    self._values = values
+    self._is_repeated = is_repeated
+    self._positional_index = _PositionalIndex(parent_index)
+
+  @property
+  def parent_index(self):
+    return self._parent_index
+
+  @property
+  def is_repeated(self):
+    return self._is_repeated
+
+  @property
+  def values(self):
+    return self._values
+
+  @property
+  def dtype(self) -> tf.DType:
+    """The dtype of the values."""
+    return self.values.dtype
+
+  # LINT.IfChange(leaf_node_tensor)
+  def get_positional_index(self) -> tf.Tensor:
+    """Gets the positional index for this LeafNodeTensor.
+
+    The positional index tells us which index of the parent an element is.
+
+    For example, with the following parent indices: [0, 0, 2]
+    we would have positional index:
+    [
+      0, # The 0th element of the 0th parent.
+      1, # The 1st element of the 0th parent.
+      0  # The 0th element of the 2nd parent.
+    ].
+
+    For more information, view ops/run_length_before_op.cc
+
+    This is the same for Child NodeTensors.
+
+    The positional index is only calculated once (see share_positional_index).
+
+    Returns:
+      A tensor of positional indices.
+    """
+    return self._positional_index.get()
+  # LINT.ThenChange(:child_node_tensor)
+
+  def __str__(self):
+    return "{} {}".format("repeated" if self.is_repeated else "optional",
+                          str(self.dtype))
+
+
+class IndexedLeafNodeTensor(LeafNodeTensor):
+  """A leaf node whose values are gathered from another tensor on demand.
+
+  values[i] is base_values[value_index[i]]. The gather is only done the first
+  time values is accessed, so that broadcasting a leaf (e.g. a long string) to
+  many nodes does not copy the values, unless they are needed. The gather is
+  not cached if it is done in another graph or control flow context (e.g. in a
+  tf.function) than value_index.
+  """
+
+  __slots__ = ["_base_values", "_value_index"]
+
+  def __init__(self, parent_index: tf.Tensor, base_values: tf.Tensor,
+               value_index: tf.Tensor, is_repeated: bool):
+    """Creates an IndexedLeafNodeTensor.
+
+    Args:
+      parent_index: a 1-D int64 tensor where parent_index[i] represents the
+        parent index of values[i]
+      base_values: a 1-D tensor that the values are gathered from.
+      value_index: a 1-D int64 tensor of equal length to parent_index, where
+        value_index[i] is the index of values[i] in base_values.
+      is_repeated: a bool indicating if there can be more than one child per
+        parent.
+    """
+    super().__init__(parent_index, None, is_repeated)
+    self._base_values = base_values
+    self._value_index = value_index
+
+  @property
+  def base_values(self) -> tf.Tensor:
+    return self._base_values
+
+  @property
+  def value_index(self) -> tf.Tensor:
+    return self._value_index
+
+  @property
+  def values(self):
+    if self._values is not None:
+      return self._values
+    values = tf.gather(self._base_values, self._value_index)
+    if _can_cache_op_on(self._value_index):
+      self._values = values
+    return values
+
+  @property
+  def dtype(self) -> tf.DType:
+    return self._base_values.dtype
+
+
+def share_positional_index(
+    source: Union[ChildNodeTensor, LeafNodeTensor],
+    node: Union[ChildNodeTensor, LeafNodeTensor]) -> None:
+  """Makes node share the positional index of source.
+
+  After this, the positional index is calculated at most once for both nodes,
+  no matter which of them gets it first.
+
+  Args:
+    source: a node.
+    node: a node with the same parent_index tensor as source.
+
+  Raises:
+    ValueError: if the parent indices are not the same tensor.
+  """
+  if node.parent_index is not source.parent_index:
+    raise ValueError("Can only share the positional index of the same "
+                     "parent index")
+  node._positional_index = source._positional_index  # pylint: disable=protected-access
+
+
+def gather_leaf_node(leaf: LeafNodeTensor, index: tf.Tensor,
+                     parent_index: tf.Tensor,
+                     is_repeated: bool) -> LeafNodeTensor:
+  """Creates a leaf with values leaf.values[index], deferring the gather.
+
+  If leaf is an IndexedLeafNodeTensor, the indices are composed, and the values
+  of leaf are not gathered.
+
+  Args:
+    leaf: the leaf to gather the values from.
+    index: a 1-D int64 tensor of indices into leaf.values.
+    parent_index: the parent index of the new leaf.
+    is_repeated: whether the new leaf is repeated.
+
+  Returns:
+    A new IndexedLeafNodeTensor.
+  """
+  if isinstance(leaf, IndexedLeafNodeTensor):
+    return IndexedLeafNodeTensor(parent_index, leaf.base_values,
+                                 tf.gather(leaf.value_index, index),
+                                 is_repeated)
+  return IndexedLeafNodeTensor(parent_index, leaf.values, index, is_repeated)
+
+
+def reparent_leaf_node(leaf: LeafNodeTensor, parent_index: tf.Tensor,
+                       is_repeated: bool) -> LeafNodeTensor:
+  """Creates a leaf with the values of leaf and a new parent index.
+
+  If leaf is an IndexedLeafNodeTensor, its values are not gathered.
+
+  Args:
+    leaf: the leaf with the values.
+    parent_index: the parent index of the new leaf.
+    is_repeated: whether the new leaf is repeated.
+
+  Returns:
+    A new LeafNodeTensor.
+  """
+  if isinstance(leaf, IndexedLeafNodeTensor):
+    return IndexedLeafNodeTensor(parent_index, leaf.base_values,
+                                 leaf.value_index, is_repeated)
+  return LeafNodeTensor(parent_index, leaf.values, is_repeated)
+
+
+def create_required_leaf_node(values: tf.Tensor) -> LeafNodeTensor:
+  """Create a required leaf node."""
+  return LeafNodeTensor(
+      tf.range(tf.size(values, out_type=tf.int64)), values, False)
+
+
+NodeTensor = Union[LeafNodeTensor, ChildNodeTensor, RootNodeTensor]  # pylint: disable=invalid-name
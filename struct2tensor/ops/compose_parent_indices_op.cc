@@ -0,0 +1,44 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/shape_inference.h"
+
+REGISTER_OP("ComposeParentIndices")
+    .Input("parent_indices: N * int64")
+    .Output("composed_parent_index: int64")
+    .Attr("N: int >= 1")
+    .SetShapeFn([](::tensorflow::shape_inference::InferenceContext* context) {
+      context->set_output(0, context->input(0));
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+The `compose_parent_indices` op, given the parent indices [p_0,...,p_{N-1}] of
+a node and of N-1 of its ancestors (starting with the parent), returns:
+  composed_parent_index[i] := p_{N-1}[...p_1[p_0[i]]...]
+i.e. the index of the Nth ancestor of each element of the node.
+
+This promotes a field across N-1 levels at once, without creating the parent
+index of each intermediate level.
+
+For example:
+  parent_indices: [[0, 1, 1, 2], [0, 0, 1], [0, 1]]
+  output: [0, 0, 0, 1]
+
+parent_indices: int64 vectors, where the elements of parent_indices[i] are
+  indices of parent_indices[i+1] (for i < N-1).
+composed_parent_index: a vector of the same size as parent_indices[0].
+
+)doc");
@@ -186,3 +186,119 @@ REGISTER_OP("DecodeProtoSparseV2")
 
       return absl::OkStatus();
     });
+
+// Decodes a subtree of fields, possibly at different depths, from serialized
+// protos in a single pass. See DecodeProtoSparseV4 for the representation of
+// each field.
+REGISTER_OP("DecodeProtoSubtree")
+    .Input("bytes: string")
+    .Attr("message_type: string")
+    .Attr("node_field_names: list(string)")
+    .Attr("node_parents: list(int)")
+    .Attr("num_nodes: int")
+    .Attr("serialized_nodes: list(int) = []")
+    .Attr("output_types: list(type) >= 0")
+    .Attr("descriptor_literal: string = ''")
+    .Attr("honor_proto3_optional_semantics: bool = false")
+    .Output("values: output_types")
+    .Output("indices: num_nodes * int64")
+    .SetShapeFn([](InferenceContext* c) {
+      std::vector<tensorflow::DataType> output_types;
+      TF_RETURN_IF_ERROR(c->GetAttr("output_types", &output_types));
+      int num_nodes;
+      TF_RETURN_IF_ERROR(c->GetAttr("num_nodes", &num_nodes));
+
+      for (int i = 0; i < output_types.size() + num_nodes; ++i) {
+        c->set_output(i, c->Vector(c->UnknownDim()));
+      }
+
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+The `decode_proto_subtree` op extracts a subtree of fields from serialized
+binary protocol buffers, walking the wire bytes only once. Where
+`decode_proto_sparse` has to be applied once per level of the tree (and
+materializes the serialized submessages of every intermediate level), this op
+recurses into the requested submessages directly.
+
+The requested fields are the nodes of a tree rooted at `message_type`. Node i
+is the field `node_field_names[i]` of the message represented by node
+`node_parents[i]`, or of `message_type` if `node_parents[i]` is -1. A node must
+come after its parent.
+
+A node whose field is a submessage or a group only produces its parent index
+tensor: its bytes are recursed into (or skipped), never copied. The other nodes
+(the leaves) produce both a value tensor and a parent index tensor. The parent
+indices of a node refer to the position of the submessage in its parent node
+(or of the message in `bytes` for the top-level fields), so that the outputs
+are the same as the ones obtained by applying `decode_proto_sparse` level by
+level.
+
+The submessage nodes in `serialized_nodes` are leaves too: their values are
+copies of the serialized submessages, for consumers that need the bytes (e.g.,
+to transform them, or to decode them with `decode_proto_sparse`). They cannot
+have children.
+
+MessageSet extensions are not supported.
+
+bytes: tensor of serialized protos with shape `batch_shape`.
+message_type: name of the proto message type to decode.
+node_field_names: the field name of each node.
+node_parents: the index of the parent node of each node, or -1.
+num_nodes: len(node_field_names)
+serialized_nodes: the submessage nodes decoded into serialized submessages.
+output_types: the TF types of the leaf nodes, in node order.
+descriptor_literal: a serialized `proto2.FileDescriptorSet`.
+values: the values of the leaf nodes, in node order.
+indices: the parent indices of each node, in node order.
+
+)doc");
+
+// A dataset of batches of protos read from TFRecord files, where each batch is
+// decoded like DecodeProtoSubtree.
+REGISTER_OP("ProtoRecordDataset")
+    .Input("filenames: string")
+    .Input("compression_type: string")
+    .Attr("batch_size: int >= 1")
+    .Attr("message_type: string")
+    .Attr("node_field_names: list(string)")
+    .Attr("node_parents: list(int)")
+    .Attr("num_nodes: int")
+    .Attr("output_types: list(type) >= 0")
+    .Attr("descriptor_literal: string = ''")
+    .Attr("honor_proto3_optional_semantics: bool = false")
+    .Output("handle: variant")
+    .SetIsStateful()  // Source dataset ops must be marked stateful to inhibit
+                      // constant folding.
+    .SetShapeFn([](InferenceContext* c) {
+      tensorflow::shape_inference::ShapeHandle unused;
+      // `filenames` must be a scalar or a vector.
+      TF_RETURN_IF_ERROR(c->WithRankAtMost(c->input(0), 1, &unused));
+      // `compression_type` must be a scalar.
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(1), 0, &unused));
+      c->set_output(0, c->Scalar());
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+Creates a dataset of the protos of type `message_type` stored in TFRecord files.
+The records are decoded as they are read, straight into the outputs of
+`decode_proto_subtree` (see there for the meaning of the nodes), without
+batching them into a string tensor first.
+
+Each element of the dataset represents `batch_size` protos (or fewer at the
+end) as the components of a prensor: first the number of protos (an int64
+scalar), then, for each node in order, its parent indices and, for a leaf
+node, its values. For the components to match a prensor type spec, the nodes
+must be in pre-order, in the order of the children of the type spec.
+
+filenames: the TFRecord files to read, one after the other.
+compression_type: the compression of the files: "", "ZLIB" or "GZIP".
+batch_size: the number of protos in each element.
+message_type: name of the proto message type to decode.
+node_field_names: the field name of each node.
+node_parents: the index of the parent node of each node, or -1.
+num_nodes: len(node_field_names)
+output_types: the TF types of the leaf nodes, in node order.
+descriptor_literal: a serialized `proto2.FileDescriptorSet`.
+
+)doc");
@@ -19,8 +19,13 @@
 3. It orders the file descriptors so that earlier file descriptors don't depend
    upon later ones (fails on circular dependencies but that won't happen).
 4. It serializes the file descriptors into a FileDescriptorSet.
+
+get_file_descriptor_set_literal() returns the same FileDescriptorSet,
+serialized. As the ops take it as an attr, it is cached: see
+descriptor_literal_cache_info().
 """
-from typing import Sequence, Set
+import functools
+from typing import FrozenSet, Sequence, Set
 
 from struct2tensor import path
 
@@ -136,3 +141,48 @@ def get_file_descriptor_set_proto(
       _order_dependencies(
           _get_dependencies_recursively(
               _get_initial_file_descriptor_set(descriptor_type, field_names))))
+
+
+# The maximum number of serialized FileDescriptorSets cached by
+# get_file_descriptor_set_literal().
+_DESCRIPTOR_LITERAL_CACHE_SIZE = 1024
+
+
+def get_file_descriptor_set_literal(descriptor_type: descriptor.Descriptor,
+                                    field_names: Sequence[str]) -> bytes:
+  """Returns get_file_descriptor_set_proto(...) serialized.
+
+  The result only depends upon the descriptor_type and the extensions in
+  field_names, and is cached (in a bounded LRU cache).
+
+  Args:
+    descriptor_type: the type to be parsed.
+    field_names: fields to be parsed.
+  """
+  extension_names = frozenset(
+      field_name for field_name in field_names if path.is_extension(field_name))
+  return _get_file_descriptor_set_literal(descriptor_type.file.pool,
+                                          descriptor_type.full_name,
+                                          extension_names)
+
+
+def descriptor_literal_cache_info():
+  """Returns the hits, misses, maxsize and currsize of the literal cache."""
+  return _get_file_descriptor_set_literal.cache_info()
+
+
+def clear_descriptor_literal_cache() -> None:
+  """Clears the cache of get_file_descriptor_set_literal()."""
+  _get_file_descriptor_set_literal.cache_clear()
+
+
+@functools.lru_cache(maxsize=_DESCRIPTOR_LITERAL_CACHE_SIZE)
+def _get_file_descriptor_set_literal(pool,
+                                     full_name: str,
+                                     extension_names: FrozenSet[str]) -> bytes:
+  """Implementation of get_file_descriptor_set_literal(...)."""
+  # The cache is keyed by the pool (and not by the descriptor), as the
+  # descriptors of a pool can be distinct objects for the same type.
+  descriptor_type = pool.FindMessageTypeByName(full_name)
+  return get_file_descriptor_set_proto(
+      descriptor_type, sorted(extension_names)).SerializeToString()
@@ -40,6 +40,35 @@ class FileDescriptorSetTest(absltest.TestCase):
         file_set_proto.file[0].name,
         _get_base_directory() + "struct2tensor/test/test_map.proto")
 
+  def test_get_file_descriptor_set_literal(self):
+    file_descriptor_set.clear_descriptor_literal_cache()
+    field_names = ["(struct2tensor.test.MyExternalExtension.ext)", "age"]
+    literal = file_descriptor_set.get_file_descriptor_set_literal(
+        test_pb2.UserInfo.DESCRIPTOR, field_names)
+    self.assertEqual(
+        literal,
+        file_descriptor_set.get_file_descriptor_set_proto(
+            test_pb2.UserInfo.DESCRIPTOR, field_names).SerializeToString())
+    cache_info = file_descriptor_set.descriptor_literal_cache_info()
+    self.assertEqual(cache_info.hits, 0)
+    self.assertEqual(cache_info.misses, 1)
+
+    # Regular fields do not change the literal.
+    self.assertEqual(
+        literal,
+        file_descriptor_set.get_file_descriptor_set_literal(
+            test_pb2.UserInfo.DESCRIPTOR,
+            ["friends", "(struct2tensor.test.MyExternalExtension.ext)"]))
+    cache_info = file_descriptor_set.descriptor_literal_cache_info()
+    self.assertEqual(cache_info.hits, 1)
+    self.assertEqual(cache_info.misses, 1)
+
+    file_descriptor_set.get_file_descriptor_set_literal(
+        test_pb2.UserInfo.DESCRIPTOR, [])
+    cache_info = file_descriptor_set.descriptor_literal_cache_info()
+    self.assertEqual(cache_info.hits, 1)
+    self.assertEqual(cache_info.misses, 2)
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -11,13 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Wrapper for _decode_proto_map_op.so."""
+"""Wrapper for the map ops of _decode_proto_op.so."""
 
-from tensorflow.python.framework import load_library
-from tensorflow.python.platform import resource_loader
+from struct2tensor.ops import lazy_op_library
 
-decode_proto_map_module = load_library.load_op_library(
-    resource_loader.get_path_to_datafile('_decode_proto_map_op.so'))
-
-decode_proto_map = decode_proto_map_module.decode_proto_map
-decode_proto_map_v2 = decode_proto_map_module.decode_proto_map_v2
+__getattr__ = lazy_op_library.create_module_getattr(
+    '_decode_proto_op.so', 'decode_proto_map_module', [
+        'decode_proto_map',
+        'decode_proto_map_v2',
+    ])
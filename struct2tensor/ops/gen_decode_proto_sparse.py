@@ -11,14 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Wrapper for _decode_proto_sparse_op.so."""
+"""Wrapper for the sparse ops of _decode_proto_op.so."""
 
-from tensorflow.python.framework import load_library
-from tensorflow.python.platform import resource_loader
+from struct2tensor.ops import lazy_op_library
 
-decode_proto_sparse_module = load_library.load_op_library(
-    resource_loader.get_path_to_datafile('_decode_proto_sparse_op.so'))
-
-decode_proto_sparse_v2 = decode_proto_sparse_module.decode_proto_sparse_v2
-decode_proto_sparse_v3 = decode_proto_sparse_module.decode_proto_sparse_v3
-decode_proto_sparse_v4 = decode_proto_sparse_module.decode_proto_sparse_v4
+__getattr__ = lazy_op_library.create_module_getattr(
+    '_decode_proto_op.so', 'decode_proto_sparse_module', [
+        'decode_proto_sparse_v2',
+        'decode_proto_sparse_v3',
+        'decode_proto_sparse_v4',
+        'decode_proto_subtree',
+        'proto_record_dataset',
+    ])
@@ -13,9 +13,9 @@
 # limitations under the License.
 """Wrapper for _equi_join_indices_op.so."""
 
-from tensorflow.python.framework import load_library
-from tensorflow.python.platform import resource_loader
+from struct2tensor.ops import lazy_op_library
 
-equi_join_indices_module = load_library.load_op_library(
-    resource_loader.get_path_to_datafile('_equi_join_indices_op.so'))
-equi_join_indices = equi_join_indices_module.equi_join_indices
+__getattr__ = lazy_op_library.create_module_getattr(
+    '_equi_join_indices_op.so', 'equi_join_indices_module', [
+        'equi_join_indices',
+    ])
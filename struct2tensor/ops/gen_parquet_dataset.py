@@ -13,10 +13,9 @@
 # limitations under the License.
 """Wrapper for _parquet_dataset_op.so."""
 
-from tensorflow.python.framework import load_library
-from tensorflow.python.platform import resource_loader
+from struct2tensor.ops import lazy_op_library
 
-parquet_dataset_module = load_library.load_op_library(
-    resource_loader.get_path_to_datafile('_parquet_dataset_op.so'))
-
-parquet_dataset = parquet_dataset_module.parquet_dataset
+__getattr__ = lazy_op_library.create_module_getattr(
+    '_parquet_dataset_op.so', 'parquet_dataset_module', [
+        'parquet_dataset',
+    ])
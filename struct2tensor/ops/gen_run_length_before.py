@@ -13,9 +13,9 @@
 # limitations under the License.
 """Wrapper for _run_length_before_op.so."""
 
-from tensorflow.python.framework import load_library
-from tensorflow.python.platform import resource_loader
+from struct2tensor.ops import lazy_op_library
 
-run_length_before_module = load_library.load_op_library(
-    resource_loader.get_path_to_datafile('_run_length_before_op.so'))
-run_length_before = run_length_before_module.run_length_before
+__getattr__ = lazy_op_library.create_module_getattr(
+    '_run_length_before_op.so', 'run_length_before_module', [
+        'run_length_before',
+    ])
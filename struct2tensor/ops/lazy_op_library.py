@@ -0,0 +1,89 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Loads the custom op libraries of struct2tensor on first use.
+
+Loading an op library (and tensorflow itself) is expensive. The gen_*.py
+wrappers use create_module_getattr, so that a library is only loaded when one
+of its ops is first accessed:
+
+```
+__getattr__ = lazy_op_library.create_module_getattr(
+    "_run_length_before_op.so", "run_length_before_module",
+    ["run_length_before"])
+```
+"""
+
+import threading
+from typing import Any, Callable, Dict, Sequence
+
+
+class _LazyOpLibrary(object):
+  """An op library that is loaded the first time it is needed."""
+
+  def __init__(self, filename: str):
+    """Creates a _LazyOpLibrary.
+
+    Args:
+      filename: the name of the library, relative to this directory.
+    """
+    self._filename = filename
+    self._module = None
+    self._lock = threading.Lock()
+
+  def get(self) -> Any:
+    """Returns the python module of the library, loading it if needed."""
+    with self._lock:
+      if self._module is None:
+        # pylint: disable=g-import-not-at-top,g-direct-tensorflow-import
+        from tensorflow.python.framework import load_library
+        from tensorflow.python.platform import resource_loader
+        # pylint: enable=g-import-not-at-top,g-direct-tensorflow-import
+        self._module = load_library.load_op_library(
+            resource_loader.get_path_to_datafile(self._filename))
+      return self._module
+
+
+# The library of each filename. Several gen_*.py wrappers can wrap the ops of one
+# library (e.g. _decode_proto_op.so), which is then loaded once.
+_libraries = {}  # type: Dict[str, _LazyOpLibrary]
+_libraries_lock = threading.Lock()
+
+
+def create_module_getattr(filename: str, module_name: str,
+                          op_names: Sequence[str]) -> Callable[[str], Any]:
+  """Creates the module-level __getattr__ of a gen_*.py wrapper.
+
+  Args:
+    filename: the name of the op library, relative to this directory.
+    module_name: the attribute that resolves to the loaded library.
+    op_names: the attributes that resolve to the ops of the library.
+
+  Returns:
+    A __getattr__ function that loads the library on first use.
+  """
+  with _libraries_lock:
+    library = _libraries.get(filename)
+    if library is None:
+      library = _LazyOpLibrary(filename)
+      _libraries[filename] = library
+  op_names = frozenset(op_names)
+
+  def module_getattr(name: str) -> Any:
+    if name == module_name:
+      return library.get()
+    if name in op_names:
+      return getattr(library.get(), name)
+    raise AttributeError("{} has no attribute {}".format(filename, name))
+
+  return module_getattr
@@ -26,8 +26,15 @@ TEST(OpAndKernelRegistrationTest, Struct2TensorOpsAndKernelsAreRegistered) {
     "EquiJoinIndices",
     "EquiJoinAnyIndices",
     "DecodeProtoSparseV3",
+    "DecodeProtoSubtree",
     "RunLengthBefore",
+    "ComposeParentIndices",
+    "SegmentCount",
+    "SliceIndices",
+    "PrensorRowSplits",
+    "PrensorSparseIndices",
     "ParquetDataset",
+    "ProtoRecordDataset",
   };
 
   const auto* global_op_registry = tensorflow::OpRegistry::Global();
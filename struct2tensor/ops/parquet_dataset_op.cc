@@ -25,6 +25,10 @@ REGISTER_OP("ParquetDataset")
     .Attr("parent_index_paths: list(string) >= 1")
     .Attr("path_index: list(int) >= 1")
     .Attr("batch_size: int = 1")  // TODO(andylou) add a metadata_filename Attr.
+    .Attr("num_parallel_reads: int >= 1 = 1")
+    .Attr("deterministic: bool = true")
+    .Attr("row_group_splits: list(int) = []")
+    .Attr("row_groups: list(int) = []")
     .Output("handle: variant")
     .SetIsStateful()  // TODO(b/123753214): Source dataset ops must be marked
                       // stateful to inhibit constant folding.
@@ -82,6 +86,22 @@ i-th element of parent_index_paths.
 batch_size: An optional int that determines how many messages are parsed into
 one prensor tree in an iteration. If there are fewer than batch_size
 remaining messages, then all remaining messages will be returned.
+num_parallel_reads: An optional int that determines how many files are read in
+parallel. The i-th of the num_parallel_reads readers reads the files
+filenames[i], filenames[i + num_parallel_reads], ... one after the other, in
+a background thread (see row_group_splits for reading row groups in parallel).
+deterministic: An optional bool, only used if num_parallel_reads > 1. If true,
+the readers take turns to return a batch, so the order of the batches only
+depends on the files. If false, the batches are returned in the order they are
+read, which avoids waiting on a slow file.
+row_group_splits: An optional list of ints, either empty or with one more
+element than filenames. If set, only the row groups
+row_groups[row_group_splits[i]:row_group_splits[i + 1]] of filenames[i] are
+read, and the other row groups are skipped. If num_parallel_reads > 1, the
+selected row groups (instead of the files) are read in parallel, and a batch
+does not span several row groups.
+row_groups: An optional list of ints: the indices of the row groups to read
+in each file. See row_group_splits.
 
 For example: If we have a group of sharded parquet files, and a metadata file,
 we would pass them in as
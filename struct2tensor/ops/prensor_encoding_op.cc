@@ -0,0 +1,119 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+
+#include <vector>
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/shape_inference.h"
+
+using tensorflow::shape_inference::InferenceContext;
+
+REGISTER_OP("PrensorRowSplits")
+    .Input("root_size: int64")
+    .Input("parent_indices: N * int64")
+    .Output("row_splits: N * int64")
+    .Attr("N: int >= 1")
+    .Attr("parent_ids: list(int)")
+    .Attr("validate: bool = true")
+    .SetShapeFn([](InferenceContext* c) {
+      for (int i = 0; i < c->num_outputs(); ++i) {
+        c->set_output(i, c->Vector(InferenceContext::kUnknownDim));
+      }
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+Computes the row splits of the nodes of a prensor in one pass.
+
+The nodes (excluding the root) are described by their parent indices, and by
+parent_ids: parent_ids[k] is the position in parent_indices of the parent of
+node k, or -1 if its parent is the root. A parent must come before its
+children.
+
+row_splits[k] are the row splits of node k relative to its parent, i.e. the
+children of the jth parent are [row_splits[k][j], row_splits[k][j+1]). A leaf
+RaggedTensor is then tf.RaggedTensor.from_nested_row_splits(values,
+[row_splits of the nodes from the root to the leaf]).
+
+root_size: the number of roots.
+parent_indices: the parent index of each node. Each must be sorted.
+validate: if true, fails if a parent index is not sorted. Otherwise, the
+  row splits of an unsorted parent index are undefined.
+row_splits: for each node, a vector of length (size of the parent) + 1.
+)doc");
+
+REGISTER_OP("PrensorSparseIndices")
+    .Input("root_size: int64")
+    .Input("parent_indices: N * int64")
+    .Output("indices: num_leaves * int64")
+    .Output("dense_shapes: num_leaves * int64")
+    .Attr("N: int >= 1")
+    .Attr("num_leaves: int >= 1")
+    .Attr("parent_ids: list(int)")
+    .Attr("is_repeated: list(bool)")
+    .Attr("leaf_ids: list(int)")
+    .SetShapeFn([](InferenceContext* c) {
+      std::vector<int> parent_ids;
+      TF_RETURN_IF_ERROR(c->GetAttr("parent_ids", &parent_ids));
+      std::vector<bool> is_repeated;
+      TF_RETURN_IF_ERROR(c->GetAttr("is_repeated", &is_repeated));
+      std::vector<int> leaf_ids;
+      TF_RETURN_IF_ERROR(c->GetAttr("leaf_ids", &leaf_ids));
+      const int num_nodes = parent_ids.size();
+      if (is_repeated.size() != num_nodes) {
+        return tensorflow::errors::InvalidArgument(
+            "parent_ids and is_repeated must have the same length");
+      }
+      for (int k = 0; k < num_nodes; ++k) {
+        if (parent_ids[k] < -1 || parent_ids[k] >= k) {
+          return tensorflow::errors::InvalidArgument(
+              "The parent of node ", k, " must come before it: ",
+              parent_ids[k]);
+        }
+      }
+      const int num_leaves = leaf_ids.size();
+      for (int m = 0; m < num_leaves; ++m) {
+        if (leaf_ids[m] < 0 || leaf_ids[m] >= num_nodes) {
+          return tensorflow::errors::InvalidArgument("Invalid leaf id: ",
+                                                     leaf_ids[m]);
+        }
+        // The rank is 1 (for the root) + the number of repeated nodes from the
+        // root to the leaf.
+        int rank = 1;
+        for (int k = leaf_ids[m]; k >= 0; k = parent_ids[k]) {
+          if (is_repeated[k]) {
+            ++rank;
+          }
+        }
+        c->set_output(m, c->Matrix(InferenceContext::kUnknownDim, rank));
+        c->set_output(num_leaves + m, c->Vector(rank));
+      }
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+Computes the indices and dense shapes of the SparseTensors of the leaves of a
+prensor in one pass.
+
+The nodes (excluding the root) are described as in PrensorRowSplits. The
+indices of leaf_ids[m] are its Dewey encoding: the index of the root, followed
+by the positional index of each repeated node from the root to the leaf.
+Optional nodes do not add a dimension. dense_shapes[m] is the root size,
+followed by the maximum size of each repeated node.
+
+root_size: the number of roots.
+parent_indices: the parent index of each node. If one is not sorted, the
+  indices are undefined.
+indices: for each leaf, a matrix with a row per value of the leaf.
+dense_shapes: for each leaf, the dense shape of its SparseTensor.
+)doc");
@@ -0,0 +1,48 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/shape_inference.h"
+
+using tensorflow::shape_inference::InferenceContext;
+using tensorflow::shape_inference::ShapeHandle;
+
+REGISTER_OP("SegmentCount")
+    .Input("parent_index: int64")
+    .Input("num_parents: int64")
+    .Output("size: int64")
+    .SetShapeFn([](InferenceContext* c) {
+      ShapeHandle unused;
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(0), 1, &unused));
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(1), 0, &unused));
+      c->set_output(0, c->Vector(InferenceContext::kUnknownDim));
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+The `segment_count` op counts the children of each parent:
+  size[j] := |{i : parent_index[i] = j}|
+
+This is the size of a field, if parent_index is its parent index.
+
+For example:
+  parent_index: [0, 1, 1, 3]
+  num_parents: 5
+  size: [1, 2, 0, 1, 0]
+
+parent_index: an int64 vector, where 0 <= parent_index[i] < num_parents.
+num_parents: an int64 scalar, the number of parents.
+size: an int64 vector of length num_parents.
+
+)doc");
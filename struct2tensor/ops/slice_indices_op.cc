@@ -0,0 +1,58 @@
+/* Copyright 2019 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+==============================================================================*/
+
+#include "tensorflow/core/framework/op.h"
+#include "tensorflow/core/framework/shape_inference.h"
+
+using tensorflow::shape_inference::InferenceContext;
+using tensorflow::shape_inference::ShapeHandle;
+
+REGISTER_OP("SliceIndices")
+    .Input("parent_index: int64")
+    .Input("begin: int64")
+    .Input("end: int64")
+    .Output("new_parent_index: int64")
+    .Output("indices_to_keep: int64")
+    .SetShapeFn([](InferenceContext* c) {
+      ShapeHandle unused;
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(0), 1, &unused));
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(1), 0, &unused));
+      TF_RETURN_IF_ERROR(c->WithRank(c->input(2), 0, &unused));
+      c->set_output(0, c->Vector(InferenceContext::kUnknownDim));
+      c->set_output(1, c->Vector(InferenceContext::kUnknownDim));
+      return absl::OkStatus();
+    })
+    .Doc(R"doc(
+The `slice_indices` op slices the children of each parent, like a python
+slice children[begin:end] of the list of children of the parent.
+
+If a parent has n children, the ith child of the parent is kept iff
+begin' <= i < end', where begin' is begin if begin >= 0, and n + begin
+otherwise (and similarly for end').
+
+For example:
+  parent_index: [0, 0, 0, 1, 1, 3]
+  begin: 1
+  end: 3
+  new_parent_index: [0, 0, 1]
+  indices_to_keep: [1, 2, 4]
+
+parent_index: a sorted int64 vector.
+begin: an int64 scalar, the beginning of the slice (inclusive).
+end: an int64 scalar, the end of the slice (exclusive).
+new_parent_index: the parent index of the children kept.
+indices_to_keep: the indices of the children kept, in parent_index.
+
+)doc");
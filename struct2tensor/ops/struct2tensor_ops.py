@@ -13,21 +13,43 @@
 # limitations under the License.
 """Utilities for manipulating prensors."""
 
-
-from typing import NamedTuple, Optional, Sequence, Tuple
+from typing import List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
 from struct2tensor import path
 from struct2tensor.ops import file_descriptor_set
+from struct2tensor.ops import gen_compose_parent_indices
 from struct2tensor.ops import gen_decode_proto_map_op
 from struct2tensor.ops import gen_decode_proto_sparse
 from struct2tensor.ops import gen_equi_join_any_indices
 from struct2tensor.ops import gen_equi_join_indices
+from struct2tensor.ops import gen_prensor_encoding
 from struct2tensor.ops import gen_run_length_before
+from struct2tensor.ops import gen_segment_count
+from struct2tensor.ops import gen_slice_indices
 import tensorflow as tf
 
 from google.protobuf import descriptor
 
 
+def load_op_libraries() -> None:
+  """Loads the op libraries of the ops in this file.
+
+  The op libraries are loaded on the first use of one of their ops. Call this
+  before importing a graph or loading a SavedModel that has struct2tensor ops,
+  so that the ops are registered.
+  """
+  # Accessing the library attribute loads the library.
+  _ = gen_compose_parent_indices.compose_parent_indices_module
+  _ = gen_decode_proto_map_op.decode_proto_map_module
+  _ = gen_decode_proto_sparse.decode_proto_sparse_module
+  _ = gen_equi_join_any_indices.equi_join_any_indices_module
+  _ = gen_equi_join_indices.equi_join_indices_module
+  _ = gen_prensor_encoding.prensor_encoding_module
+  _ = gen_run_length_before.run_length_before_module
+  _ = gen_segment_count.segment_count_module
+  _ = gen_slice_indices.slice_indices_module
+
+
 def _get_dtype_from_cpp_type(cpp_type: int) -> tf.DType:
   """Converts a cpp type in FieldDescriptor to the appropriate dtype."""
   library = {
@@ -154,9 +176,8 @@ def parse_message_level(
   # is deterministic.
   field_names = sorted(field_names)
   message_type = descriptor_type.full_name
-  descriptor_set = file_descriptor_set.get_file_descriptor_set_proto(
+  descriptor_literal = file_descriptor_set.get_file_descriptor_set_literal(
       descriptor_type, field_names)
-  descriptor_literal = descriptor_set.SerializeToString()
   # TODO(martinz): catch KeyError and give a better error.
   field_descriptors = [
       _get_field_descriptor(descriptor_type, field_name)
@@ -197,6 +218,161 @@ def parse_message_level(
   return result
 
 
+# The requested fields of a subtree of a message, as the nodes of a tree.
+# paths[i] is the path of node i, relative to the message. The nodes are in
+#   pre-order: a parent precedes its children, and the children of a node are
+#   sorted by step.
+# parents[i] is the index of the parent node of node i, or -1.
+# field_descriptors[i] is the FieldDescriptor of node i.
+# leaf_ids are the indices of the nodes that are not submessages, or whose
+#   submessages are decoded serialized.
+# serialized_ids are the indices of the submessage nodes decoded serialized.
+# output_types[j] is the dtype of the values of node leaf_ids[j].
+_SubtreeNodes = NamedTuple(
+    "_SubtreeNodes", [("paths", Sequence[path.Path]),
+                      ("parents", Sequence[int]),
+                      ("field_descriptors",
+                       Sequence[descriptor.FieldDescriptor]),
+                      ("leaf_ids", Sequence[int]),
+                      ("serialized_ids", Sequence[int]),
+                      ("output_types", Sequence[tf.DType])])
+
+
+def _get_subtree_nodes(
+    descriptor_type: descriptor.Descriptor,
+    paths: Sequence[path.Path],
+    serialized_paths: Sequence[path.Path] = ()) -> _SubtreeNodes:
+  """Gets the nodes of the subtree of the paths (and their prefixes).
+
+  Args:
+    descriptor_type: a descriptor for the protocol buffer to parse.
+    paths: the paths to parse, relative to descriptor_type.
+    serialized_paths: paths to submessage fields to parse into serialized
+      submessages, relative to descriptor_type.
+
+  Returns:
+    The _SubtreeNodes of the paths.
+
+  Raises:
+    ValueError: if a path is not a path to a field in descriptor_type, or if a
+      serialized path is not a message field or is a prefix of another path.
+  """
+  all_paths = set()
+  for p in list(paths) + list(serialized_paths):
+    for i in range(1, len(p) + 1):
+      all_paths.add(p.prefix(i))
+  # Parents precede their children, and the attrs are deterministic.
+  node_paths = sorted(all_paths)
+  node_ids = {p: i for i, p in enumerate(node_paths)}
+  node_parents = []
+  field_descriptors = []
+  for p in node_paths:
+    if len(p) == 1:
+      node_parents.append(-1)
+      parent_type = descriptor_type
+    else:
+      parent_id = node_ids[p.get_parent()]
+      node_parents.append(parent_id)
+      parent_type = field_descriptors[parent_id].message_type
+      if parent_type is None:
+        raise ValueError("Not a message field: {}".format(p.get_parent()))
+    try:
+      field_descriptors.append(
+          _get_field_descriptor(parent_type, p.field_list[-1]))
+    except KeyError:
+      raise ValueError("Unknown field: {} in {}".format(
+          p, descriptor_type.full_name))
+
+  serialized_ids = sorted(node_ids[p] for p in set(serialized_paths))
+  for i in serialized_ids:
+    if field_descriptors[i].message_type is None:
+      raise ValueError("Not a message field: {}".format(node_paths[i]))
+  for i, parent_id in enumerate(node_parents):
+    if parent_id in serialized_ids:
+      raise ValueError("Cannot parse {} from serialized {}".format(
+          node_paths[i], node_paths[parent_id]))
+  leaf_ids = [
+      i for i, field_descriptor in enumerate(field_descriptors)
+      if field_descriptor.message_type is None or i in serialized_ids
+  ]
+  output_types = [
+      _get_dtype_from_cpp_type(field_descriptors[i].cpp_type) for i in leaf_ids
+  ]
+  return _SubtreeNodes(
+      paths=node_paths,
+      parents=node_parents,
+      field_descriptors=field_descriptors,
+      leaf_ids=leaf_ids,
+      serialized_ids=serialized_ids,
+      output_types=output_types)
+
+
+def parse_message_subtree(
+    tensor_of_protos: tf.Tensor,
+    descriptor_type: descriptor.Descriptor,
+    paths: Sequence[path.Path],
+    honor_proto3_optional_semantics: bool = False,
+    serialized_paths: Sequence[path.Path] = ()
+) -> Mapping[path.Path, _ParsedField]:
+  """Parses a subtree of fields of a message in a single pass.
+
+  parse_message_level only parses one level of a message: getting a field
+  nested k levels deep requires k calls (and k walks over the wire bytes),
+  with the serialized submessages of every level in between materialized.
+  This parses all the fields on `paths` (and their prefixes) at once.
+
+  Only regular fields and extensions are supported (no Any casts, no map
+  indexing steps, no MessageSet extensions), and the protos must be binary.
+  The submessages of `serialized_paths` are returned serialized, so that they
+  can be parsed further with parse_message_level.
+
+  Args:
+    tensor_of_protos: a 1-D tensor of strings of protocol buffers.
+    descriptor_type: a descriptor for the protocol buffer to parse.
+    paths: the paths to parse, relative to descriptor_type. All the prefixes
+      of the paths are parsed too.
+    honor_proto3_optional_semantics: see parse_message_level.
+    serialized_paths: paths to submessage fields, relative to descriptor_type,
+      whose submessages are returned serialized. All their prefixes are parsed
+      too, but they cannot be a prefix of another path.
+
+  Returns:
+    A map from each path (and each nonempty prefix of a path) to a
+    _ParsedField. For a leaf field or a serialized path, value and index are
+    as in parse_message_level. For another submessage field, value is None,
+    and index maps each submessage to its parent submessage (or to its proto
+    in tensor_of_protos for a top-level field).
+
+  Raises:
+    ValueError: if a path is not a path to a field in descriptor_type, or if a
+      serialized path is not a message field or is a prefix of another path.
+  """
+  nodes = _get_subtree_nodes(descriptor_type, paths, serialized_paths)
+  if not nodes.paths:
+    return {}
+  node_field_names = [p.field_list[-1] for p in nodes.paths]
+  descriptor_literal = file_descriptor_set.get_file_descriptor_set_literal(
+      descriptor_type, node_field_names)
+  values, indices = gen_decode_proto_sparse.decode_proto_subtree(
+      tensor_of_protos,
+      message_type=descriptor_type.full_name,
+      node_field_names=node_field_names,
+      node_parents=nodes.parents,
+      num_nodes=len(nodes.paths),
+      serialized_nodes=nodes.serialized_ids,
+      output_types=nodes.output_types,
+      descriptor_literal=descriptor_literal,
+      honor_proto3_optional_semantics=honor_proto3_optional_semantics)
+  leaf_values = dict(zip(nodes.leaf_ids, values))
+  return {
+      p: _ParsedField(
+          field_name=p.field_list[-1],
+          field_descriptor=nodes.field_descriptors[i],
+          value=leaf_values.get(i),
+          index=indices[i]) for i, p in enumerate(nodes.paths)
+  }
+
+
 def run_length_before(a: tf.Tensor) -> tf.Tensor:
   r"""Returns the run length of each set of elements in a vector.
 
@@ -211,6 +387,114 @@ def run_length_before(a: tf.Tensor) -> tf.Tensor:
   return gen_run_length_before.run_length_before(a)
 
 
+def segment_count(parent_index: tf.Tensor, num_parents: tf.Tensor) -> tf.Tensor:
+  """Counts the children of each parent.
+
+  For example, with parent_index [0, 1, 1, 3] and num_parents 5, the result
+  is [1, 2, 0, 1, 0].
+
+  Args:
+    parent_index: 1D int64 tensor, the parent index of the children. Each
+      element must be in [0, num_parents).
+    num_parents: int64 scalar, the number of parents.
+
+  Returns:
+    1D int64 tensor of length num_parents, where result[j] is the number of
+    i such that parent_index[i] == j.
+  """
+  return gen_segment_count.segment_count(parent_index, num_parents)
+
+
+def slice_indices(parent_index: tf.Tensor, begin: tf.Tensor,
+                  end: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+  """Slices the children of each parent.
+
+  Keeps the children of each parent that a python slice [begin:end] of the
+  list of children of the parent would keep. For example, with parent_index
+  [0, 0, 0, 1, 1, 3], begin 1 and end 3, the children kept are [1, 2, 4].
+
+  Args:
+    parent_index: 1D int64 tensor, the sorted parent index of the children.
+    begin: int64 scalar, the beginning of the slice (inclusive). If negative,
+      it is relative to the number of children of each parent.
+    end: int64 scalar, the end of the slice (exclusive). If negative, it is
+      relative to the number of children of each parent.
+
+  Returns:
+    (new_parent_index, indices_to_keep), two 1D int64 tensors of equal length,
+    where indices_to_keep are the (sorted) indices of the children kept, and
+    new_parent_index[i] = parent_index[indices_to_keep[i]].
+  """
+  return gen_slice_indices.slice_indices(parent_index, begin, end)
+
+
+def prensor_row_splits(root_size: tf.Tensor,
+                       parent_indices: Sequence[tf.Tensor],
+                       parent_ids: Sequence[int],
+                       validate: bool = True) -> List[tf.Tensor]:
+  """Gets the row splits of the nodes of a prensor.
+
+  Args:
+    root_size: int64 scalar, the number of roots.
+    parent_indices: 1D int64 tensors, the parent index of each node (excluding
+      the root).
+    parent_ids: for each node, the position in parent_indices of its parent, or
+      -1 if its parent is the root. A parent must come before its children.
+    validate: if True, fails if a parent index is not sorted.
+
+  Returns:
+    For each node, its row splits relative to its parent.
+  """
+  return gen_prensor_encoding.prensor_row_splits(
+      root_size, parent_indices, parent_ids=parent_ids, validate=validate)
+
+
+def prensor_sparse_indices(
+    root_size: tf.Tensor, parent_indices: Sequence[tf.Tensor],
+    parent_ids: Sequence[int], is_repeated: Sequence[bool],
+    leaf_ids: Sequence[int]) -> Tuple[List[tf.Tensor], List[tf.Tensor]]:
+  """Gets the indices and dense shapes of the SparseTensors of prensor leaves.
+
+  The indices are the Dewey encoding of the values of each leaf: the index of
+  the root, followed by the positional index of each repeated node from the
+  root to the leaf.
+
+  Args:
+    root_size: int64 scalar, the number of roots.
+    parent_indices: 1D int64 tensors, the parent index of each node (excluding
+      the root).
+    parent_ids: for each node, the position in parent_indices of its parent, or
+      -1 if its parent is the root. A parent must come before its children.
+    is_repeated: for each node, whether it is repeated.
+    leaf_ids: the positions in parent_indices of the leaves to encode.
+
+  Returns:
+    (indices, dense_shapes), with an element per leaf in leaf_ids.
+  """
+  indices, dense_shapes = gen_prensor_encoding.prensor_sparse_indices(
+      root_size,
+      parent_indices,
+      num_leaves=len(leaf_ids),
+      parent_ids=parent_ids,
+      is_repeated=is_repeated,
+      leaf_ids=leaf_ids)
+  return indices, dense_shapes
+
+
+def compose_parent_indices(parent_indices: Sequence[tf.Tensor]) -> tf.Tensor:
+  """Composes the parent indices of a node and of some of its ancestors.
+
+  Args:
+    parent_indices: 1D int64 tensors [p_0,...,p_n], where p_0 is the parent
+      index of a node, and p_{i+1} is the parent index of the parent of p_i.
+
+  Returns:
+    1D int64 tensor where result[i] = p_n[...p_1[p_0[i]]...], i.e. the parent
+    index of the node if it was promoted n levels.
+  """
+  return gen_compose_parent_indices.compose_parent_indices(parent_indices)
+
+
 def create_sparse_tensor_for_repeated(parent_index: tf.Tensor,
                                       values: tf.Tensor, dense_shape: tf.Tensor
                                      ) -> tf.SparseTensor:
@@ -254,6 +538,8 @@ def equi_join_any_indices(a: tf.Tensor, b: tf.Tensor) -> tf.Tensor:
 
   Similar to `equi_join_indices`, except this does not assume `a` and `b` are
   monotonically increasing. Prefer to use equi_join_indices if possible.
+  If `a` and `b` do turn out to be monotonically increasing, this takes linear
+  time, as equi_join_indices does.
 
   Args:
     a: a tensor that is an int64 vector
@@ -311,6 +597,6 @@ def parse_proto_map(
       map_entries, map_entry_parent_indices, backing_str_tensor,
       map_entry_descriptor.full_name, keys_needed_as_list,
       len(keys_needed_as_list), _get_dtype_from_cpp_type(value_fd.cpp_type),
-      file_descriptor_set.get_file_descriptor_set_proto(
-          map_entry_descriptor, ["key", "value"]).SerializeToString())
+      file_descriptor_set.get_file_descriptor_set_literal(
+          map_entry_descriptor, ["key", "value"]))
   return list(zip(values, parent_indices))
@@ -18,6 +18,7 @@ import itertools
 from absl.testing import absltest
 from absl.testing import parameterized
 import numpy as np
+from struct2tensor import path
 from struct2tensor.ops import struct2tensor_ops
 from struct2tensor.test import test_extension_pb2
 from struct2tensor.test import test_map_pb2
@@ -394,6 +395,38 @@ class PrensorOpsTest(parameterized.TestCase, tf.test.TestCase):
     self.assertAllEqual(indices, [0])
     self.assertAllEqual(values, [3])
 
+  def test_parse_message_level_many_messages(self):
+    # Enough messages for the decoding to be split into several shards.
+    num_messages = 5000
+    events = []
+    expected_event_id_index = []
+    expected_event_id_value = []
+    expected_query_token_index = []
+    expected_query_token_value = []
+    expected_action_index = []
+    for i in range(num_messages):
+      event = test_pb2.Event()
+      if i % 3:
+        event.event_id = str(i)
+        expected_event_id_index.append(i)
+        expected_event_id_value.append(str(i).encode())
+      for j in range(i % 4):
+        event.query_token.append("{}_{}".format(i, j))
+        expected_query_token_index.append(i)
+        expected_query_token_value.append("{}_{}".format(i, j).encode())
+      if i % 2:
+        event.action.add().doc_id = str(i)
+        expected_action_index.append(i)
+      events.append(event.SerializeToString())
+    event_id, query_token, action = struct2tensor_ops.parse_message_level(
+        tf.constant(events), test_pb2.Event.DESCRIPTOR,
+        ["event_id", "query_token", "action"])
+    self.assertAllEqual(event_id.index, expected_event_id_index)
+    self.assertAllEqual(event_id.value, expected_event_id_value)
+    self.assertAllEqual(query_token.index, expected_query_token_index)
+    self.assertAllEqual(query_token.value, expected_query_token_value)
+    self.assertAllEqual(action.index, expected_action_index)
+
   def test_parse_extension(self):
     user_info = test_pb2.UserInfo()
     user_info.Extensions[
@@ -422,6 +455,101 @@ class PrensorOpsTest(parameterized.TestCase, tf.test.TestCase):
     self.assertAllEqual(field_tuple.index, [0])
     self.assertAllEqual(field_tuple.value, [expected_value.SerializeToString()])
 
+  def test_parse_message_subtree(self):
+    session_0 = test_pb2.Session(event=[
+        test_pb2.Event(action=[
+            test_pb2.Action(doc_id="a"),
+            test_pb2.Action(),
+            test_pb2.Action(doc_id="b", number_of_views=3)
+        ]),
+        test_pb2.Event(),
+    ])
+    session_1 = test_pb2.Session(
+        session_id=5,
+        event=[test_pb2.Event(action=[test_pb2.Action(doc_id="c")])])
+    tensor_of_protos = tf.constant(
+        [session_0.SerializeToString(),
+         session_1.SerializeToString()])
+    result = struct2tensor_ops.parse_message_subtree(
+        tensor_of_protos, test_pb2.Session.DESCRIPTOR, [
+            path.Path(["event", "action", "doc_id"]),
+            path.Path(["session_id"])
+        ])
+    self.assertCountEqual(result.keys(), [
+        path.Path(["event"]),
+        path.Path(["event", "action"]),
+        path.Path(["event", "action", "doc_id"]),
+        path.Path(["session_id"])
+    ])
+    self.assertIsNone(result[path.Path(["event"])].value)
+    self.assertAllEqual(result[path.Path(["event"])].index, [0, 0, 1])
+    self.assertIsNone(result[path.Path(["event", "action"])].value)
+    self.assertAllEqual(result[path.Path(["event", "action"])].index,
+                        [0, 0, 0, 2])
+    doc_id = result[path.Path(["event", "action", "doc_id"])]
+    self.assertEqual(doc_id.field_name, "doc_id")
+    self.assertAllEqual(doc_id.index, [0, 2, 3])
+    self.assertAllEqual(doc_id.value, [b"a", b"b", b"c"])
+    self.assertAllEqual(result[path.Path(["session_id"])].index, [1])
+    self.assertAllEqual(result[path.Path(["session_id"])].value, [5])
+
+  def test_parse_message_subtree_serialized_paths(self):
+    action_0 = test_pb2.Action(doc_id="a")
+    action_1 = test_pb2.Action(doc_id="b", number_of_views=3)
+    session = test_pb2.Session(
+        session_id=5,
+        event=[
+            test_pb2.Event(event_id="A", action=[action_0, action_1]),
+            test_pb2.Event(event_id="B"),
+        ])
+    result = struct2tensor_ops.parse_message_subtree(
+        tf.constant([session.SerializeToString()]),
+        test_pb2.Session.DESCRIPTOR, [path.Path(["event", "event_id"])],
+        serialized_paths=[path.Path(["event", "action"])])
+    self.assertCountEqual(result.keys(), [
+        path.Path(["event"]),
+        path.Path(["event", "event_id"]),
+        path.Path(["event", "action"])
+    ])
+    self.assertIsNone(result[path.Path(["event"])].value)
+    self.assertAllEqual(result[path.Path(["event", "event_id"])].value,
+                        [b"A", b"B"])
+    action = result[path.Path(["event", "action"])]
+    self.assertAllEqual(action.index, [0, 0])
+    self.assertAllEqual(
+        action.value,
+        [action_0.SerializeToString(),
+         action_1.SerializeToString()])
+
+  def test_parse_message_subtree_serialized_path_with_children(self):
+    with self.assertRaisesRegex(ValueError, "Cannot parse"):
+      struct2tensor_ops.parse_message_subtree(
+          tf.constant([b""]),
+          test_pb2.Session.DESCRIPTOR, [path.Path(["event", "event_id"])],
+          serialized_paths=[path.Path(["event"])])
+
+  def test_parse_message_subtree_last_optional_submessage_wins(self):
+    # As with parse_message_level, when an optional submessage appears twice on
+    # the wire, only the last one is kept.
+    event_0 = test_pb2.Event(
+        user_info=test_pb2.UserInfo(age_in_years=3, friends=["a"]))
+    event_1 = test_pb2.Event(
+        user_info=test_pb2.UserInfo(age_in_years=4, friends=["b"]))
+    tensor_of_protos = tf.constant(
+        [event_0.SerializeToString() + event_1.SerializeToString()])
+    result = struct2tensor_ops.parse_message_subtree(
+        tensor_of_protos, test_pb2.Event.DESCRIPTOR, [
+            path.Path(["user_info", "age_in_years"]),
+            path.Path(["user_info", "friends"])
+        ])
+    self.assertAllEqual(result[path.Path(["user_info"])].index, [0])
+    age = result[path.Path(["user_info", "age_in_years"])]
+    self.assertAllEqual(age.index, [0])
+    self.assertAllEqual(age.value, [4])
+    friends = result[path.Path(["user_info", "friends"])]
+    self.assertAllEqual(friends.index, [0])
+    self.assertAllEqual(friends.value, [b"b"])
+
 
   def test_parse_packed_fields(self):
     message_with_packed_fields = test_pb2.HasPackedFields(
@@ -523,6 +651,13 @@ class PrensorOpsTest(parameterized.TestCase, tf.test.TestCase):
     self.assertAllEqual(index_a, [0, 1, 1, 2, 3, 3, 4])
     self.assertAllEqual(index_b, [0, 1, 2, 3, 1, 2, 3])
 
+  def test_equi_join_any_indices_one_side_monotonic(self):
+    a = tf.constant([0, 1, 1, 2], dtype=tf.int64)
+    b = tf.constant([2, 1, 0, 1], dtype=tf.int64)
+    [index_a, index_b] = struct2tensor_ops.equi_join_any_indices(a, b)
+    self.assertAllEqual(index_a, [0, 1, 1, 2, 2, 3])
+    self.assertAllEqual(index_b, [2, 1, 3, 1, 3, 0])
+
   def test_run_length_before(self):
     """Breaking down the broadcast."""
     a = tf.constant([0, 1, 1, 7, 8, 8, 9], dtype=tf.int64)
@@ -535,6 +670,96 @@ class PrensorOpsTest(parameterized.TestCase, tf.test.TestCase):
     b = struct2tensor_ops.run_length_before(a)
     self.assertAllEqual(b, [])
 
+  def test_segment_count(self):
+    parent_index = tf.constant([0, 1, 1, 3], dtype=tf.int64)
+    result = struct2tensor_ops.segment_count(
+        parent_index, tf.constant(5, dtype=tf.int64))
+    self.assertAllEqual(result, [1, 2, 0, 1, 0])
+
+  def test_segment_count_empty(self):
+    parent_index = tf.constant([], dtype=tf.int64)
+    result = struct2tensor_ops.segment_count(
+        parent_index, tf.constant(2, dtype=tf.int64))
+    self.assertAllEqual(result, [0, 0])
+
+  def test_segment_count_out_of_range(self):
+    parent_index = tf.constant([0, 2], dtype=tf.int64)
+    with self.assertRaises(tf.errors.InvalidArgumentError):
+      self.evaluate(
+          struct2tensor_ops.segment_count(parent_index,
+                                          tf.constant(2, dtype=tf.int64)))
+
+  def test_compose_parent_indices(self):
+    parent_indices = [
+        tf.constant([0, 1, 1, 2], dtype=tf.int64),
+        tf.constant([0, 0, 1], dtype=tf.int64),
+        tf.constant([0, 1], dtype=tf.int64)
+    ]
+    result = struct2tensor_ops.compose_parent_indices(parent_indices)
+    self.assertAllEqual(result, [0, 0, 0, 1])
+
+  def test_compose_parent_indices_out_of_range(self):
+    parent_indices = [
+        tf.constant([0, 3], dtype=tf.int64),
+        tf.constant([0, 0, 1], dtype=tf.int64)
+    ]
+    with self.assertRaises(tf.errors.InvalidArgumentError):
+      self.evaluate(struct2tensor_ops.compose_parent_indices(parent_indices))
+
+  def test_slice_indices(self):
+    parent_index = tf.constant([0, 0, 0, 1, 1, 3], dtype=tf.int64)
+    new_parent_index, indices_to_keep = struct2tensor_ops.slice_indices(
+        parent_index, tf.constant(1, dtype=tf.int64),
+        tf.constant(3, dtype=tf.int64))
+    self.assertAllEqual(new_parent_index, [0, 0, 1])
+    self.assertAllEqual(indices_to_keep, [1, 2, 4])
+
+  def test_slice_indices_negative(self):
+    parent_index = tf.constant([0, 0, 0, 1, 1, 3], dtype=tf.int64)
+    new_parent_index, indices_to_keep = struct2tensor_ops.slice_indices(
+        parent_index, tf.constant(-2, dtype=tf.int64),
+        tf.constant(-1, dtype=tf.int64))
+    self.assertAllEqual(new_parent_index, [0, 1])
+    self.assertAllEqual(indices_to_keep, [1, 3])
+
+  def test_slice_indices_empty(self):
+    parent_index = tf.constant([], dtype=tf.int64)
+    new_parent_index, indices_to_keep = struct2tensor_ops.slice_indices(
+        parent_index, tf.constant(0, dtype=tf.int64),
+        tf.constant(2, dtype=tf.int64))
+    self.assertAllEqual(new_parent_index, [])
+    self.assertAllEqual(indices_to_keep, [])
+
+  def test_prensor_row_splits(self):
+    parent_indices = [
+        tf.constant([0, 1, 1], dtype=tf.int64),
+        tf.constant([0, 1, 1, 2], dtype=tf.int64)
+    ]
+    result = struct2tensor_ops.prensor_row_splits(
+        tf.constant(3, dtype=tf.int64), parent_indices, [-1, 0])
+    self.assertLen(result, 2)
+    self.assertAllEqual(result[0], [0, 1, 3, 3])
+    self.assertAllEqual(result[1], [0, 1, 3, 4])
+
+  def test_prensor_row_splits_unsorted(self):
+    parent_indices = [tf.constant([1, 0], dtype=tf.int64)]
+    with self.assertRaises(tf.errors.InvalidArgumentError):
+      self.evaluate(
+          struct2tensor_ops.prensor_row_splits(
+              tf.constant(2, dtype=tf.int64), parent_indices, [-1]))
+
+  def test_prensor_sparse_indices(self):
+    parent_indices = [
+        tf.constant([0, 1, 1], dtype=tf.int64),
+        tf.constant([0, 1, 1, 2], dtype=tf.int64)
+    ]
+    indices, dense_shapes = struct2tensor_ops.prensor_sparse_indices(
+        tf.constant(3, dtype=tf.int64), parent_indices, [-1, 0],
+        [True, True], [1])
+    self.assertAllEqual(indices[0],
+                        [[0, 0, 0], [1, 0, 0], [1, 0, 1], [1, 1, 0]])
+    self.assertAllEqual(dense_shapes[0], [3, 2, 2])
+
 _SIGNED_INTEGER_TYPES = [
     "int32", "int64", "sfixed32", "sfixed64", "sint32", "sint64"
 ]
@@ -23,196 +23,28 @@ For operations on the expression, see create_expression.py.
 
 import collections
 import enum
-from typing import FrozenSet, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
 from struct2tensor import calculate_options
+from struct2tensor import node_tensor
 from struct2tensor import path
+from struct2tensor import prensor_value
 from struct2tensor.ops import struct2tensor_ops
 import tensorflow as tf
 
+from tensorflow.python.client import session as session_lib  # pylint: disable=g-direct-tensorflow-import
 from tensorflow.python.framework import composite_tensor  # pylint: disable=g-direct-tensorflow-import
 
-
-# TODO(martinz): Consider creating node.py with the LeafNodeTensor,
-# ChildNodeTensor, and RootNodeTensor, allowing expression.py to depend upon
-# node.py.
-class RootNodeTensor(object):
-  """The value of the root."""
-
-  __slots__ = ["_size"]
-
-  def __init__(self, size: tf.Tensor):
-    """Creates a root node.
-
-    Args:
-      size: A scalar int64 tensor saying how many root objects there are.
-    """
-    self._size = size
-
-  @property
-  def size(self):
-    return self._size
-
-  @property
-  def is_repeated(self):
-    return True
-
-  def get_positional_index(self) -> tf.Tensor:
-    """Gets the positional index for this RootNodeTensor.
-
-    The positional index relative to the node's parent, and thus is always
-    monotonically increasing at step size 1 for a RootNodeTensor.
-
-    Returns:
-      A tensor of positional indices.
-    """
-    return tf.range(self.size)
-
-  def __str__(self):
-    return "RootNodeTensor"
-
-
-class ChildNodeTensor(object):
-  """The value of an intermediate node."""
-
-  __slots__ = ["_parent_index", "_is_repeated", "_index_to_value"]
-
-  def __init__(self,
-               parent_index: tf.Tensor,
-               is_repeated: bool,
-               index_to_value: Optional[tf.Tensor] = None):
-    """Creates a child node.
-
-    Args:
-      parent_index: a 1-D int64 tensor where parent_index[i] represents the
-        parent index of the ith child.
-      is_repeated: a bool indicating if there can be more than one child per
-        parent.
-      index_to_value: a 1-D int64 tensor where index_to_value[i] represents the
-        `value` of the ith child. Where `value` is a subtree.
-    """
-    self._parent_index = parent_index
-    self._is_repeated = is_repeated
-    self._index_to_value = index_to_value
-
-  @property
-  def size(self):
-    """Returns the size, as if this was the root prensor.
-
-    Returns:
-      A scalar int64 tensor.
-    """
-    return tf.size(self._parent_index, out_type=tf.int64)
-
-  @property
-  def parent_index(self):
-    return self._parent_index
-
-  @property
-  def is_repeated(self):
-    return self._is_repeated
-
-  @property
-  def index_to_value(self):
-    return self._index_to_value
-
-  # LINT.IfChange(child_node_tensor)
-  def get_positional_index(self) -> tf.Tensor:
-    """Gets the positional index for this ChildNodeTensor.
-
-    The positional index tells us which index of the parent an element is.
-
-    For example, with the following parent indices: [0, 0, 2]
-    we would have positional index:
-    [
-      0, # The 0th element of the 0th parent.
-      1, # The 1st element of the 0th parent.
-      0  # The 0th element of the 2nd parent.
-    ].
-
-    For more information, view ops/run_length_before_op.cc
-
-    This is the same for Leaf NodeTensors.
-
-    Returns:
-      A tensor of positional indices.
-    """
-    return struct2tensor_ops.run_length_before(self.parent_index)
-  # LINT.ThenChange(:leaf_node_tensor)
-
-  def __str__(self):
-    cardinality = "repeated" if self.is_repeated else "optional"
-    return "{} ChildNodeTensor".format(cardinality)
-
-
-class LeafNodeTensor(object):
-  """The value of a leaf node."""
-
-  __slots__ = ["_parent_index", "_values", "_is_repeated"]
-
-  def __init__(self, parent_index: tf.Tensor, values: tf.Tensor,
-               is_repeated: bool):
-    """Creates a LeafNodeTensor.
-
-    Args:
-      parent_index: a 1-D int64 tensor where parent_index[i] represents the
-        parent index of values[i]
-      values: a 1-D tensor of equal length to parent_index.
-      is_repeated: a bool indicating if there can be more than one child per
-        parent.
-    """
-    self._parent_index = parent_index
-    self._values = values
-    self._is_repeated = is_repeated
-
-  @property
-  def parent_index(self):
-    return self._parent_index
-
-  @property
-  def is_repeated(self):
-    return self._is_repeated
-
-  @property
-  def values(self):
-    return self._values
-
-  # LINT.IfChange(leaf_node_tensor)
-  def get_positional_index(self) -> tf.Tensor:
-    """Gets the positional index for this LeafNodeTensor.
-
-    The positional index tells us which index of the parent an element is.
-
-    For example, with the following parent indices: [0, 0, 2]
-    we would have positional index:
-    [
-      0, # The 0th element of the 0th parent.
-      1, # The 1st element of the 0th parent.
-      0  # The 0th element of the 2nd parent.
-    ].
-
-    For more information, view ops/run_length_before_op.cc
-
-    This is the same for Child NodeTensors.
-
-    Returns:
-      A tensor of positional indices.
-    """
-    return struct2tensor_ops.run_length_before(self.parent_index)
-  # LINT.ThenChange(:child_node_tensor)
-
-  def __str__(self):
-    return "{} {}".format("repeated" if self.is_repeated else "optional",
-                          str(self.values.dtype))
-
-
-def create_required_leaf_node(values: tf.Tensor) -> LeafNodeTensor:
-  """Create a required leaf node."""
-  return LeafNodeTensor(
-      tf.range(tf.size(values, out_type=tf.int64)), values, False)
-
-
-NodeTensor = Union[LeafNodeTensor, ChildNodeTensor, RootNodeTensor]  # pylint: disable=invalid-name
+# The node tensors are defined in node_tensor.py.
+RootNodeTensor = node_tensor.RootNodeTensor
+ChildNodeTensor = node_tensor.ChildNodeTensor
+LeafNodeTensor = node_tensor.LeafNodeTensor
+IndexedLeafNodeTensor = node_tensor.IndexedLeafNodeTensor
+NodeTensor = node_tensor.NodeTensor  # pylint: disable=invalid-name
+share_positional_index = node_tensor.share_positional_index
+gather_leaf_node = node_tensor.gather_leaf_node
+reparent_leaf_node = node_tensor.reparent_leaf_node
+create_required_leaf_node = node_tensor.create_required_leaf_node
 
 
 class _PrensorTypeSpec(tf.TypeSpec):
@@ -527,7 +359,7 @@ class Prensor(composite_tensor.CompositeTensor):
     else:
       is_repeated = self.node.is_repeated
       node_type = _PrensorTypeSpec._NodeType.LEAF
-      value_dtype = self.node.values.dtype
+      value_dtype = self.node.dtype
     return _PrensorTypeSpec(
         is_repeated,
         node_type,
@@ -611,32 +443,6 @@ class _LeafNodePath(object):
     return self._tail
 
 
-class _ChildNodePath(object):
-  """A _ChildNodePath is a path that ends with a child node.
-
-  It keeps same triple structure as _LeafNodePath.
-  We use these in _get_dewey_encoding.
-  """
-
-  def __init__(self, head: RootNodeTensor, middle: Sequence[ChildNodeTensor],
-               tail: ChildNodeTensor):
-    self._head = head
-    self._middle = middle
-    self._tail = tail
-
-  @property
-  def head(self) -> RootNodeTensor:
-    return self._head
-
-  @property
-  def middle(self) -> Sequence[ChildNodeTensor]:
-    return self._middle
-
-  @property
-  def tail(self) -> ChildNodeTensor:
-    return self._tail
-
-
 def _as_root_node_tensor(node_tensor: NodeTensor) -> RootNodeTensor:
   if isinstance(node_tensor, RootNodeTensor):
     return node_tensor
@@ -677,16 +483,6 @@ def _get_leaf_node_path(p: path.Path, t: Prensor) -> _LeafNodePath:
   return _LeafNodePath(root_node, child_nodes, leaf_node)
 
 
-def _get_leaf_node_path_suffix(p: _LeafNodePath) -> _LeafNodePath:
-  """Get the suffix of a LeafNodePath."""
-  return _LeafNodePath(_as_root_node_tensor(p.middle[0]), p.middle[1:], p.tail)
-
-
-def _get_node_path_parent(
-    p: Union[_LeafNodePath, _ChildNodePath]) -> _ChildNodePath:
-  return _ChildNodePath(p.head, p.middle[:-1], p.middle[-1])
-
-
 def _get_leaf_node_paths(t: Prensor) -> Mapping[path.Path, _LeafNodePath]:
   """Gets a map of paths to leaf nodes in the expression."""
   return {
@@ -696,53 +492,83 @@ def _get_leaf_node_paths(t: Prensor) -> Mapping[path.Path, _LeafNodePath]:
   }
 
 
-#################### Code for _get_sparse_tensors(...) #########################
+######### Code for _get_sparse_tensors(...) and _get_ragged_tensors(...) #######
 
 
-def _get_dewey_encoding(
-    p: Union[_LeafNodePath, _ChildNodePath]) -> Tuple[tf.Tensor, tf.Tensor]:
-  """Gets a pair of the indices and shape of these protos.
+class _LeafEncodingInputs(object):
+  """The nodes on the paths to some leaves, as inputs to the encoding ops.
 
-  See http://db.ucsd.edu/static/cse232B-s05/papers/tatarinov02.pdf
-
-  Args:
-    p: the path to encode.
-
-  Returns:
-    A pair of an indices matrix and a dense_shape
+  The nodes are numbered so that a parent comes before its children. A node on
+  the path to several leaves (e.g. a repeated submessage with many fields) is
+  only numbered, and encoded, once.
   """
-  parent = p.middle[-1] if p.middle else p.head
-  parent_size = tf.reshape(parent.size, [1])
-  positional_index = p.tail.get_positional_index()
-  # tf.reduce_max([]) == -kmaxint64 but we need it to be 0.
-  current_size = tf.maximum(
-      tf.reshape(tf.reduce_max(positional_index) + 1, [1]), [0])
-  if not p.middle:
-    if p.tail.is_repeated:
-      return (tf.stack([p.tail.parent_index, positional_index],
-                       axis=1), tf.concat([parent_size, current_size], 0))
-    else:
-      return tf.expand_dims(p.tail.parent_index, -1), parent_size
-  else:
-    parent_dewey_encoding, parent_size = _get_dewey_encoding(
-        _get_node_path_parent(p))
-    if p.tail.is_repeated:
-      positional_index_as_matrix = tf.expand_dims(
-          p.tail.get_positional_index(), -1)
-      indices = tf.concat([
-          tf.gather(parent_dewey_encoding, p.tail.parent_index),
-          positional_index_as_matrix
-      ], 1)
-      size = tf.concat([parent_size, current_size], 0)
-      return (indices, size)
-    else:
-      return tf.gather(parent_dewey_encoding, p.tail.parent_index), parent_size
 
+  def __init__(self, t: Prensor, leaf_paths: Sequence[path.Path]):
+    self._root_size = _as_root_node_tensor(t.node).size
+    self._node_ids = {}  # type: Dict[path.Path, int]
+    self._nodes = []  # type: List[Union[ChildNodeTensor, LeafNodeTensor]]
+    self._parent_ids = []  # type: List[int]
+    self._is_repeated = []  # type: List[bool]
+    for leaf_path in leaf_paths:
+      leaf_node_path = _get_leaf_node_path(leaf_path, t)
+      nodes = list(leaf_node_path.middle) + [leaf_node_path.tail]
+      for i, node in enumerate(nodes):
+        node_path = leaf_path.prefix(i + 1)
+        if node_path not in self._node_ids:
+          self._node_ids[node_path] = len(self._nodes)
+          self._parent_ids.append(
+              self._node_ids[node_path.get_parent()] if i else -1)
+          self._is_repeated.append(node.is_repeated)
+          self._nodes.append(node)
+
+  def get_leaf(self, leaf_path: path.Path) -> LeafNodeTensor:
+    return self._nodes[self._node_ids[leaf_path]]
+
+  def get_node_ids(self, leaf_path: path.Path) -> List[int]:
+    """Gets the ids of the nodes from the root (excluded) to the leaf."""
+    return [
+        self._node_ids[leaf_path.prefix(i)]
+        for i in range(1, len(leaf_path) + 1)
+    ]
+
+  def get_row_splits(self, validate: bool) -> List[tf.Tensor]:
+    """Gets the row splits of each node, by id."""
+    return struct2tensor_ops.prensor_row_splits(
+        self._root_size, [x.parent_index for x in self._nodes],
+        self._parent_ids, validate)
+
+  def get_sparse_indices(
+      self, leaf_paths: Sequence[path.Path]
+  ) -> Tuple[List[tf.Tensor], List[tf.Tensor]]:
+    """Gets the indices and dense shapes of the leaves."""
+    return struct2tensor_ops.prensor_sparse_indices(
+        self._root_size, [x.parent_index for x in self._nodes],
+        self._parent_ids, self._is_repeated,
+        [self._node_ids[p] for p in leaf_paths])
+
+
+def _get_leaf_paths(t: Prensor) -> List[path.Path]:
+  return [
+      k for k, v in t.get_descendants().items()
+      if isinstance(v.node, LeafNodeTensor)
+  ]
 
-def _get_sparse_tensor_from_leaf_node_path(p: _LeafNodePath) -> tf.SparseTensor:
-  indices, dense_shape = _get_dewey_encoding(p)
-  return tf.SparseTensor(
-      indices=indices, values=p.tail.values, dense_shape=dense_shape)
+
+def _get_sparse_tensors_for_paths(
+    t: Prensor,
+    leaf_paths: Sequence[path.Path]) -> Mapping[path.Path, tf.SparseTensor]:
+  """Gets sparse tensors for leaf_paths, with one PrensorSparseIndices op."""
+  if not leaf_paths:
+    return {}
+  inputs = _LeafEncodingInputs(t, leaf_paths)
+  indices, dense_shapes = inputs.get_sparse_indices(leaf_paths)
+  return {
+      p: tf.SparseTensor(
+          indices=leaf_indices,
+          values=inputs.get_leaf(p).values,
+          dense_shape=dense_shape)
+      for p, leaf_indices, dense_shape in zip(leaf_paths, indices, dense_shapes)
+  }
 
 
 def _get_sparse_tensor(
@@ -766,8 +592,7 @@ def _get_sparse_tensor(
     structure along the path. Raises an error if the path is not found.
   """
   del options
-  leaf_node_path = _get_leaf_node_path(p, t)
-  return _get_sparse_tensor_from_leaf_node_path(leaf_node_path)
+  return _get_sparse_tensors_for_paths(t, [p])[p]
 
 
 def _get_sparse_tensors(
@@ -786,13 +611,7 @@ def _get_sparse_tensors(
   """
 
   del options
-  return {
-      p: _get_sparse_tensor_from_leaf_node_path(v)
-      for p, v in _get_leaf_node_paths(t).items()
-  }
-
-
-#################### Code for _get_ragged_tensors(...) #########################
+  return _get_sparse_tensors_for_paths(t, _get_leaf_paths(t))
 
 
 def from_value_rowids_bridge(values,
@@ -804,26 +623,33 @@ def from_value_rowids_bridge(values,
       values, value_rowids=value_rowids, nrows=nrows, validate=validate)
 
 
-def _get_ragged_tensor_from_leaf_node_path(
-    nodes: _LeafNodePath,
-    options: calculate_options.Options = calculate_options.get_default_options(
-    )
-) -> tf.RaggedTensor:
-  """Gets a ragged tensor from a leaf node path."""
-  if not nodes.middle:
-    return from_value_rowids_bridge(
-        nodes.tail.values,
-        value_rowids=nodes.tail.parent_index,
-        nrows=nodes.head.size,
-        validate=options.ragged_checks)
-  deeper_ragged = _get_ragged_tensor_from_leaf_node_path(
-      _get_leaf_node_path_suffix(nodes), options)
-  first_child_node = nodes.middle[0]
-  return from_value_rowids_bridge(
-      deeper_ragged,
-      value_rowids=first_child_node.parent_index,
-      nrows=nodes.head.size,
-      validate=options.ragged_checks)
+def _get_ragged_tensors_for_paths(
+    t: Prensor, leaf_paths: Sequence[path.Path],
+    options: calculate_options.Options) -> Mapping[path.Path, tf.RaggedTensor]:
+  """Gets ragged tensors for leaf_paths, with one PrensorRowSplits op.
+
+  The leaves under a node share the row splits of that node. The row splits of
+  each node are checked once by PrensorRowSplits (if options.ragged_checks),
+  so the ragged tensors of the leaves are not validated again.
+
+  Args:
+    t: The Prensor to extract tensors from.
+    leaf_paths: the paths to leaf nodes in `t`.
+    options: used to pass options for calculating ragged tensors.
+
+  Returns:
+    A map from leaf_paths to ragged tensors.
+  """
+  if not leaf_paths:
+    return {}
+  inputs = _LeafEncodingInputs(t, leaf_paths)
+  row_splits = inputs.get_row_splits(options.ragged_checks)
+  return {
+      p: tf.RaggedTensor.from_nested_row_splits(
+          inputs.get_leaf(p).values,
+          [row_splits[k] for k in inputs.get_node_ids(p)],
+          validate=False) for p in leaf_paths
+  }
 
 
 def _get_ragged_tensor(
@@ -845,8 +671,7 @@ def _get_ragged_tensor(
     A ragged tensor containing values of the leaf node, preserving the
     structure along the path. Raises an error if the path is not found.
   """
-  leaf_node_path = _get_leaf_node_path(p, t)
-  return _get_ragged_tensor_from_leaf_node_path(leaf_node_path, options)
+  return _get_ragged_tensors_for_paths(t, [p], options)[p]
 
 
 def _get_ragged_tensors(
@@ -863,7 +688,25 @@ def _get_ragged_tensors(
   Returns:
     A map from paths to ragged tensors.
   """
-  return {
-      p: _get_ragged_tensor_from_leaf_node_path(v, options)
-      for p, v in _get_leaf_node_paths(t).items()
-  }
+  return _get_ragged_tensors_for_paths(t, _get_leaf_paths(t), options)
+
+
+def _prensor_value_fetch(prensor_tree: Prensor):
+  """Fetch function for PrensorValue. See the document in session_lib."""
+  # pylint: disable=protected-access
+  type_spec = prensor_tree._type_spec
+  components = type_spec._to_components(prensor_tree)
+  def _construct_prensor_value(component_values):
+    return prensor_value._prensor_value_from_type_spec_and_component_values(
+        type_spec, iter(component_values))
+
+  return components, _construct_prensor_value
+
+
+# This lets tf.compat.v1.Session.run() take a Prensor and return a
+# PrensorValue.
+session_lib.register_session_run_conversion_functions(
+    Prensor,
+    _prensor_value_fetch,
+    feed_function=None,
+    feed_function_for_partial_run=None)
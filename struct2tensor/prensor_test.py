@@ -167,6 +167,55 @@ class PrensorTest(tf.test.TestCase):
         expression.get_descendant_or_error(path.Path(["doc",
                                                       "keep_me"])).is_leaf)
 
+  def test_get_positional_index_is_cached(self):
+    leaf = prensor_test_util.create_repeated_leaf_node([0, 0, 2], [1, 2, 3])
+    positional_index = leaf.get_positional_index()
+    self.assertIs(leaf.get_positional_index(), positional_index)
+    self.assertAllEqual(positional_index, [0, 1, 0])
+
+  def test_share_positional_index(self):
+    leaf = prensor_test_util.create_repeated_leaf_node([0, 0, 2], [1, 2, 3])
+    other = prensor.LeafNodeTensor(leaf.parent_index,
+                                   tf.constant(["a", "b", "c"]), True)
+    prensor.share_positional_index(leaf, other)
+    self.assertIs(other.get_positional_index(), leaf.get_positional_index())
+
+  def test_shared_positional_index_first_read_in_function(self):
+    leaf = prensor_test_util.create_repeated_leaf_node([0, 0, 2], [1, 2, 3])
+    other = prensor.LeafNodeTensor(leaf.parent_index,
+                                   tf.constant(["a", "b", "c"]), True)
+    prensor.share_positional_index(leaf, other)
+
+    @tf.function
+    def get_positional_index():
+      return leaf.get_positional_index()
+
+    self.assertAllEqual(get_positional_index(), [0, 1, 0])
+    # The positional index calculated in the function is not cached, so it is
+    # not used outside of it.
+    self.assertAllEqual(other.get_positional_index(), [0, 1, 0])
+    self.assertIs(other.get_positional_index(), leaf.get_positional_index())
+
+  def test_share_positional_index_different_parent_index(self):
+    leaf = prensor_test_util.create_repeated_leaf_node([0, 0, 2], [1, 2, 3])
+    other = prensor_test_util.create_repeated_leaf_node([0, 0, 2], [1, 2, 3])
+    with self.assertRaisesRegex(ValueError, "same parent index"):
+      prensor.share_positional_index(leaf, other)
+
+  def test_indexed_leaf_values_first_read_in_function(self):
+    leaf = prensor.IndexedLeafNodeTensor(
+        tf.constant([0, 1], dtype=tf.int64), tf.constant(["a", "b"]),
+        tf.constant([1, 1], dtype=tf.int64), False)
+
+    @tf.function
+    def get_values():
+      return leaf.values
+
+    self.assertAllEqual(get_values(), [b"b", b"b"])
+    # The values gathered in the function are not cached, so they are not used
+    # outside of it.
+    self.assertAllEqual(leaf.values, [b"b", b"b"])
+
   def test_get_sparse_tensors(self):
     """Tests get_sparse_tensors on a deep expression."""
     for options in _OPTIONS_TO_TEST:
@@ -250,6 +299,15 @@ class PrensorTest(tf.test.TestCase):
       self.assertAllEqual(string_np_map["user.friends"].to_list(),
                           [[[b"a"]], [[b"b", b"c"], [b"d"]], [[b"e"]]])
 
+  def test_get_ragged_tensors_share_row_splits(self):
+    """Tests that sibling leaves share the row splits of their ancestors."""
+    expression = prensor_test_util.create_nested_prensor()
+    ragged_tensor_map = prensor._get_ragged_tensors(expression)
+    bar = ragged_tensor_map[path.create_path("doc.bar")]
+    keep_me = ragged_tensor_map[path.create_path("doc.keep_me")]
+    self.assertIs(bar.row_splits, keep_me.row_splits)
+    self.assertIsNot(bar.values.row_splits, keep_me.values.row_splits)
+
   def test_get_ragged_tensor(self):
     """Tests get_ragged_tensor on a deep field."""
     for options in _OPTIONS_TO_TEST:
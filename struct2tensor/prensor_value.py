@@ -22,17 +22,22 @@ with tf.Session() as sess:
   prensor_value = sess.run(prensor)
   assert isinstance(prensor_value, struct2tensor.PrensorValue)
 
+This module does not import tensorflow, so that PrensorValues can be used
+without it (see calculate_numpy.py). The session handler is registered by the
+prensor module.
 """
 
+from __future__ import annotations
+
 import collections
 from typing import FrozenSet, Iterator, Mapping, Optional, Sequence, Union
 
 import numpy as np
+from struct2tensor import lazy_loader
 from struct2tensor import path
-from struct2tensor import prensor
-import tensorflow as tf
 
-from tensorflow.python.client import session as session_lib  # pylint: disable=g-direct-tensorflow-import
+prensor = lazy_loader.LazyLoader("prensor", globals(), "struct2tensor.prensor")
+tf = lazy_loader.LazyLoader("tf", globals(), "tensorflow")
 
 
 class RootNodeValue(object):
@@ -281,21 +286,3 @@ def _prensor_value_from_type_spec_and_component_values(
         child_spec, component_values)
   return PrensorValue(node, step_to_child)
 
-
-def _prensor_value_fetch(prensor_tree: prensor.Prensor):
-  """Fetch function for PrensorValue. See the document in session_lib."""
-  # pylint: disable=protected-access
-  type_spec = prensor_tree._type_spec
-  components = type_spec._to_components(prensor_tree)
-  def _construct_prensor_value(component_values):
-    return _prensor_value_from_type_spec_and_component_values(
-        type_spec, iter(component_values))
-
-  return components, _construct_prensor_value
-
-
-session_lib.register_session_run_conversion_functions(
-    prensor.Prensor,
-    _prensor_value_fetch,
-    feed_function=None,
-    feed_function_for_partial_run=None)
@@ -323,7 +323,8 @@ def s2t_gen_op_wrapper_py(
       name: name of the target
       out: a file that must be provided. Included as source.
       static_library: a static library (ignored).
-      dynamic_library: a dynamic library included as data.
+      dynamic_library: a dynamic library included as data. It is loaded on
+        first use of its ops (see ops/lazy_op_library.py).
       visibility: The visibility attribute on a rule controls whether the rule can be used by other packages. Rules are always visible to other rules declared in the same package.
     """
     native.py_library(
@@ -334,6 +335,9 @@ def s2t_gen_op_wrapper_py(
         data = [
             dynamic_library,
         ],
+        deps = [
+            "//struct2tensor/ops:lazy_op_library",
+        ],
         srcs_version = "PY3ONLY",
         visibility = visibility,
     )
@@ -13,6 +13,9 @@
 # limitations under the License.
 """Tests for struct2tensor.__init__.py."""
 
+import subprocess
+import sys
+
 from absl.testing import absltest
 import struct2tensor as s2t
 
@@ -26,6 +29,7 @@ class Struct2tensorModuleTest(absltest.TestCase):
     # calculate APIs
     s2t.calculate_prensors
     s2t.calculate_prensors_with_graph
+    s2t.CompiledQuery
     s2t.get_default_options
     s2t.get_options_with_minimal_checks
     s2t.calculate_prensors_with_source_paths
@@ -52,16 +56,50 @@ class Struct2tensorModuleTest(absltest.TestCase):
     s2t.prensor_value
     # pylint: enable=pointless-statement
 
+  def test_importing_struct2tensor_is_lazy(self):
+    """This tests that importing struct2tensor does not import tensorflow."""
+    program = ('import sys; import struct2tensor as s2t; s2t.Path; '
+               'print("tensorflow" in sys.modules)')
+    output = subprocess.run([sys.executable, '-c', program],
+                            check=True,
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    self.assertEqual(output.strip(), 'False')
+
+  def test_submodule_import_registers_prensor_session_handler(self):
+    """Tests that Session.run() takes a Prensor with only submodules imported."""
+    program = '\n'.join([
+        'from struct2tensor import calculate',
+        'from struct2tensor.expression_impl import proto',
+        'from struct2tensor.test import test_pb2',
+        'import tensorflow as tf',
+        'event = test_pb2.Event(action=[test_pb2.Action(doc_id="a")])',
+        'with tf.Graph().as_default():',
+        '  expr = proto.create_expression_from_proto(',
+        '      tf.constant([event.SerializeToString()]),',
+        '      test_pb2.Event.DESCRIPTOR)',
+        '  [result] = calculate.calculate_prensors(',
+        '      [expr.project(["action.doc_id"])])',
+        '  with tf.compat.v1.Session() as sess:',
+        '    print(type(sess.run(result)).__name__)',
+    ])
+    output = subprocess.run([sys.executable, '-c', program],
+                            check=True,
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    self.assertEqual(output.strip().splitlines()[-1], 'PrensorValue')
+
   def test_importing_expression_impl_modules(self):
     """This tests that the expression_impl/__init__.py imports are found."""
 
     from struct2tensor import expression_impl  # pylint: disable=g-import-not-at-top
 
     modules = [
-        'apply_schema', 'broadcast', 'depth_limit', 'filter_expression',
-        'index', 'map_prensor', 'map_prensor_to_prensor', 'map_values',
-        'parquet', 'placeholder', 'project', 'promote', 'promote_and_broadcast',
-        'proto', 'reroot', 'size', 'slice_expression'
+        'aggregate', 'apply_schema', 'broadcast', 'depth_limit',
+        'filter_expression', 'index', 'map_prensor', 'map_prensor_to_prensor',
+        'map_values', 'parquet', 'placeholder', 'project', 'promote',
+        'promote_and_broadcast', 'proto', 'proto_record', 'reroot', 'size',
+        'slice_expression'
     ]
 
     for module in modules:
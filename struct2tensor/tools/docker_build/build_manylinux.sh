@@ -57,8 +57,7 @@ function bazel_build() {
 }
 
 libraries=(
-"_decode_proto_map_op.so"
-"_decode_proto_sparse_op.so"
+"_decode_proto_op.so"
 "_run_length_before_op.so"
 "_equi_join_any_indices_op.so"
 "_equi_join_indices_op.so"